@@ -62,3 +62,11 @@ from .microtask_planner import (
     format_plan_for_approval,
     track_microtask_progress
 )
+
+# Общий клиент базы знаний Archon
+from .knowledge_client import (
+    ArchonKnowledgeClient,
+    get_knowledge_client,
+    search_agent_knowledge_text,
+    close_knowledge_clients
+)
@@ -11,6 +11,8 @@
 import logging
 from typing import Dict, Any, List, Optional
 
+from .knowledge_client import search_agent_knowledge_text
+
 logger = logging.getLogger(__name__)
 
 # ID проекта AI Agent Factory
@@ -35,23 +37,16 @@ async def search_knowledge_base(
     Returns:
         Найденная информация или сообщение об ошибке
     """
-    try:
-        # Здесь должен быть реальный вызов Archon MCP
-        # Пока используем заглушку
-        logger.info(f"Поиск в базе знаний: {query}, теги: {tags}, домен: {domain}")
-
-        # TODO: Реализовать вызов через MCP
-        # result = await mcp__archon__rag_search_knowledge_base(
-        #     query=query,
-        #     source_domain=domain,
-        #     match_count=match_count
-        # )
-
-        return f"Результаты поиска для запроса: {query}"
-
-    except Exception as e:
-        logger.error(f"Ошибка поиска в базе знаний: {e}")
-        return f"Ошибка поиска: {e}"
+    logger.info(f"Поиск в базе знаний: {query}, теги: {tags}, домен: {domain}")
+
+    # Общий клиент с пулом соединений и кэшем для всех агентов
+    return await search_agent_knowledge_text(
+        query=query,
+        tags=tags,
+        domain=domain,
+        match_count=match_count,
+        label="База знаний Archon"
+    )
 
 
 async def create_archon_task(
@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+Общий клиент базы знаний Archon для всех агентов.
+
+Вместо нового httpx.AsyncClient (и нового TCP/TLS соединения) на каждый
+вызов search_agent_knowledge агенты используют один клиент на адрес Archon:
+- пул соединений с keep-alive и HTTP/2, если установлен пакет h2
+- кэш результатов по (запрос, теги, домен, количество) с TTL
+- объединение одинаковых одновременных запросов в один HTTP-запрос
+"""
+
+import asyncio
+import copy
+import importlib.util
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Set, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARCHON_URL = "http://localhost:3737"
+SEARCH_PATH = "/rag/search-knowledge-base"
+
+# HTTP/2 в httpx требует необязательный пакет h2
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+CacheKey = Tuple[str, Tuple[str, ...], Optional[str], int]
+
+
+class ArchonKnowledgeClient:
+    """
+    Пулированный клиент поиска в базе знаний Archon с кэшем и объединением запросов.
+
+    Клиент привязан к event loop, в котором был создан пул соединений; при
+    вызове из другого loop (например, после нового asyncio.run) пул создается
+    заново, а прежний закрывается. Каждый вызывающий получает свою копию
+    результата, поэтому изменения ответа не попадают в кэш.
+    """
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_ARCHON_URL,
+        cache_ttl: float = 300.0,
+        cache_size: int = 1024,
+        timeout: float = 30.0,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 60.0,
+        http2: Optional[bool] = None
+    ):
+        """
+        Args:
+            base_url: Адрес Archon
+            cache_ttl: Время жизни кэшированного результата в секундах (0 - без кэша)
+            cache_size: Максимальное число результатов в кэше
+            timeout: Таймаут запроса в секундах
+            max_connections: Максимум одновременных соединений
+            max_keepalive_connections: Максимум простаивающих соединений в пуле
+            keepalive_expiry: Сколько секунд держать простаивающее соединение
+            http2: Использовать HTTP/2 (по умолчанию - если установлен h2)
+        """
+        self.base_url = base_url.rstrip("/")
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.http2 = HTTP2_AVAILABLE if http2 is None else http2
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._cache: "OrderedDict[CacheKey, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[CacheKey, asyncio.Future] = {}
+        self._closing: Set[asyncio.Future] = set()
+        self.stats = {"requests": 0, "cache_hits": 0, "coalesced": 0}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Пул соединений текущего event loop."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            if self._client is not None:
+                logger.debug("Event loop сменился, создаю новый пул соединений Archon")
+                self._retire_client(self._client, self._loop)
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=self.http2,
+                limits=self.limits,
+                timeout=self.timeout
+            )
+            self._loop = loop
+            self._inflight = {}
+        return self._client
+
+    def _retire_client(self, client: httpx.AsyncClient, loop: Optional[asyncio.AbstractEventLoop]):
+        """Закрыть пул соединений прежнего event loop."""
+        if loop is not None and loop.is_running():
+            # Прежний loop работает в другом потоке - закрываем пул в нем
+            closing = asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._close_client(client), loop))
+        else:
+            closing = asyncio.ensure_future(self._close_client(client))
+        self._closing.add(closing)
+        closing.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    async def _close_client(client: httpx.AsyncClient):
+        try:
+            await client.aclose()
+        except RuntimeError as e:
+            # Соединения закрытого loop штатно не закрыть, их сокеты освободит сборщик мусора
+            logger.debug(f"Не удалось закрыть прежний пул соединений Archon: {e}")
+
+    @staticmethod
+    def _cache_key(query: str, tags: Sequence[str], domain: Optional[str], match_count: int) -> CacheKey:
+        return (query, tuple(sorted(set(tags))), domain, match_count)
+
+    def _cached(self, key: CacheKey) -> Optional[Dict[str, Any]]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires, result = entry
+        if expires < time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return result
+
+    def _store(self, key: CacheKey, result: Dict[str, Any]):
+        if self.cache_ttl <= 0 or not result.get("success"):
+            return
+        self._cache[key] = (time.monotonic() + self.cache_ttl, result)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _fetch(self, key: CacheKey) -> Dict[str, Any]:
+        query, tags, domain, match_count = key
+        search_query = f"{query} {' '.join(tags)}" if tags else query
+
+        self.stats["requests"] += 1
+        response = await self._get_client().post(
+            SEARCH_PATH,
+            json={
+                "query": search_query,
+                "source_domain": domain,
+                "match_count": match_count
+            }
+        )
+        response.raise_for_status()
+        result = response.json()
+        self._store(key, result)
+        return result
+
+    async def search(
+        self,
+        query: str,
+        tags: Optional[Sequence[str]] = None,
+        domain: Optional[str] = None,
+        match_count: int = 5,
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Поиск в базе знаний Archon.
+
+        Args:
+            query: Поисковый запрос
+            tags: Теги знаний агента, добавляемые к запросу
+            domain: Домен источников
+            match_count: Количество результатов
+            use_cache: Использовать кэш результатов
+
+        Returns:
+            Ответ Archon (поля success и results)
+
+        Raises:
+            httpx.HTTPStatusError: Archon ответил кодом ошибки
+            httpx.HTTPError: Ошибка соединения
+        """
+        key = self._cache_key(query, tags or [], domain, match_count)
+        if use_cache:
+            cached = self._cached(key)
+            if cached is not None:
+                self.stats["cache_hits"] += 1
+                return copy.deepcopy(cached)
+
+        self._get_client()
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats["coalesced"] += 1
+        else:
+            inflight = asyncio.ensure_future(self._fetch(key))
+            self._inflight[key] = inflight
+            inflight.add_done_callback(lambda done: self._forget(key, done))
+
+        # shield: отмена одного вызывающего не отменяет запрос для остальных
+        return copy.deepcopy(await asyncio.shield(inflight))
+
+    def _forget(self, key: CacheKey, done: asyncio.Future):
+        if self._inflight.get(key) is done:
+            del self._inflight[key]
+
+    def clear_cache(self):
+        """Очистить кэш результатов."""
+        self._cache.clear()
+
+    async def aclose(self):
+        """Закрыть пул соединений, в том числе прежних event loop."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+
+
+def format_knowledge(result: Dict[str, Any], label: str) -> str:
+    """
+    Форматировать ответ Archon для агента.
+
+    Args:
+        result: Ответ ArchonKnowledgeClient.search
+        label: Название базы знаний в заголовке
+
+    Returns:
+        Найденные знания или сообщение, что ничего не найдено
+    """
+    if result.get("success") and result.get("results"):
+        knowledge = "\n".join([
+            f"**{r.get('metadata', {}).get('title', 'Знания')}:**\n{r['content']}"
+            for r in result["results"]
+        ])
+        return f"{label}:\n{knowledge}"
+    return "Информация не найдена в базе знаний агента."
+
+
+_clients: Dict[str, ArchonKnowledgeClient] = {}
+
+
+def get_knowledge_client(base_url: Optional[str] = None) -> ArchonKnowledgeClient:
+    """
+    Общий клиент для адреса Archon.
+
+    Args:
+        base_url: Адрес Archon (по умолчанию ARCHON_URL или localhost:3737)
+
+    Returns:
+        Один и тот же клиент для всех агентов с этим адресом
+    """
+    base_url = (base_url or os.getenv("ARCHON_URL") or DEFAULT_ARCHON_URL).rstrip("/")
+    client = _clients.get(base_url)
+    if client is None:
+        client = _clients[base_url] = ArchonKnowledgeClient(base_url)
+    return client
+
+
+async def search_agent_knowledge_text(
+    query: str,
+    tags: Optional[Sequence[str]] = None,
+    domain: Optional[str] = None,
+    match_count: int = 5,
+    label: str = "База знаний",
+    base_url: Optional[str] = None
+) -> str:
+    """
+    Поиск для инструментов search_agent_knowledge через общий клиент.
+
+    Args:
+        query: Поисковый запрос
+        tags: Теги знаний агента
+        domain: Домен источников
+        match_count: Количество результатов
+        label: Название базы знаний в ответе
+        base_url: Адрес Archon
+
+    Returns:
+        Найденная информация или сообщение об ошибке
+    """
+    try:
+        result = await get_knowledge_client(base_url).search(query, tags, domain, match_count)
+        return format_knowledge(result, label)
+    except httpx.HTTPStatusError as e:
+        return f"Ошибка поиска: {e.response.status_code}"
+    except Exception as e:
+        return f"Ошибка доступа к базе знаний: {e}"
+
+
+async def close_knowledge_clients():
+    """Закрыть пулы соединений всех общих клиентов."""
+    for client in list(_clients.values()):
+        await client.aclose()
+    _clients.clear()
+
+
+__all__ = [
+    "ArchonKnowledgeClient",
+    "format_knowledge",
+    "get_knowledge_client",
+    "search_agent_knowledge_text",
+    "close_knowledge_clients"
+]
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты общего клиента базы знаний Archon на локальном stub-сервере.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from knowledge_client import (
+    ArchonKnowledgeClient,
+    format_knowledge,
+    get_knowledge_client,
+    search_agent_knowledge_text,
+    close_knowledge_clients
+)
+
+
+class StubArchonHandler(BaseHTTPRequestHandler):
+    """Отвечает на /rag/search-knowledge-base как Archon."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        server.requests.append(body)
+        server.connections.add(self.client_address)
+        time.sleep(server.delay)
+
+        if server.status != 200:
+            payload = b"{}"
+        else:
+            payload = json.dumps({
+                "success": True,
+                "results": [{"content": f"ответ на {body['query']}", "metadata": {"title": "Документ"}}]
+            }).encode()
+        self.send_response(server.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def archon():
+    """Stub Archon в отдельном потоке."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubArchonHandler)
+    server.requests = []
+    server.connections = set()
+    server.delay = 0.0
+    server.status = 200
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestArchonKnowledgeClient:
+    """Тесты пула соединений, кэша и объединения запросов."""
+
+    @pytest.mark.asyncio
+    async def test_request_payload_and_connection_reuse(self, archon):
+        """Теги добавляются к запросу, а последовательные запросы идут по одному соединению."""
+        client = ArchonKnowledgeClient(archon.url, cache_ttl=0)
+
+        for i in range(5):
+            result = await client.search(f"запрос {i}", tags=["rag-agent"], domain="docs", match_count=3)
+            assert result["success"]
+        await client.aclose()
+
+        assert archon.requests[0] == {"query": "запрос 0 rag-agent", "source_domain": "docs", "match_count": 3}
+        assert len(archon.requests) == 5
+        assert len(archon.connections) == 1
+
+    @pytest.mark.asyncio
+    async def test_results_cached_per_query_and_tags(self, archon):
+        """Повторный запрос берется из кэша; порядок тегов не важен, другие теги - новый запрос."""
+        client = ArchonKnowledgeClient(archon.url)
+
+        await client.search("pgvector", tags=["a", "b"])
+        await client.search("pgvector", tags=["b", "a"])
+        await client.search("pgvector", tags=["c"])
+        await client.aclose()
+
+        assert len(archon.requests) == 2
+        assert client.stats["cache_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_cache_expires_after_ttl(self, archon):
+        """Устаревший результат запрашивается заново."""
+        client = ArchonKnowledgeClient(archon.url, cache_ttl=0.05)
+
+        await client.search("hnsw")
+        await asyncio.sleep(0.1)
+        await client.search("hnsw")
+        await client.aclose()
+
+        assert len(archon.requests) == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_queries_coalesced(self, archon):
+        """Одинаковые одновременные запросы агентов превращаются в один HTTP-запрос."""
+        archon.delay = 0.1
+        client = ArchonKnowledgeClient(archon.url)
+
+        results = await asyncio.gather(*(client.search("общий запрос", tags=["x"]) for _ in range(10)))
+        await client.aclose()
+
+        assert len(archon.requests) == 1
+        assert client.stats["coalesced"] == 9
+        assert all(result == results[0] for result in results)
+
+    @pytest.mark.asyncio
+    async def test_errors_are_not_cached(self, archon):
+        """Ответ с ошибкой поднимается как HTTPStatusError и не попадает в кэш."""
+        archon.status = 500
+        client = ArchonKnowledgeClient(archon.url)
+
+        with pytest.raises(httpx.HTTPStatusError) as error:
+            await client.search("сбой")
+        archon.status = 200
+        result = await client.search("сбой")
+        await client.aclose()
+
+        assert error.value.response.status_code == 500
+        assert result["success"]
+        assert len(archon.requests) == 2
+
+    def test_new_event_loop_gets_new_pool(self, archon):
+        """Клиент продолжает работать после смены event loop (например, новый asyncio.run)."""
+        client = ArchonKnowledgeClient(archon.url, cache_ttl=0)
+
+        asyncio.run(client.search("первый"))
+        asyncio.run(client.search("второй"))
+
+        assert len(archon.requests) == 2
+
+    def test_old_pool_closed_on_loop_change(self, archon):
+        """Пул прежнего event loop закрывается, а не остается висеть."""
+        client = ArchonKnowledgeClient(archon.url, cache_ttl=0)
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(client.search("первый"))
+            first_pool = client._client
+
+            async def second():
+                await client.search("второй")
+                await client.aclose()
+
+            asyncio.run(second())
+        finally:
+            loop.close()
+
+        assert first_pool.is_closed
+        assert not client._closing
+
+    @pytest.mark.asyncio
+    async def test_cached_result_is_a_copy(self, archon):
+        """Изменение полученного результата не меняет кэш и ответы другим агентам."""
+        archon.delay = 0.05
+        client = ArchonKnowledgeClient(archon.url)
+
+        first, second = await asyncio.gather(client.search("копия"), client.search("копия"))
+        first["results"][0]["content"] = "изменено"
+        first["results"].clear()
+        cached = await client.search("копия")
+        await client.aclose()
+
+        assert second["results"][0]["content"] == "ответ на копия"
+        assert cached == second
+        assert len(archon.requests) == 1
+
+
+class TestSharedClient:
+    """Тесты общего клиента для инструментов search_agent_knowledge."""
+
+    @pytest.mark.asyncio
+    async def test_one_client_per_url(self, archon):
+        """Все агенты с одним адресом Archon получают один клиент."""
+        assert get_knowledge_client(archon.url) is get_knowledge_client(archon.url + "/")
+        await close_knowledge_clients()
+
+    @pytest.mark.asyncio
+    async def test_text_for_agent_tools(self, archon):
+        """Текст для агента совпадает с прежним форматом инструментов."""
+        text = await search_agent_knowledge_text(
+            "индексы", tags=["rag-agent"], label="База знаний RAG Agent", base_url=archon.url
+        )
+        archon.status = 503
+        error = await search_agent_knowledge_text("другое", base_url=archon.url)
+        await close_knowledge_clients()
+
+        assert text == "База знаний RAG Agent:\n**Документ:**\nответ на индексы rag-agent"
+        assert error == "Ошибка поиска: 503"
+        assert format_knowledge({"success": True, "results": []}, "X") == "Информация не найдена в базе знаний агента."
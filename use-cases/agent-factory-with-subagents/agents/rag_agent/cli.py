@@ -4,7 +4,6 @@
 import asyncio
 import sys
 import uuid
-from typing import List
 
 from rich.console import Console
 from rich.panel import Panel
@@ -15,23 +14,20 @@ from pydantic_ai import Agent
 from agent import search_agent
 from dependencies import AgentDependencies
 from settings import load_settings
+from utils.conversation_memory import ConversationMemory, format_prompt
 
 console = Console()
 
 
-async def stream_agent_interaction(user_input: str, conversation_history: List[str], deps: AgentDependencies) -> tuple[str, str]:
+async def stream_agent_interaction(user_input: str, memory: ConversationMemory, deps: AgentDependencies) -> tuple[str, str]:
     """Stream agent interaction with real-time tool call display."""
     
     try:
-        # Build context with conversation history
-        context = "\n".join(conversation_history[-6:]) if conversation_history else ""
-        
-        prompt = f"""Previous conversation:
-{context}
-
-User: {user_input}
-
-Search the knowledge base to answer the user's question. Choose the appropriate search strategy (semantic_search or hybrid_search) based on the query type. Provide a comprehensive summary of your findings."""
+        # Build a token-budgeted context: summary, recent turns and reusable chunks
+        context = memory.build_context(user_input)
+        prompt = format_prompt(user_input, context)
+        if context["chunks"]:
+            console.print(f"  ♻️  [dim]Reusing {len(context['chunks'])} retrieved chunks[/dim]")
 
         # Stream the agent execution
         async with search_agent.iter(prompt, deps=deps) as run:
@@ -131,6 +127,11 @@ Search the knowledge base to answer the user's question. Choose the appropriate
                                     attrs = [attr for attr in dir(event) if not attr.startswith('_')]
                                     result = f"Unknown result structure. Attrs: {attrs[:5]}"
                                 
+                                # Keep search results for follow-up questions
+                                content = getattr(getattr(event, 'result', None), 'content', None)
+                                if isinstance(content, list):
+                                    memory.remember_results(content)
+                                
                                 if result and len(result) > 100:
                                     result = result[:97] + "..."
                                 console.print(f"  ✅ [green]Tool result:[/green] [dim]{result}[/dim]")
@@ -171,7 +172,7 @@ def display_help():
 
 - **exit/quit**: Exit the application
 - **help**: Show this help message
-- **clear**: Clear the screen
+- **clear**: Clear the screen and start a new conversation
 - **info**: Display system configuration
 - **set <key>=<value>**: Set a preference (e.g., 'set text_weight=0.5')
 
@@ -197,7 +198,12 @@ async def main():
     
     console.print("[bold green]✓[/bold green] Search system initialized\n")
     
-    conversation_history = []
+    settings = deps.settings
+    memory = ConversationMemory(
+        history_tokens=settings.memory_history_tokens,
+        summary_tokens=settings.memory_summary_tokens,
+        chunk_tokens=settings.memory_chunk_tokens
+    )
     
     try:
         while True:
@@ -216,6 +222,7 @@ async def main():
                 
                 elif user_input.lower() == 'clear':
                     console.clear()
+                    memory.clear()
                     display_welcome()
                     continue
                 
@@ -254,13 +261,10 @@ async def main():
                 if not user_input:
                     continue
                 
-                # Add to history
-                conversation_history.append(f"User: {user_input}")
-                
                 # Stream the interaction and get response
                 streamed_text, final_response = await stream_agent_interaction(
                     user_input, 
-                    conversation_history, 
+                    memory, 
                     deps
                 )
                 
@@ -268,12 +272,12 @@ async def main():
                 if streamed_text:
                     # Response was streamed, just add spacing
                     console.print()
-                    conversation_history.append(f"Assistant: {streamed_text}")
+                    memory.add_turn(user_input, streamed_text)
                 elif final_response and final_response.strip():
                     # Response wasn't streamed, display with proper formatting
                     console.print(f"[bold blue]Assistant:[/bold blue] {final_response}")
                     console.print()
-                    conversation_history.append(f"Assistant: {final_response}")
+                    memory.add_turn(user_input, final_response)
                     
             except KeyboardInterrupt:
                 console.print("\n[yellow]Use 'exit' to quit[/yellow]")
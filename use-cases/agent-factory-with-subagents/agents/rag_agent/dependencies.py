@@ -6,6 +6,13 @@ import asyncpg
 import openai
 import httpx
 from settings import load_settings
+from utils.embedding_cache import PersistentEmbeddingCache
+from utils.local_embeddings import LocalEmbeddingClient
+from utils.local_store import LocalVectorStore
+from utils.query_embedder import QueryEmbedder
+from utils.retrieval import Reranker, create_reranker
+from utils.storage import PostgresVectorStore, VectorStore
+from utils.vector_codec import register_vector_codec
 
 
 @dataclass
@@ -17,6 +24,10 @@ class RAGAgentDependencies:
     db_pool: Optional[asyncpg.Pool] = None
     openai_client: Optional[openai.AsyncOpenAI] = None
     settings: Optional[Any] = None
+    embedding_cache: Optional[PersistentEmbeddingCache] = None
+    query_embedder: Optional[QueryEmbedder] = None
+    vector_store: Optional[VectorStore] = None
+    reranker: Optional[Reranker] = None
 
     # Universal RAG configuration
     rag_type: str = "semantic-search"  # semantic-search, qa-system, document-analysis, knowledge-base, chat-assistant
@@ -323,38 +334,99 @@ class RAGAgentDependencies:
         if not self.settings:
             self.settings = load_settings()
         
-        # Initialize database pool
-        if not self.db_pool:
+        # Initialize database pool; vectors cross the wire in binary form
+        if not self.db_pool and self.settings.vector_store != "local":
             self.db_pool = await asyncpg.create_pool(
                 self.settings.database_url,
                 min_size=self.settings.db_pool_min_size,
-                max_size=self.settings.db_pool_max_size
+                max_size=self.settings.db_pool_max_size,
+                init=register_vector_codec
             )
         
         # Initialize OpenAI client (or compatible provider)
-        if not self.openai_client:
+        if not self.openai_client and self.settings.embedding_provider == "local":
+            self.openai_client = LocalEmbeddingClient(self.settings.embedding_dimension)
+        elif not self.openai_client:
             self.openai_client = openai.AsyncOpenAI(
                 api_key=self.settings.llm_api_key,
                 base_url=self.settings.llm_base_url
             )
+        
+        # Open the embedding cache shared with ingestion
+        if self.embedding_cache is None and self.settings.embedding_cache_path:
+            self.embedding_cache = PersistentEmbeddingCache(
+                self.settings.embedding_cache_path,
+                max_entries=self.settings.embedding_cache_max_entries
+            )
     
     async def cleanup(self):
         """Clean up external connections."""
+        if self.vector_store is not None:
+            await self.vector_store.close()
+            self.vector_store = None
+        
         if self.db_pool:
             await self.db_pool.close()
             self.db_pool = None
+        
+        if self.query_embedder is not None:
+            await self.query_embedder.drain()
+            self.query_embedder = None
+        
+        if self.embedding_cache is not None:
+            self.embedding_cache.close()
+            self.embedding_cache = None
     
     async def get_embedding(self, text: str) -> list[float]:
-        """Generate embedding for text using OpenAI."""
+        """
+        Generate embedding for text using OpenAI, reusing cached embeddings.
+        
+        Concurrent identical queries share one API call and distinct concurrent
+        queries are batched into one request (see ``QueryEmbedder``).
+        """
         if not self.openai_client:
             await self.initialize()
         
-        response = await self.openai_client.embeddings.create(
-            model=self.settings.embedding_model,
-            input=text
-        )
+        if self.query_embedder is None:
+            self.query_embedder = QueryEmbedder(
+                self.openai_client,
+                self.settings.embedding_model,
+                persistent_cache=self.embedding_cache,
+                max_entries=self.settings.query_embedding_cache_size,
+                ttl_seconds=self.settings.query_embedding_cache_ttl,
+                batch_window_ms=self.settings.query_embedding_batch_window_ms,
+                max_batch_size=self.settings.query_embedding_max_batch_size
+            )
         # Return as list of floats - asyncpg will handle conversion
-        return response.data[0].embedding
+        return await self.query_embedder.embed(text)
+    
+    def get_vector_store(self) -> VectorStore:
+        """
+        Storage backend behind the search tools, created on first use.
+        
+        PostgreSQL uses the session's pool; the local store reads the
+        directory written by ``ingestion.ingest --store local``.
+        """
+        if self.vector_store is None:
+            if not self.settings:
+                self.settings = load_settings()
+            if self.settings.vector_store == "local":
+                self.vector_store = LocalVectorStore(self.settings.local_store_path)
+            else:
+                self.vector_store = PostgresVectorStore(
+                    self.db_pool,
+                    ef_search=self.settings.hnsw_ef_search,
+                    probes=self.settings.ivfflat_probes
+                )
+        return self.vector_store
+    
+    def get_reranker(self) -> Reranker:
+        """Reranker for the configured backend, created on first use."""
+        if self.reranker is None:
+            if not self.settings:
+                self.settings = load_settings()
+            self.reranker = create_reranker(self.settings.reranker)
+        return self.reranker
     
     def set_user_preference(self, key: str, value: Any):
         """Set a user preference for the session."""
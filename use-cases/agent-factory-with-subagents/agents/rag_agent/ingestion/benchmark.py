@@ -0,0 +1,365 @@
+"""
+Benchmark for the staged ingestion pipeline.
+
+Runs the pipeline against a local fake OpenAI-compatible embedding server
+with configurable latency and a simulated database write, so the effect of
+stage concurrency can be measured without network access or PostgreSQL.
+
+With ``--processes``, the benchmark instead compares parsing and chunking
+in threads (0) against process pools of the given sizes, on larger
+documents, and reports how long the event loop was blocked.
+
+Usage (from the rag_agent directory):
+    python -m ingestion.benchmark --documents 200 --embed-latency 0.05
+    python -m ingestion.benchmark --documents 2000 --sections 60 --dimensions 8 --processes 0 2 4 8
+"""
+
+import os
+import asyncio
+import argparse
+import base64
+import hashlib
+import json
+import random
+import struct
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# The pipeline modules build their default clients at import time
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("DATABASE_URL", "postgresql://benchmark@localhost/benchmark")
+
+from openai import AsyncOpenAI
+
+from .embedder import EmbeddingGenerator
+from .ingest import DocumentIngestionPipeline
+
+try:
+    from ..utils.models import IngestionConfig
+except ImportError:
+    # For direct execution or testing
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from utils.models import IngestionConfig
+
+
+WORDS = (
+    "vector search index embedding retrieval chunk document query latency "
+    "throughput pipeline postgres similarity ranking context agent model"
+).split()
+
+
+class FakeEmbeddingServer:
+    """Minimal HTTP server implementing POST /v1/embeddings."""
+    
+    def __init__(self, latency: float = 0.05, dimensions: int = 1536):
+        """
+        Initialize fake server.
+        
+        Args:
+            latency: Seconds each request takes to answer
+            dimensions: Embedding dimension
+        """
+        self.latency = latency
+        self.dimensions = dimensions
+        self.requests = 0
+        self.inputs = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+    
+    @property
+    def base_url(self) -> str:
+        """Base URL for an OpenAI client."""
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/v1"
+    
+    async def start(self):
+        """Start listening on a free local port."""
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+    
+    async def stop(self):
+        """Stop the server."""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+    
+    def _vector(self, text: str) -> List[float]:
+        """Deterministic pseudo-embedding for a text."""
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+        rng = random.Random(seed)
+        return [rng.uniform(-1.0, 1.0) for _ in range(self.dimensions)]
+    
+    def _respond(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Build an embeddings API response."""
+        inputs = request["input"]
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        
+        data = []
+        for index, text in enumerate(inputs):
+            vector = self._vector(text)
+            if request.get("encoding_format") == "base64":
+                embedding = base64.b64encode(struct.pack(f"<{len(vector)}f", *vector)).decode()
+            else:
+                embedding = vector
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+        
+        tokens = sum(len(text.split()) for text in inputs)
+        return {
+            "object": "list",
+            "data": data,
+            "model": request.get("model", "fake"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+        }
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve keep-alive HTTP/1.1 requests on one connection."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                
+                self.requests += 1
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+                try:
+                    await asyncio.sleep(self.latency)
+                    request = json.loads(body)
+                    self.inputs += 1 if isinstance(request["input"], str) else len(request["input"])
+                    payload = json.dumps(self._respond(request)).encode()
+                finally:
+                    self.in_flight -= 1
+                
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Content-Type: application/json\r\n"
+                    + f"Content-Length: {len(payload)}\r\n\r\n".encode()
+                    + payload
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+class BenchmarkPipeline(DocumentIngestionPipeline):
+    """Ingestion pipeline with a simulated database write."""
+    
+    def __init__(self, *args, store_latency: float = 0.01, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.store_latency = store_latency
+        self.saved_chunks = 0
+    
+    async def initialize(self):
+        self._initialized = True
+    
+    async def close(self):
+        self._initialized = False
+    
+    async def _save_documents_to_postgres(
+        self,
+        documents: List[Tuple],
+        replaced_ids: Sequence[str] = ()
+    ) -> List[str]:
+        await asyncio.sleep(self.store_latency)
+        self.saved_chunks += sum(len(chunks) for _, _, _, chunks, _ in documents)
+        return [hashlib.md5(source.encode()).hexdigest() for _, source, _, _, _ in documents]
+
+
+def generate_corpus(folder: str, documents: int, sections: int = 6, seed: int = 42):
+    """
+    Write a synthetic markdown corpus.
+    
+    Args:
+        folder: Destination folder
+        documents: Number of documents
+        sections: Sections per document
+        seed: Random seed
+    """
+    rng = random.Random(seed)
+    for doc in range(documents):
+        lines = [f"# Document {doc}", ""]
+        for section in range(sections):
+            lines.append(f"## Section {section}")
+            lines.append("")
+            for _ in range(rng.randint(3, 6)):
+                lines.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 40))) + ".")
+                lines.append("")
+        with open(os.path.join(folder, f"doc_{doc:04d}.md"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.005) -> float:
+    """
+    Measure the longest delay of the event loop while ingestion runs.
+    
+    Args:
+        stop: Set when the measurement should end
+        interval: Sleep between samples in seconds
+    
+    Returns:
+        Maximum lag in seconds
+    """
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def run_case(
+    name: str,
+    folder: str,
+    config: IngestionConfig,
+    embed_latency: float,
+    store_latency: float,
+    dimensions: int = 1536
+) -> Dict[str, Any]:
+    """
+    Ingest the corpus once and collect timings.
+    
+    Args:
+        name: Case name
+        folder: Corpus folder
+        config: Ingestion configuration
+        embed_latency: Fake embedding request latency in seconds
+        store_latency: Simulated database write latency in seconds
+        dimensions: Embedding dimension returned by the fake server
+    
+    Returns:
+        Case report
+    """
+    server = FakeEmbeddingServer(latency=embed_latency, dimensions=dimensions)
+    await server.start()
+    client = AsyncOpenAI(base_url=server.base_url, api_key="fake", max_retries=0)
+    
+    try:
+        pipeline = BenchmarkPipeline(
+            config=config,
+            documents_folder=folder,
+            embedder=EmbeddingGenerator(client=client),
+            store_latency=store_latency
+        )
+        
+        stop = asyncio.Event()
+        lag = asyncio.create_task(measure_loop_lag(stop))
+        start = time.perf_counter()
+        try:
+            results = await pipeline.ingest_documents()
+        finally:
+            elapsed = time.perf_counter() - start
+            stop.set()
+            max_lag = await lag
+    finally:
+        await client.close()
+        await server.stop()
+    
+    return {
+        "case": name,
+        "documents": len(results),
+        "chunks": pipeline.saved_chunks,
+        "errors": sum(len(r.errors) for r in results),
+        "seconds": round(elapsed, 3),
+        "documents_per_second": round(len(results) / elapsed, 1),
+        "embedding_requests": server.requests,
+        "max_in_flight_requests": server.max_in_flight,
+        "max_loop_lag_ms": round(max_lag * 1000, 1),
+        "workers": {
+            "chunk": config.chunk_workers,
+            "chunk_processes": config.chunk_processes,
+            "embed": config.embed_workers,
+            "store": config.store_workers,
+            "queue_size": config.queue_size
+        }
+    }
+
+
+async def main():
+    """Run the ingestion benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark the staged ingestion pipeline")
+    parser.add_argument("--documents", type=int, default=100, help="Number of synthetic documents")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="Embedding request latency (s)")
+    parser.add_argument("--store-latency", type=float, default=0.01, help="Database write latency (s)")
+    parser.add_argument("--chunk-workers", type=int, default=4, help="Concurrent read/chunk workers")
+    parser.add_argument("--embed-workers", type=int, default=8, help="Concurrent embedding requests")
+    parser.add_argument("--store-workers", type=int, default=4, help="Concurrent database writers")
+    parser.add_argument("--queue-size", type=int, default=32, help="Documents buffered between stages")
+    parser.add_argument("--sections", type=int, default=6, help="Sections per synthetic document")
+    parser.add_argument("--dimensions", type=int, default=1536,
+                        help="Fake embedding dimension (lower it to keep serialization off the measured path)")
+    parser.add_argument("--processes", type=int, nargs="+",
+                        help="Compare chunking process pool sizes (0: threads) instead of the default cases")
+    parser.add_argument("--output", "-o", help="Write the JSON report to this file")
+    args = parser.parse_args()
+    
+    cases = {
+        "single_worker": IngestionConfig(
+            use_semantic_chunking=False,
+            chunk_processes=0,
+            chunk_workers=1,
+            embed_workers=1,
+            store_workers=1,
+            queue_size=1
+        ),
+        "pipelined": IngestionConfig(
+            use_semantic_chunking=False,
+            chunk_workers=args.chunk_workers,
+            embed_workers=args.embed_workers,
+            store_workers=args.store_workers,
+            queue_size=args.queue_size
+        )
+    }
+    if args.processes:
+        cases = {
+            f"processes_{processes}": IngestionConfig(
+                use_semantic_chunking=False,
+                chunk_processes=processes,
+                chunk_workers=args.chunk_workers,
+                embed_workers=args.embed_workers,
+                store_workers=args.store_workers,
+                queue_size=args.queue_size
+            )
+            for processes in args.processes
+        }
+    
+    with tempfile.TemporaryDirectory() as folder:
+        generate_corpus(folder, args.documents, sections=args.sections)
+        reports = [
+            await run_case(name, folder, config, args.embed_latency, args.store_latency, args.dimensions)
+            for name, config in cases.items()
+        ]
+    
+    report = {
+        "documents": args.documents,
+        "embed_latency": args.embed_latency,
+        "store_latency": args.store_latency,
+        "cpu_count": os.cpu_count(),
+        "cases": reports,
+        "speedup": round(reports[0]["seconds"] / reports[-1]["seconds"], 2)
+    }
+    
+    print(json.dumps(report, indent=2))
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
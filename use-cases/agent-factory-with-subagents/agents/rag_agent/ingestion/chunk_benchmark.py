@@ -0,0 +1,254 @@
+"""
+Benchmark for document chunking strategies.
+
+Chunks a folder of documents (``documents/`` by default) with each strategy
+and reports chunking speed and retrieval quality. Retrieval quality is
+measured with sentences sampled from the documents as queries: a query hits
+when a returned chunk from the same document contains the sentence. Results
+are reported as recall@k and mean reciprocal rank over all chunks of the
+corpus.
+
+By default a local hashed bag-of-words embedder is used for both sentence
+embeddings and retrieval, so the benchmark runs without network access;
+``--embeddings api`` uses the configured embedding provider instead.
+
+Usage (from the rag_agent directory):
+    python -m ingestion.chunk_benchmark --documents documents
+    python -m ingestion.chunk_benchmark --embeddings api --llm
+"""
+
+import os
+import re
+import asyncio
+import argparse
+import glob
+import hashlib
+import json
+import random
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# The chunking modules build their default clients at import time
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from .chunker import (
+    SENTENCE_BOUNDARY, ChunkingConfig, DocumentChunk, SemanticChunker, SimpleChunker
+)
+
+WORD = re.compile(r"\w+")
+
+
+class LexicalEmbedder:
+    """Local embedder hashing word counts into a fixed-size vector."""
+    
+    model = "lexical-hash"
+    
+    def __init__(self, dimensions: int = 1024):
+        """
+        Initialize embedder.
+        
+        Args:
+            dimensions: Embedding dimension
+        """
+        self.dimensions = dimensions
+    
+    def _vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for word in WORD.findall(text.lower()):
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dimensions] += 1.0 if value >> 63 else -1.0
+        # Sublinear term frequency
+        return np.sign(vector) * np.log1p(np.abs(vector))
+    
+    async def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts locally."""
+        return [self._vector(text).tolist() for text in texts]
+    
+    async def embed_query(self, query: str) -> List[float]:
+        """Embed a query locally."""
+        return self._vector(query).tolist()
+
+
+def load_documents(folder: str) -> List[Tuple[str, str]]:
+    """Read markdown and text files as (name, content) pairs."""
+    paths = sorted(
+        glob.glob(os.path.join(folder, "**", "*.md"), recursive=True)
+        + glob.glob(os.path.join(folder, "**", "*.txt"), recursive=True)
+    )
+    documents = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            documents.append((os.path.relpath(path, folder), f.read()))
+    return documents
+
+
+def sample_queries(
+    documents: Sequence[Tuple[str, str]],
+    per_document: int,
+    seed: int = 42
+) -> List[Tuple[str, str]]:
+    """
+    Pick sentences from each document to use as queries.
+    
+    Args:
+        documents: (name, content) pairs
+        per_document: Queries per document
+        seed: Random seed
+    
+    Returns:
+        (document name, sentence) pairs
+    """
+    rng = random.Random(seed)
+    queries = []
+    for name, content in documents:
+        sentences = [
+            sentence.strip()
+            for sentence in SENTENCE_BOUNDARY.split(content)
+            if len(WORD.findall(sentence)) >= 8 and not sentence.lstrip().startswith(("#", "|", "```"))
+        ]
+        queries.extend((name, sentence) for sentence in rng.sample(sentences, min(per_document, len(sentences))))
+    return queries
+
+
+async def chunk_corpus(chunker, documents: Sequence[Tuple[str, str]]) -> List[List[DocumentChunk]]:
+    """Chunk every document with the given chunker."""
+    result = []
+    for name, content in documents:
+        chunks = chunker.chunk_document(content=content, title=name, source=name)
+        if asyncio.iscoroutine(chunks):
+            chunks = await chunks
+        result.append(chunks)
+    return result
+
+
+async def evaluate_retrieval(
+    embedder,
+    documents: Sequence[Tuple[str, str]],
+    chunked: Sequence[List[DocumentChunk]],
+    queries: Sequence[Tuple[str, str]],
+    k_values: Sequence[int] = (1, 5)
+) -> Dict[str, float]:
+    """
+    Rank all chunks for each query by cosine similarity.
+    
+    Args:
+        embedder: Embedder with generate_embeddings_batch
+        documents: (name, content) pairs
+        chunked: Chunks of each document
+        queries: (document name, sentence) pairs
+        k_values: Cut-offs for recall@k
+    
+    Returns:
+        Recall at each k and mean reciprocal rank
+    """
+    sources = [name for (name, _), chunks in zip(documents, chunked) for _ in chunks]
+    chunks = [chunk for doc_chunks in chunked for chunk in doc_chunks]
+    
+    chunk_vectors = np.asarray(
+        await embedder.generate_embeddings_batch([chunk.content for chunk in chunks]), dtype=np.float32
+    )
+    query_vectors = np.asarray(
+        await embedder.generate_embeddings_batch([sentence for _, sentence in queries]), dtype=np.float32
+    )
+    chunk_vectors /= np.maximum(np.linalg.norm(chunk_vectors, axis=1, keepdims=True), 1e-12)
+    query_vectors /= np.maximum(np.linalg.norm(query_vectors, axis=1, keepdims=True), 1e-12)
+    
+    ranking = np.argsort(-(query_vectors @ chunk_vectors.T), axis=1)
+    
+    hits = {k: 0 for k in k_values}
+    reciprocal_ranks = 0.0
+    for (source, sentence), ranked in zip(queries, ranking):
+        relevant = [
+            rank for rank, position in enumerate(ranked)
+            if sources[position] == source and sentence in chunks[position].content
+        ]
+        if not relevant:
+            continue
+        for k in k_values:
+            hits[k] += relevant[0] < k
+        reciprocal_ranks += 1.0 / (relevant[0] + 1)
+    
+    metrics = {f"recall@{k}": round(hits[k] / len(queries), 4) for k in k_values}
+    metrics["mrr"] = round(reciprocal_ranks / len(queries), 4)
+    return metrics
+
+
+async def run_case(
+    name: str,
+    chunker,
+    embedder,
+    documents: Sequence[Tuple[str, str]],
+    queries: Sequence[Tuple[str, str]]
+) -> Dict[str, Any]:
+    """Time chunking of the corpus and evaluate retrieval over the chunks."""
+    start = time.perf_counter()
+    chunked = await chunk_corpus(chunker, documents)
+    elapsed = time.perf_counter() - start
+    
+    sizes = [len(chunk.content) for chunks in chunked for chunk in chunks]
+    report = {
+        "case": name,
+        "seconds": round(elapsed, 3),
+        "documents_per_second": round(len(documents) / elapsed, 1),
+        "chunks": len(sizes),
+        "mean_chunk_chars": round(float(np.mean(sizes)), 1),
+        "max_chunk_chars": max(sizes)
+    }
+    report.update(await evaluate_retrieval(embedder, documents, chunked, queries))
+    return report
+
+
+async def main():
+    """Run the chunking benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark document chunking strategies")
+    parser.add_argument("--documents", "-d", default="documents", help="Documents folder path")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Target chunk size")
+    parser.add_argument("--chunk-overlap", type=int, default=200, help="Chunk overlap for simple chunking")
+    parser.add_argument("--queries", type=int, default=10, help="Sampled query sentences per document")
+    parser.add_argument("--embeddings", choices=["lexical", "api"], default="lexical",
+                        help="Local hashed bag-of-words or the configured embedding provider")
+    parser.add_argument("--llm", action="store_true", help="Also benchmark LLM-based splitting")
+    parser.add_argument("--output", "-o", help="Write the JSON report to this file")
+    args = parser.parse_args()
+    
+    if args.embeddings == "api":
+        from .embedder import create_embedder
+        embedder = create_embedder()
+    else:
+        embedder = LexicalEmbedder()
+    
+    documents = load_documents(args.documents)
+    queries = sample_queries(documents, args.queries)
+    
+    def config(**kwargs) -> ChunkingConfig:
+        return ChunkingConfig(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap, **kwargs)
+    
+    cases = [
+        ("simple", SimpleChunker(config(use_semantic_splitting=False))),
+        ("embedding", SemanticChunker(config(semantic_method="embedding"), embedder=embedder))
+    ]
+    if args.llm:
+        cases.append(("llm", SemanticChunker(config(semantic_method="llm"))))
+    
+    reports = [await run_case(name, chunker, embedder, documents, queries) for name, chunker in cases]
+    
+    report = {
+        "documents": len(documents),
+        "queries": len(queries),
+        "chunk_size": args.chunk_size,
+        "embeddings": embedder.model,
+        "cases": reports
+    }
+    
+    print(json.dumps(report, indent=2))
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
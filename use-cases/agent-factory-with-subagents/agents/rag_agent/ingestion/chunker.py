@@ -9,6 +9,7 @@ from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 import asyncio
 
+import numpy as np
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -18,17 +19,115 @@ logger = logging.getLogger(__name__)
 
 # Import flexible providers
 try:
-    from ..utils.providers import get_embedding_client, get_ingestion_model
+    from ..utils.providers import get_ingestion_model
 except ImportError:
     # For direct execution or testing
     import sys
     import os
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    from utils.providers import get_embedding_client, get_ingestion_model
+    from utils.providers import get_ingestion_model
 
-# Initialize clients with flexible providers
-embedding_client = get_embedding_client()
-ingestion_model = get_ingestion_model()
+# Sentence ends, paragraph breaks, and line breaks before headers or list items
+SENTENCE_BOUNDARY = re.compile(
+    r'(?<=[.!?…])["\')\]]*\s+'
+    r'|\n\s*\n'
+    r'|\n(?=[ \t]*(?:#{1,6}\s|[-*+]\s|\d+\.\s|\|))'
+)
+
+# Line patterns of the markdown section tokenizer, matched at line starts
+HEADER_LINE = re.compile(r'[ \t]{0,3}#{1,6}(?:[ \t]|$)')
+FENCE_LINE = re.compile(r'[ \t]*(```|~~~)')
+LIST_ITEM_LINE = re.compile(r'[ \t]*(?:[-*+]|\d+[.)])[ \t]+\S')
+TABLE_LINE = re.compile(r'[ \t]*\|')
+
+
+def split_markdown_sections(content: str) -> List[Tuple[int, int, str]]:
+    """
+    Split markdown into structural sections in a single pass.
+    
+    Sections are headers, paragraphs, list items, fenced code blocks and
+    tables. Each line is inspected once, so the cost is linear in the size
+    of the document.
+    
+    Args:
+        content: Markdown text
+    
+    Returns:
+        List of (start, end, kind) tuples; offsets exclude surrounding whitespace
+    """
+    sections = []
+    length = len(content)
+    start = None
+    end = 0
+    kind = ""
+    fence = None
+    pos = 0
+    
+    while pos < length:
+        newline = content.find("\n", pos)
+        line_end = length if newline == -1 else newline
+        next_pos = line_end + 1
+        
+        # Last non-whitespace position of the line
+        text_end = line_end
+        while text_end > pos and content[text_end - 1] in " \t\r":
+            text_end -= 1
+        
+        if fence is not None:
+            # Inside a code block only the closing fence matters
+            end = max(end, text_end)
+            match = FENCE_LINE.match(content, pos, line_end)
+            if match and match.group(1) == fence:
+                sections.append((start, end, kind))
+                start, fence = None, None
+            pos = next_pos
+            continue
+        
+        text_start = pos
+        while text_start < text_end and content[text_start] in " \t":
+            text_start += 1
+        
+        if text_start == text_end:
+            # Blank line ends the current section
+            if start is not None:
+                sections.append((start, end, kind))
+                start = None
+        elif HEADER_LINE.match(content, pos, line_end):
+            if start is not None:
+                sections.append((start, end, kind))
+                start = None
+            sections.append((text_start, text_end, "header"))
+        elif FENCE_LINE.match(content, pos, line_end):
+            if start is not None:
+                sections.append((start, end, kind))
+            fence = FENCE_LINE.match(content, pos, line_end).group(1)
+            start, end, kind = text_start, text_end, "code"
+        elif LIST_ITEM_LINE.match(content, pos, line_end):
+            if start is not None:
+                sections.append((start, end, kind))
+            start, end, kind = text_start, text_end, "list"
+        elif TABLE_LINE.match(content, pos, line_end):
+            if start is not None and kind != "table":
+                sections.append((start, end, kind))
+                start = None
+            if start is None:
+                start, kind = text_start, "table"
+            end = text_end
+        else:
+            # Paragraph text, or a continuation line of a paragraph or list item
+            if start is not None and kind == "table":
+                sections.append((start, end, kind))
+                start = None
+            if start is None:
+                start, kind = text_start, "paragraph"
+            end = text_end
+        
+        pos = next_pos
+    
+    if start is not None:
+        sections.append((start, end, kind))
+    
+    return sections
 
 
 @dataclass
@@ -40,6 +139,11 @@ class ChunkingConfig:
     min_chunk_size: int = 100
     use_semantic_splitting: bool = True
     preserve_structure: bool = True
+    # "embedding" breaks where adjacent sentence windows diverge;
+    # "llm" asks the ingestion model to split each oversized section
+    semantic_method: str = "embedding"
+    sentence_window: int = 2
+    breakpoint_percentile: float = 90.0
     
     def __post_init__(self):
         """Validate configuration."""
@@ -47,6 +151,10 @@ class ChunkingConfig:
             raise ValueError("Chunk overlap must be less than chunk size")
         if self.min_chunk_size <= 0:
             raise ValueError("Minimum chunk size must be positive")
+        if self.semantic_method not in ("embedding", "llm"):
+            raise ValueError(f"Unknown semantic method: {self.semantic_method}")
+        if self.sentence_window < 1:
+            raise ValueError("Sentence window must be at least 1")
 
 
 @dataclass
@@ -67,18 +175,28 @@ class DocumentChunk:
 
 
 class SemanticChunker:
-    """Semantic document chunker using LLM for intelligent splitting."""
+    """
+    Semantic document chunker.
     
-    def __init__(self, config: ChunkingConfig):
+    By default chunks end where the embeddings of adjacent sentence windows
+    diverge. Splitting oversized sections with the ingestion LLM is available
+    with ``semantic_method="llm"``.
+    """
+    
+    def __init__(self, config: ChunkingConfig, embedder: Optional[Any] = None):
         """
         Initialize chunker.
         
         Args:
             config: Chunking configuration
+            embedder: Embedding generator for sentence embeddings (created on
+                first use if not given)
         """
         self.config = config
-        self.client = embedding_client
-        self.model = ingestion_model
+        # The ingestion LLM is only created when LLM splitting is used, so
+        # offline runs need no API key
+        self.model = None
+        self.embedder = embedder
     
     async def chunk_document(
         self,
@@ -110,13 +228,22 @@ class SemanticChunker:
         
         # First, try semantic chunking if enabled
         if self.config.use_semantic_splitting and len(content) > self.config.chunk_size:
+            if self.config.semantic_method == "embedding":
+                try:
+                    spans = await self._embedding_chunk(content)
+                    return self._create_chunk_objects(spans, content, base_metadata, "embedding")
+                except Exception as e:
+                    logger.warning(f"Embedding chunking failed, falling back to simple chunking: {e}")
+                    return self._simple_chunk(content, base_metadata)
+            
             try:
                 semantic_chunks = await self._semantic_chunk(content)
                 if semantic_chunks:
                     return self._create_chunk_objects(
                         semantic_chunks,
                         content,
-                        base_metadata
+                        base_metadata,
+                        "semantic"
                     )
             except Exception as e:
                 logger.warning(f"Semantic chunking failed, falling back to simple chunking: {e}")
@@ -124,91 +251,240 @@ class SemanticChunker:
         # Fallback to rule-based chunking
         return self._simple_chunk(content, base_metadata)
     
-    async def _semantic_chunk(self, content: str) -> List[str]:
+    async def _embedding_chunk(self, content: str) -> List[Tuple[int, int]]:
         """
-        Perform semantic chunking using LLM.
+        Split content at similarity valleys between sentence windows.
+        
+        Each sentence is embedded once; a window embedding is the mean of the
+        normalized embeddings of ``sentence_window`` consecutive sentences,
+        computed for all boundaries at once from cumulative sums.
         
         Args:
             content: Content to chunk
         
         Returns:
-            List of chunk boundaries
+            List of (start, end) character offsets of chunks
         """
-        # First, split on natural boundaries
-        sections = self._split_on_structure(content)
+        sentences = self._split_sentences(content)
+        if len(sentences) < 2:
+            return sentences
         
-        # Group sections into semantic chunks
-        chunks = []
-        current_chunk = ""
+        if self.embedder is None:
+            from .embedder import create_embedder
+            self.embedder = create_embedder()
         
-        for section in sections:
-            # Check if adding this section would exceed chunk size
-            potential_chunk = current_chunk + "\n\n" + section if current_chunk else section
-            
-            if len(potential_chunk) <= self.config.chunk_size:
-                current_chunk = potential_chunk
-            else:
-                # Current chunk is ready, decide if we should split the section
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                    current_chunk = ""
-                
-                # Handle oversized sections
-                if len(section) > self.config.max_chunk_size:
-                    # Split the section semantically
-                    sub_chunks = await self._split_long_section(section)
-                    chunks.extend(sub_chunks)
-                else:
-                    current_chunk = section
+        embeddings = await self.embedder.generate_embeddings_batch(
+            [content[start:end] for start, end in sentences]
+        )
+        distances = self._window_distances(
+            np.asarray(embeddings, dtype=np.float32),
+            self.config.sentence_window
+        )
         
-        # Add the last chunk
-        if current_chunk:
-            chunks.append(current_chunk.strip())
+        # Headers always start a new section
+        headers = np.array([content.startswith("#", start) for start, _ in sentences[1:]])
         
-        return [chunk for chunk in chunks if len(chunk.strip()) >= self.config.min_chunk_size]
+        return self._segment(sentences, distances, headers)
     
-    def _split_on_structure(self, content: str) -> List[str]:
+    def _split_sentences(self, content: str) -> List[Tuple[int, int]]:
         """
-        Split content on structural boundaries.
+        Split content into sentences with exact character offsets.
+        
+        Sentences longer than the chunk size are cut at whitespace.
         
         Args:
             content: Content to split
         
         Returns:
-            List of sections
+            List of (start, end) offsets with surrounding whitespace excluded
         """
-        # Split on markdown headers, paragraphs, and other structural elements
-        patterns = [
-            r'\n#{1,6}\s+.+?\n',  # Markdown headers
-            r'\n\n+',            # Multiple newlines (paragraph breaks)
-            r'\n[-*+]\s+',       # List items
-            r'\n\d+\.\s+',       # Numbered lists
-            r'\n```.*?```\n',    # Code blocks
-            r'\n\|\s*.+?\|\s*\n', # Tables
-        ]
-        
-        # Split by patterns but keep the separators
-        sections = [content]
-        
-        for pattern in patterns:
-            new_sections = []
-            for section in sections:
-                parts = re.split(f'({pattern})', section, flags=re.MULTILINE | re.DOTALL)
-                new_sections.extend([part for part in parts if part.strip()])
-            sections = new_sections
-        
-        return sections
-    
-    async def _split_long_section(self, section: str) -> List[str]:
+        spans = []
+        start = 0
+        for match in SENTENCE_BOUNDARY.finditer(content):
+            spans.append((start, match.start()))
+            start = match.end()
+        spans.append((start, len(content)))
+        
+        sentences = []
+        limit = self.config.chunk_size
+        for start, end in spans:
+            # Trim whitespace without copying the text
+            while start < end and content[start].isspace():
+                start += 1
+            while end > start and content[end - 1].isspace():
+                end -= 1
+            
+            while end - start > limit:
+                cut = content.rfind(" ", start + limit // 2, start + limit)
+                if cut <= start:
+                    cut = start + limit
+                sentences.append((start, cut))
+                start = cut
+                while start < end and content[start].isspace():
+                    start += 1
+            
+            if end > start:
+                sentences.append((start, end))
+        
+        return sentences
+    
+    @staticmethod
+    def _window_distances(embeddings: np.ndarray, window: int) -> np.ndarray:
+        """
+        Cosine distances between the sentence windows on either side of each boundary.
+        
+        Args:
+            embeddings: Sentence embeddings, one row per sentence
+            window: Sentences per window
+        
+        Returns:
+            Array of n - 1 distances; entry i is the boundary after sentence i
+        """
+        count = len(embeddings)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        unit = embeddings / np.maximum(norms, 1e-12)
+        
+        sums = np.zeros((count + 1, unit.shape[1]), dtype=np.float64)
+        np.cumsum(unit, axis=0, out=sums[1:])
+        
+        boundaries = np.arange(1, count)
+        left = sums[boundaries] - sums[np.maximum(boundaries - window, 0)]
+        right = sums[np.minimum(boundaries + window, count)] - sums[boundaries]
+        
+        left /= np.maximum(np.linalg.norm(left, axis=1, keepdims=True), 1e-12)
+        right /= np.maximum(np.linalg.norm(right, axis=1, keepdims=True), 1e-12)
+        
+        return 1.0 - np.einsum("ij,ij->i", left, right)
+    
+    def _segment(
+        self,
+        sentences: List[Tuple[int, int]],
+        distances: np.ndarray,
+        headers: np.ndarray
+    ) -> List[Tuple[int, int]]:
+        """
+        Group sentences into chunks, breaking at the deepest similarity valleys.
+        
+        Boundaries that are local distance maxima above the configured
+        percentile, and boundaries before headers, start new chunks. Chunks
+        still larger than ``chunk_size`` are split at their most distant
+        boundary, and chunks below ``min_chunk_size`` are merged with the
+        previous chunk.
+        
+        Args:
+            sentences: Sentence offsets
+            distances: Distance at each boundary between sentences
+            headers: Whether each boundary precedes a header
+        
+        Returns:
+            List of (start, end) chunk offsets
+        """
+        starts = np.array([start for start, _ in sentences])
+        ends = np.array([end for _, end in sentences])
+        scores = distances + headers
+        
+        def size(first: int, last: int) -> int:
+            return int(ends[last - 1] - starts[first])
+        
+        threshold = np.percentile(distances, self.config.breakpoint_percentile)
+        peaks = (scores >= np.r_[-np.inf, scores[:-1]]) & (scores >= np.r_[scores[1:], -np.inf])
+        cuts = np.flatnonzero((peaks & (distances > threshold)) | headers) + 1
+        
+        bounds = [0, *cuts.tolist(), len(sentences)]
+        pending = list(zip(bounds[:-1], bounds[1:]))[::-1]
+        segments = []
+        
+        # Split oversized segments at their most distant boundary
+        while pending:
+            first, last = pending.pop()
+            if last - first < 2 or size(first, last) <= self.config.chunk_size:
+                segments.append((first, last))
+                continue
+            
+            inner = np.arange(first + 1, last)
+            balanced = inner[
+                (ends[inner - 1] - starts[first] >= self.config.min_chunk_size)
+                & (ends[last - 1] - starts[inner] >= self.config.min_chunk_size)
+            ]
+            candidates = balanced if len(balanced) else inner
+            # Near-equal boundaries are broken towards the middle of the segment
+            middle = (starts[first] + ends[last - 1]) / 2
+            offcentre = np.abs(starts[candidates] - middle) / size(first, last)
+            cut = int(candidates[np.argmax(scores[candidates - 1] - 1e-3 * offcentre)])
+            pending.extend([(cut, last), (first, cut)])
+        
+        # Merge undersized segments with the previous one, within the chunk
+        # size if possible and the maximum chunk size for a short tail
+        merged = []
+        for first, last in segments:
+            if merged:
+                previous = size(*merged[-1])
+                combined = size(merged[-1][0], last)
+                small = min(previous, size(first, last)) < self.config.min_chunk_size
+                if small and (
+                    combined <= self.config.chunk_size
+                    or (previous <= self.config.chunk_size and combined <= self.config.max_chunk_size)
+                ):
+                    merged[-1] = (merged[-1][0], last)
+                    continue
+            merged.append((first, last))
+        
+        return [(int(starts[first]), int(ends[last - 1])) for first, last in merged]
+    
+    async def _semantic_chunk(self, content: str) -> List[Tuple[int, int]]:
+        """
+        Perform semantic chunking using LLM.
+        
+        Args:
+            content: Content to chunk
+        
+        Returns:
+            List of (start, end) chunk offsets
+        """
+        # Group structural sections into chunks
+        chunks = []
+        current = None
+        
+        for start, end, _ in split_markdown_sections(content):
+            # Check if adding this section would exceed chunk size
+            if current is not None and end - current[0] <= self.config.chunk_size:
+                current = (current[0], end)
+                continue
+            
+            # Current chunk is ready, decide if we should split the section
+            if current is not None:
+                chunks.append(current)
+                current = None
+            
+            # Handle oversized sections
+            if end - start > self.config.max_chunk_size:
+                # Split the section semantically
+                chunks.extend(await self._split_long_section(content, start, end))
+            else:
+                current = (start, end)
+        
+        # Add the last chunk
+        if current is not None:
+            chunks.append(current)
+        
+        return [(start, end) for start, end in chunks if end - start >= self.config.min_chunk_size]
+    
+    async def _split_long_section(self, content: str, start: int, end: int) -> List[Tuple[int, int]]:
         """
         Split a long section using LLM for semantic boundaries.
         
+        The model's chunks are located in the section so that offsets stay
+        exact; if it rewrote the text, the section is split by rules instead.
+        
         Args:
-            section: Section to split
+            content: Document content
+            start: Section start offset
+            end: Section end offset
         
         Returns:
-            List of sub-chunks
+            List of (start, end) sub-chunk offsets
         """
+        section = content[start:end]
         try:
             prompt = f"""
             Split the following text into semantically coherent chunks. Each chunk should:
@@ -225,54 +501,71 @@ class SemanticChunker:
             
             # Use Pydantic AI for LLM calls
             from pydantic_ai import Agent
+            if self.model is None:
+                self.model = get_ingestion_model()
             temp_agent = Agent(self.model)
             
             response = await temp_agent.run(prompt)
             result = response.data
             chunks = [chunk.strip() for chunk in result.split("---CHUNK---")]
             
-            # Validate chunks
+            # Validate chunks and locate them in the section
             valid_chunks = []
+            cursor = start
             for chunk in chunks:
-                if (self.config.min_chunk_size <= len(chunk) <= self.config.max_chunk_size):
-                    valid_chunks.append(chunk)
+                if not (self.config.min_chunk_size <= len(chunk) <= self.config.max_chunk_size):
+                    continue
+                position = content.find(chunk, cursor, end)
+                if position == -1:
+                    logger.warning("LLM chunk does not match the source text, using simple splitting")
+                    return self._simple_split(content, start, end)
+                valid_chunks.append((position, position + len(chunk)))
+                cursor = position + len(chunk)
             
-            return valid_chunks if valid_chunks else self._simple_split(section)
+            return valid_chunks if valid_chunks else self._simple_split(content, start, end)
             
         except Exception as e:
             logger.error(f"LLM chunking failed: {e}")
-            return self._simple_split(section)
+            return self._simple_split(content, start, end)
     
-    def _simple_split(self, text: str) -> List[str]:
+    def _simple_split(
+        self,
+        text: str,
+        start: int = 0,
+        end: Optional[int] = None
+    ) -> List[Tuple[int, int]]:
         """
         Simple text splitting as fallback.
         
         Args:
             text: Text to split
+            start: Offset to start splitting at
+            end: Offset to stop at (end of text by default)
         
         Returns:
-            List of chunks
+            List of (start, end) chunk offsets
         """
+        if end is None:
+            end = len(text)
+        
         chunks = []
-        start = 0
         
-        while start < len(text):
-            end = start + self.config.chunk_size
+        while start < end:
+            chunk_end = start + self.config.chunk_size
             
-            if end >= len(text):
+            if chunk_end >= end:
                 # Last chunk
-                chunks.append(text[start:])
+                chunks.append((start, end))
                 break
             
             # Try to end at a sentence boundary
-            chunk_end = end
-            for i in range(end, max(start + self.config.min_chunk_size, end - 200), -1):
+            for i in range(chunk_end, max(start + self.config.min_chunk_size, chunk_end - 200), -1):
                 if text[i] in '.!?\n':
                     chunk_end = i + 1
                     break
             
-            chunks.append(text[start:chunk_end])
-            start = chunk_end - self.config.chunk_overlap
+            chunks.append((start, chunk_end))
+            start = max(chunk_end - self.config.chunk_overlap, start + 1)
         
         return chunks
     
@@ -291,54 +584,49 @@ class SemanticChunker:
         Returns:
             List of document chunks
         """
-        chunks = self._simple_split(content)
-        return self._create_chunk_objects(chunks, content, base_metadata)
+        spans = self._simple_split(content)
+        return self._create_chunk_objects(spans, content, base_metadata, "simple")
     
     def _create_chunk_objects(
         self,
-        chunks: List[str],
-        original_content: str,
-        base_metadata: Dict[str, Any]
+        spans: List[Tuple[int, int]],
+        content: str,
+        base_metadata: Dict[str, Any],
+        method: str
     ) -> List[DocumentChunk]:
         """
-        Create DocumentChunk objects from text chunks.
+        Create DocumentChunk objects from chunk offsets.
         
         Args:
-            chunks: List of chunk texts
-            original_content: Original document content
+            spans: List of (start, end) offsets into content
+            content: Original document content
             base_metadata: Base metadata
+            method: Chunking method recorded in metadata
         
         Returns:
             List of DocumentChunk objects
         """
         chunk_objects = []
-        current_pos = 0
-        
-        for i, chunk_text in enumerate(chunks):
-            # Find the position of this chunk in the original content
-            start_pos = original_content.find(chunk_text, current_pos)
-            if start_pos == -1:
-                # Fallback: estimate position
-                start_pos = current_pos
-            
-            end_pos = start_pos + len(chunk_text)
-            
-            # Create chunk metadata
-            chunk_metadata = {
-                **base_metadata,
-                "chunk_method": "semantic" if self.config.use_semantic_splitting else "simple",
-                "total_chunks": len(chunks)
-            }
+        
+        for start, end in spans:
+            # Offsets exclude surrounding whitespace so they match the content
+            while start < end and content[start].isspace():
+                start += 1
+            while end > start and content[end - 1].isspace():
+                end -= 1
+            if start == end:
+                continue
             
             chunk_objects.append(DocumentChunk(
-                content=chunk_text.strip(),
-                index=i,
-                start_char=start_pos,
-                end_char=end_pos,
-                metadata=chunk_metadata
+                content=content[start:end],
+                index=len(chunk_objects),
+                start_char=start,
+                end_char=end,
+                metadata={**base_metadata, "chunk_method": method}
             ))
-            
-            current_pos = end_pos
+        
+        for chunk in chunk_objects:
+            chunk.metadata["total_chunks"] = len(chunk_objects)
         
         return chunk_objects
 
@@ -379,49 +667,50 @@ class SimpleChunker:
             **(metadata or {})
         }
         
-        # Split on paragraphs first
-        paragraphs = re.split(r'\n\s*\n', content)
-        chunks = []
-        current_chunk = ""
-        current_pos = 0
-        chunk_index = 0
+        # Split on paragraphs first, keeping their offsets
+        paragraphs = []
+        start = 0
+        for match in re.finditer(r'\n\s*\n', content):
+            paragraphs.append((start, match.start()))
+            start = match.end()
+        paragraphs.append((start, len(content)))
         
-        for paragraph in paragraphs:
-            paragraph = paragraph.strip()
-            if not paragraph:
+        chunks = []
+        current = None
+        
+        for start, end in paragraphs:
+            while start < end and content[start].isspace():
+                start += 1
+            while end > start and content[end - 1].isspace():
+                end -= 1
+            if start == end:
                 continue
             
             # Check if adding this paragraph exceeds chunk size
-            potential_chunk = current_chunk + "\n\n" + paragraph if current_chunk else paragraph
+            if current is not None and end - current[0] <= self.config.chunk_size:
+                current = (current[0], end)
+                continue
             
-            if len(potential_chunk) <= self.config.chunk_size:
-                current_chunk = potential_chunk
-            else:
-                # Save current chunk if it exists
-                if current_chunk:
-                    chunks.append(self._create_chunk(
-                        current_chunk,
-                        chunk_index,
-                        current_pos,
-                        current_pos + len(current_chunk),
-                        base_metadata.copy()
-                    ))
-                    
-                    # Move position, but ensure overlap is respected
-                    overlap_start = max(0, len(current_chunk) - self.config.chunk_overlap)
-                    current_pos += overlap_start
-                    chunk_index += 1
-                
-                # Start new chunk with current paragraph
-                current_chunk = paragraph
+            # Save current chunk if it exists
+            if current is not None:
+                chunks.append(self._create_chunk(
+                    content[current[0]:current[1]],
+                    len(chunks),
+                    current[0],
+                    current[1],
+                    base_metadata.copy()
+                ))
+            
+            # Start new chunk with current paragraph
+            current = (start, end)
         
         # Add final chunk
-        if current_chunk:
+        if current is not None:
             chunks.append(self._create_chunk(
-                current_chunk,
-                chunk_index,
-                current_pos,
-                current_pos + len(current_chunk),
+                content[current[0]:current[1]],
+                len(chunks),
+                current[0],
+                current[1],
                 base_metadata.copy()
             ))
         
@@ -450,18 +739,19 @@ class SimpleChunker:
 
 
 # Factory function
-def create_chunker(config: ChunkingConfig):
+def create_chunker(config: ChunkingConfig, embedder: Optional[Any] = None):
     """
     Create appropriate chunker based on configuration.
     
     Args:
         config: Chunking configuration
+        embedder: Embedding generator used by embedding-based semantic chunking
     
     Returns:
         Chunker instance
     """
     if config.use_semantic_splitting:
-        return SemanticChunker(config)
+        return SemanticChunker(config, embedder=embedder)
     else:
         return SimpleChunker(config)
 
@@ -0,0 +1,172 @@
+"""
+Microbenchmark of the binary pgvector codec against the text format.
+
+Client side, for each dimension it times encoding a query vector as a
+pgvector text literal (``'[' + ','.join(map(str, embedding)) + ']'``) and
+with ``encode_vector``, and decoding a returned vector from text and with
+``decode_vector``, and reports the bytes each format puts on the wire.
+
+With a database URL it also measures round trips over a real connection:
+sending a query vector (``SELECT $1::text::vector`` vs ``SELECT $1::vector``
+with the codec) and fetching stored embeddings from a scratch table
+(``embedding::text`` parsed in Python vs the binary codec). The benchmark
+table is dropped afterwards.
+
+Usage (from the rag_agent directory):
+    python -m ingestion.codec_benchmark --dimensions 768 1536 3072
+    DATABASE_URL=postgresql://... python -m ingestion.codec_benchmark
+"""
+
+import os
+import asyncio
+import argparse
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import asyncpg
+import numpy as np
+
+try:
+    from ..utils.vector_codec import decode_vector, encode_vector, register_vector_codec
+except ImportError:
+    # For direct execution or testing
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from utils.vector_codec import decode_vector, encode_vector, register_vector_codec
+
+
+def text_literal(embedding: List[float]) -> str:
+    """Vector as the text literal the search tools used to send."""
+    return '[' + ','.join(map(str, embedding)) + ']'
+
+
+def parse_literal(text: str) -> List[float]:
+    """Vector from pgvector's text output."""
+    return [float(value) for value in text[1:-1].split(",")]
+
+
+def time_calls(run: Callable[[], Any], repeat: int) -> float:
+    """Median microseconds per call."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1e6)
+    return round(float(np.median(timings)), 1)
+
+
+async def time_queries(run: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Latency percentiles in milliseconds of an async call."""
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await run()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3)
+    }
+
+
+def benchmark_client(dimensions: int, repeat: int) -> Dict[str, Any]:
+    """Encode and decode cost of one vector in each format."""
+    embedding = np.random.default_rng(dimensions).standard_normal(dimensions).astype(np.float32).tolist()
+    literal = text_literal(embedding)
+    # pgvector prints shortest round-trip float4 values
+    output = text_literal([float(np.format_float_positional(np.float32(v), unique=True)) for v in embedding])
+    encoded = encode_vector(embedding)
+    
+    return {
+        "dimensions": dimensions,
+        "text_bytes": len(literal),
+        "binary_bytes": len(encoded),
+        "encode_text_us": time_calls(lambda: text_literal(embedding), repeat),
+        "encode_binary_us": time_calls(lambda: encode_vector(embedding), repeat),
+        "decode_text_us": time_calls(lambda: parse_literal(output), repeat),
+        "decode_binary_us": time_calls(lambda: decode_vector(encoded), repeat)
+    }
+
+
+async def benchmark_database(
+    database_url: str,
+    dimensions: int,
+    rows: int,
+    repeat: int
+) -> Dict[str, Any]:
+    """Round-trip latency of sending and fetching vectors in each format."""
+    vectors = np.random.default_rng(dimensions).standard_normal((rows, dimensions)).astype(np.float32)
+    query = vectors[0].tolist()
+    
+    text_conn = await asyncpg.connect(database_url)
+    binary_conn = await asyncpg.connect(database_url)
+    try:
+        await register_vector_codec(binary_conn)
+        await binary_conn.execute("DROP TABLE IF EXISTS codec_benchmark")
+        await binary_conn.execute(
+            f"CREATE UNLOGGED TABLE codec_benchmark (id integer, embedding vector({dimensions}))"
+        )
+        await binary_conn.copy_records_to_table(
+            "codec_benchmark",
+            records=[(i, vector) for i, vector in enumerate(vectors)],
+            columns=["id", "embedding"]
+        )
+        
+        async def fetch_text():
+            rows = await text_conn.fetch("SELECT embedding::text FROM codec_benchmark")
+            return [parse_literal(row[0]) for row in rows]
+        
+        async def fetch_binary():
+            return await binary_conn.fetch("SELECT embedding FROM codec_benchmark")
+        
+        return {
+            "dimensions": dimensions,
+            "send_text": await time_queries(
+                lambda: text_conn.fetchval("SELECT vector_dims($1::text::vector)", text_literal(query)), repeat
+            ),
+            "send_binary": await time_queries(
+                lambda: binary_conn.fetchval("SELECT vector_dims($1::vector)", query), repeat
+            ),
+            f"fetch_{rows}_text": await time_queries(fetch_text, repeat),
+            f"fetch_{rows}_binary": await time_queries(fetch_binary, repeat)
+        }
+    finally:
+        await binary_conn.execute("DROP TABLE IF EXISTS codec_benchmark")
+        await text_conn.close()
+        await binary_conn.close()
+
+
+async def main():
+    """Run the vector codec benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark binary vs text pgvector transfer")
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[768, 1536, 3072],
+                        help="Vector dimensions to test")
+    parser.add_argument("--repeat", type=int, default=200, help="Calls per measurement")
+    parser.add_argument("--rows", type=int, default=40, help="Embeddings fetched per query")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"),
+                        help="PostgreSQL URL for round-trip measurements")
+    parser.add_argument("--output", "-o", help="Write the JSON report to this file")
+    args = parser.parse_args()
+    
+    report: Dict[str, Optional[List[Dict[str, Any]]]] = {"client": [], "database": None}
+    for dimensions in args.dimensions:
+        result = benchmark_client(dimensions, args.repeat)
+        report["client"].append(result)
+        print(json.dumps(result))
+    
+    if args.database_url:
+        report["database"] = []
+        for dimensions in args.dimensions:
+            result = await benchmark_database(args.database_url, dimensions, args.rows, args.repeat)
+            report["database"].append(result)
+            print(json.dumps(result))
+    
+    print(json.dumps(report, indent=2))
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
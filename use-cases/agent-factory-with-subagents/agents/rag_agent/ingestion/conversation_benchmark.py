@@ -0,0 +1,193 @@
+"""
+Prompt tokens per turn of the CLI conversation context, before and after memory.
+
+Replays a scripted multi-turn session (questions with follow-ups) over the
+documents with the offline local store and hashing embeddings. Each answer
+is simulated as the text of the top retrieved chunks, standing in for a
+long model answer. Per turn it counts:
+
+- ``baseline``: the previous CLI prompt (last 6 history lines verbatim)
+  plus the search results returned to the model, since every turn searched
+- ``memory``: the ``ConversationMemory`` prompt, plus search results only on
+  turns where no cached chunk matched the question (the prompt tells the
+  model to answer from reused passages instead of searching)
+
+Usage (from the rag_agent directory):
+    python -m ingestion.conversation_benchmark
+    python -m ingestion.conversation_benchmark --history-tokens 1000 --output conversation_benchmark.json
+"""
+
+import os
+import asyncio
+import argparse
+import json
+import tempfile
+from typing import Any, Dict, List, Sequence
+
+# Keep any default embeddings client the pipeline creates offline
+os.environ.setdefault("EMBEDDING_PROVIDER", "local")
+
+from .embedder import create_embedder
+from .ingest import DocumentIngestionPipeline
+
+try:
+    from ..utils.conversation_memory import ConversationMemory, TokenCounter, format_prompt
+    from ..utils.local_embeddings import HASHING_EMBEDDING_MODEL, LocalEmbeddingClient
+    from ..utils.local_store import LocalVectorStore
+    from ..utils.models import IngestionConfig
+except ImportError:
+    # For direct execution or testing
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from utils.conversation_memory import ConversationMemory, TokenCounter, format_prompt
+    from utils.local_embeddings import HASHING_EMBEDDING_MODEL, LocalEmbeddingClient
+    from utils.local_store import LocalVectorStore
+    from utils.models import IngestionConfig
+
+SESSION = [
+    "How much funding did OpenAI raise in its latest round?",
+    "What valuation did the OpenAI funding round imply?",
+    "Which investors led the OpenAI round?",
+    "What is the partnership between Anthropic and Amazon?",
+    "How much has Amazon invested in Anthropic?",
+    "Which Amazon chips does Anthropic train on?",
+    "Why does Nvidia dominate the AI chip market?",
+    "What market share does Nvidia hold in AI chips?",
+    "What does the EU AI Act require from AI providers?",
+    "When do the EU AI Act obligations take effect?",
+    "How does the United States approach AI regulation?",
+    "How much funding did OpenAI raise in its latest round?"
+]
+
+# Previous CLI behaviour: the last 6 history lines, verbatim
+BASELINE_HISTORY_LINES = 6
+
+BASELINE_INSTRUCTIONS = (
+    "Search the knowledge base to answer the user's question. Choose the appropriate search strategy "
+    "(semantic_search or hybrid_search) based on the query type. Provide a comprehensive summary of your findings."
+)
+
+
+def baseline_prompt(user_input: str, history: Sequence[str]) -> str:
+    """The prompt the CLI built before conversation memory."""
+    context = "\n".join(history[-BASELINE_HISTORY_LINES:]) if history else ""
+    return f"""Previous conversation:
+{context}
+
+User: {user_input}
+
+{BASELINE_INSTRUCTIONS}"""
+
+
+def tool_result_text(results: Sequence[Dict[str, Any]]) -> str:
+    """Search results as the model receives them from the tool."""
+    return json.dumps([
+        {key: result[key] for key in ("chunk_id", "document_title", "document_source", "content")}
+        for result in results
+    ])
+
+
+async def run_session(
+    documents_folder: str,
+    questions: Sequence[str],
+    match_count: int,
+    answer_chunks: int,
+    memory: ConversationMemory
+) -> Dict[str, Any]:
+    """Replay the session and count prompt tokens per turn."""
+    client = LocalEmbeddingClient()
+    counter = memory.counter
+    turns: List[Dict[str, Any]] = []
+    
+    with tempfile.TemporaryDirectory() as path:
+        store = LocalVectorStore(path)
+        pipeline = DocumentIngestionPipeline(
+            config=IngestionConfig(use_semantic_chunking=False, manage_vector_index=False),
+            documents_folder=documents_folder,
+            clean_before_ingest=True,
+            embedder=create_embedder(HASHING_EMBEDDING_MODEL, use_cache=False, client=client),
+            store=store
+        )
+        await pipeline.ingest_documents()
+        
+        history: List[str] = []
+        for number, question in enumerate(questions, start=1):
+            results = await store.hybrid_search(client.embedder.embed(question).tolist(), question, match_count)
+            answer = "\n\n".join(result["content"] for result in results[:answer_chunks])
+            search_tokens = counter.count(tool_result_text(results))
+            
+            # Previous CLI: user line appended before building the prompt
+            history.append(f"User: {question}")
+            old_prompt = counter.count(baseline_prompt(question, history))
+            
+            context = memory.build_context(question)
+            new_prompt = counter.count(format_prompt(question, context))
+            searched = not context["chunks"]
+            
+            turns.append({
+                "turn": number,
+                "question": question,
+                "baseline_prompt_tokens": old_prompt,
+                "baseline_total_tokens": old_prompt + search_tokens,
+                "memory_prompt_tokens": new_prompt,
+                "memory_total_tokens": new_prompt + (search_tokens if searched else 0),
+                "reused_chunks": len(context["chunks"]),
+                "searched": searched
+            })
+            
+            history.append(f"Assistant: {answer}")
+            if searched:
+                memory.remember_results(results)
+            memory.add_turn(question, answer)
+        
+        await pipeline.close()
+    
+    baseline_total = sum(turn["baseline_total_tokens"] for turn in turns)
+    memory_total = sum(turn["memory_total_tokens"] for turn in turns)
+    return {
+        "turns": turns,
+        "max_baseline_prompt_tokens": max(turn["baseline_prompt_tokens"] for turn in turns),
+        "max_memory_prompt_tokens": max(turn["memory_prompt_tokens"] for turn in turns),
+        "baseline_total_tokens": baseline_total,
+        "memory_total_tokens": memory_total,
+        "searches_avoided": sum(1 for turn in turns if not turn["searched"]),
+        "reduction": round(1 - memory_total / baseline_total, 4) if baseline_total else 0.0,
+        "summarized_turns": memory.summarized_turns
+    }
+
+
+async def main():
+    """Run the conversation memory benchmark."""
+    parser = argparse.ArgumentParser(description="Compare prompt tokens per turn with and without conversation memory")
+    parser.add_argument("--documents", "-d", default="documents", help="Documents folder path")
+    parser.add_argument("--match-count", type=int, default=10, help="Results per search")
+    parser.add_argument("--answer-chunks", type=int, default=3, help="Chunks joined into each simulated answer")
+    parser.add_argument("--history-tokens", type=int, default=1500, help="Budget for recent turns")
+    parser.add_argument("--summary-tokens", type=int, default=300, help="Budget for the summary")
+    parser.add_argument("--chunk-tokens", type=int, default=1500, help="Budget for reused chunks")
+    parser.add_argument("--output", "-o", help="Write the JSON report to this file")
+    args = parser.parse_args()
+    
+    memory = ConversationMemory(
+        history_tokens=args.history_tokens,
+        summary_tokens=args.summary_tokens,
+        chunk_tokens=args.chunk_tokens,
+        counter=TokenCounter()
+    )
+    report = await run_session(args.documents, SESSION, args.match_count, args.answer_chunks, memory)
+    
+    for turn in report["turns"]:
+        reused = "" if turn["searched"] else f" (reused {turn['reused_chunks']} chunks)"
+        print(
+            f"turn {turn['turn']:2d}: prompt {turn['baseline_prompt_tokens']:5d} -> {turn['memory_prompt_tokens']:5d}, "
+            f"with search results {turn['baseline_total_tokens']:5d} -> {turn['memory_total_tokens']:5d}{reused}"
+        )
+    print(json.dumps({key: value for key, value in report.items() if key != "turns"}, indent=2))
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,257 @@
+"""
+Exact and near-duplicate chunk detection for ingestion.
+
+Agent knowledge files repeat a lot of boilerplate (shared instructions,
+backup copies of the same file), and every copy used to be embedded and
+stored. ``ChunkDeduplicator`` sees every chunk of an ingestion run once:
+
+- exact duplicates are found by the chunk's SHA-256 content hash
+- near duplicates by MinHash signatures of word 3-gram shingles, looked up
+  with locality-sensitive hashing (banded signatures), so each chunk is
+  compared with a handful of candidates instead of every chunk seen
+
+Chunks are only compared within a scope, the document's search
+collection, so a collection-filtered or partitioned search still finds
+every chunk of its collection. The first chunk seen with some content in
+a scope is canonical; later duplicates are not embedded or stored and their
+documents link to the canonical chunk instead.
+"""
+
+import re
+import zlib
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Mersenne prime 2^61 - 1; a * x + b stays below 2^64 for the 32-bit
+# shingle hashes and 31-bit coefficients used here
+_PRIME = np.uint64((1 << 61) - 1)
+
+WORD = re.compile(r"\w+")
+
+
+def shingles(text: str, size: int = 3) -> List[str]:
+    """
+    Word n-grams of a text, lowercased.
+    
+    Texts shorter than ``size`` words give one shingle with all their words.
+    """
+    words = WORD.findall(text.lower())
+    if len(words) <= size:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+class MinHasher:
+    """MinHash signatures estimating the Jaccard similarity of shingle sets."""
+    
+    def __init__(self, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+        """
+        Initialize hasher.
+        
+        Args:
+            num_perm: Hash functions per signature
+            shingle_size: Words per shingle
+            seed: Seed of the hash function coefficients
+        """
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+    
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """
+        Signature of a text.
+        
+        Returns:
+            ``num_perm`` uint64 minimums, None for a text without words
+        """
+        grams = set(shingles(text, self.shingle_size))
+        if not grams:
+            return None
+        hashes = np.fromiter(
+            (zlib.crc32(gram.encode("utf-8")) for gram in grams),
+            dtype=np.uint64,
+            count=len(grams)
+        )
+        return ((np.outer(hashes, self._a) + self._b) % _PRIME).min(axis=0)
+    
+    @staticmethod
+    def similarity(first: np.ndarray, second: np.ndarray) -> float:
+        """Estimated Jaccard similarity of two signatures."""
+        return float(np.mean(first == second))
+
+
+def lsh_bands(num_perm: int, threshold: float, recall: float = 0.99) -> Tuple[int, int]:
+    """
+    Bands and rows per band for a similarity threshold.
+    
+    Two signatures become candidates when all rows of any band agree, which
+    happens with probability ``1 - (1 - s**rows)**bands`` at similarity
+    ``s``. Longer bands compare fewer dissimilar pairs; this picks the
+    longest whose probability at the threshold is still ``recall``.
+    
+    Args:
+        num_perm: Signature length
+        threshold: Jaccard similarity to detect
+        recall: Probability of comparing a pair exactly at the threshold
+    
+    Returns:
+        Tuple of (bands, rows per band)
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        if 1 - (1 - threshold ** rows) ** bands >= recall:
+            best = (bands, rows)
+    return best
+
+
+@dataclass
+class DuplicateMatch:
+    """The canonical chunk a duplicate was matched to."""
+    source: str
+    chunk_index: int
+    content_hash: str
+    similarity: float
+    exact: bool
+
+
+@dataclass
+class DeduplicationStats:
+    """Chunk counts of a deduplication run."""
+    chunks: int = 0
+    exact: int = 0
+    near: int = 0
+    tokens_skipped: int = 0
+    
+    @property
+    def duplicates(self) -> int:
+        return self.exact + self.near
+    
+    @property
+    def ratio(self) -> float:
+        """Share of chunks that were duplicates."""
+        return self.duplicates / self.chunks if self.chunks else 0.0
+
+
+@dataclass
+class _Canonical:
+    source: str
+    chunk_index: int
+    content_hash: str
+    signature: Optional[np.ndarray] = field(default=None, repr=False)
+
+
+class ChunkDeduplicator:
+    """
+    Index of the canonical chunks of an ingestion run.
+    
+    Not thread-safe; the ingestion pipeline calls it from the event loop.
+    """
+    
+    def __init__(
+        self,
+        near_threshold: Optional[float] = None,
+        num_perm: int = 128,
+        shingle_size: int = 3
+    ):
+        """
+        Initialize deduplicator.
+        
+        Args:
+            near_threshold: Estimated Jaccard similarity of word shingles from
+                which a chunk is a near duplicate; None or 0 finds exact
+                duplicates only
+            num_perm: MinHash signature length
+            shingle_size: Words per shingle
+        """
+        self.near_threshold = near_threshold or None
+        self.stats = DeduplicationStats()
+        self._by_hash: Dict[Tuple[str, str], _Canonical] = {}
+        self._canonical: List[_Canonical] = []
+        self._hasher = None
+        if self.near_threshold is not None:
+            self._hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size)
+            self._bands, self._rows = lsh_bands(num_perm, self.near_threshold)
+            self._buckets: List[Dict[Tuple[str, bytes], List[int]]] = [{} for _ in range(self._bands)]
+    
+    def __len__(self) -> int:
+        return len(self._canonical)
+    
+    def check(
+        self,
+        content: str,
+        content_hash: str,
+        source: str,
+        chunk_index: int,
+        token_count: int = 0,
+        scope: str = ""
+    ) -> Optional[DuplicateMatch]:
+        """
+        Match a chunk against the canonical chunks, registering it if new.
+        
+        Args:
+            content: Chunk text
+            content_hash: SHA-256 of the text
+            source: Document source path
+            chunk_index: Position of the chunk in its document
+            token_count: Chunk tokens, counted as skipped for a duplicate
+            scope: Only chunks of the same scope are duplicates
+        
+        Returns:
+            The canonical chunk for a duplicate, None for a new chunk
+        """
+        self.stats.chunks += 1
+        
+        canonical = self._by_hash.get((scope, content_hash))
+        if canonical is not None:
+            self.stats.exact += 1
+            self.stats.tokens_skipped += token_count
+            return DuplicateMatch(canonical.source, canonical.chunk_index, canonical.content_hash, 1.0, exact=True)
+        
+        signature = self._hasher.signature(content) if self._hasher is not None else None
+        if signature is not None:
+            match = self._near_match(signature, scope)
+            if match is not None:
+                self.stats.near += 1
+                self.stats.tokens_skipped += token_count
+                return match
+        
+        canonical = _Canonical(source, chunk_index, content_hash, signature)
+        self._by_hash[(scope, content_hash)] = canonical
+        self._canonical.append(canonical)
+        if signature is not None:
+            position = len(self._canonical) - 1
+            for band, key in enumerate(self._band_keys(signature)):
+                self._buckets[band].setdefault((scope, key), []).append(position)
+        return None
+    
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [
+            signature[band * self._rows:(band + 1) * self._rows].tobytes()
+            for band in range(self._bands)
+        ]
+    
+    def _near_match(self, signature: np.ndarray, scope: str) -> Optional[DuplicateMatch]:
+        """Most similar canonical chunk of the scope at or above the threshold."""
+        candidates = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            candidates.update(self._buckets[band].get((scope, key), ()))
+        
+        best, best_similarity = None, 0.0
+        for position in sorted(candidates):
+            canonical = self._canonical[position]
+            similarity = MinHasher.similarity(signature, canonical.signature)
+            if similarity >= self.near_threshold and similarity > best_similarity:
+                best, best_similarity = canonical, similarity
+        if best is None:
+            return None
+        return DuplicateMatch(best.source, best.chunk_index, best.content_hash, best_similarity, exact=False)
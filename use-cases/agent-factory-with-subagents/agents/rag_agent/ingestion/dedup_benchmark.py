@@ -0,0 +1,208 @@
+"""
+Duplicate chunks in the agents' knowledge files, and what removing them saves.
+
+Copies the knowledge files (``<agent>/knowledge/**/*.md`` under the agents
+folder by default) into a temporary folder and ingests them into a
+temporary ``LocalVectorStore`` with the hashing embedder once per mode:
+deduplication off, exact duplicates only, and each near-duplicate
+threshold. For every mode it reports the dedup ratio, embedded chunks and
+tokens, store size on disk, ingestion time, and how redundant the top-k
+results are: the share of results that nearly repeat a higher-ranked result
+of the same query.
+
+Usage (from the rag_agent directory):
+    python -m ingestion.dedup_benchmark
+    python -m ingestion.dedup_benchmark --thresholds 0.95 0.85 0.7 --output dedup.json
+"""
+
+import os
+import asyncio
+import argparse
+import glob
+import json
+import random
+import shutil
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+# Keep any default embeddings client the pipeline creates offline
+os.environ.setdefault("EMBEDDING_PROVIDER", "local")
+
+from .dedup import ChunkDeduplicator
+from .embedder import create_embedder
+from .ingest import DocumentIngestionPipeline
+
+try:
+    from ..utils.local_embeddings import HASHING_EMBEDDING_MODEL, LocalEmbeddingClient
+    from ..utils.local_store import LocalVectorStore
+    from ..utils.models import IngestionConfig
+except ImportError:
+    # For direct execution or testing
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from utils.local_embeddings import HASHING_EMBEDDING_MODEL, LocalEmbeddingClient
+    from utils.local_store import LocalVectorStore
+    from utils.models import IngestionConfig
+
+AGENTS_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def copy_corpus(root: str, pattern: str, target: str) -> int:
+    """Copy the files matching ``pattern`` under ``root``, keeping their relative paths."""
+    files = sorted(glob.glob(os.path.join(root, pattern), recursive=True))
+    for path in files:
+        destination = os.path.join(target, os.path.relpath(path, root))
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        shutil.copyfile(path, destination)
+    return len(files)
+
+
+def directory_bytes(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(folder, name))
+        for folder, _, names in os.walk(path)
+        for name in names
+    )
+
+
+def redundancy(results: List[List[Dict[str, Any]]], threshold: float) -> float:
+    """Share of results nearly repeating a higher-ranked result of the same query."""
+    repeated = 0
+    total = 0
+    for ranked in results:
+        seen = ChunkDeduplicator(near_threshold=threshold)
+        for position, result in enumerate(ranked):
+            key = f"{result['document_source']}:{position}"
+            repeated += seen.check(result["content"], key, key, position) is not None
+            total += 1
+    return repeated / total if total else 0.0
+
+
+def top_duplicates(store: LocalVectorStore, limit: int) -> List[Dict[str, Any]]:
+    """Stored chunks linked from the most documents."""
+    links = Counter()
+    for (metadata,) in store._db.execute("SELECT metadata FROM documents"):
+        for link in json.loads(metadata).get("duplicate_chunks", []):
+            links[(link["duplicate_of"], link["source"])] += 1
+    
+    top = []
+    for (digest, source), copies in links.most_common(limit):
+        row = store._db.execute(
+            "SELECT content FROM chunks WHERE json_extract(metadata, '$.content_hash') = ?", (digest,)
+        ).fetchone()
+        preview = " ".join(row[0].split())[:100] if row else ""
+        top.append({"source": source, "copies": copies + 1, "preview": preview})
+    return top
+
+
+async def run_mode(
+    corpus: str,
+    threshold: Optional[float],
+    queries: List[str],
+    match_count: int,
+    redundancy_threshold: float,
+    semantic: bool,
+    top: int
+) -> Dict[str, Any]:
+    """Ingest the corpus with one deduplication setting and search it."""
+    client = LocalEmbeddingClient()
+    with tempfile.TemporaryDirectory() as path:
+        store = LocalVectorStore(path)
+        pipeline = DocumentIngestionPipeline(
+            config=IngestionConfig(
+                use_semantic_chunking=semantic,
+                manage_vector_index=False,
+                deduplicate_chunks=threshold is not None,
+                near_duplicate_threshold=threshold or 0.0
+            ),
+            documents_folder=corpus,
+            clean_before_ingest=True,
+            embedder=create_embedder(HASHING_EMBEDDING_MODEL, use_cache=False, client=client),
+            store=store
+        )
+        
+        start = time.perf_counter()
+        results = await pipeline.ingest_documents()
+        ingest_seconds = time.perf_counter() - start
+        
+        stats = pipeline.dedup_stats
+        chunks = sum(result.chunks_created + result.chunks_deduplicated for result in results)
+        embedded_tokens = store._db.execute("SELECT COALESCE(SUM(token_count), 0) FROM chunks").fetchone()[0]
+        
+        found = []
+        for text in queries:
+            found.append(await store.vector_search(client.embedder.embed(text).tolist(), match_count))
+        
+        report = {
+            "documents": len(results),
+            "chunks": chunks,
+            "stored_chunks": int(store._embedded.sum()),
+            "exact_duplicates": stats.exact,
+            "near_duplicates": stats.near,
+            "dedup_ratio": round(stats.ratio, 4),
+            "embedded_tokens": int(embedded_tokens),
+            "store_bytes": directory_bytes(path),
+            "ingest_seconds": round(ingest_seconds, 3),
+            f"redundant_results@{match_count}": round(redundancy(found, redundancy_threshold), 4)
+        }
+        if top and threshold is not None:
+            report["most_repeated"] = top_duplicates(store, top)
+        await pipeline.close()
+    return report
+
+
+async def main():
+    """Run the deduplication benchmark."""
+    parser = argparse.ArgumentParser(description="Measure duplicate chunks in the agents' knowledge files")
+    parser.add_argument("--root", default=AGENTS_DIR, help="Folder searched for knowledge files")
+    parser.add_argument("--pattern", default="*/knowledge/**/*.md", help="Glob of the files, relative to --root")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.9, 0.85, 0.7],
+                        help="Near-duplicate thresholds to compare")
+    parser.add_argument("--queries", type=int, default=100, help="Queries sampled from the paragraphs")
+    parser.add_argument("--match-count", type=int, default=10, help="Results per query")
+    parser.add_argument("--redundancy-threshold", type=float, default=0.85,
+                        help="Similarity from which a result repeats a higher-ranked one")
+    parser.add_argument("--top", type=int, default=5, help="Most repeated chunks to list per mode")
+    parser.add_argument("--semantic", action="store_true", help="Use embedding-based semantic chunking")
+    parser.add_argument("--output", "-o", help="Write the JSON report to this file")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as corpus:
+        files = copy_corpus(args.root, args.pattern, corpus)
+        if not files:
+            parser.error(f"No files match {args.pattern} under {args.root}")
+        
+        # Queries are the opening words of paragraphs sampled from the files
+        paragraphs = []
+        for path in sorted(glob.glob(os.path.join(corpus, "**", "*.md"), recursive=True)):
+            with open(path, encoding="utf-8", errors="replace") as f:
+                paragraphs.extend(p for p in f.read().split("\n\n") if len(p.split()) >= 12)
+        samples = random.Random(0).sample(paragraphs, min(args.queries, len(paragraphs)))
+        queries = [" ".join(text.split()[:12]) for text in samples]
+        
+        report: Dict[str, Any] = {"files": files, "pattern": args.pattern, "queries": len(queries), "modes": {}}
+        modes = {"off": None, "exact": 0.0}
+        modes.update({f"near_{threshold}": threshold for threshold in args.thresholds})
+        for name, threshold in modes.items():
+            report["modes"][name] = await run_mode(
+                corpus, threshold, queries, args.match_count, args.redundancy_threshold, args.semantic, args.top
+            )
+            summary = {key: value for key, value in report["modes"][name].items() if key != "most_repeated"}
+            print(name, json.dumps(summary))
+    
+    baseline = report["modes"]["off"]
+    for mode in report["modes"].values():
+        mode["embedding_calls_saved"] = round(1 - mode["stored_chunks"] / max(baseline["stored_chunks"], 1), 4)
+        mode["store_size_saved"] = round(1 - mode["store_bytes"] / max(baseline["store_bytes"], 1), 4)
+    
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
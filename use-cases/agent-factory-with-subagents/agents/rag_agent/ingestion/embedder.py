@@ -4,12 +4,14 @@ Document embedding generation for vector search.
 
 import os
 import asyncio
+import time
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 from datetime import datetime
 import json
 
-from openai import RateLimitError, APIError
+from openai import RateLimitError, APIError, BadRequestError
 from dotenv import load_dotenv
 
 from .chunker import DocumentChunk
@@ -17,52 +19,155 @@ from .chunker import DocumentChunk
 # Import flexible providers
 try:
     from ..utils.providers import get_embedding_client, get_embedding_model
+    from ..utils.local_embeddings import DEFAULT_HASHING_DIMENSIONS, HASHING_EMBEDDING_MODEL
+    from ..utils.embedding_cache import (
+        DEFAULT_EMBEDDING_CACHE_PATH, PersistentEmbeddingCache, embedding_cache_key
+    )
 except ImportError:
     # For direct execution or testing
     import sys
     import os
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     from utils.providers import get_embedding_client, get_embedding_model
+    from utils.local_embeddings import DEFAULT_HASHING_DIMENSIONS, HASHING_EMBEDDING_MODEL
+    from utils.embedding_cache import (
+        DEFAULT_EMBEDDING_CACHE_PATH, PersistentEmbeddingCache, embedding_cache_key
+    )
 
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
-# Initialize client with flexible provider
-embedding_client = get_embedding_client()
 EMBEDDING_MODEL = get_embedding_model()
 
 
+# Conservative fallback when tiktoken or its encoding files are unavailable:
+# about one token per three UTF-8 bytes, which over-counts English and keeps
+# Cyrillic text within provider limits.
+_BYTES_PER_TOKEN = 3
+
+
+def _load_encoding(model: str):
+    """Return a tiktoken encoding for the model, or None if unavailable."""
+    try:
+        import tiktoken
+    except ImportError:
+        logger.warning("tiktoken is not installed, estimating token counts from text length")
+        return None
+    
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        pass
+    except Exception as e:
+        logger.warning(f"Could not load tokenizer for {model} ({e}), estimating token counts")
+        return None
+    
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"Could not load tokenizer for {model} ({e}), estimating token counts")
+        return None
+
+
+class TokenRateLimiter:
+    """Token bucket limiting the number of tokens sent per minute."""
+    
+    def __init__(self, tokens_per_minute: int):
+        """
+        Initialize the limiter with a full bucket.
+        
+        Args:
+            tokens_per_minute: Sustained token budget per minute
+        """
+        self.capacity = tokens_per_minute
+        self.rate = tokens_per_minute / 60.0
+        self.available = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self, tokens: int):
+        """
+        Wait until the tokens can be spent, then spend them.
+        
+        Callers are served in arrival order. Requests larger than the bucket
+        wait for a full bucket instead of blocking forever.
+        
+        Args:
+            tokens: Tokens about to be sent
+        """
+        tokens = min(tokens, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.available = min(self.capacity, self.available + (now - self._updated) * self.rate)
+                self._updated = now
+                
+                if self.available >= tokens:
+                    self.available -= tokens
+                    return
+                
+                await asyncio.sleep((tokens - self.available) / self.rate)
+
+
 class EmbeddingGenerator:
-    """Generates embeddings for document chunks."""
+    """
+    Generates embeddings for document chunks.
+    
+    Texts are packed into requests by token count up to the provider's
+    per-request limit, several requests run concurrently, and an optional
+    token-per-minute limiter paces them. A failing request is split in half
+    until the offending text is isolated, so one bad input does not turn a
+    batch into one call per text.
+    """
     
     def __init__(
         self,
         model: str = EMBEDDING_MODEL,
-        batch_size: int = 100,
+        batch_size: int = 2048,
         max_retries: int = 3,
-        retry_delay: float = 1.0
+        retry_delay: float = 1.0,
+        client: Optional[Any] = None,
+        cache: Optional[Any] = None,
+        max_batch_tokens: int = 300_000,
+        max_concurrent_batches: int = 8,
+        tokens_per_minute: Optional[int] = None
     ):
         """
         Initialize embedding generator.
         
         Args:
             model: OpenAI embedding model to use
-            batch_size: Number of texts to process in parallel
+            batch_size: Maximum number of texts per request
             max_retries: Maximum number of retry attempts
             retry_delay: Delay between retries in seconds
+            client: OpenAI-compatible async client (defaults to the configured
+                provider, created on first use)
+            cache: Embedding cache with get_many/put_many (EmbeddingCache or
+                PersistentEmbeddingCache); None disables caching
+            max_batch_tokens: Maximum total tokens per request
+            max_concurrent_batches: Maximum requests in flight, shared by all callers
+            tokens_per_minute: Token-per-minute budget; None disables rate limiting
         """
         self.model = model
+        self._client = client
+        self.cache = cache
         self.batch_size = batch_size
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+        self.max_batch_tokens = max_batch_tokens
+        self.rate_limiter = TokenRateLimiter(tokens_per_minute) if tokens_per_minute else None
+        self._request_slots = asyncio.Semaphore(max_concurrent_batches)
+        self._encoding = None
+        self._encoding_loaded = False
         
         # Model-specific configurations
         self.model_configs = {
             "text-embedding-3-small": {"dimensions": 1536, "max_tokens": 8191},
             "text-embedding-3-large": {"dimensions": 3072, "max_tokens": 8191},
-            "text-embedding-ada-002": {"dimensions": 1536, "max_tokens": 8191}
+            "text-embedding-ada-002": {"dimensions": 1536, "max_tokens": 8191},
+            HASHING_EMBEDDING_MODEL: {"dimensions": DEFAULT_HASHING_DIMENSIONS, "max_tokens": 8191}
         }
         
         if model not in self.model_configs:
@@ -71,6 +176,50 @@ class EmbeddingGenerator:
         else:
             self.config = self.model_configs[model]
     
+    @property
+    def client(self) -> Any:
+        """Embeddings client, created from the configured provider on first use."""
+        if self._client is None:
+            self._client = get_embedding_client()
+        return self._client
+    
+    @client.setter
+    def client(self, client: Any):
+        self._client = client
+    
+    def _prepare_text(self, text: str) -> Tuple[str, int]:
+        """
+        Truncate a text to the model's input limit and count its tokens.
+        
+        Args:
+            text: Text to embed
+        
+        Returns:
+            Tuple of (possibly truncated text, token count)
+        """
+        if not self._encoding_loaded:
+            self._encoding = _load_encoding(self.model)
+            self._encoding_loaded = True
+        
+        max_tokens = self.config["max_tokens"]
+        
+        if self._encoding is not None:
+            tokens = self._encoding.encode(text, disallowed_special=())
+            if len(tokens) > max_tokens:
+                tokens = tokens[:max_tokens]
+                text = self._encoding.decode(tokens)
+            return text, len(tokens)
+        
+        data = text.encode("utf-8")
+        if len(data) > max_tokens * _BYTES_PER_TOKEN:
+            data = data[:max_tokens * _BYTES_PER_TOKEN]
+            text = data.decode("utf-8", errors="ignore")
+        return text, -(-len(data) // _BYTES_PER_TOKEN)
+    
+    def count_tokens(self, text: str) -> int:
+        """Count the tokens a text is sent as, after truncation."""
+        return self._prepare_text(text)[1]
+    
     async def generate_embedding(self, text: str) -> List[float]:
         """
         Generate embedding for a single text.
@@ -81,39 +230,17 @@ class EmbeddingGenerator:
         Returns:
             Embedding vector
         """
-        # Truncate text if too long
-        if len(text) > self.config["max_tokens"] * 4:  # Rough token estimation
-            text = text[:self.config["max_tokens"] * 4]
+        text, tokens = self._prepare_text(text)
         
-        for attempt in range(self.max_retries):
-            try:
-                response = await embedding_client.embeddings.create(
-                    model=self.model,
-                    input=text
-                )
-                
-                return response.data[0].embedding
-                
-            except RateLimitError as e:
-                if attempt == self.max_retries - 1:
-                    raise
-                
-                # Exponential backoff for rate limits
-                delay = self.retry_delay * (2 ** attempt)
-                logger.warning(f"Rate limit hit, retrying in {delay}s")
-                await asyncio.sleep(delay)
-                
-            except APIError as e:
-                logger.error(f"OpenAI API error: {e}")
-                if attempt == self.max_retries - 1:
-                    raise
-                await asyncio.sleep(self.retry_delay)
-                
-            except Exception as e:
-                logger.error(f"Unexpected error generating embedding: {e}")
-                if attempt == self.max_retries - 1:
-                    raise
-                await asyncio.sleep(self.retry_delay)
+        if self.cache is not None:
+            cached = self.cache.get(self.model, text)
+            if cached is not None:
+                return cached
+        
+        embedding = (await self._request_embeddings([text], tokens))[0]
+        if self.cache is not None:
+            self.cache.put(self.model, text, embedding)
+        return embedding
     
     async def generate_embeddings_batch(
         self,
@@ -126,85 +253,193 @@ class EmbeddingGenerator:
             texts: List of texts to embed
         
         Returns:
-            List of embedding vectors
+            List of embedding vectors; zero vectors for empty or failed texts
         """
-        # Filter and truncate texts
-        processed_texts = []
-        for text in texts:
-            if not text or not text.strip():
-                processed_texts.append("")
-                continue
-                
-            # Truncate if too long
-            if len(text) > self.config["max_tokens"] * 4:
-                text = text[:self.config["max_tokens"] * 4]
+        embeddings = await self._embed_texts(texts)
+        return [
+            embedding if embedding is not None else [0.0] * self.config["dimensions"]
+            for embedding in embeddings
+        ]
+    
+    async def _embed_texts(
+        self,
+        texts: Sequence[str],
+        progress_callback: Optional[callable] = None
+    ) -> List[Optional[List[float]]]:
+        """
+        Embed texts through the cache and token-packed concurrent requests.
+        
+        Args:
+            texts: Texts to embed, of any number and size
+            progress_callback: Optional callback called with (completed, total) requests
+        
+        Returns:
+            Embeddings in input order, None for empty or failed texts
+        """
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        
+        # Empty texts are never sent
+        indices = [i for i, text in enumerate(texts) if text and text.strip()]
+        prepared = [self._prepare_text(texts[i]) for i in indices]
+        
+        if self.cache is not None and indices:
+            cached = self.cache.get_many(self.model, [text for text, _ in prepared])
+            for i, embedding in zip(indices, cached):
+                embeddings[i] = embedding
+            missing = [n for n, embedding in enumerate(cached) if embedding is None]
+            indices = [indices[n] for n in missing]
+            prepared = [prepared[n] for n in missing]
+        
+        if not indices:
+            return embeddings
+        
+        batches = self._pack_batches([tokens for _, tokens in prepared])
+        logger.debug(f"Embedding {len(indices)} texts in {len(batches)} requests")
+        
+        completed = 0
+        
+        async def embed(batch: List[int]) -> List[Optional[List[float]]]:
+            nonlocal completed
+            result = await self._embed_batch(
+                [prepared[n][0] for n in batch],
+                [prepared[n][1] for n in batch]
+            )
+            completed += 1
+            if progress_callback:
+                progress_callback(completed, len(batches))
+            logger.debug(f"Processed batch {completed}/{len(batches)}")
+            return result
+        
+        results = await asyncio.gather(*(embed(batch) for batch in batches))
+        
+        generated_texts, generated = [], []
+        for batch, batch_embeddings in zip(batches, results):
+            for n, embedding in zip(batch, batch_embeddings):
+                embeddings[indices[n]] = embedding
+                if embedding is not None:
+                    generated_texts.append(prepared[n][0])
+                    generated.append(embedding)
+        
+        if self.cache is not None and generated:
+            self.cache.put_many(self.model, generated_texts, generated)
+        
+        return embeddings
+    
+    def _pack_batches(self, token_counts: Sequence[int]) -> List[List[int]]:
+        """
+        Group texts into requests within the token and text-count limits.
+        
+        Texts keep their order, so a request holds consecutive texts.
+        
+        Args:
+            token_counts: Token count of each text
+        
+        Returns:
+            Lists of text positions, one list per request
+        """
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_tokens = 0
+        
+        for n, tokens in enumerate(token_counts):
+            if current and (
+                current_tokens + tokens > self.max_batch_tokens
+                or len(current) >= self.batch_size
+            ):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(n)
+            current_tokens += tokens
+        
+        if current:
+            batches.append(current)
+        return batches
+    
+    async def _embed_batch(
+        self,
+        texts: List[str],
+        token_counts: List[int]
+    ) -> List[Optional[List[float]]]:
+        """
+        Embed one packed request, bisecting it if the request fails.
+        
+        Args:
+            texts: Prepared texts
+            token_counts: Token count of each text
+        
+        Returns:
+            Embeddings in input order, None for texts that could not be embedded
+        """
+        try:
+            return await self._request_embeddings(texts, sum(token_counts))
+        except RateLimitError:
+            # Splitting would only add load to an exhausted quota
+            raise
+        except Exception as e:
+            if len(texts) == 1:
+                logger.error(f"Failed to embed text: {e}")
+                return [None]
             
-            processed_texts.append(text)
+            middle = len(texts) // 2
+            logger.warning(f"Batch of {len(texts)} texts failed ({e}), splitting it in two")
+            left, right = await asyncio.gather(
+                self._embed_batch(texts[:middle], token_counts[:middle]),
+                self._embed_batch(texts[middle:], token_counts[middle:])
+            )
+            return left + right
+    
+    async def _request_embeddings(self, texts: List[str], tokens: int) -> List[List[float]]:
+        """
+        Send one embeddings request, retrying transient failures.
         
+        Args:
+            texts: Prepared texts
+            tokens: Total tokens in the request, charged to the rate limiter
+        
+        Returns:
+            List of embedding vectors
+        """
         for attempt in range(self.max_retries):
             try:
-                response = await embedding_client.embeddings.create(
-                    model=self.model,
-                    input=processed_texts
-                )
+                async with self._request_slots:
+                    if self.rate_limiter is not None:
+                        await self.rate_limiter.acquire(tokens)
+                    response = await self.client.embeddings.create(
+                        model=self.model,
+                        input=texts
+                    )
                 
+                if len(response.data) != len(texts):
+                    raise ValueError(
+                        f"Expected {len(texts)} embeddings, got {len(response.data)}"
+                    )
                 return [data.embedding for data in response.data]
                 
             except RateLimitError as e:
                 if attempt == self.max_retries - 1:
                     raise
                 
+                # Exponential backoff for rate limits
                 delay = self.retry_delay * (2 ** attempt)
                 logger.warning(f"Rate limit hit, retrying batch in {delay}s")
                 await asyncio.sleep(delay)
                 
+            except BadRequestError:
+                # The input itself was rejected; retrying cannot help
+                raise
+                
             except APIError as e:
                 logger.error(f"OpenAI API error in batch: {e}")
                 if attempt == self.max_retries - 1:
-                    # Fallback to individual processing
-                    return await self._process_individually(processed_texts)
+                    raise
                 await asyncio.sleep(self.retry_delay)
                 
             except Exception as e:
                 logger.error(f"Unexpected error in batch embedding: {e}")
                 if attempt == self.max_retries - 1:
-                    return await self._process_individually(processed_texts)
+                    raise
                 await asyncio.sleep(self.retry_delay)
     
-    async def _process_individually(
-        self,
-        texts: List[str]
-    ) -> List[List[float]]:
-        """
-        Process texts individually as fallback.
-        
-        Args:
-            texts: List of texts to embed
-        
-        Returns:
-            List of embedding vectors
-        """
-        embeddings = []
-        
-        for text in texts:
-            try:
-                if not text or not text.strip():
-                    embeddings.append([0.0] * self.config["dimensions"])
-                    continue
-                
-                embedding = await self.generate_embedding(text)
-                embeddings.append(embedding)
-                
-                # Small delay to avoid overwhelming the API
-                await asyncio.sleep(0.1)
-                
-            except Exception as e:
-                logger.error(f"Failed to embed text: {e}")
-                # Use zero vector as fallback
-                embeddings.append([0.0] * self.config["dimensions"])
-        
-        return embeddings
-    
     async def embed_chunks(
         self,
         chunks: List[DocumentChunk],
@@ -225,56 +460,45 @@ class EmbeddingGenerator:
         
         logger.info(f"Generating embeddings for {len(chunks)} chunks")
         
-        # Process chunks in batches
-        embedded_chunks = []
-        total_batches = (len(chunks) + self.batch_size - 1) // self.batch_size
+        try:
+            embeddings = await self._embed_texts(
+                [chunk.content for chunk in chunks], progress_callback
+            )
+            error = "Embedding request failed"
+        except Exception as e:
+            logger.error(f"Failed to embed chunks: {e}")
+            embeddings = [None] * len(chunks)
+            error = str(e)
         
-        for i in range(0, len(chunks), self.batch_size):
-            batch_chunks = chunks[i:i + self.batch_size]
-            batch_texts = [chunk.content for chunk in batch_chunks]
+        embedded_chunks = []
+        for chunk, embedding in zip(chunks, embeddings):
+            if embedding is None:
+                # Keep the chunk with a zero vector and record why
+                chunk.metadata.update({
+                    "embedding_error": error if chunk.content.strip() else "Empty chunk",
+                    "embedding_generated_at": datetime.now().isoformat()
+                })
+                chunk.embedding = [0.0] * self.config["dimensions"]
+                embedded_chunks.append(chunk)
+                continue
             
-            try:
-                # Generate embeddings for this batch
-                embeddings = await self.generate_embeddings_batch(batch_texts)
-                
-                # Add embeddings to chunks
-                for chunk, embedding in zip(batch_chunks, embeddings):
-                    # Create a new chunk with embedding
-                    embedded_chunk = DocumentChunk(
-                        content=chunk.content,
-                        index=chunk.index,
-                        start_char=chunk.start_char,
-                        end_char=chunk.end_char,
-                        metadata={
-                            **chunk.metadata,
-                            "embedding_model": self.model,
-                            "embedding_generated_at": datetime.now().isoformat()
-                        },
-                        token_count=chunk.token_count
-                    )
-                    
-                    # Add embedding as a separate attribute
-                    embedded_chunk.embedding = embedding
-                    embedded_chunks.append(embedded_chunk)
-                
-                # Progress update
-                current_batch = (i // self.batch_size) + 1
-                if progress_callback:
-                    progress_callback(current_batch, total_batches)
-                
-                logger.info(f"Processed batch {current_batch}/{total_batches}")
-                
-            except Exception as e:
-                logger.error(f"Failed to process batch {i//self.batch_size + 1}: {e}")
-                
-                # Add chunks without embeddings as fallback
-                for chunk in batch_chunks:
-                    chunk.metadata.update({
-                        "embedding_error": str(e),
-                        "embedding_generated_at": datetime.now().isoformat()
-                    })
-                    chunk.embedding = [0.0] * self.config["dimensions"]
-                    embedded_chunks.append(chunk)
+            # Create a new chunk with embedding
+            embedded_chunk = DocumentChunk(
+                content=chunk.content,
+                index=chunk.index,
+                start_char=chunk.start_char,
+                end_char=chunk.end_char,
+                metadata={
+                    **chunk.metadata,
+                    "embedding_model": self.model,
+                    "embedding_generated_at": datetime.now().isoformat()
+                },
+                token_count=chunk.token_count
+            )
+            
+            # Add embedding as a separate attribute
+            embedded_chunk.embedding = embedding
+            embedded_chunks.append(embedded_chunk)
         
         logger.info(f"Generated embeddings for {len(embedded_chunks)} chunks")
         return embedded_chunks
@@ -298,77 +522,72 @@ class EmbeddingGenerator:
 
 # Cache for embeddings
 class EmbeddingCache:
-    """Simple in-memory cache for embeddings."""
+    """In-memory LRU cache for embeddings, keyed by (model, sha256(text))."""
     
     def __init__(self, max_size: int = 1000):
         """Initialize cache."""
-        self.cache: Dict[str, List[float]] = {}
-        self.access_times: Dict[str, datetime] = {}
+        self.cache: "OrderedDict[Tuple[str, bytes], List[float]]" = OrderedDict()
         self.max_size = max_size
     
-    def get(self, text: str) -> Optional[List[float]]:
+    def get(self, model: str, text: str) -> Optional[List[float]]:
         """Get embedding from cache."""
-        text_hash = self._hash_text(text)
-        if text_hash in self.cache:
-            self.access_times[text_hash] = datetime.now()
-            return self.cache[text_hash]
-        return None
+        key = (model, embedding_cache_key(text))
+        embedding = self.cache.get(key)
+        if embedding is not None:
+            self.cache.move_to_end(key)
+        return embedding
     
-    def put(self, text: str, embedding: List[float]):
-        """Store embedding in cache."""
-        text_hash = self._hash_text(text)
-        
-        # Evict oldest entries if cache is full
-        if len(self.cache) >= self.max_size:
-            oldest_key = min(self.access_times.keys(), key=lambda k: self.access_times[k])
-            del self.cache[oldest_key]
-            del self.access_times[oldest_key]
+    def put(self, model: str, text: str, embedding: List[float]):
+        """Store embedding in cache, evicting the least recently used entry if full."""
+        key = (model, embedding_cache_key(text))
+        self.cache[key] = embedding
+        self.cache.move_to_end(key)
         
-        self.cache[text_hash] = embedding
-        self.access_times[text_hash] = datetime.now()
+        while len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+    
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Get embeddings for several texts (None where not cached)."""
+        return [self.get(model, text) for text in texts]
     
-    def _hash_text(self, text: str) -> str:
-        """Generate hash for text."""
-        import hashlib
-        return hashlib.md5(text.encode()).hexdigest()
+    def put_many(self, model: str, texts: Sequence[str], embeddings: Sequence[List[float]]):
+        """Store embeddings for several texts."""
+        for text, embedding in zip(texts, embeddings):
+            self.put(model, text, embedding)
 
 
 # Factory function
 def create_embedder(
     model: str = EMBEDDING_MODEL,
     use_cache: bool = True,
+    cache_path: Optional[str] = None,
     **kwargs
 ) -> EmbeddingGenerator:
     """
     Create embedding generator with optional caching.
     
+    The cache is persistent by default so repeated ingestion runs do not
+    re-embed text that was embedded before. Its location comes from
+    ``cache_path``, the EMBEDDING_CACHE_PATH environment variable, or
+    ``~/.cache/rag_agent/embeddings.sqlite``; an empty EMBEDDING_CACHE_PATH
+    falls back to an in-memory cache.
+    
     Args:
         model: Embedding model to use
         use_cache: Whether to use caching
+        cache_path: SQLite file for the persistent cache
         **kwargs: Additional arguments for EmbeddingGenerator
     
     Returns:
         EmbeddingGenerator instance
     """
-    embedder = EmbeddingGenerator(model=model, **kwargs)
-    
+    cache = None
     if use_cache:
-        # Add caching capability
-        cache = EmbeddingCache()
-        original_generate = embedder.generate_embedding
-        
-        async def cached_generate(text: str) -> List[float]:
-            cached = cache.get(text)
-            if cached is not None:
-                return cached
-            
-            embedding = await original_generate(text)
-            cache.put(text, embedding)
-            return embedding
-        
-        embedder.generate_embedding = cached_generate
+        if cache_path is None:
+            cache_path = os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_EMBEDDING_CACHE_PATH)
+        cache = PersistentEmbeddingCache(cache_path) if cache_path else EmbeddingCache()
     
-    return embedder
+    return EmbeddingGenerator(model=model, cache=cache, **kwargs)
 
 
 # Example usage
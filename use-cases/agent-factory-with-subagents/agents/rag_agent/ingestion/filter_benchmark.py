@@ -0,0 +1,315 @@
+"""
+Latency and recall of metadata-filtered vector search on PostgreSQL.
+
+Builds a synthetic multi-collection corpus: documents spread over
+collections and source sections, with Zipf-distributed tags and dates over
+two years, and clustered embeddings that do not depend on the metadata (the
+hard case for filtering after retrieval). The corpus is loaded twice, into
+two scratch schemas: one with the plain ``sql/schema.sql`` tables and one
+with ``sql/partitioned_chunks.sql`` applied, both through
+``PostgresVectorStore`` with an HNSW index.
+
+For each filter it compares, at the same ``match_count``:
+
+- ``post_filter``: the previous approach, an unfiltered search for
+  ``match_count * fetch_factor`` chunks filtered in the application
+- ``filtered``: ``vector_search`` with a ``SearchFilter``, for each
+  ``--exact-rows`` threshold (0 always goes through the ANN index)
+
+reporting p50/p95 latency, recall@k against the exact filtered neighbours
+and the share of ``match_count`` results returned.
+
+Usage (from the rag_agent directory):
+    DATABASE_URL=postgresql://... python -m ingestion.filter_benchmark
+    DATABASE_URL=postgresql://... python -m ingestion.filter_benchmark --collections 16 --documents 400 --output filters.json
+"""
+
+import os
+import asyncio
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Dict, List, Sequence
+
+import asyncpg
+import numpy as np
+
+from .index_benchmark import generate_vectors
+
+try:
+    from ..utils.search_filter import SearchFilter
+    from ..utils.storage import FILTER_EXACT_MAX_ROWS, PostgresVectorStore
+    from ..utils.vector_codec import register_vector_codec
+except ImportError:
+    # For direct execution or testing
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from utils.search_filter import SearchFilter
+    from utils.storage import FILTER_EXACT_MAX_ROWS, PostgresVectorStore
+    from utils.vector_codec import register_vector_codec
+
+SQL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sql")
+
+SCHEMAS = {"flat": "filter_benchmark", "partitioned": "filter_benchmark_partitioned"}
+
+SECTIONS = 10
+TAGS = 20
+START_DATE = datetime(2023, 1, 1, tzinfo=timezone.utc)
+DAYS = 730
+
+
+def make_corpus(collections: int, documents: int, chunks: int, dimensions: int, seed: int = 42) -> Dict[str, Any]:
+    """
+    Generate documents with metadata and one embedding per chunk.
+    
+    Args:
+        collections: Number of collections
+        documents: Documents per collection
+        chunks: Chunks per document
+        dimensions: Embedding dimension
+        seed: Random seed
+    
+    Returns:
+        ``documents`` (collection, source, tags, date) per document,
+        ``vectors`` (one row per chunk, document-major) and ``document_of``
+        (document index of each row)
+    """
+    rng = random.Random(seed)
+    tag_weights = [1 / (rank + 1) for rank in range(TAGS)]
+    docs = []
+    for number in range(collections * documents):
+        collection = f"collection_{number % collections}"
+        tags = sorted(set(rng.choices([f"tag_{i}" for i in range(TAGS)], weights=tag_weights, k=2)))
+        docs.append({
+            "collection": collection,
+            "source": f"{collection}/section_{rng.randrange(SECTIONS)}/doc_{number}.md",
+            "tags": tags,
+            "date": START_DATE + timedelta(days=rng.randrange(DAYS))
+        })
+    
+    rows = len(docs) * chunks
+    return {
+        "documents": docs,
+        "vectors": generate_vectors(rows, dimensions, clusters=max(rows // 100, 1), seed=seed),
+        "document_of": np.repeat(np.arange(len(docs)), chunks)
+    }
+
+
+def make_filters(collections: int) -> Dict[str, SearchFilter]:
+    """Filters from broad to narrow."""
+    last = f"collection_{collections - 1}"
+    return {
+        "collection": SearchFilter(collection="collection_0"),
+        "common_tag": SearchFilter(tags=["tag_0"]),
+        "date_quarter": SearchFilter(date_from="2024-01-01", date_to="2024-03-31"),
+        "source_section": SearchFilter(source_prefix="collection_1/section_3/"),
+        "rare_tag": SearchFilter(tags=[f"tag_{TAGS - 1}"]),
+        "collection_tag_date": SearchFilter(collection=last, tags=["tag_1"], date_from="2024-01-01")
+    }
+
+
+def document_records(corpus: Dict[str, Any], chunks: int) -> List[tuple]:
+    """(title, source, content, chunks, metadata) records; chunk content names its row."""
+    records = []
+    for number, document in enumerate(corpus["documents"]):
+        document_chunks = [
+            SimpleNamespace(
+                content=f"row {number * chunks + i}",
+                index=i,
+                metadata={},
+                token_count=2,
+                embedding=corpus["vectors"][number * chunks + i].tolist()
+            )
+            for i in range(chunks)
+        ]
+        metadata = {
+            "collection": document["collection"],
+            "tags": document["tags"],
+            "date": document["date"].isoformat()
+        }
+        records.append((document["source"], document["source"], "", document_chunks, metadata))
+    return records
+
+
+def adapt_script(script: str, dimensions: int, keep_drops: bool = True) -> str:
+    """
+    A ``sql/`` script for the benchmark schema.
+    
+    Sets the embedding dimension and generates ids with the built-in
+    ``gen_random_uuid()`` like the other benchmarks, so uuid-ossp need not be
+    installed. ``keep_drops=False`` removes the DROP statements, which would
+    resolve to the public tables from an empty schema.
+    """
+    lines = [
+        line for line in script.splitlines()
+        if (keep_drops or not line.startswith("DROP ")) and "uuid-ossp" not in line
+    ]
+    return (
+        "\n".join(lines)
+        .replace("vector(1536)", f"vector({dimensions})")
+        .replace("uuid_generate_v4()", "gen_random_uuid()")
+    )
+
+
+async def create_schema(database_url: str, schema: str, dimensions: int, partitioned: bool):
+    """Create the tables of ``sql/schema.sql`` in a scratch schema."""
+    scripts = ["schema.sql"] + (["partitioned_chunks.sql"] if partitioned else [])
+    conn = await asyncpg.connect(database_url)
+    try:
+        await conn.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        await conn.execute(f"CREATE SCHEMA {schema}")
+        await conn.execute(f"SET search_path = {schema}, public")
+        for name in scripts:
+            with open(os.path.join(SQL_DIR, name), encoding="utf-8") as f:
+                await conn.execute(adapt_script(f.read(), dimensions, keep_drops=name != "schema.sql"))
+    finally:
+        await conn.close()
+
+
+async def load(store: PostgresVectorStore, records: Sequence[tuple], batch_size: int = 50) -> float:
+    """Save the corpus and build the HNSW index; returns the load seconds."""
+    start = time.perf_counter()
+    for i in range(0, len(records), batch_size):
+        await store.save_documents(records[i:i + batch_size])
+    async with store.pool.acquire() as conn:
+        await conn.execute("ANALYZE")
+    await store.optimize("hnsw")
+    return time.perf_counter() - start
+
+
+def row_of(result: Dict[str, Any]) -> int:
+    return int(result["content"].split()[1])
+
+
+async def measure(search, queries: np.ndarray, truth: List[np.ndarray], k: int) -> Dict[str, float]:
+    """Latency, recall@k and fill rate of a search function."""
+    latencies = []
+    found = 0
+    expected_total = 0
+    returned = 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        rows = await search(query.tolist())
+        latencies.append((time.perf_counter() - start) * 1000)
+        found += len(set(rows) & set(expected.tolist()))
+        expected_total += len(expected)
+        returned += min(len(rows), k)
+    return {
+        f"recall@{k}": round(found / max(expected_total, 1), 4),
+        "fill": round(returned / (len(queries) * k), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2)
+    }
+
+
+async def benchmark_filter(
+    store: PostgresVectorStore,
+    corpus: Dict[str, Any],
+    filters: SearchFilter,
+    queries: np.ndarray,
+    k: int,
+    fetch_factor: int,
+    exact_rows: Sequence[int]
+) -> Dict[str, Any]:
+    """Compare post-filtering with filtered search for one filter."""
+    passes = np.array([
+        filters.matches(document["collection"], document["source"], document["tags"], document["date"])
+        for document in corpus["documents"]
+    ])
+    rows = np.flatnonzero(passes[corpus["document_of"]])
+    scores = queries @ corpus["vectors"][rows].T
+    truth = [rows[np.argsort(-row_scores, kind="stable")[:k]] for row_scores in scores]
+    
+    async def post_filter(vector):
+        results = await store.vector_search(vector, k * fetch_factor)
+        kept = [row_of(result) for result in results if passes[corpus["document_of"][row_of(result)]]]
+        return kept[:k]
+    
+    report = {"matching_chunks": int(len(rows)), "post_filter": await measure(post_filter, queries, truth, k)}
+    for threshold in exact_rows:
+        store.filter_exact_rows = threshold
+        
+        async def filtered(vector):
+            return [row_of(result) for result in await store.vector_search(vector, k, filters=filters)]
+        
+        report[f"filtered_exact_rows_{threshold}"] = await measure(filtered, queries, truth, k)
+    store.filter_exact_rows = FILTER_EXACT_MAX_ROWS
+    return report
+
+
+async def main():
+    """Run the filter benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark metadata-filtered vector search")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"), help="PostgreSQL URL")
+    parser.add_argument("--collections", type=int, default=8, help="Number of collections")
+    parser.add_argument("--documents", type=int, default=500, help="Documents per collection")
+    parser.add_argument("--chunks", type=int, default=10, help="Chunks per document")
+    parser.add_argument("--dimensions", type=int, default=256, help="Embedding dimension")
+    parser.add_argument("--queries", type=int, default=100, help="Queries per filter")
+    parser.add_argument("--k", type=int, default=10, help="Results per query")
+    parser.add_argument("--fetch-factor", type=int, default=4,
+                        help="Over-fetch of the post-filter baseline, as a multiple of k")
+    parser.add_argument("--exact-rows", type=int, nargs="+", default=[0, FILTER_EXACT_MAX_ROWS],
+                        help="Exact-ranking thresholds to compare (0: always use the ANN index)")
+    parser.add_argument("--layouts", nargs="+", choices=list(SCHEMAS), default=list(SCHEMAS),
+                        help="Plain and/or partitioned chunks table")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch schemas")
+    parser.add_argument("--output", "-o", help="Write the JSON report to this file")
+    args = parser.parse_args()
+    
+    if not args.database_url:
+        parser.error("DATABASE_URL environment variable or --database-url is required")
+    
+    corpus = make_corpus(args.collections, args.documents, args.chunks, args.dimensions)
+    records = document_records(corpus, args.chunks)
+    rng = np.random.default_rng(7)
+    queries = corpus["vectors"][rng.choice(len(corpus["vectors"]), args.queries, replace=False)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape, dtype=np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    
+    report: Dict[str, Any] = {
+        "chunks": len(corpus["vectors"]),
+        "collections": args.collections,
+        "dimensions": args.dimensions,
+        "k": args.k,
+        "layouts": {}
+    }
+    for layout in args.layouts:
+        schema = SCHEMAS[layout]
+        await create_schema(args.database_url, schema, args.dimensions, partitioned=layout == "partitioned")
+        pool = await asyncpg.create_pool(
+            args.database_url,
+            min_size=1,
+            max_size=2,
+            init=register_vector_codec,
+            server_settings={"search_path": f"{schema}, public"}
+        )
+        store = PostgresVectorStore(pool)
+        try:
+            load_seconds = await load(store, records)
+            results = {"load_seconds": round(load_seconds, 1)}
+            for name, filters in make_filters(args.collections).items():
+                results[name] = await benchmark_filter(
+                    store, corpus, filters, queries, args.k, args.fetch_factor, args.exact_rows
+                )
+                print(layout, name, json.dumps(results[name]))
+            report["layouts"][layout] = results
+        finally:
+            await pool.close()
+            if not args.keep:
+                conn = await asyncpg.connect(args.database_url)
+                await conn.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+                await conn.close()
+    
+    print(json.dumps(report, indent=2))
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
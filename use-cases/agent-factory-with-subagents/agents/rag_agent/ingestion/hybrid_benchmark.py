@@ -0,0 +1,284 @@
+"""
+Latency benchmark for hybrid (vector + full-text) search.
+
+Loads synthetic chunks into temporary tables that shadow ``documents`` and
+``chunks`` for the benchmark connection, installs the search functions from
+``sql/schema.sql`` as temporary functions, and compares per-query latency of:
+
+- ``vector``: ``match_chunks``, pure vector search through the ANN index;
+- ``hybrid_full_scan``: the previous ``hybrid_search``, which computed
+  ``to_tsvector`` for every row and scored the whole table;
+- ``hybrid_rrf``: the current ``hybrid_search``, fusing top-k vector and
+  GIN-indexed full-text candidates by reciprocal rank.
+
+Existing data is untouched.
+
+Usage (from the rag_agent directory):
+    DATABASE_URL=postgresql://... python -m ingestion.hybrid_benchmark --chunks 100000
+"""
+
+import os
+import re
+import asyncio
+import argparse
+import json
+import random
+import time
+from typing import Dict, List, Tuple
+
+import asyncpg
+import numpy as np
+
+from .index_benchmark import generate_vectors
+
+try:
+    from ..utils.db_utils import register_vector_codec
+    from ..utils.vector_index import (
+        BUILD_TIMEOUT, apply_search_settings, choose_index_plan, vector_search_settings
+    )
+except ImportError:
+    # For direct execution or testing
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from utils.db_utils import register_vector_codec
+    from utils.vector_index import (
+        BUILD_TIMEOUT, apply_search_settings, choose_index_plan, vector_search_settings
+    )
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sql", "schema.sql")
+
+SCRATCH_TABLES = """
+CREATE TEMP TABLE documents (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    title TEXT NOT NULL,
+    source TEXT NOT NULL,
+    content TEXT NOT NULL,
+    metadata JSONB DEFAULT '{{}}'
+);
+CREATE TEMP TABLE chunks (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    document_id UUID NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    content TEXT NOT NULL,
+    embedding vector({dimensions}),
+    chunk_index INTEGER NOT NULL,
+    metadata JSONB DEFAULT '{{}}',
+    content_tsv tsvector GENERATED ALWAYS AS (to_tsvector('english', content)) STORED
+);
+"""
+
+# hybrid_search before the stored tsvector column and rank fusion
+LEGACY_HYBRID_SEARCH = """
+CREATE FUNCTION pg_temp.hybrid_search_full_scan(
+    query_embedding vector({dimensions}),
+    query_text TEXT,
+    match_count INT DEFAULT 10,
+    text_weight FLOAT DEFAULT 0.3
+)
+RETURNS TABLE (chunk_id UUID, combined_score FLOAT)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    WITH vector_results AS (
+        SELECT c.id AS chunk_id, 1 - (c.embedding <=> query_embedding) AS vector_sim
+        FROM chunks c
+        JOIN documents d ON c.document_id = d.id
+        WHERE c.embedding IS NOT NULL
+    ),
+    text_results AS (
+        SELECT c.id AS chunk_id,
+            ts_rank_cd(to_tsvector('english', c.content), plainto_tsquery('english', query_text)) AS text_sim
+        FROM chunks c
+        JOIN documents d ON c.document_id = d.id
+        WHERE to_tsvector('english', c.content) @@ plainto_tsquery('english', query_text)
+    )
+    SELECT
+        COALESCE(v.chunk_id, t.chunk_id) AS chunk_id,
+        (COALESCE(v.vector_sim, 0) * (1 - text_weight) + COALESCE(t.text_sim, 0) * text_weight)::float8
+    FROM vector_results v
+    FULL OUTER JOIN text_results t ON v.chunk_id = t.chunk_id
+    ORDER BY 2 DESC
+    LIMIT match_count;
+END;
+$$;
+"""
+
+FUNCTION = re.compile(r"CREATE OR REPLACE FUNCTION (\w+)\(.*?\n\$\$;", re.DOTALL)
+
+WORDS = (
+    "vector search index embedding retrieval chunk document query latency throughput "
+    "pipeline postgres similarity ranking context agent model funding investment market "
+    "growth startup acquisition revenue valuation partnership research compute training "
+    "inference hardware cloud platform enterprise adoption regulation policy safety"
+).split()
+
+
+def schema_functions(dimensions: int) -> List[str]:
+    """Search functions from schema.sql, as temporary functions for the given dimension."""
+    with open(SCHEMA_PATH, encoding="utf-8") as f:
+        schema = f.read()
+    functions = []
+    for match in FUNCTION.finditer(schema):
+        if match.group(1) in ("match_chunks", "hybrid_search"):
+            statement = match.group(0).replace("FUNCTION ", "FUNCTION pg_temp.", 1)
+            functions.append(statement.replace("vector(1536)", f"vector({dimensions})"))
+    return functions
+
+
+def generate_text(rng: random.Random, vocabulary: List[str], words: int) -> str:
+    """Chunk text with Zipf-like word frequencies."""
+    weights = [1.0 / (rank + 1) for rank in range(len(vocabulary))]
+    return " ".join(rng.choices(vocabulary, weights=weights, k=words)) + "."
+
+
+async def load_corpus(
+    conn: asyncpg.Connection,
+    chunks: int,
+    dimensions: int,
+    seed: int = 42
+) -> Tuple[List[str], np.ndarray]:
+    """
+    Load synthetic documents and chunks into the scratch tables.
+    
+    Returns:
+        Chunk texts and embeddings, for sampling queries
+    """
+    rng = random.Random(seed)
+    # Rare terms make some queries selective, like names and identifiers
+    vocabulary = WORDS + [f"term{i}" for i in range(5000)]
+    vectors = generate_vectors(chunks, dimensions, clusters=max(chunks // 100, 1))
+    texts = [generate_text(rng, vocabulary, rng.randint(80, 200)) for _ in range(chunks)]
+    
+    per_document = 20
+    document_ids = await conn.fetch(
+        """
+        INSERT INTO documents (title, source, content)
+        SELECT 'Document ' || i, 'doc_' || i || '.md', ''
+        FROM generate_series(1, $1) AS i
+        RETURNING id
+        """,
+        (chunks + per_document - 1) // per_document
+    )
+    for start in range(0, chunks, 20_000):
+        await conn.copy_records_to_table(
+            "chunks",
+            records=[
+                (document_ids[i // per_document]["id"], texts[i], vectors[i].tolist(), i % per_document)
+                for i in range(start, min(start + 20_000, chunks))
+            ],
+            columns=["document_id", "content", "embedding", "chunk_index"],
+            timeout=BUILD_TIMEOUT
+        )
+    
+    plan = choose_index_plan(chunks)
+    await conn.execute(
+        plan.definition("tmp_chunks_embedding").replace(" ON chunks ", " ON pg_temp.chunks "),
+        timeout=BUILD_TIMEOUT
+    )
+    await conn.execute("CREATE INDEX ON chunks USING GIN (content_tsv)", timeout=BUILD_TIMEOUT)
+    await conn.execute("CREATE INDEX ON chunks (document_id)")
+    await conn.execute("ANALYZE documents")
+    await conn.execute("ANALYZE chunks")
+    return texts, vectors
+
+
+async def time_queries(
+    conn: asyncpg.Connection,
+    sql: str,
+    params: List[Tuple],
+    settings: Dict[str, int]
+) -> Dict[str, float]:
+    """Run the search for every parameter set and report latency percentiles."""
+    latencies = []
+    results = 0
+    async with conn.transaction():
+        await apply_search_settings(conn, settings)
+        for args in params:
+            start = time.perf_counter()
+            rows = await conn.fetch(sql, *args, timeout=BUILD_TIMEOUT)
+            latencies.append((time.perf_counter() - start) * 1000)
+            results += len(rows)
+    
+    return {
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "mean_results": round(results / len(params), 1)
+    }
+
+
+async def main():
+    """Run the hybrid search benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark hybrid search latency")
+    parser.add_argument("--database-url", default=DATABASE_URL, help="PostgreSQL URL")
+    parser.add_argument("--chunks", type=int, default=100_000, help="Synthetic chunks")
+    parser.add_argument("--dimensions", type=int, default=1536, help="Embedding dimension")
+    parser.add_argument("--queries", type=int, default=100, help="Queries per case")
+    parser.add_argument("--legacy-queries", type=int, default=20, help="Queries for the full-scan function")
+    parser.add_argument("--match-count", type=int, default=10, help="Results per query")
+    parser.add_argument("--candidates", type=int, default=50, help="Candidates per side for rank fusion")
+    parser.add_argument("--output", "-o", help="Write the JSON report to this file")
+    args = parser.parse_args()
+    
+    if not args.database_url:
+        parser.error("DATABASE_URL environment variable or --database-url is required")
+    
+    conn = await asyncpg.connect(args.database_url)
+    try:
+        await conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        await conn.execute(SCRATCH_TABLES.format(dimensions=args.dimensions))
+        for statement in schema_functions(args.dimensions):
+            await conn.execute(statement)
+        await conn.execute(LEGACY_HYBRID_SEARCH.format(dimensions=args.dimensions))
+        await register_vector_codec(conn)
+        
+        start = time.perf_counter()
+        texts, vectors = await load_corpus(conn, args.chunks, args.dimensions)
+        load_seconds = time.perf_counter() - start
+        
+        # Queries: three words from a random chunk, with that chunk's embedding
+        rng = random.Random(7)
+        queries = []
+        for position in (rng.randrange(args.chunks) for _ in range(args.queries)):
+            words = texts[position].rstrip(".").split()
+            first = rng.randrange(len(words) - 3)
+            queries.append((vectors[position].tolist(), " ".join(words[first:first + 3])))
+        
+        plan = choose_index_plan(args.chunks)
+        limit = args.match_count
+        cases = [
+            ("vector", f"SELECT * FROM pg_temp.match_chunks($1, {limit})",
+             [(embedding,) for embedding, _ in queries], vector_search_settings(plan, limit)),
+            ("hybrid_full_scan", f"SELECT * FROM pg_temp.hybrid_search_full_scan($1, $2, {limit})",
+             queries[:args.legacy_queries], {}),
+            ("hybrid_rrf", f"SELECT * FROM pg_temp.hybrid_search($1, $2, {limit}, 0.3, {args.candidates})",
+             queries, vector_search_settings(plan, max(limit, args.candidates)))
+        ]
+        
+        reports = []
+        for name, sql, params, settings in cases:
+            report = {"case": name, "queries": len(params)}
+            report.update(await time_queries(conn, sql, params, settings))
+            reports.append(report)
+            print(json.dumps(report))
+    finally:
+        await conn.close()
+    
+    report = {
+        "chunks": args.chunks,
+        "dimensions": args.dimensions,
+        "index": plan.method,
+        "load_seconds": round(load_seconds, 1),
+        "cases": reports
+    }
+    
+    print(json.dumps(report, indent=2))
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
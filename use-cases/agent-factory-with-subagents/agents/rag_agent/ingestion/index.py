@@ -0,0 +1,94 @@
+"""
+Manage the ANN index on chunk embeddings.
+
+Shows the current index and the one suited to the corpus size, and builds
+it concurrently when they differ. Ingestion does this automatically after
+each run; use this command after loading data by other means, to switch
+methods, or to rebuild with more memory.
+
+Usage (from the rag_agent directory):
+    python -m ingestion.index --status
+    python -m ingestion.index --method auto --maintenance-work-mem 2GB
+"""
+
+import asyncio
+import argparse
+import logging
+
+from dotenv import load_dotenv
+
+try:
+    from ..utils.db_utils import db_pool, initialize_database, close_database
+    from ..utils.vector_index import (
+        HNSW_MAX_ROWS, choose_index_plan, ensure_vector_index,
+        get_embedding_dimensions, get_vector_index
+    )
+except ImportError:
+    # For direct execution or testing
+    import sys
+    import os
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from utils.db_utils import db_pool, initialize_database, close_database
+    from utils.vector_index import (
+        HNSW_MAX_ROWS, choose_index_plan, ensure_vector_index,
+        get_embedding_dimensions, get_vector_index
+    )
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    """Show or rebuild the chunk embedding index."""
+    parser = argparse.ArgumentParser(description="Manage the ANN index on chunk embeddings")
+    parser.add_argument("--method", choices=["auto", "hnsw", "ivfflat", "none"], default="auto",
+                        help="Index method (auto: HNSW up to --hnsw-max-rows, IVFFlat above)")
+    parser.add_argument("--hnsw-max-rows", type=int, default=HNSW_MAX_ROWS,
+                        help="Largest corpus indexed with HNSW in auto mode")
+    parser.add_argument("--status", action="store_true", help="Only show the current and suggested index")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the current index is adequate")
+    parser.add_argument("--blocking", action="store_true",
+                        help="Build without CONCURRENTLY (faster, blocks writes)")
+    parser.add_argument("--maintenance-work-mem", help="Memory for the build, e.g. 2GB")
+    parser.add_argument("--parallel-workers", type=int, help="Parallel maintenance workers for the build")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Enable verbose logging")
+    args = parser.parse_args()
+    
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    
+    await initialize_database()
+    try:
+        async with db_pool.acquire() as conn:
+            if args.status:
+                rows = await conn.fetchval("SELECT count(*) FROM chunks WHERE embedding IS NOT NULL")
+                dimensions = await get_embedding_dimensions(conn)
+                current = await get_vector_index(conn)
+                suggested = choose_index_plan(
+                    rows, args.method, dimensions=dimensions, hnsw_max_rows=args.hnsw_max_rows
+                )
+                print(f"Embedded chunks: {rows}")
+                print(f"Current index:   {current}")
+                print(f"Suggested index: {suggested}")
+                return
+            
+            plan, rebuilt = await ensure_vector_index(
+                conn,
+                method=args.method,
+                force=args.force,
+                concurrently=not args.blocking,
+                hnsw_max_rows=args.hnsw_max_rows,
+                maintenance_work_mem=args.maintenance_work_mem,
+                parallel_workers=args.parallel_workers
+            )
+            print(f"{'Built' if rebuilt else 'Kept'} index: {plan}")
+    finally:
+        await close_database()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
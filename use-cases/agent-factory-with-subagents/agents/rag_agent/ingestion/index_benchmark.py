@@ -0,0 +1,262 @@
+"""
+Recall vs latency benchmark for ANN indexes on a synthetic vector table.
+
+Loads clustered random unit vectors into an unlogged table, computes exact
+nearest neighbours with numpy, then builds each index the index manager can
+choose (HNSW, and IVFFlat with about sqrt(rows) lists) and sweeps the
+query-time setting (``hnsw.ef_search`` / ``ivfflat.probes``). For every
+setting it reports recall@k against the exact neighbours and p50/p95 query
+latency, next to the exact sequential scan.
+
+The table is dropped at the end unless ``--keep`` is given, so a loaded
+table can be reused with ``--reuse``.
+
+Usage (from the rag_agent directory):
+    DATABASE_URL=postgresql://... python -m ingestion.index_benchmark --rows 1000000 --dimensions 128
+"""
+
+import os
+import asyncio
+import argparse
+import json
+import time
+from typing import Any, Dict, Sequence
+
+import asyncpg
+import numpy as np
+
+try:
+    from ..utils.db_utils import register_vector_codec
+    from ..utils.vector_index import (
+        BUILD_TIMEOUT, VectorIndexPlan, apply_search_settings, choose_index_plan, vector_search_settings
+    )
+except ImportError:
+    # For direct execution or testing
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from utils.db_utils import register_vector_codec
+    from utils.vector_index import (
+        BUILD_TIMEOUT, VectorIndexPlan, apply_search_settings, choose_index_plan, vector_search_settings
+    )
+
+
+def generate_vectors(
+    rows: int,
+    dimensions: int,
+    clusters: int,
+    intrinsic_dimensions: int = 32,
+    seed: int = 42
+) -> np.ndarray:
+    """
+    Generate clustered unit vectors with a low intrinsic dimension.
+    
+    Real embeddings are clustered by topic and vary along far fewer
+    directions than they have dimensions. Points are drawn around cluster
+    centres in a low-dimensional latent space and projected up, plus a little
+    isotropic noise; uniform random vectors would make every index look worse
+    than it is in practice.
+    
+    Args:
+        rows: Number of vectors
+        dimensions: Vector dimension
+        clusters: Number of cluster centres
+        intrinsic_dimensions: Dimension of the latent space
+        seed: Random seed
+    
+    Returns:
+        float32 matrix of shape (rows, dimensions)
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, intrinsic_dimensions), dtype=np.float32)
+    projection = rng.standard_normal((intrinsic_dimensions, dimensions), dtype=np.float32)
+    projection /= np.sqrt(intrinsic_dimensions)
+    
+    vectors = np.empty((rows, dimensions), dtype=np.float32)
+    for start in range(0, rows, 100_000):
+        end = min(start + 100_000, rows)
+        latent = centres[rng.integers(0, clusters, end - start)]
+        latent += 0.7 * rng.standard_normal((end - start, intrinsic_dimensions), dtype=np.float32)
+        vectors[start:end] = latent @ projection
+        vectors[start:end] += 0.1 * rng.standard_normal((end - start, dimensions), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def exact_neighbours(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Ids (row numbers) of the k most cosine-similar vectors for each query."""
+    best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+    best_ids = np.zeros((len(queries), k), dtype=np.int64)
+    for start in range(0, len(vectors), 200_000):
+        scores = queries @ vectors[start:start + 200_000].T
+        take = min(k, scores.shape[1])
+        top = np.argpartition(-scores, take - 1, axis=1)[:, :take]
+        candidates = np.concatenate([best_scores, np.take_along_axis(scores, top, axis=1)], axis=1)
+        candidate_ids = np.concatenate([best_ids, top + start], axis=1)
+        keep = np.argsort(-candidates, axis=1)[:, :k]
+        best_scores = np.take_along_axis(candidates, keep, axis=1)
+        best_ids = np.take_along_axis(candidate_ids, keep, axis=1)
+    return best_ids
+
+
+async def load_table(conn: asyncpg.Connection, table: str, vectors: np.ndarray):
+    """Create the benchmark table and COPY the vectors into it."""
+    await conn.execute(f"DROP TABLE IF EXISTS {table}")
+    await conn.execute(
+        f"CREATE UNLOGGED TABLE {table} (id integer PRIMARY KEY, embedding vector({vectors.shape[1]}))"
+    )
+    for start in range(0, len(vectors), 50_000):
+        batch = vectors[start:start + 50_000]
+        await conn.copy_records_to_table(
+            table,
+            records=[(start + i, row.tolist()) for i, row in enumerate(batch)],
+            columns=["id", "embedding"]
+        )
+    await conn.execute(f"VACUUM ANALYZE {table}")
+
+
+async def measure_queries(
+    conn: asyncpg.Connection,
+    table: str,
+    queries: np.ndarray,
+    truth: np.ndarray,
+    k: int,
+    settings: Dict[str, Any]
+) -> Dict[str, float]:
+    """
+    Run every query with the given settings.
+    
+    Returns:
+        recall@k and p50/p95 latency in milliseconds
+    """
+    sql = f"SELECT id FROM {table} ORDER BY embedding <=> $1 LIMIT {k}"
+    latencies = []
+    found = 0
+    async with conn.transaction():
+        await apply_search_settings(conn, settings)
+        for query, expected in zip(queries, truth):
+            vector = query.tolist()
+            start = time.perf_counter()
+            rows = await conn.fetch(sql, vector, timeout=BUILD_TIMEOUT)
+            latencies.append((time.perf_counter() - start) * 1000)
+            found += len({row["id"] for row in rows} & set(expected.tolist()))
+    
+    return {
+        f"recall@{k}": round(found / (len(queries) * k), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2)
+    }
+
+
+async def benchmark_index(
+    conn: asyncpg.Connection,
+    table: str,
+    plan: VectorIndexPlan,
+    values: Sequence[int],
+    queries: np.ndarray,
+    truth: np.ndarray,
+    k: int
+) -> Dict[str, Any]:
+    """Build one index, sweep its query-time setting and drop it."""
+    definition = plan.definition(f"{table}_ann").replace(" ON chunks ", f" ON {table} ")
+    start = time.perf_counter()
+    await conn.execute(definition, timeout=BUILD_TIMEOUT)
+    build_seconds = time.perf_counter() - start
+    size = await conn.fetchval(f"SELECT pg_relation_size('{table}_ann')")
+    
+    sweep = []
+    for value in values:
+        settings = vector_search_settings(plan, k, ef_search=value, probes=value)
+        result = {"setting": settings}
+        result.update(await measure_queries(conn, table, queries, truth, k, settings))
+        sweep.append(result)
+        print(json.dumps(result))
+    
+    await conn.execute(f"DROP INDEX {table}_ann")
+    return {
+        "index": plan.definition(f"{table}_ann"),
+        "build_seconds": round(build_seconds, 1),
+        "index_mb": round(size / 1024 / 1024, 1),
+        "sweep": sweep
+    }
+
+
+async def main():
+    """Run the ANN index benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark ANN index recall and latency")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Vectors in the synthetic table")
+    parser.add_argument("--dimensions", type=int, default=128, help="Vector dimension")
+    parser.add_argument("--clusters", type=int, default=1000, help="Cluster centres in the synthetic data")
+    parser.add_argument("--intrinsic-dimensions", type=int, default=32,
+                        help="Latent dimension of the synthetic data")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per setting")
+    parser.add_argument("--exact-queries", type=int, default=20, help="Queries for the sequential scan baseline")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours per query")
+    parser.add_argument("--methods", nargs="+", choices=["hnsw", "ivfflat"], default=["hnsw", "ivfflat"])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[10, 20, 40, 80, 160, 320],
+                        help="hnsw.ef_search values to sweep")
+    parser.add_argument("--probes", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64],
+                        help="ivfflat.probes values to sweep")
+    parser.add_argument("--maintenance-work-mem", default="1GB", help="Memory for index builds")
+    parser.add_argument("--table", default="ann_benchmark", help="Benchmark table name")
+    parser.add_argument("--reuse", action="store_true", help="Reuse a table kept by a previous run")
+    parser.add_argument("--keep", action="store_true", help="Keep the table after the run")
+    parser.add_argument("--output", "-o", help="Write the JSON report to this file")
+    args = parser.parse_args()
+    
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        raise SystemExit("DATABASE_URL is required")
+    
+    vectors = generate_vectors(args.rows, args.dimensions, args.clusters, args.intrinsic_dimensions)
+    rng = np.random.default_rng(7)
+    # Queries are perturbed corpus vectors, like questions close to a passage
+    queries = vectors[rng.integers(0, args.rows, args.queries)] + 0.3 * rng.standard_normal(
+        (args.queries, args.dimensions), dtype=np.float32
+    ) / np.sqrt(args.dimensions)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = exact_neighbours(vectors, queries, args.k)
+    
+    conn = await asyncpg.connect(database_url)
+    await register_vector_codec(conn)
+    try:
+        await conn.execute("SELECT set_config('maintenance_work_mem', $1, false)", args.maintenance_work_mem)
+        
+        start = time.perf_counter()
+        if not args.reuse:
+            await load_table(conn, args.table, vectors)
+        load_seconds = time.perf_counter() - start
+        
+        report: Dict[str, Any] = {
+            "rows": args.rows,
+            "dimensions": args.dimensions,
+            "intrinsic_dimensions": args.intrinsic_dimensions,
+            "queries": args.queries,
+            "k": args.k,
+            "load_seconds": round(load_seconds, 1),
+            "exact": await measure_queries(
+                conn, args.table, queries[:args.exact_queries], truth[:args.exact_queries], args.k, {}
+            ),
+            "indexes": []
+        }
+        print(json.dumps({"exact": report["exact"]}))
+        
+        for method in args.methods:
+            plan = choose_index_plan(args.rows, method=method)
+            values = args.ef_search if method == "hnsw" else args.probes
+            report["indexes"].append(
+                await benchmark_index(conn, args.table, plan, values, queries, truth, args.k)
+            )
+        
+        print(json.dumps(report, indent=2))
+        
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+    finally:
+        if not args.keep:
+            await conn.execute(f"DROP TABLE IF EXISTS {args.table}")
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -4,37 +4,185 @@ Main ingestion script for processing markdown documents into vector DB and knowl
 
 import os
 import asyncio
+import inspect
 import logging
-import json
-import glob
+import hashlib
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+from typing import List, Dict, Any, Optional, Callable, Awaitable, Iterable, Sequence, Tuple
+from datetime import date, datetime
 import argparse
 
-import asyncpg
 from dotenv import load_dotenv
 
-from .chunker import ChunkingConfig, create_chunker, DocumentChunk
-from .embedder import create_embedder
+from .chunker import ChunkingConfig, SimpleChunker, create_chunker, DocumentChunk
+from .dedup import ChunkDeduplicator, DeduplicationStats
+from .embedder import EmbeddingGenerator, create_embedder
+from .loader import DocumentWalker, MemoryBudget, read_document, walk_documents
 
 # Import utilities
 try:
-    from ..utils.db_utils import initialize_database, close_database, db_pool
+    from ..utils.db_utils import db_pool
+    from ..utils.local_store import DEFAULT_LOCAL_STORE_PATH, LocalVectorStore
     from ..utils.models import IngestionConfig, IngestionResult
+    from ..utils.search_filter import DEFAULT_COLLECTION
+    from ..utils.storage import PostgresVectorStore, VectorStore
 except ImportError:
     # For direct execution or testing
     import sys
     import os
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    from utils.db_utils import initialize_database, close_database, db_pool
+    from utils.db_utils import db_pool
+    from utils.local_store import DEFAULT_LOCAL_STORE_PATH, LocalVectorStore
     from utils.models import IngestionConfig, IngestionResult
+    from utils.search_filter import DEFAULT_COLLECTION
+    from utils.storage import PostgresVectorStore, VectorStore
 
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Marks the end of input for a stage worker
+_STOP = object()
+
+
+@dataclass
+class _DocumentWork:
+    """A document moving through the pipeline stages."""
+    position: int
+    file_path: str
+    started_at: float = field(default_factory=time.perf_counter)
+    title: str = ""
+    source: str = ""
+    content: str = ""
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    chunks: List[DocumentChunk] = field(default_factory=list)
+    content_hash: str = ""
+    unchanged: bool = False
+    replaces: List[str] = field(default_factory=list)
+    chunks_reused: int = 0
+    chunks_deduplicated: int = 0
+    reserved_bytes: int = 0
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 hex digest used to detect changed documents and chunks."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _megabytes(value: Optional[float]) -> Optional[int]:
+    """Bytes in a size given in MB; None stays None."""
+    return int(value * 2 ** 20) if value is not None else None
+
+
+def extract_title(content: str, file_path: str) -> str:
+    """Extract title from document content or filename."""
+    # Try to find markdown title
+    lines = content.split('\n')
+    for line in lines[:10]:  # Check first 10 lines
+        line = line.strip()
+        if line.startswith('# '):
+            return line[2:].strip()
+    
+    # Fallback to filename
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+
+def extract_document_metadata(content: str, file_path: str) -> Dict[str, Any]:
+    """Extract metadata from document content."""
+    metadata = {
+        "file_path": file_path,
+        "file_size": len(content),
+        "ingestion_date": datetime.now().isoformat()
+    }
+    
+    # Try to extract YAML frontmatter
+    if content.startswith('---'):
+        try:
+            import yaml
+            end_marker = content.find('\n---\n', 4)
+            if end_marker != -1:
+                frontmatter = content[4:end_marker]
+                yaml_metadata = yaml.safe_load(frontmatter)
+                if isinstance(yaml_metadata, dict):
+                    # YAML dates become ISO strings so metadata stays JSON
+                    metadata.update({
+                        key: value.isoformat() if isinstance(value, (date, datetime)) else value
+                        for key, value in yaml_metadata.items()
+                    })
+        except ImportError:
+            logger.warning("PyYAML not installed, skipping frontmatter extraction")
+        except Exception as e:
+            logger.warning(f"Failed to parse frontmatter: {e}")
+    
+    # Extract some basic metadata from content
+    lines = content.split('\n')
+    metadata['line_count'] = len(lines)
+    metadata['word_count'] = len(content.split())
+    
+    return metadata
+
+
+def parse_document(
+    file_path: str,
+    source: str,
+    ingest_root: str,
+    previous_hash: Optional[str] = None,
+    chunking_config: Optional[ChunkingConfig] = None,
+    max_bytes: Optional[int] = None
+) -> Tuple[str, str, str, Optional[Dict[str, Any]], Optional[List[DocumentChunk]]]:
+    """
+    Read, parse and optionally chunk a document.
+    
+    This is the CPU-bound part of ingestion. It runs in a worker process, so
+    it takes and returns only picklable values.
+    
+    Args:
+        file_path: Document path
+        source: Document path relative to the documents folder
+        ingest_root: Absolute documents folder, recorded in metadata
+        previous_hash: Content hash of the stored version; parsing stops after
+            hashing if the content is unchanged
+        chunking_config: Rule-based chunking configuration; None leaves
+            chunking to the caller
+        max_bytes: File size limit; None for no limit
+    
+    Returns:
+        Tuple of (title, content, content hash, metadata, chunks); metadata
+        is None for unchanged documents and chunks is None when not chunked
+    
+    Raises:
+        DocumentTooLargeError: The file is larger than ``max_bytes``
+    """
+    content = read_document(file_path, max_bytes)
+    title = extract_title(content, file_path)
+    digest = content_hash(content)
+    
+    if digest == previous_hash:
+        return title, content, digest, None, None
+    
+    metadata = extract_document_metadata(content, file_path)
+    metadata["content_hash"] = digest
+    metadata["ingest_root"] = ingest_root
+    
+    chunks = None
+    if chunking_config is not None:
+        chunks = SimpleChunker(chunking_config).chunk_document(
+            content=content,
+            title=title,
+            source=source,
+            metadata=metadata
+        )
+        for chunk in chunks:
+            chunk.metadata["content_hash"] = content_hash(chunk.content)
+    
+    return title, content, digest, metadata, chunks
+
 
 class DocumentIngestionPipeline:
     """Pipeline for ingesting documents into vector DB and knowledge graph."""
@@ -43,7 +191,9 @@ class DocumentIngestionPipeline:
         self,
         config: IngestionConfig,
         documents_folder: str = "documents",
-        clean_before_ingest: bool = False
+        clean_before_ingest: bool = False,
+        embedder: Optional[EmbeddingGenerator] = None,
+        store: Optional[VectorStore] = None
     ):
         """
         Initialize ingestion pipeline.
@@ -52,8 +202,11 @@ class DocumentIngestionPipeline:
             config: Ingestion configuration
             documents_folder: Folder containing markdown documents
             clean_before_ingest: Whether to clean existing data before ingestion
+            embedder: Embedding generator (defaults to the configured provider)
+            store: Storage backend (defaults to PostgreSQL through DATABASE_URL)
         """
         self.config = config
+        self.store = store or PostgresVectorStore(db_pool, manage_pool=True)
         self.documents_folder = documents_folder
         self.clean_before_ingest = clean_before_ingest
         
@@ -62,12 +215,30 @@ class DocumentIngestionPipeline:
             chunk_size=config.chunk_size,
             chunk_overlap=config.chunk_overlap,
             max_chunk_size=config.max_chunk_size,
-            use_semantic_splitting=config.use_semantic_chunking
+            use_semantic_splitting=config.use_semantic_chunking,
+            semantic_method=config.semantic_method
         )
         
-        self.chunker = create_chunker(self.chunker_config)
-        self.embedder = create_embedder()
+        self.embedder = embedder or create_embedder(
+            max_concurrent_batches=config.embedding_concurrency,
+            tokens_per_minute=config.embedding_tokens_per_minute
+        )
+        # Sentence embeddings for semantic chunking share the embedder's cache and limits
+        self.chunker = create_chunker(self.chunker_config, embedder=self.embedder)
+        
+        # Documents from this folder form the manifest for incremental runs
+        self.ingest_root = os.path.abspath(documents_folder)
+        self._manifest: Dict[str, Tuple[List[str], Optional[str]]] = {}
+        self.removed_sources: List[str] = []
+        
+        # Canonical chunks of the current run
+        self._deduplicator: Optional[ChunkDeduplicator] = None
+        self.dedup_stats = DeduplicationStats()
         
+        # File bytes of the documents in flight during a run
+        self.memory_budget = MemoryBudget(_megabytes(config.memory_budget_mb))
+        
+        self._process_pool: Optional[ProcessPoolExecutor] = None
         self._initialized = False
     
     async def initialize(self):
@@ -78,7 +249,7 @@ class DocumentIngestionPipeline:
         logger.info("Initializing ingestion pipeline...")
         
         # Initialize database connections
-        await initialize_database()
+        await self.store.initialize()
         
         self._initialized = True
         logger.info("Ingestion pipeline initialized")
@@ -86,7 +257,7 @@ class DocumentIngestionPipeline:
     async def close(self):
         """Close database connections."""
         if self._initialized:
-            await close_database()
+            await self.store.close()
             self._initialized = False
     
     async def ingest_documents(
@@ -96,204 +267,588 @@ class DocumentIngestionPipeline:
         """
         Ingest all documents from the documents folder.
         
+        Documents stream through three stages connected by bounded queues:
+        read/chunk, embed and store. Each stage runs its own pool of workers
+        (``chunk_workers``, ``embed_workers``, ``store_workers``), so embedding
+        requests and database writes for different documents overlap. When a
+        downstream stage falls behind, its full queue blocks the upstream
+        workers, which keeps at most ``queue_size`` documents buffered between
+        any two stages. Store workers take up to ``store_batch_size`` waiting
+        documents at a time and write them in a single transaction.
+        
+        Files are found by a ``DocumentWalker`` in a background thread and
+        enter the pipeline as soon as they are found, so ingestion of a huge
+        folder starts without listing it first; the total passed to
+        ``progress_callback`` grows until the walk completes. Files larger
+        than ``max_file_mb`` get a failed result without being read, and a
+        document enters the pipeline only when its size fits in the
+        ``memory_budget_mb`` left by the documents already in flight.
+        
+        With ``incremental`` enabled, the content hashes recorded for documents
+        previously ingested from the same folder act as a manifest: unchanged
+        files are skipped after hashing, changed files replace their previous
+        version and reuse embeddings of unchanged chunks, and documents whose
+        files were removed are deleted. Nothing is deleted when the folder
+        does not exist or part of it could not be read.
+        
+        With ``deduplicate_chunks`` enabled, a chunk whose content repeats (or
+        nearly repeats) a chunk already seen in the run is neither embedded
+        nor stored; its document's ``duplicate_chunks`` metadata links it to
+        the stored copy. Documents whose linked copy is no longer stored
+        (its document changed, failed or was removed) are ingested again at
+        the end of the run, keeping their own chunks.
+        
+        With ``manage_vector_index`` enabled, a clean run drops the ANN index
+        before loading and every run finishes by building the index that
+        suits the corpus size, concurrently so searches keep working.
+        
         Args:
             progress_callback: Optional callback for progress updates
         
         Returns:
-            List of ingestion results
+            List of ingestion results, in file order
         """
         if not self._initialized:
             await self.initialize()
         
+        # A mistyped or unmounted folder must not look like an empty one,
+        # which would remove every stored document of this ingest root
+        if not os.path.isdir(self.documents_folder):
+            logger.error(f"Documents folder not found: {self.documents_folder}")
+            self.removed_sources = []
+            return []
+        
         # Clean existing data if requested
         if self.clean_before_ingest:
             await self._clean_databases()
         
-        # Find all markdown files
-        markdown_files = self._find_markdown_files()
+        self._manifest = {}
+        self.removed_sources = []
+        self._deduplicator = None
+        if self.config.deduplicate_chunks:
+            self._deduplicator = ChunkDeduplicator(near_threshold=self.config.near_duplicate_threshold)
+        self.dedup_stats = self._deduplicator.stats if self._deduplicator is not None else DeduplicationStats()
+        if self.config.incremental and not self.clean_before_ingest:
+            self._manifest = await self._load_manifest()
+            logger.info(f"Loaded manifest with {len(self._manifest)} documents")
         
-        if not markdown_files:
-            logger.warning(f"No markdown files found in {self.documents_folder}")
-            return []
+        results: Dict[int, IngestionResult] = {}
+        total = 0
+        completed = 0
+        max_file_bytes = _megabytes(self.config.max_file_mb)
+        budget = self.memory_budget = MemoryBudget(_megabytes(self.config.memory_budget_mb))
+        # Stored sources not found in the folder (yet)
+        missing = set(self._manifest)
+        
+        def finish(work: _DocumentWork, result: IngestionResult):
+            nonlocal completed
+            results[work.position] = result
+            budget.release(work.reserved_bytes)
+            work.reserved_bytes = 0
+            completed += 1
+            if progress_callback:
+                progress_callback(completed, total)
         
-        logger.info(f"Found {len(markdown_files)} markdown files to process")
+        async def prepare(batch: List[_DocumentWork]) -> List[_DocumentWork]:
+            prepared = []
+            for work in batch:
+                logger.info(f"Processing file {work.position + 1}/{total}: {work.file_path}")
+                await self._prepare_document(work)
+                if work.unchanged:
+                    finish(work, self._unchanged_result(work))
+                    continue
+                if not work.chunks and not work.chunks_deduplicated:
+                    logger.warning(f"No chunks created for {work.title}")
+                    finish(work, self._failed_result(work, "No chunks created"))
+                    continue
+                prepared.append(work)
+            return prepared
         
-        results = []
+        async def embed(batch: List[_DocumentWork]) -> List[_DocumentWork]:
+            for work in batch:
+                await self._embed_document(work)
+            return batch
         
-        for i, file_path in enumerate(markdown_files):
+        async def store(batch: List[_DocumentWork]) -> List[_DocumentWork]:
+            for work, result in zip(batch, await self._store_documents(batch)):
+                finish(work, result)
+            return []
+        
+        def fail(work: _DocumentWork, error: Exception):
+            logger.error(f"Failed to process {work.file_path}: {error}")
+            finish(work, self._failed_result(work, str(error)))
+        
+        async with DocumentWalker(self.documents_folder) as walker:
+            # A small folder is usually walked completely by now, which
+            # keeps the process pool from outnumbering its documents
+            await walker.prefetch(self.config.chunk_processes or os.cpu_count() or 1)
+            processes = self._start_process_pool(walker.found if walker.complete else None)
+            # Enough prepare workers to keep every process busy
+            prepare_workers = max(self.config.chunk_workers, processes)
+            
+            queue_size = self.config.queue_size
+            paths: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+            chunked: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+            embedded: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+            
+            async def feed():
+                nonlocal total
+                try:
+                    async for document in walker:
+                        work = _DocumentWork(position=total, file_path=document.path)
+                        total += 1
+                        missing.discard(os.path.relpath(document.path, self.documents_folder))
+                        
+                        if max_file_bytes is not None and document.size > max_file_bytes:
+                            logger.warning(f"Skipping {document.path}: {document.size} bytes exceeds the size limit")
+                            finish(work, self._failed_result(
+                                work, f"File exceeds the {self.config.max_file_mb:g} MB size limit"
+                            ))
+                            continue
+                        
+                        await budget.acquire(document.size)
+                        work.reserved_bytes = document.size
+                        await paths.put(work)
+                    logger.info(f"Found {total} markdown files")
+                finally:
+                    for _ in range(prepare_workers):
+                        await paths.put(_STOP)
+            
             try:
-                logger.info(f"Processing file {i+1}/{len(markdown_files)}: {file_path}")
-                
-                result = await self._ingest_single_document(file_path)
-                results.append(result)
-                
-                if progress_callback:
-                    progress_callback(i + 1, len(markdown_files))
-                
-            except Exception as e:
-                logger.error(f"Failed to process {file_path}: {e}")
-                results.append(IngestionResult(
-                    document_id="",
-                    title=os.path.basename(file_path),
-                    chunks_created=0,
-                    entities_extracted=0,
-                    relationships_created=0,
-                    processing_time_ms=0,
-                    errors=[str(e)]
-                ))
+                await asyncio.gather(
+                    feed(),
+                    self._run_stage(paths, prepare, fail, prepare_workers,
+                                    chunked, self.config.embed_workers),
+                    self._run_stage(chunked, embed, fail, self.config.embed_workers,
+                                    embedded, self.config.store_workers),
+                    self._run_stage(embedded, store, fail, self.config.store_workers,
+                                    batch_size=self.config.store_batch_size)
+                )
+            finally:
+                await self._stop_process_pool()
+        
+        if walker.errors:
+            # Files under the skipped paths may still exist
+            logger.warning(
+                f"Could not read {walker.errors} paths in {self.documents_folder}; "
+                f"not removing the {len(missing)} stored documents not found"
+            )
+        else:
+            await self._remove_deleted_documents(missing)
+        
+        if not results:
+            logger.warning(f"No markdown files found in {self.documents_folder}")
+            await self._tune_vector_index()
+            return []
+        
+        restored = await self._restore_dangling_duplicates()
+        results = [results[position] for position in range(total)]
+        results = [restored.get(result.document_id, result) for result in results]
+        
+        await self._tune_vector_index()
         
         # Log summary
         total_chunks = sum(r.chunks_created for r in results)
         total_errors = sum(len(r.errors) for r in results)
+        unchanged = sum(1 for r in results if r.unchanged)
+        reused = sum(r.chunks_reused for r in results)
         
         logger.info(f"Ingestion complete: {len(results)} documents, {total_chunks} chunks, {total_errors} errors")
+        if self._deduplicator is not None:
+            stats = self.dedup_stats
+            logger.info(
+                f"Deduplication: {stats.exact} exact and {stats.near} near duplicates "
+                f"of {stats.chunks} chunks ({stats.ratio:.1%}) not embedded or stored"
+            )
+        if self.config.incremental:
+            logger.info(
+                f"Incremental run: {unchanged} unchanged documents skipped, "
+                f"{reused} embeddings reused, {len(self.removed_sources)} documents removed"
+            )
         
         return results
     
-    async def _ingest_single_document(self, file_path: str) -> IngestionResult:
+    async def _run_stage(
+        self,
+        inbox: asyncio.Queue,
+        handler: Callable[[List[_DocumentWork]], Awaitable[List[_DocumentWork]]],
+        on_error: Callable[[_DocumentWork, Exception], None],
+        workers: int,
+        outbox: Optional[asyncio.Queue] = None,
+        downstream_workers: int = 0,
+        batch_size: int = 1
+    ):
+        """
+        Run one pipeline stage with a pool of workers.
+        
+        Each worker waits for a document in ``inbox``, takes up to
+        ``batch_size - 1`` more that are already waiting, and passes the
+        handler's result to ``outbox``. Workers never wait to fill a batch.
+        Documents of a failing batch are reported through ``on_error`` and
+        dropped from the pipeline without stopping the stage. Once every
+        worker has received its stop marker, one stop marker per downstream
+        worker is sent to ``outbox``.
+        
+        Args:
+            inbox: Input queue
+            handler: Coroutine processing a batch of documents; returns the
+                documents to forward
+            on_error: Called for documents whose handler raised
+            workers: Number of concurrent workers
+            outbox: Output queue (None for the last stage)
+            downstream_workers: Number of workers reading from ``outbox``
+            batch_size: Maximum number of documents passed to the handler at once
+        """
+        async def worker():
+            stopped = False
+            while not stopped:
+                work = await inbox.get()
+                if work is _STOP:
+                    return
+                
+                batch = [work]
+                while len(batch) < batch_size and not inbox.empty():
+                    work = inbox.get_nowait()
+                    if work is _STOP:
+                        stopped = True
+                        break
+                    batch.append(work)
+                
+                try:
+                    forwarded = await handler(batch)
+                except Exception as e:
+                    for work in batch:
+                        on_error(work, e)
+                    continue
+                
+                if outbox is not None:
+                    for work in forwarded:
+                        await outbox.put(work)
+        
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        
+        if outbox is not None:
+            for _ in range(downstream_workers):
+                await outbox.put(_STOP)
+    
+    async def _ingest_single_document(self, file_path: str, force: bool = False) -> IngestionResult:
         """
         Ingest a single document.
         
         Args:
             file_path: Path to the document file
+            force: Re-ingest even if the stored version has the same content
         
         Returns:
             Ingestion result
         """
-        start_time = datetime.now()
+        work = _DocumentWork(position=0, file_path=file_path)
+        
+        await self._prepare_document(work, force=force)
+        if work.unchanged:
+            return self._unchanged_result(work)
+        if not work.chunks and not work.chunks_deduplicated:
+            logger.warning(f"No chunks created for {work.title}")
+            return self._failed_result(work, "No chunks created")
+        
+        await self._embed_document(work)
+        return (await self._store_documents([work]))[0]
+    
+    async def _prepare_document(self, work: _DocumentWork, force: bool = False):
+        """
+        Read, parse and chunk a document.
         
-        # Read document
-        document_content = self._read_document(file_path)
-        document_title = self._extract_title(document_content, file_path)
-        document_source = os.path.relpath(file_path, self.documents_folder)
+        Parsing and rule-based chunking run in the process pool when one is
+        active, otherwise in a thread, so the event loop keeps serving the
+        embedding and storage stages. Semantic chunking, which calls the
+        embedding API or the LLM, runs on the event loop afterwards, as does
+        deduplication.
         
-        # Extract metadata from content
-        document_metadata = self._extract_document_metadata(document_content, file_path)
+        Args:
+            work: Document to prepare; filled with content, metadata and chunks
+            force: Parse and chunk even if the stored version has the same content
+        """
+        work.source = os.path.relpath(work.file_path, self.documents_folder)
         
-        logger.info(f"Processing document: {document_title}")
+        # Documents whose stored version has the same content are only hashed
+        previous_ids, previous_hash = self._manifest.get(work.source, ([], None))
+        work.replaces = previous_ids
         
-        # Chunk the document
-        chunks = await self.chunker.chunk_document(
-            content=document_content,
-            title=document_title,
-            source=document_source,
-            metadata=document_metadata
+        chunk_in_worker = isinstance(self.chunker, SimpleChunker)
+        work.title, work.content, work.content_hash, metadata, chunks = await self._run_cpu_bound(
+            parse_document,
+            work.file_path,
+            work.source,
+            self.ingest_root,
+            previous_hash if len(previous_ids) == 1 and not force else None,
+            self.chunker.config if chunk_in_worker else None,
+            _megabytes(self.config.max_file_mb)
         )
         
-        if not chunks:
-            logger.warning(f"No chunks created for {document_title}")
-            return IngestionResult(
-                document_id="",
-                title=document_title,
-                chunks_created=0,
-                entities_extracted=0,
-                relationships_created=0,
-                processing_time_ms=(datetime.now() - start_time).total_seconds() * 1000,
-                errors=["No chunks created"]
+        if metadata is None:
+            work.unchanged = True
+            logger.info(f"Unchanged document: {work.title}")
+            return
+        work.metadata = metadata
+        # Frontmatter may place a document in another collection
+        if self.config.collection:
+            work.metadata.setdefault("collection", self.config.collection)
+        
+        logger.info(f"Processing document: {work.title}")
+        
+        if chunks is None:
+            chunks = self.chunker.chunk_document(
+                content=work.content,
+                title=work.title,
+                source=work.source,
+                metadata=work.metadata
             )
+            if inspect.isawaitable(chunks):
+                chunks = await chunks
+            for chunk in chunks:
+                chunk.metadata["content_hash"] = content_hash(chunk.content)
+        work.chunks = chunks
         
         logger.info(f"Created {len(chunks)} chunks")
         
-        # Entity extraction removed (graph-related functionality)
-        entities_extracted = 0
+        if self._deduplicator is not None:
+            self._deduplicate(work)
+    
+    def _deduplicate(self, work: _DocumentWork):
+        """
+        Drop chunks that duplicate a canonical chunk of this run.
+        
+        Only chunks of the document's collection are compared, so the stored
+        copy is always in the same collection (and partition). Each dropped
+        chunk is recorded in the document's ``duplicate_chunks`` metadata
+        with the content hash, source and index of the stored copy.
+        
+        Args:
+            work: Chunked document
+        """
+        kept = []
+        links = []
+        collection = str(work.metadata.get("collection") or DEFAULT_COLLECTION)
+        for chunk in work.chunks:
+            match = self._deduplicator.check(
+                chunk.content,
+                chunk.metadata["content_hash"],
+                work.source,
+                chunk.index,
+                chunk.token_count or 0,
+                scope=collection
+            )
+            if match is None:
+                kept.append(chunk)
+                continue
+            links.append({
+                "index": chunk.index,
+                "content_hash": chunk.metadata["content_hash"],
+                "duplicate_of": match.content_hash,
+                "source": match.source,
+                "chunk_index": match.chunk_index,
+                "similarity": round(match.similarity, 3)
+            })
+        
+        work.chunks_deduplicated = len(links)
+        if links:
+            work.chunks = kept
+            work.metadata["duplicate_chunks"] = links
+            logger.info(f"Skipped {len(links)} duplicate chunks, keeping {len(kept)}")
+    
+    async def _run_cpu_bound(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run a CPU-bound function in the process pool, or in a thread without one.
+        
+        If the pool breaks (e.g. a worker was killed), the remaining work
+        continues in threads.
+        
+        Args:
+            func: Picklable module-level function
+            *args: Picklable arguments
+        
+        Returns:
+            The function's result
+        """
+        pool = self._process_pool
+        if pool is not None:
+            try:
+                return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+            except BrokenProcessPool as e:
+                logger.warning(f"Chunking process pool failed ({e}), continuing in threads")
+                if self._process_pool is pool:
+                    self._process_pool = None
+                    pool.shutdown(wait=False, cancel_futures=True)
+        return await asyncio.to_thread(func, *args)
+    
+    def _start_process_pool(self, documents: Optional[int] = None) -> int:
+        """
+        Start the chunking process pool for a run.
+        
+        Args:
+            documents: Number of documents to ingest, None while unknown
+        
+        Returns:
+            Number of worker processes (0 when parsing runs in threads)
+        """
+        processes = self.config.chunk_processes
+        if processes is None:
+            processes = os.cpu_count() or 1
+        if documents is not None:
+            processes = min(processes, documents)
         
-        # Generate embeddings
-        embedded_chunks = await self.embedder.embed_chunks(chunks)
-        logger.info(f"Generated embeddings for {len(embedded_chunks)} chunks")
+        if processes > 0:
+            # Spawned workers do not inherit the event loop or open connections
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            logger.info(f"Parsing and chunking in {processes} processes")
+            return processes
+        return 0
+    
+    async def _stop_process_pool(self):
+        """Shut down the chunking process pool."""
+        pool, self._process_pool = self._process_pool, None
+        if pool is not None:
+            await asyncio.to_thread(pool.shutdown, True, cancel_futures=True)
+    
+    async def _embed_document(self, work: _DocumentWork):
+        """
+        Generate embeddings for a document's chunks.
+        
+        When the document replaces a stored version, embeddings of chunks
+        whose content did not change are reused instead of regenerated.
+        
+        Args:
+            work: Chunked document; its chunks are replaced with embedded ones
+        """
+        reusable = {}
+        if work.replaces:
+            reusable = await self._load_chunk_embeddings(work.replaces)
+        
+        pending = []
+        for chunk in work.chunks:
+            embedding = reusable.get(chunk.metadata["content_hash"])
+            if embedding is None:
+                pending.append(chunk)
+            else:
+                chunk.embedding = embedding
+                chunk.metadata["embedding_model"] = self.embedder.model
+        work.chunks_reused = len(work.chunks) - len(pending)
         
-        # Save to PostgreSQL
-        document_id = await self._save_to_postgres(
-            document_title,
-            document_source,
-            document_content,
-            embedded_chunks,
-            document_metadata
+        if pending:
+            embedded = iter(await self.embedder.embed_chunks(pending))
+            work.chunks = [
+                next(embedded) if getattr(chunk, "embedding", None) is None else chunk
+                for chunk in work.chunks
+            ]
+        
+        logger.info(
+            f"Generated embeddings for {len(pending)} chunks, reused {work.chunks_reused}"
         )
+    
+    async def _store_documents(self, batch: List[_DocumentWork]) -> List[IngestionResult]:
+        """
+        Save embedded documents to PostgreSQL in one transaction.
         
-        logger.info(f"Saved document to PostgreSQL with ID: {document_id}")
+        If the batch write fails, documents are retried one by one so that a
+        single bad document does not fail the rest of the batch.
+        
+        Args:
+            batch: Embedded documents
+        
+        Returns:
+            Ingestion results, in batch order
+        """
+        documents = [
+            (work.title, work.source, work.content, work.chunks, work.metadata)
+            for work in batch
+        ]
         
-        # Knowledge graph functionality removed
-        relationships_created = 0
-        graph_errors = []
+        try:
+            document_ids = await self._save_documents_to_postgres(
+                documents,
+                replaced_ids=[document_id for work in batch for document_id in work.replaces]
+            )
+        except Exception as e:
+            if len(batch) == 1:
+                raise
+            logger.warning(f"Batch write of {len(batch)} documents failed, retrying individually: {e}")
+            
+            results = []
+            for work, document in zip(batch, documents):
+                try:
+                    document_id = (await self._save_documents_to_postgres(
+                        [document], replaced_ids=work.replaces
+                    ))[0]
+                except Exception as error:
+                    logger.error(f"Failed to save {work.file_path}: {error}")
+                    results.append(self._failed_result(work, str(error)))
+                else:
+                    results.append(self._stored_result(work, document_id))
+            return results
         
-        # Calculate processing time
-        processing_time = (datetime.now() - start_time).total_seconds() * 1000
+        return [
+            self._stored_result(work, document_id)
+            for work, document_id in zip(batch, document_ids)
+        ]
+    
+    def _stored_result(self, work: _DocumentWork, document_id: str) -> IngestionResult:
+        """Build the result for a document saved to the database."""
+        logger.info(f"Saved document to PostgreSQL with ID: {document_id}")
         
         return IngestionResult(
             document_id=document_id,
-            title=document_title,
-            chunks_created=len(chunks),
-            entities_extracted=entities_extracted,
-            relationships_created=relationships_created,
-            processing_time_ms=processing_time,
-            errors=graph_errors
+            title=work.title,
+            chunks_created=len(work.chunks),
+            chunks_reused=work.chunks_reused,
+            chunks_deduplicated=work.chunks_deduplicated,
+            processing_time_ms=(time.perf_counter() - work.started_at) * 1000,
+            errors=[]
+        )
+    
+    def _unchanged_result(self, work: _DocumentWork) -> IngestionResult:
+        """Build the result for a document skipped because it did not change."""
+        document_ids, _ = self._manifest[work.source]
+        return IngestionResult(
+            document_id=document_ids[0],
+            title=work.title,
+            chunks_created=0,
+            processing_time_ms=(time.perf_counter() - work.started_at) * 1000,
+            unchanged=True,
+            errors=[]
+        )
+    
+    def _failed_result(self, work: _DocumentWork, error: str) -> IngestionResult:
+        """Build the result for a document that could not be ingested."""
+        return IngestionResult(
+            document_id="",
+            title=work.title or os.path.basename(work.file_path),
+            chunks_created=0,
+            processing_time_ms=(time.perf_counter() - work.started_at) * 1000,
+            errors=[error]
         )
     
     def _find_markdown_files(self) -> List[str]:
-        """Find all markdown files in the documents folder."""
+        """Find all markdown files in the documents folder, in path order."""
         if not os.path.exists(self.documents_folder):
             logger.error(f"Documents folder not found: {self.documents_folder}")
             return []
         
-        patterns = ["*.md", "*.markdown", "*.txt"]
-        files = []
-        
-        for pattern in patterns:
-            files.extend(glob.glob(os.path.join(self.documents_folder, "**", pattern), recursive=True))
-        
-        return sorted(files)
+        return [document.path for document in walk_documents(self.documents_folder)]
     
     def _read_document(self, file_path: str) -> str:
         """Read document content from file."""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        except UnicodeDecodeError:
-            # Try with different encoding
-            with open(file_path, 'r', encoding='latin-1') as f:
-                return f.read()
+        return read_document(file_path, _megabytes(self.config.max_file_mb))
     
     def _extract_title(self, content: str, file_path: str) -> str:
         """Extract title from document content or filename."""
-        # Try to find markdown title
-        lines = content.split('\n')
-        for line in lines[:10]:  # Check first 10 lines
-            line = line.strip()
-            if line.startswith('# '):
-                return line[2:].strip()
-        
-        # Fallback to filename
-        return os.path.splitext(os.path.basename(file_path))[0]
+        return extract_title(content, file_path)
     
     def _extract_document_metadata(self, content: str, file_path: str) -> Dict[str, Any]:
         """Extract metadata from document content."""
-        metadata = {
-            "file_path": file_path,
-            "file_size": len(content),
-            "ingestion_date": datetime.now().isoformat()
-        }
-        
-        # Try to extract YAML frontmatter
-        if content.startswith('---'):
-            try:
-                import yaml
-                end_marker = content.find('\n---\n', 4)
-                if end_marker != -1:
-                    frontmatter = content[4:end_marker]
-                    yaml_metadata = yaml.safe_load(frontmatter)
-                    if isinstance(yaml_metadata, dict):
-                        metadata.update(yaml_metadata)
-            except ImportError:
-                logger.warning("PyYAML not installed, skipping frontmatter extraction")
-            except Exception as e:
-                logger.warning(f"Failed to parse frontmatter: {e}")
-        
-        # Extract some basic metadata from content
-        lines = content.split('\n')
-        metadata['line_count'] = len(lines)
-        metadata['word_count'] = len(content.split())
-        
-        return metadata
+        return extract_document_metadata(content, file_path)
     
     async def _save_to_postgres(
         self,
@@ -304,57 +859,139 @@ class DocumentIngestionPipeline:
         metadata: Dict[str, Any]
     ) -> str:
         """Save document and chunks to PostgreSQL."""
-        async with db_pool.acquire() as conn:
-            async with conn.transaction():
-                # Insert document
-                document_result = await conn.fetchrow(
-                    """
-                    INSERT INTO documents (title, source, content, metadata)
-                    VALUES ($1, $2, $3, $4)
-                    RETURNING id::text
-                    """,
-                    title,
-                    source,
-                    content,
-                    json.dumps(metadata)
-                )
-                
-                document_id = document_result["id"]
-                
-                # Insert chunks
-                for chunk in chunks:
-                    # Convert embedding to PostgreSQL vector string format
-                    embedding_data = None
-                    if hasattr(chunk, 'embedding') and chunk.embedding:
-                        # PostgreSQL vector format: '[1.0,2.0,3.0]' (no spaces after commas)
-                        embedding_data = '[' + ','.join(map(str, chunk.embedding)) + ']'
-                    
-                    await conn.execute(
-                        """
-                        INSERT INTO chunks (document_id, content, embedding, chunk_index, metadata, token_count)
-                        VALUES ($1::uuid, $2, $3::vector, $4, $5, $6)
-                        """,
-                        document_id,
-                        chunk.content,
-                        embedding_data,
-                        chunk.index,
-                        json.dumps(chunk.metadata),
-                        chunk.token_count
-                    )
-                
-                return document_id
+        document_ids = await self._save_documents_to_postgres(
+            [(title, source, content, chunks, metadata)]
+        )
+        return document_ids[0]
+    
+    async def _save_documents_to_postgres(
+        self,
+        documents: List[Tuple[str, str, str, List[DocumentChunk], Dict[str, Any]]],
+        replaced_ids: Sequence[str] = ()
+    ) -> List[str]:
+        """
+        Save several documents and their chunks in one transaction.
+        
+        Args:
+            documents: (title, source, content, chunks, metadata) tuples
+            replaced_ids: Previous document versions to delete in the same transaction
+        
+        Returns:
+            Document IDs, in input order
+        """
+        return await self.store.save_documents(documents, replaced_ids)
+    
+    async def _load_manifest(self) -> Dict[str, Tuple[List[str], Optional[str]]]:
+        """
+        Load the stored documents previously ingested from this folder.
+        
+        Returns:
+            Mapping of source path to (document IDs, content hash of the latest version)
+        """
+        return await self.store.load_manifest(self.ingest_root)
+    
+    async def _load_chunk_embeddings(self, document_ids: Sequence[str]) -> Dict[str, List[float]]:
+        """
+        Load stored chunk embeddings of previous document versions.
+        
+        Only embeddings generated by the current embedding model are returned.
+        
+        Args:
+            document_ids: Previous document versions
+        
+        Returns:
+            Mapping of chunk content hash to embedding
+        """
+        return await self.store.load_chunk_embeddings(document_ids, self.embedder.model)
+    
+    async def _remove_deleted_documents(self, missing_sources: Iterable[str]):
+        """
+        Delete stored documents whose files no longer exist.
+        
+        Args:
+            missing_sources: Manifest sources not found in the documents folder
+        """
+        removed = sorted(source for source in missing_sources if source in self._manifest)
+        if not removed:
+            return
+        
+        document_ids = [
+            document_id for source in removed
+            for document_id in self._manifest.pop(source)[0]
+        ]
+        await self._delete_documents(document_ids)
+        
+        self.removed_sources = removed
+        logger.info(f"Removed {len(removed)} documents whose files were deleted")
+    
+    async def _delete_documents(self, document_ids: Sequence[str]):
+        """Delete documents and their chunks."""
+        await self.store.delete_documents(document_ids)
+    
+    async def _find_dangling_duplicates(self) -> List[str]:
+        """Sources from this folder whose duplicate chunks link to chunks no longer stored."""
+        return await self.store.find_dangling_duplicates(self.ingest_root)
+    
+    async def _restore_dangling_duplicates(self) -> Dict[str, IngestionResult]:
+        """
+        Re-ingest documents whose duplicate chunks lost their stored copy.
+        
+        The copy disappears when its document is changed, removed or fails
+        to store. The affected documents are ingested again without
+        deduplication, so they keep all of their chunks.
+        
+        Returns:
+            Results of the re-ingested documents, by the IDs of the stored
+            versions they replace
+        """
+        if self._deduplicator is None or not (self.dedup_stats.duplicates or self.config.incremental):
+            return {}
+        
+        sources = [
+            source for source in await self._find_dangling_duplicates()
+            if os.path.exists(os.path.join(self.documents_folder, source))
+        ]
+        if not sources:
+            return {}
+        
+        logger.info(f"Re-ingesting {len(sources)} documents whose duplicate chunks lost their stored copy")
+        # Stored versions to replace, including the ones written by this run
+        self._manifest = await self._load_manifest()
+        deduplicator, self._deduplicator = self._deduplicator, None
+        try:
+            results = {}
+            for source in sources:
+                path = os.path.join(self.documents_folder, source)
+                previous_ids, _ = self._manifest.get(source, ([], None))
+                try:
+                    result = await self._ingest_single_document(path, force=True)
+                except Exception as e:
+                    logger.error(f"Failed to re-ingest {path}: {e}")
+                    continue
+                results.update((document_id, result) for document_id in previous_ids)
+            return results
+        finally:
+            self._deduplicator = deduplicator
     
     async def _clean_databases(self):
         """Clean existing data from databases."""
         logger.warning("Cleaning existing data from databases...")
         
-        # Clean PostgreSQL
-        async with db_pool.acquire() as conn:
-            async with conn.transaction():
-                await conn.execute("DELETE FROM chunks")
-                await conn.execute("DELETE FROM documents")
+        # Loading into an unindexed table and building afterwards is much
+        # faster than maintaining the ANN index row by row
+        await self.store.clear(drop_index=self.config.manage_vector_index)
+        
+        logger.info(f"Cleaned {self.store.name} store")
+    
+    async def _tune_vector_index(self):
+        """Build or re-tune the ANN index for the current corpus size."""
+        if not self.config.manage_vector_index:
+            return
+        
+        plan = await self.store.optimize(method=self.config.vector_index_method)
         
-        logger.info("Cleaned PostgreSQL database")
+        if plan:
+            logger.info(f"Vector index rebuilt: {plan}")
 
 async def main():
     """Main function for running ingestion."""
@@ -364,7 +1001,40 @@ async def main():
     parser.add_argument("--chunk-size", type=int, default=1000, help="Chunk size for splitting documents")
     parser.add_argument("--chunk-overlap", type=int, default=200, help="Chunk overlap size")
     parser.add_argument("--no-semantic", action="store_true", help="Disable semantic chunking")
+    parser.add_argument("--llm-chunking", action="store_true",
+                        help="Split oversized sections with the ingestion LLM instead of embeddings")
+    parser.add_argument("--chunk-workers", type=int, default=4, help="Concurrent read/chunk workers")
+    parser.add_argument("--chunk-processes", type=int, default=None,
+                        help="Processes for parsing and rule-based chunking (default: CPU count, 0: threads)")
+    parser.add_argument("--embed-workers", type=int, default=8, help="Concurrent embedding requests")
+    parser.add_argument("--store-workers", type=int, default=4, help="Concurrent database writers")
+    parser.add_argument("--queue-size", type=int, default=32, help="Documents buffered between stages")
+    parser.add_argument("--store-batch-size", type=int, default=8, help="Documents written per transaction")
+    parser.add_argument("--max-file-mb", type=float, default=50.0, help="Skip files larger than this")
+    parser.add_argument("--memory-budget-mb", type=float, default=512.0,
+                        help="File bytes of documents held in the pipeline at once")
+    parser.add_argument("--embedding-concurrency", type=int, default=8,
+                        help="Embedding API requests in flight across all documents")
+    parser.add_argument("--embedding-tpm", type=int, default=None,
+                        help="Embedding token-per-minute limit of the provider account")
+    parser.add_argument("--index-method", choices=["auto", "hnsw", "ivfflat", "none"], default="auto",
+                        help="ANN index built after ingestion (auto: by corpus size)")
+    parser.add_argument("--no-index", action="store_true",
+                        help="Leave the ANN index untouched (manage it with ingestion.index)")
+    parser.add_argument("--incremental", "-i", action="store_true",
+                        help="Only re-ingest changed files and remove deleted ones")
+    parser.add_argument("--collection", default=None,
+                        help="Collection of the ingested documents, e.g. an agent's knowledge (default: 'default')")
+    parser.add_argument("--store", choices=["postgres", "local"], default=os.getenv("VECTOR_STORE", "postgres"),
+                        help="Storage backend (local: embedded store, no database needed)")
+    parser.add_argument("--store-path", default=os.getenv("LOCAL_STORE_PATH", DEFAULT_LOCAL_STORE_PATH),
+                        help="Directory of the local store")
     # Graph-related arguments removed
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="Embed and store repeated chunks instead of linking them to one copy")
+    parser.add_argument("--near-duplicate-threshold", type=float, default=0.0,
+                        help="Word-shingle similarity from which near-duplicate chunks are dropped, "
+                             "e.g. 0.85 (default 0: exact duplicates only)")
     parser.add_argument("--verbose", "-v", action="store_true", help="Enable verbose logging")
     
     args = parser.parse_args()
@@ -380,14 +1050,32 @@ async def main():
     config = IngestionConfig(
         chunk_size=args.chunk_size,
         chunk_overlap=args.chunk_overlap,
-        use_semantic_chunking=not args.no_semantic
+        use_semantic_chunking=not args.no_semantic,
+        semantic_method="llm" if args.llm_chunking else "embedding",
+        chunk_workers=args.chunk_workers,
+        chunk_processes=args.chunk_processes,
+        embed_workers=args.embed_workers,
+        store_workers=args.store_workers,
+        queue_size=args.queue_size,
+        store_batch_size=args.store_batch_size,
+        max_file_mb=args.max_file_mb,
+        memory_budget_mb=args.memory_budget_mb,
+        embedding_concurrency=args.embedding_concurrency,
+        embedding_tokens_per_minute=args.embedding_tpm,
+        incremental=args.incremental,
+        deduplicate_chunks=not args.no_dedup,
+        near_duplicate_threshold=args.near_duplicate_threshold,
+        manage_vector_index=not args.no_index,
+        vector_index_method=args.index_method,
+        collection=args.collection
     )
     
     # Create and run pipeline
     pipeline = DocumentIngestionPipeline(
         config=config,
         documents_folder=args.documents,
-        clean_before_ingest=args.clean
+        clean_before_ingest=args.clean,
+        store=LocalVectorStore(args.store_path) if args.store == "local" else None
     )
     
     def progress_callback(current: int, total: int):
@@ -409,11 +1097,24 @@ async def main():
         print(f"Total chunks created: {sum(r.chunks_created for r in results)}")
         # Graph-related stats removed
         print(f"Total errors: {sum(len(r.errors) for r in results)}")
+        if config.incremental:
+            print(f"Unchanged documents skipped: {sum(1 for r in results if r.unchanged)}")
+            print(f"Embeddings reused: {sum(r.chunks_reused for r in results)}")
+            print(f"Documents removed: {len(pipeline.removed_sources)}")
+        if config.deduplicate_chunks:
+            stats = pipeline.dedup_stats
+            print(
+                f"Duplicate chunks skipped: {stats.duplicates} of {stats.chunks} "
+                f"({stats.exact} exact, {stats.near} near, {stats.ratio:.1%})"
+            )
         print(f"Total processing time: {total_time:.2f} seconds")
         print()
         
         # Print individual results
         for result in results:
+            if result.unchanged:
+                print(f"= {result.title}: unchanged")
+                continue
             status = "✓" if not result.errors else "✗"
             print(f"{status} {result.title}: {result.chunks_created} chunks")
             
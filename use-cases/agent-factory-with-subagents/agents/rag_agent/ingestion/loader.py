@@ -0,0 +1,381 @@
+"""
+Streaming discovery and reading of documents for ingestion.
+
+A recursive glob lists the whole documents folder before ingestion can
+start, and reading a file in one call holds its bytes and text at once.
+This module replaces both:
+
+- ``DocumentWalker`` walks the folder in a background thread and hands
+  files to the event loop in small batches as it finds them, so the first
+  document is processed while the rest of the tree is still being listed
+- ``read_document`` reads a file in fixed-size blocks, detects the encoding
+  once from the first block and decodes incrementally, stopping as soon as
+  the file exceeds the size limit
+- ``MemoryBudget`` caps the file bytes of the documents the pipeline holds
+  at the same time
+
+Files are found in the same order as a sorted recursive glob: sorted by
+path, skipping hidden files and folders.
+"""
+
+import os
+import asyncio
+import codecs
+import logging
+import threading
+from collections import deque
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Callable, Deque, Iterator, List, Optional, Sequence, Set, Tuple
+
+try:
+    from charset_normalizer import from_bytes as detect_charset
+except ImportError:
+    detect_charset = None
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_EXTENSIONS = (".md", ".markdown", ".txt")
+
+# Bytes read from a file per call
+READ_BLOCK_SIZE = 1 << 20
+
+# Bytes of the first block used to guess a non-UTF-8 encoding
+DETECTION_SAMPLE_SIZE = 64 * 1024
+
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16")
+)
+
+# Marks the end of the walk in the batch queue
+_DONE = object()
+
+
+class DocumentTooLargeError(ValueError):
+    """A document is larger than the ingestion size limit."""
+
+
+@dataclass(frozen=True)
+class DocumentFile:
+    """A document found in the documents folder."""
+    path: str
+    size: int
+
+
+def detect_encoding(sample: bytes, complete: bool = True) -> str:
+    """
+    Guess the encoding of a file from its first bytes.
+    
+    A byte order mark wins; otherwise UTF-8 is used when the sample decodes
+    as UTF-8, then charset-normalizer's guess when it is installed, then
+    latin-1, which decodes any byte sequence.
+    
+    Args:
+        sample: First bytes of the file
+        complete: Whether the sample is the whole file; a multi-byte
+            character cut off at the end of a partial sample is not an error
+    
+    Returns:
+        Python codec name
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+    
+    try:
+        sample.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError as e:
+        if not complete and e.reason == "unexpected end of data" and e.start >= len(sample) - 3:
+            return "utf-8"
+    
+    if detect_charset is not None:
+        best = detect_charset(sample[:DETECTION_SAMPLE_SIZE]).best()
+        if best is not None:
+            return best.encoding
+    return "latin-1"
+
+
+def read_document(
+    file_path: str,
+    max_bytes: Optional[int] = None,
+    block_size: int = READ_BLOCK_SIZE
+) -> str:
+    """
+    Read a document in blocks, decoding it with one detected encoding.
+    
+    Bytes that are invalid in the detected encoding are replaced rather
+    than failing the document.
+    
+    Args:
+        file_path: Document path
+        max_bytes: Size limit; None for no limit
+        block_size: Bytes read per call
+    
+    Returns:
+        Document text
+    
+    Raises:
+        DocumentTooLargeError: The file is larger than ``max_bytes``
+    """
+    def check(size: int):
+        if max_bytes is not None and size > max_bytes:
+            raise DocumentTooLargeError(
+                f"File exceeds the {max_bytes / 2 ** 20:g} MB size limit: {file_path}"
+            )
+    
+    with open(file_path, "rb") as f:
+        block = f.read(block_size)
+        size = len(block)
+        check(size)
+        
+        decoder = codecs.getincrementaldecoder(detect_encoding(block, complete=size < block_size))(errors="replace")
+        parts = []
+        while block:
+            parts.append(decoder.decode(block))
+            block = f.read(block_size)
+            size += len(block)
+            check(size)
+        parts.append(decoder.decode(b"", final=True))
+    
+    return "".join(parts)
+
+
+def walk_documents(
+    folder: str,
+    extensions: Sequence[str] = DOCUMENT_EXTENSIONS,
+    on_error: Optional[Callable[[str, OSError], None]] = None
+) -> Iterator[DocumentFile]:
+    """
+    Find documents under a folder, depth first in sorted path order.
+    
+    Hidden files and folders are skipped. Symlinked folders are followed
+    once; unreadable folders and files are logged and skipped.
+    
+    Args:
+        folder: Folder to walk
+        extensions: File name suffixes of documents
+        on_error: Called with the path and error of each skipped folder or file
+    
+    Yields:
+        Documents with their size in bytes
+    """
+    extensions = tuple(extensions)
+    visited: Set[Tuple[int, int]] = set()
+    
+    def listing(directory: str) -> Iterator[os.DirEntry]:
+        try:
+            stat = os.stat(directory)
+            if (stat.st_dev, stat.st_ino) in visited:
+                return iter(())
+            visited.add((stat.st_dev, stat.st_ino))
+            with os.scandir(directory) as entries:
+                # A folder sorts as its name plus "/", which keeps the whole
+                # walk in the order of the sorted full paths
+                listed = sorted(
+                    (entry.name + "/" if entry.is_dir() else entry.name, entry)
+                    for entry in entries
+                    if not entry.name.startswith(".")
+                )
+        except OSError as e:
+            logger.warning(f"Skipping unreadable folder {directory}: {e}")
+            if on_error is not None:
+                on_error(directory, e)
+            return iter(())
+        return iter([entry for _, entry in listed])
+    
+    # One open listing per folder level down to the current one
+    stack: List[Iterator[os.DirEntry]] = [listing(folder)]
+    while stack:
+        entry = next(stack[-1], None)
+        if entry is None:
+            stack.pop()
+            continue
+        try:
+            if entry.is_dir():
+                stack.append(listing(entry.path))
+                continue
+            if entry.name.endswith(extensions):
+                yield DocumentFile(entry.path, entry.stat().st_size)
+        except OSError as e:
+            logger.warning(f"Skipping unreadable file {entry.path}: {e}")
+            if on_error is not None:
+                on_error(entry.path, e)
+
+
+class DocumentWalker:
+    """
+    Asynchronous iterator over the documents of a folder.
+    
+    ``walk_documents`` runs in a daemon thread that puts batches of found
+    files on a bounded queue. Batches start at one file and double up to
+    ``batch_size``: the first document reaches the event loop as soon as it
+    is found, later ones cost one wake-up per batch. When the queue is full
+    the walk pauses until the pipeline catches up. ``errors`` counts the
+    folders and files the walk had to skip, so a caller can tell an
+    incomplete listing from a complete one.
+    
+    Use it as an async context manager, which stops the thread on exit.
+    """
+    
+    def __init__(
+        self,
+        folder: str,
+        extensions: Sequence[str] = DOCUMENT_EXTENSIONS,
+        batch_size: int = 256,
+        max_batches: int = 64
+    ):
+        """
+        Initialize walker.
+        
+        Args:
+            folder: Folder to walk
+            extensions: File name suffixes of documents
+            batch_size: Largest number of files passed to the event loop at once
+            max_batches: Batches buffered before the walk pauses
+        """
+        self.folder = folder
+        self.extensions = tuple(extensions)
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.found = 0
+        self.errors = 0
+        self.complete = False
+        self._buffer: Deque[DocumentFile] = deque()
+        self._queue: Optional[asyncio.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+    
+    async def __aenter__(self) -> "DocumentWalker":
+        self.start()
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+    
+    def __aiter__(self) -> "DocumentWalker":
+        return self
+    
+    async def __anext__(self) -> DocumentFile:
+        while not self._buffer:
+            if self.complete or not await self._next_batch():
+                raise StopAsyncIteration
+        return self._buffer.popleft()
+    
+    def start(self):
+        """Start walking in the background."""
+        if self._thread is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_batches)
+        self._thread = threading.Thread(
+            target=self._walk,
+            args=(asyncio.get_running_loop(),),
+            name="document-walker",
+            daemon=True
+        )
+        self._thread.start()
+    
+    async def stop(self):
+        """Stop the walk and wait for the thread to exit."""
+        self._stopped.set()
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join)
+    
+    async def prefetch(self, count: int) -> int:
+        """
+        Wait until ``count`` documents are buffered or the walk is complete.
+        
+        Returns:
+            Number of buffered documents
+        """
+        while len(self._buffer) < count and not self.complete:
+            await self._next_batch()
+        return len(self._buffer)
+    
+    async def _next_batch(self) -> bool:
+        """Move the next batch from the queue to the buffer; False at the end of the walk."""
+        item = await self._queue.get()
+        if item is _DONE:
+            self.complete = True
+            return False
+        if isinstance(item, BaseException):
+            self.complete = True
+            raise item
+        self._buffer.extend(item)
+        self.found += len(item)
+        return True
+    
+    def _count_error(self, path: str, error: OSError):
+        self.errors += 1
+    
+    def _walk(self, loop: asyncio.AbstractEventLoop):
+        """Walk the folder in the thread, handing batches to the event loop."""
+        def put(item) -> bool:
+            try:
+                future = asyncio.run_coroutine_threadsafe(self._queue.put(item), loop)
+            except RuntimeError:
+                # The event loop is closed
+                return False
+            while not self._stopped.is_set():
+                try:
+                    future.result(timeout=0.1)
+                    return True
+                except FutureTimeoutError:
+                    continue
+            future.cancel()
+            return False
+        
+        batch: List[DocumentFile] = []
+        limit = 1
+        try:
+            for document in walk_documents(self.folder, self.extensions, self._count_error):
+                batch.append(document)
+                if len(batch) >= limit:
+                    if not put(batch):
+                        return
+                    batch = []
+                    limit = min(limit * 2, self.batch_size)
+            if batch and not put(batch):
+                return
+            put(_DONE)
+        except Exception as e:
+            put(e)
+
+
+class MemoryBudget:
+    """
+    Bytes of documents held by the ingestion pipeline at the same time.
+    
+    ``acquire`` waits until a reservation fits in the budget. A document
+    larger than the whole budget is admitted once nothing else is reserved,
+    so it is processed alone rather than never.
+    """
+    
+    def __init__(self, limit: Optional[int] = None):
+        """
+        Initialize budget.
+        
+        Args:
+            limit: Budget in bytes; None for no limit
+        """
+        self.limit = limit
+        self.reserved = 0
+        self.peak = 0
+        self._released = asyncio.Event()
+    
+    async def acquire(self, size: int):
+        """Reserve ``size`` bytes, waiting for releases if they do not fit."""
+        while self.limit is not None and self.reserved and self.reserved + size > self.limit:
+            self._released.clear()
+            await self._released.wait()
+        self.reserved += size
+        self.peak = max(self.peak, self.reserved)
+    
+    def release(self, size: int):
+        """Return ``size`` reserved bytes."""
+        self.reserved -= size
+        self._released.set()
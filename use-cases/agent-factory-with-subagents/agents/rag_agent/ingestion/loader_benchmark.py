@@ -0,0 +1,206 @@
+"""
+Benchmark for streaming document discovery and reading.
+
+Builds a synthetic documents tree and compares the recursive glob the
+pipeline used to run before ingesting anything with ``DocumentWalker``:
+time to the first file, time to the whole listing and peak Python memory
+(tracemalloc). It then times the first document processed by the pipeline
+(local store, hashing embedder) on the same tree, and compares reading one
+large file in a single call with ``read_document`` under a size limit.
+
+Usage (from the rag_agent directory):
+    python -m ingestion.loader_benchmark
+    python -m ingestion.loader_benchmark --files 1000000 --per-folder 500 --output loader.json
+"""
+
+import os
+import asyncio
+import argparse
+import glob
+import json
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Tuple
+
+# Keep any default embeddings client the pipeline creates offline
+os.environ.setdefault("EMBEDDING_PROVIDER", "local")
+
+from .embedder import create_embedder
+from .ingest import DocumentIngestionPipeline
+from .loader import DocumentTooLargeError, DocumentWalker, read_document
+
+try:
+    from ..utils.local_embeddings import HASHING_EMBEDDING_MODEL, LocalEmbeddingClient
+    from ..utils.local_store import LocalVectorStore
+    from ..utils.models import IngestionConfig
+except ImportError:
+    # For direct execution or testing
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from utils.local_embeddings import HASHING_EMBEDDING_MODEL, LocalEmbeddingClient
+    from utils.local_store import LocalVectorStore
+    from utils.models import IngestionConfig
+
+
+def build_tree(root: str, files: int, per_folder: int) -> None:
+    """Write ``files`` small documents, ``per_folder`` per folder, two folder levels deep."""
+    for i in range(files):
+        folder = os.path.join(root, f"group_{i // (per_folder * 100):04d}", f"folder_{i // per_folder:06d}")
+        if i % per_folder == 0:
+            os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"doc_{i:07d}.md"), "w", encoding="utf-8") as f:
+            f.write(f"# Document {i}\n\nNotes about topic {i % 97} and a few words of filler text.\n")
+
+
+def measure(func: Callable[[], Any]) -> Tuple[Any, float, int]:
+    """Run ``func`` and return its result, seconds and peak traced bytes."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = func()
+        return result, time.perf_counter() - start, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def glob_listing(root: str) -> int:
+    files = []
+    for pattern in ["*.md", "*.markdown", "*.txt"]:
+        files.extend(glob.glob(os.path.join(root, "**", pattern), recursive=True))
+    return len(sorted(files))
+
+
+async def walker_listing(root: str) -> Dict[str, Any]:
+    """Time to the first file and to the end of the walk, holding no listing."""
+    start = time.perf_counter()
+    first = None
+    count = 0
+    async with DocumentWalker(root) as walker:
+        async for _ in walker:
+            if first is None:
+                first = time.perf_counter() - start
+            count += 1
+    return {"files": count, "first_file_ms": round((first or 0) * 1000, 2),
+            "seconds": round(time.perf_counter() - start, 3)}
+
+
+async def first_document(root: str) -> Dict[str, Any]:
+    """Time until the pipeline finishes its first document, then stop it."""
+    done = asyncio.Event()
+    with tempfile.TemporaryDirectory() as path:
+        pipeline = DocumentIngestionPipeline(
+            config=IngestionConfig(
+                use_semantic_chunking=False,
+                manage_vector_index=False,
+                deduplicate_chunks=False,
+                chunk_processes=0
+            ),
+            documents_folder=root,
+            clean_before_ingest=True,
+            embedder=create_embedder(HASHING_EMBEDDING_MODEL, use_cache=False, client=LocalEmbeddingClient()),
+            store=LocalVectorStore(path)
+        )
+        await pipeline.initialize()
+        start = time.perf_counter()
+        task = asyncio.create_task(pipeline.ingest_documents(lambda current, total: done.set()))
+        await done.wait()
+        elapsed = time.perf_counter() - start
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        await pipeline.close()
+    return {"first_document_ms": round(elapsed * 1000, 2)}
+
+
+def large_file(size_mb: int, limit_mb: float) -> Dict[str, Any]:
+    """Peak memory of reading one large file whole, and of rejecting it at the size limit."""
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "large.md")
+        line = "Large document line with some ASCII words and a word in Cyrillic: приклад.\n"
+        with open(path, "w", encoding="utf-8") as f:
+            for _ in range(size_mb * 2 ** 20 // len(line.encode("utf-8"))):
+                f.write(line)
+        
+        def read_whole():
+            with open(path, "r", encoding="utf-8") as f:
+                return len(f.read())
+        
+        def read_limited():
+            try:
+                return len(read_document(path, int(limit_mb * 2 ** 20)))
+            except DocumentTooLargeError:
+                return None
+        
+        _, whole_seconds, whole_peak = measure(read_whole)
+        _, streamed_seconds, streamed_peak = measure(lambda: len(read_document(path)))
+        rejected, limited_seconds, limited_peak = measure(read_limited)
+    
+    return {
+        "file_mb": size_mb,
+        "single_read": {"seconds": round(whole_seconds, 3), "peak_mb": round(whole_peak / 2 ** 20, 1)},
+        "block_read": {"seconds": round(streamed_seconds, 3), "peak_mb": round(streamed_peak / 2 ** 20, 1)},
+        f"block_read_limit_{limit_mb:g}mb": {
+            "rejected": rejected is None,
+            "seconds": round(limited_seconds, 3),
+            "peak_mb": round(limited_peak / 2 ** 20, 1)
+        }
+    }
+
+
+async def main():
+    """Run the loader benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark streaming document discovery and reading")
+    parser.add_argument("--files", type=int, default=100_000, help="Documents in the synthetic tree")
+    parser.add_argument("--per-folder", type=int, default=200, help="Documents per folder")
+    parser.add_argument("--root", help="Existing documents folder to use instead of a synthetic tree")
+    parser.add_argument("--large-file-mb", type=int, default=200, help="Size of the large file read")
+    parser.add_argument("--max-file-mb", type=float, default=50.0, help="Size limit of the limited read")
+    parser.add_argument("--output", "-o", help="Write the JSON report to this file")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as scratch:
+        root = args.root
+        report: Dict[str, Any] = {}
+        if root is None:
+            root = os.path.join(scratch, "documents")
+            start = time.perf_counter()
+            build_tree(root, args.files, args.per_folder)
+            report["tree"] = {"files": args.files, "per_folder": args.per_folder,
+                              "build_seconds": round(time.perf_counter() - start, 1)}
+            print("tree", json.dumps(report["tree"]))
+        
+        # Warm the directory cache so both listings read it from memory
+        glob_listing(root)
+        
+        files, seconds, peak = measure(lambda: glob_listing(root))
+        # The pipeline could not start before the whole listing was sorted
+        report["glob"] = {"files": files, "first_file_ms": round(seconds * 1000, 2),
+                          "seconds": round(seconds, 3), "peak_mb": round(peak / 2 ** 20, 1)}
+        print("glob", json.dumps(report["glob"]))
+        
+        tracemalloc.start()
+        walked = await walker_listing(root)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        report["walker"] = {**walked, "peak_mb": round(peak / 2 ** 20, 1)}
+        print("walker", json.dumps(report["walker"]))
+        
+        report["pipeline"] = await first_document(root)
+        print("pipeline", json.dumps(report["pipeline"]))
+    
+    if args.large_file_mb:
+        report["large_file"] = large_file(args.large_file_mb, args.max_file_mb)
+        print("large_file", json.dumps(report["large_file"]))
+    
+    print(json.dumps(report, indent=2))
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,175 @@
+"""
+Offline benchmark of the local vector store on the bundled documents.
+
+Ingests a documents folder into a temporary ``LocalVectorStore`` with the
+deterministic hashing embedder, so it needs no database, API key or
+network. Queries are the opening words of sampled chunks. It reports
+ingestion time and p50/p95 latency of exact vector search, IVF vector search
+(with recall@k against the exact results) and hybrid search.
+
+``--scale`` grows the corpus with perturbed copies of the ingested
+embeddings to show how the exact scan and IVF diverge on larger stores.
+
+Usage (from the rag_agent directory):
+    python -m ingestion.local_benchmark --documents documents
+    python -m ingestion.local_benchmark --scale 200 --output local_benchmark.json
+"""
+
+import os
+import asyncio
+import argparse
+import json
+import random
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Dict, List
+
+import numpy as np
+
+# Keep any default embeddings client the pipeline creates offline
+os.environ.setdefault("EMBEDDING_PROVIDER", "local")
+
+from .embedder import create_embedder
+from .ingest import DocumentIngestionPipeline
+
+try:
+    from ..utils.local_embeddings import HASHING_EMBEDDING_MODEL, LocalEmbeddingClient
+    from ..utils.local_store import LocalVectorStore
+    from ..utils.models import IngestionConfig
+except ImportError:
+    # For direct execution or testing
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from utils.local_embeddings import HASHING_EMBEDDING_MODEL, LocalEmbeddingClient
+    from utils.local_store import LocalVectorStore
+    from utils.models import IngestionConfig
+
+
+async def time_queries(
+    queries: List[Any],
+    search: Callable[[Any], Awaitable[List[Dict[str, Any]]]]
+) -> Dict[str, float]:
+    """Latency percentiles in milliseconds of a search over the queries."""
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        await search(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3)
+    }
+
+
+async def add_synthetic_rows(store: LocalVectorStore, copies: int, noise: float = 0.05, batch: int = 50):
+    """Store perturbed copies of every embedding as extra documents."""
+    rows = np.flatnonzero(store._embedded)
+    vectors = np.asarray(store._matrix[rows])
+    rng = np.random.default_rng(0)
+    
+    documents = []
+    for copy in range(copies):
+        noisy = vectors + rng.standard_normal(vectors.shape).astype(np.float32) * noise / np.sqrt(vectors.shape[1])
+        noisy /= np.linalg.norm(noisy, axis=1, keepdims=True)
+        chunks = [
+            SimpleNamespace(content=f"synthetic chunk {copy}-{i}", index=i, metadata={},
+                            token_count=3, embedding=vector.tolist())
+            for i, vector in enumerate(noisy)
+        ]
+        documents.append((f"Synthetic {copy}", f"synthetic/{copy}.md", "", chunks, {}))
+        if len(documents) == batch:
+            await store.save_documents(documents)
+            documents = []
+    if documents:
+        await store.save_documents(documents)
+
+
+async def run_benchmark(
+    documents_folder: str,
+    queries: int,
+    match_count: int,
+    scale: int,
+    semantic: bool
+) -> Dict[str, Any]:
+    """Ingest, search and report timings."""
+    client = LocalEmbeddingClient()
+    
+    with tempfile.TemporaryDirectory() as path:
+        store = LocalVectorStore(path)
+        pipeline = DocumentIngestionPipeline(
+            config=IngestionConfig(use_semantic_chunking=semantic, manage_vector_index=False),
+            documents_folder=documents_folder,
+            clean_before_ingest=True,
+            embedder=create_embedder(HASHING_EMBEDDING_MODEL, use_cache=False, client=client),
+            store=store
+        )
+        
+        start = time.perf_counter()
+        results = await pipeline.ingest_documents()
+        ingest_seconds = time.perf_counter() - start
+        
+        if scale > 1:
+            await add_synthetic_rows(store, scale - 1)
+        
+        texts = [row[0] for row in store._db.execute("SELECT content FROM chunks WHERE content NOT LIKE 'synthetic %'")]
+        samples = random.Random(0).sample(texts, min(queries, len(texts)))
+        query_texts = [" ".join(text.split()[:12]) for text in samples]
+        query_vectors = [client.embedder.embed(text).tolist() for text in query_texts]
+        
+        report: Dict[str, Any] = {
+            "documents": len(results),
+            "chunks": sum(result.chunks_created for result in results),
+            "rows": int(store._embedded.sum()),
+            "ingest_seconds": round(ingest_seconds, 3),
+            "queries": len(query_texts),
+            "match_count": match_count
+        }
+        
+        exact = [await store.vector_search(vector, match_count) for vector in query_vectors]
+        report["exact"] = await time_queries(query_vectors, lambda vector: store.vector_search(vector, match_count))
+        report["hybrid"] = await time_queries(
+            list(zip(query_vectors, query_texts)),
+            lambda query: store.hybrid_search(query[0], query[1], match_count)
+        )
+        
+        start = time.perf_counter()
+        plan = await store.optimize(method="ivfflat")
+        report["ivf_build_seconds"] = round(time.perf_counter() - start, 3)
+        report["ivf_index"] = plan
+        report["ivf"] = await time_queries(query_vectors, lambda vector: store.vector_search(vector, match_count))
+        
+        recalls = []
+        for vector, expected in zip(query_vectors, exact):
+            found = await store.vector_search(vector, match_count)
+            expected_ids = {result["chunk_id"] for result in expected}
+            recalls.append(len(expected_ids & {result["chunk_id"] for result in found}) / max(len(expected_ids), 1))
+        report["ivf"]["recall_at_k"] = round(float(np.mean(recalls)), 4)
+        
+        await pipeline.close()
+    
+    return report
+
+
+async def main():
+    """Run the local store benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark the offline local vector store")
+    parser.add_argument("--documents", "-d", default="documents", help="Documents folder path")
+    parser.add_argument("--queries", type=int, default=100, help="Queries sampled from the chunks")
+    parser.add_argument("--match-count", type=int, default=10, help="Results per query")
+    parser.add_argument("--scale", type=int, default=1,
+                        help="Multiply the corpus with perturbed copies of its embeddings")
+    parser.add_argument("--semantic", action="store_true", help="Use embedding-based semantic chunking")
+    parser.add_argument("--output", "-o", help="Write the JSON report to this file")
+    args = parser.parse_args()
+    
+    report = await run_benchmark(args.documents, args.queries, args.match_count, args.scale, args.semantic)
+    print(json.dumps(report, indent=2))
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,158 @@
+"""
+Latency benchmark for the post-retrieval stages of semantic search.
+
+Generates synthetic candidate sets like those ``match_chunks_with_embeddings``
+returns (embeddings near the query in pgvector's binary format, plus chunk text) and measures,
+for each over-fetch size, the per-query latency each stage adds on top of the
+vector search:
+
+- ``decode``: turning the returned embeddings into a matrix;
+- ``mmr``: maximal marginal relevance selection of the results;
+- ``lexical``: BM25 reranking of the candidates;
+- ``cross-encoder``: local cross-encoder reranking (when sentence-transformers
+  is installed, or with ``--cross-encoder``).
+
+No database or API access is needed.
+
+Usage (from the rag_agent directory):
+    python -m ingestion.rerank_benchmark --fetch 10 40 100 200
+"""
+
+import os
+import argparse
+import json
+import random
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+try:
+    from ..utils.retrieval import (
+        DEFAULT_CROSS_ENCODER, CrossEncoderReranker, LexicalReranker, embedding_matrix, mmr_select
+    )
+    from ..utils.vector_codec import decode_vector, encode_vector
+except ImportError:
+    # For direct execution or testing
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from utils.retrieval import (
+        DEFAULT_CROSS_ENCODER, CrossEncoderReranker, LexicalReranker, embedding_matrix, mmr_select
+    )
+    from utils.vector_codec import decode_vector, encode_vector
+
+
+VOCABULARY = (
+    "vector search index embedding retrieval chunk document query latency throughput "
+    "pipeline postgres similarity ranking context agent model funding investment market "
+    "growth startup acquisition revenue valuation partnership research compute training"
+).split()
+
+
+def candidate_set(
+    rng: np.random.Generator,
+    query: np.ndarray,
+    count: int,
+    topics: int = 5
+) -> np.ndarray:
+    """
+    Unit vectors around the query, grouped into a few near-duplicate topics.
+    
+    Vector search returns candidates that are all close to the query and
+    often close to each other, which is the case MMR exists for.
+    """
+    dimensions = len(query)
+    centres = query + 0.5 * rng.standard_normal((topics, dimensions), dtype=np.float32) / np.sqrt(dimensions)
+    vectors = centres[rng.integers(0, topics, count)]
+    vectors += 0.2 * rng.standard_normal((count, dimensions), dtype=np.float32) / np.sqrt(dimensions)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def candidate_text(rng: random.Random, words: int) -> str:
+    """Chunk text with Zipf-like word frequencies over a mixed vocabulary."""
+    vocabulary = VOCABULARY + [f"term{i}" for i in range(2000)]
+    weights = [1.0 / (rank + 1) for rank in range(len(vocabulary))]
+    return " ".join(rng.choices(vocabulary, weights=weights, k=words)) + "."
+
+
+def time_stage(run: Callable[[int], object], queries: int) -> Dict[str, float]:
+    """Run a stage once per query and report latency percentiles."""
+    latencies = []
+    for query in range(queries):
+        start = time.perf_counter()
+        run(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3)
+    }
+
+
+def main():
+    """Run the post-retrieval stage benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark MMR and rerank latency")
+    parser.add_argument("--fetch", type=int, nargs="+", default=[10, 40, 100, 200],
+                        help="Candidates fetched per query")
+    parser.add_argument("--match-count", type=int, default=10, help="Results per query")
+    parser.add_argument("--dimensions", type=int, default=1536, help="Embedding dimension")
+    parser.add_argument("--queries", type=int, default=50, help="Queries per stage and fetch size")
+    parser.add_argument("--diversity", type=float, default=0.3, help="MMR diversity")
+    parser.add_argument("--cross-encoder", nargs="?", const=DEFAULT_CROSS_ENCODER,
+                        help="Also benchmark this cross-encoder model")
+    parser.add_argument("--output", "-o", help="Write the JSON report to this file")
+    args = parser.parse_args()
+    
+    rng = random.Random(42)
+    vector_rng = np.random.default_rng(42)
+    largest = max(args.fetch)
+    query_vectors = vector_rng.standard_normal((args.queries, args.dimensions), dtype=np.float32)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    vectors = [candidate_set(vector_rng, query, largest) for query in query_vectors]
+    texts = [candidate_text(rng, rng.randint(80, 200)) for _ in range(largest)]
+    query_texts = [" ".join(rng.sample(texts[i].rstrip(".").split(), 3)) for i in range(args.queries)]
+    
+    rerankers = [LexicalReranker()]
+    if args.cross_encoder:
+        rerankers.append(CrossEncoderReranker(args.cross_encoder))
+    else:
+        try:
+            rerankers.append(CrossEncoderReranker())
+        except ImportError:
+            print("sentence-transformers not installed; skipping the cross-encoder")
+    
+    reports: List[Dict] = []
+    for fetch in args.fetch:
+        candidates = [block[:fetch] for block in vectors]
+        # Embeddings arrive in binary form through the registered vector codec
+        encoded = [[encode_vector(row) for row in block] for block in candidates]
+        matrices = [embedding_matrix([decode_vector(data) for data in block]) for block in encoded]
+        
+        stages = {
+            "decode": lambda q: embedding_matrix([decode_vector(data) for data in encoded[q]]),
+            "mmr": lambda q: mmr_select(query_vectors[q], matrices[q], args.match_count, args.diversity)
+        }
+        for reranker in rerankers:
+            stages[reranker.name] = lambda q, r=reranker: r.score(query_texts[q], texts[:fetch])
+        
+        for name, run in stages.items():
+            report = {"stage": name, "fetch": fetch}
+            report.update(time_stage(run, args.queries))
+            reports.append(report)
+            print(json.dumps(report))
+    
+    report = {
+        "dimensions": args.dimensions,
+        "match_count": args.match_count,
+        "queries": args.queries,
+        "stages": reports
+    }
+    
+    print(json.dumps(report, indent=2))
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
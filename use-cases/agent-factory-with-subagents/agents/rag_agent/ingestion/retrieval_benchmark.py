@@ -0,0 +1,340 @@
+"""
+Retrieval quality and latency benchmark over a labelled query set.
+
+Builds labelled queries from the section headings of a documents folder
+(see ``utils.evaluation.build_query_set``), ingests the folder once per
+chunker and chunk size into a temporary local store, and runs every query
+through each search mode and index setting. For each combination it reports
+recall@k, MRR, p50/p95 latency and throughput under concurrent load.
+
+Search modes mirror the agent tools:
+
+- ``vector``: ``semantic_search`` in similarity order
+- ``hybrid``: ``hybrid_search`` once per text weight
+- ``mmr``: MMR over ``--fetch-factor`` x k candidates
+- ``rerank``: lexical reranking of ``--fetch-factor`` x k candidates
+
+Index settings are an exact scan, then an IVF index searched with each of
+``--probes``. Embeddings come from the offline hashing embedder by default;
+``--embeddings provider`` uses the configured embedding provider instead,
+through the persistent embedding cache.
+
+Usage (from the rag_agent directory):
+    python -m ingestion.retrieval_benchmark --output retrieval_benchmark.json
+    python -m ingestion.retrieval_benchmark --chunkers simple semantic --chunk-sizes 500 1000 1500 \\
+        --modes vector hybrid --text-weights 0.1 0.3 0.5 --probes 1 4
+"""
+
+import os
+import asyncio
+import argparse
+import json
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+# Keep any default embeddings client the pipeline creates offline
+if os.getenv("EMBEDDING_PROVIDER") is None and not os.getenv("OPENAI_API_KEY"):
+    os.environ["EMBEDDING_PROVIDER"] = "local"
+
+from .embedder import EmbeddingGenerator, create_embedder
+from .ingest import DocumentIngestionPipeline
+
+try:
+    from ..utils.evaluation import (
+        LabelledQuery, build_query_set, first_relevant_rank, latency_metrics,
+        load_query_set, ranking_metrics, save_query_set
+    )
+    from ..utils.local_embeddings import HASHING_EMBEDDING_MODEL, LocalEmbeddingClient
+    from ..utils.local_store import LocalVectorStore
+    from ..utils.models import IngestionConfig
+    from ..utils.retrieval import LexicalReranker, embedding_matrix, mmr_select
+except ImportError:
+    # For direct execution or testing
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from utils.evaluation import (
+        LabelledQuery, build_query_set, first_relevant_rank, latency_metrics,
+        load_query_set, ranking_metrics, save_query_set
+    )
+    from utils.local_embeddings import HASHING_EMBEDDING_MODEL, LocalEmbeddingClient
+    from utils.local_store import LocalVectorStore
+    from utils.models import IngestionConfig
+    from utils.retrieval import LexicalReranker, embedding_matrix, mmr_select
+
+MODES = ("vector", "hybrid", "mmr", "rerank")
+
+Search = Callable[[int], Awaitable[List[Dict[str, Any]]]]
+
+
+def create_search(
+    store: LocalVectorStore,
+    mode: str,
+    queries: Sequence[LabelledQuery],
+    query_vectors: Sequence[List[float]],
+    match_count: int,
+    text_weight: float = 0.3,
+    probes: Optional[int] = None,
+    fetch_factor: int = 4,
+    candidate_count: int = 50
+) -> Search:
+    """
+    Search function for one mode, taking the index of a query.
+    
+    Args:
+        store: Store to search
+        mode: One of ``MODES``
+        queries: Labelled queries
+        query_vectors: Embedding of each query
+        match_count: Results per query
+        text_weight: Keyword weight for hybrid search
+        probes: IVF lists searched per query
+        fetch_factor: Over-fetch for MMR and reranking
+        candidate_count: Candidates per side for hybrid search
+    
+    Returns:
+        Async function returning the results of query ``i``
+    """
+    reranker = LexicalReranker()
+    
+    async def vector(i: int) -> List[Dict[str, Any]]:
+        return await store.vector_search(query_vectors[i], match_count, probes=probes)
+    
+    async def hybrid(i: int) -> List[Dict[str, Any]]:
+        return await store.hybrid_search(
+            query_vectors[i], queries[i].query, match_count,
+            text_weight=text_weight, candidate_count=max(candidate_count, match_count), probes=probes
+        )
+    
+    async def mmr(i: int) -> List[Dict[str, Any]]:
+        results = await store.vector_search(
+            query_vectors[i], match_count * fetch_factor, with_embeddings=True, probes=probes
+        )
+        if not results:
+            return results
+        order = mmr_select(query_vectors[i], embedding_matrix([r["embedding"] for r in results]), match_count)
+        return [results[j] for j in order]
+    
+    async def rerank(i: int) -> List[Dict[str, Any]]:
+        results = await store.vector_search(query_vectors[i], match_count * fetch_factor, probes=probes)
+        scores = reranker.score(queries[i].query, [r["content"] for r in results])
+        order = sorted(range(len(results)), key=lambda j: -scores[j])[:match_count]
+        return [results[j] for j in order]
+    
+    searches = {"vector": vector, "hybrid": hybrid, "mmr": mmr, "rerank": rerank}
+    if mode not in searches:
+        raise ValueError(f"Unknown search mode: {mode}")
+    return searches[mode]
+
+
+async def evaluate(
+    search: Search,
+    queries: Sequence[LabelledQuery],
+    ks: Sequence[int],
+    concurrency: int
+) -> Dict[str, Any]:
+    """
+    Quality and latency of a search function over the query set.
+    
+    Queries run one at a time for per-query latency and ranks, then all at
+    once with ``concurrency`` in flight for throughput.
+    
+    Returns:
+        Ranking metrics, latency percentiles and ``qps``
+    """
+    ranks = []
+    latencies = []
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        results = await search(i)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ranks.append(first_relevant_rank(query, results))
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def limited(i: int):
+        async with semaphore:
+            await search(i)
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(limited(i) for i in range(len(queries))))
+    elapsed = time.perf_counter() - start
+    
+    return {
+        **ranking_metrics(ranks, ks),
+        **latency_metrics(latencies),
+        "qps": round(len(queries) / elapsed, 1) if elapsed > 0 else None
+    }
+
+
+async def ingest(
+    documents_folder: str,
+    path: str,
+    chunker: str,
+    chunk_size: int,
+    embedder: EmbeddingGenerator
+) -> Dict[str, Any]:
+    """Ingest the documents into a fresh local store, returning corpus stats."""
+    config = IngestionConfig(
+        chunk_size=chunk_size,
+        chunk_overlap=min(200, chunk_size // 5),
+        max_chunk_size=max(2000, chunk_size * 2),
+        use_semantic_chunking=chunker == "semantic",
+        manage_vector_index=False
+    )
+    pipeline = DocumentIngestionPipeline(
+        config=config,
+        documents_folder=documents_folder,
+        clean_before_ingest=True,
+        embedder=embedder,
+        store=LocalVectorStore(path)
+    )
+    start = time.perf_counter()
+    results = await pipeline.ingest_documents()
+    seconds = time.perf_counter() - start
+    await pipeline.close()
+    return {
+        "chunks": sum(result.chunks_created for result in results),
+        "ingest_seconds": round(seconds, 3)
+    }
+
+
+async def run_benchmark(
+    documents_folder: str,
+    queries: Sequence[LabelledQuery],
+    embedder: EmbeddingGenerator,
+    chunkers: Sequence[str] = ("simple", "semantic"),
+    chunk_sizes: Sequence[int] = (500, 1000, 1500),
+    modes: Sequence[str] = MODES,
+    text_weights: Sequence[float] = (0.3,),
+    probes: Sequence[int] = (),
+    ks: Sequence[int] = (1, 5, 10),
+    concurrency: int = 8,
+    fetch_factor: int = 4,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Evaluate every combination of chunking, search mode and index setting.
+    
+    Args:
+        documents_folder: Markdown documents to ingest
+        queries: Labelled queries over those documents
+        embedder: Embedder for chunks and queries
+        chunkers: "simple" and/or "semantic"
+        chunk_sizes: Target chunk sizes in characters
+        modes: Search modes from ``MODES``
+        text_weights: Keyword weights tried for hybrid search
+        probes: IVF probe counts tried after the exact scan (empty: exact only)
+        ks: Recall cut-offs; the largest is the match count
+        concurrency: Queries in flight for the throughput run
+        fetch_factor: Over-fetch for MMR and reranking
+        on_result: Called with each result as it is produced
+    
+    Returns:
+        One result per combination
+    """
+    match_count = max(ks)
+    query_vectors = await embedder.generate_embeddings_batch([query.query for query in queries])
+    results: List[Dict[str, Any]] = []
+    
+    for chunker in chunkers:
+        for chunk_size in chunk_sizes:
+            with tempfile.TemporaryDirectory() as path:
+                corpus = await ingest(documents_folder, path, chunker, chunk_size, embedder)
+                store = LocalVectorStore(path)
+                
+                index_settings: List[Dict[str, Any]] = [{"index": "exact", "probes": None}]
+                for probe_count in probes:
+                    index_settings.append({"index": "ivf", "probes": probe_count})
+                
+                for setting in index_settings:
+                    if setting["index"] == "ivf" and store.index is None:
+                        await store.optimize(method="ivfflat")
+                    lists = store.index.lists if store.index else None
+                    
+                    for mode in modes:
+                        for text_weight in (text_weights if mode == "hybrid" else (None,)):
+                            search = create_search(
+                                store, mode, queries, query_vectors, match_count,
+                                text_weight=text_weight if text_weight is not None else 0.3,
+                                probes=setting["probes"], fetch_factor=fetch_factor
+                            )
+                            result = {
+                                "chunker": chunker,
+                                "chunk_size": chunk_size,
+                                **corpus,
+                                "mode": mode,
+                                "text_weight": text_weight,
+                                "index": setting["index"],
+                                "lists": lists,
+                                "probes": setting["probes"],
+                                **await evaluate(search, queries, ks, concurrency)
+                            }
+                            results.append(result)
+                            if on_result:
+                                on_result(result)
+                
+                await store.close()
+    
+    return results
+
+
+async def main():
+    """Run the retrieval benchmark."""
+    parser = argparse.ArgumentParser(description="Measure retrieval quality and latency across settings")
+    parser.add_argument("--documents", "-d", default="documents", help="Documents folder path")
+    parser.add_argument("--queries", help="Labelled query set (JSON); built from the documents if omitted")
+    parser.add_argument("--save-queries", help="Write the labelled query set to this file")
+    parser.add_argument("--chunkers", nargs="+", choices=["simple", "semantic"], default=["simple", "semantic"])
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[500, 1000, 1500])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--text-weights", type=float, nargs="+", default=[0.3],
+                        help="Keyword weights tried for hybrid search")
+    parser.add_argument("--probes", type=int, nargs="*", default=[],
+                        help="Also search an IVF index with these probe counts")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 5, 10], help="Recall cut-offs")
+    parser.add_argument("--concurrency", type=int, default=8, help="Queries in flight for throughput")
+    parser.add_argument("--fetch-factor", type=int, default=4, help="Over-fetch for MMR and reranking")
+    parser.add_argument("--embeddings", choices=["local", "provider"], default="local",
+                        help="Offline hashing embeddings, or the configured embedding provider")
+    parser.add_argument("--output", "-o", help="Write the JSON report to this file")
+    args = parser.parse_args()
+    
+    queries = load_query_set(args.queries) if args.queries else build_query_set(args.documents)
+    if args.save_queries:
+        save_query_set(queries, args.save_queries)
+    
+    if args.embeddings == "local":
+        embedder = create_embedder(HASHING_EMBEDDING_MODEL, use_cache=False, client=LocalEmbeddingClient())
+    else:
+        embedder = create_embedder()
+    
+    results = await run_benchmark(
+        args.documents,
+        queries,
+        embedder,
+        chunkers=args.chunkers,
+        chunk_sizes=args.chunk_sizes,
+        modes=args.modes,
+        text_weights=args.text_weights,
+        probes=args.probes,
+        ks=sorted(args.k),
+        concurrency=args.concurrency,
+        fetch_factor=args.fetch_factor,
+        on_result=lambda result: print(json.dumps(result))
+    )
+    
+    report = {
+        "documents": args.documents,
+        "queries": len(queries),
+        "embedding_model": embedder.model,
+        "results": results
+    }
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,223 @@
+"""
+Benchmark for structural markdown splitting on large documents.
+
+Generates synthetic markdown files of increasing size and times the
+structure-based chunking path (sections grouped into chunks, oversized
+sections split by rules, chunk objects with offsets) with:
+
+- ``regex_find``: the previous implementation, six regex passes that re-split
+  every section, and chunk offsets located with ``str.find``;
+- ``single_pass``: ``split_markdown_sections`` and offsets carried through
+  from the tokenizer.
+
+No LLM is called; oversized sections are split by rules in both cases.
+
+Usage (from the rag_agent directory):
+    python -m ingestion.split_benchmark --sizes 1 2 5 10 --legacy-max-mb 2
+"""
+
+import os
+import re
+import asyncio
+import argparse
+import json
+import random
+import time
+from typing import Any, Dict, List, Tuple
+
+# The chunking modules build their default clients at import time
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from .chunker import ChunkingConfig, DocumentChunk, SemanticChunker
+
+WORDS = (
+    "vector search index embedding retrieval chunk document query latency "
+    "throughput pipeline postgres similarity ranking context agent model"
+).split()
+
+
+def generate_markdown(size: int, seed: int = 42) -> str:
+    """
+    Generate repetitive markdown of roughly ``size`` characters.
+    
+    Sections repeat the same headings and boilerplate paragraphs, which is
+    the case where locating chunks with ``str.find`` goes wrong.
+    
+    Args:
+        size: Target size in characters
+        seed: Random seed
+    
+    Returns:
+        Markdown text
+    """
+    rng = random.Random(seed)
+    parts = []
+    total = 0
+    section = 0
+    while total < size:
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 160)))
+        block = [
+            f"## Section {section % 50}",
+            "This section follows the standard template.",
+            words.capitalize() + ".",
+            "- item one\n- item two\n- item three",
+            "| key | value |\n|-----|-------|\n| a   | 1     |",
+            "```python\nfor item in items:\n    process(item)\n```",
+        ]
+        if section % 7 == 0:
+            # An oversized paragraph that has to be split
+            block.append(" ".join(rng.choice(WORDS) for _ in range(600)) + ".")
+        text = "\n\n".join(block) + "\n\n"
+        parts.append(text)
+        total += len(text)
+        section += 1
+    return "".join(parts)
+
+
+class LegacySplitter:
+    """The regex-pass splitter and find-based offsets used before the tokenizer."""
+    
+    def __init__(self, config: ChunkingConfig):
+        self.config = config
+    
+    def split_on_structure(self, content: str) -> List[str]:
+        patterns = [
+            r'\n#{1,6}\s+.+?\n',
+            r'\n\n+',
+            r'\n[-*+]\s+',
+            r'\n\d+\.\s+',
+            r'\n```.*?```\n',
+            r'\n\|\s*.+?\|\s*\n',
+        ]
+        sections = [content]
+        for pattern in patterns:
+            new_sections = []
+            for section in sections:
+                parts = re.split(f'({pattern})', section, flags=re.MULTILINE | re.DOTALL)
+                new_sections.extend([part for part in parts if part.strip()])
+            sections = new_sections
+        return sections
+    
+    def simple_split(self, text: str) -> List[str]:
+        chunks = []
+        start = 0
+        while start < len(text):
+            end = start + self.config.chunk_size
+            if end >= len(text):
+                chunks.append(text[start:])
+                break
+            chunk_end = end
+            for i in range(end, max(start + self.config.min_chunk_size, end - 200), -1):
+                if text[i] in '.!?\n':
+                    chunk_end = i + 1
+                    break
+            chunks.append(text[start:chunk_end])
+            start = chunk_end - self.config.chunk_overlap
+        return chunks
+    
+    def chunk(self, content: str) -> List[DocumentChunk]:
+        chunks = []
+        current_chunk = ""
+        for section in self.split_on_structure(content):
+            potential_chunk = current_chunk + "\n\n" + section if current_chunk else section
+            if len(potential_chunk) <= self.config.chunk_size:
+                current_chunk = potential_chunk
+            else:
+                if current_chunk:
+                    chunks.append(current_chunk.strip())
+                    current_chunk = ""
+                if len(section) > self.config.max_chunk_size:
+                    chunks.extend(self.simple_split(section))
+                else:
+                    current_chunk = section
+        if current_chunk:
+            chunks.append(current_chunk.strip())
+        chunks = [chunk for chunk in chunks if len(chunk.strip()) >= self.config.min_chunk_size]
+        
+        chunk_objects = []
+        current_pos = 0
+        for i, chunk_text in enumerate(chunks):
+            start_pos = content.find(chunk_text, current_pos)
+            if start_pos == -1:
+                start_pos = current_pos
+            end_pos = start_pos + len(chunk_text)
+            chunk_objects.append(DocumentChunk(
+                content=chunk_text.strip(), index=i, start_char=start_pos, end_char=end_pos, metadata={}
+            ))
+            current_pos = end_pos
+        return chunk_objects
+
+
+class RuleSplitChunker(SemanticChunker):
+    """Structure-based chunker that splits oversized sections without the LLM."""
+    
+    async def _split_long_section(self, content: str, start: int, end: int) -> List[Tuple[int, int]]:
+        return self._simple_split(content, start, end)
+
+
+async def single_pass(chunker: RuleSplitChunker, content: str) -> List[DocumentChunk]:
+    """Chunk with the single-pass tokenizer."""
+    spans = await chunker._semantic_chunk(content)
+    return chunker._create_chunk_objects(spans, content, {}, "semantic")
+
+
+def exact_offsets(content: str, chunks: List[DocumentChunk]) -> float:
+    """Share of chunks whose offsets slice exactly their content."""
+    exact = sum(content[chunk.start_char:chunk.end_char] == chunk.content for chunk in chunks)
+    return round(exact / max(len(chunks), 1), 4)
+
+
+async def run_size(megabytes: float, run_legacy: bool, config: ChunkingConfig) -> Dict[str, Any]:
+    """Time both splitters on one generated document."""
+    content = generate_markdown(int(megabytes * 1024 * 1024))
+    report: Dict[str, Any] = {"megabytes": megabytes, "characters": len(content), "cases": []}
+    
+    start = time.perf_counter()
+    chunks = await single_pass(RuleSplitChunker(config), content)
+    elapsed = time.perf_counter() - start
+    report["cases"].append({
+        "case": "single_pass",
+        "seconds": round(elapsed, 3),
+        "mb_per_second": round(megabytes / elapsed, 2),
+        "chunks": len(chunks),
+        "exact_offsets": exact_offsets(content, chunks)
+    })
+    
+    if run_legacy:
+        start = time.perf_counter()
+        chunks = LegacySplitter(config).chunk(content)
+        elapsed = time.perf_counter() - start
+        report["cases"].append({
+            "case": "regex_find",
+            "seconds": round(elapsed, 3),
+            "mb_per_second": round(megabytes / elapsed, 2),
+            "chunks": len(chunks),
+            "exact_offsets": exact_offsets(content, chunks)
+        })
+    
+    return report
+
+
+async def main():
+    """Run the splitting benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark structural markdown splitting")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 2, 5, 10],
+                        help="Document sizes in megabytes")
+    parser.add_argument("--legacy-max-mb", type=float, default=2,
+                        help="Largest size to run the previous implementation on")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Target chunk size")
+    parser.add_argument("--output", "-o", help="Write the JSON report to this file")
+    args = parser.parse_args()
+    
+    config = ChunkingConfig(chunk_size=args.chunk_size, chunk_overlap=200, semantic_method="llm")
+    reports = [await run_size(size, size <= args.legacy_max_mb, config) for size in args.sizes]
+    
+    print(json.dumps(reports, indent=2))
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,212 @@
+"""
+Benchmark for writing ingested chunks to PostgreSQL.
+
+Compares the per-chunk INSERT with text-formatted embeddings against the
+binary COPY path used by the ingestion pipeline. Runs against a real
+Postgres with pgvector, using temporary tables that shadow ``documents``
+and ``chunks`` for the benchmark connection, so existing data is untouched.
+
+Usage (from the rag_agent directory):
+    DATABASE_URL=postgresql://... python -m ingestion.store_benchmark --documents 50 --chunks 20
+"""
+
+import os
+import asyncio
+import argparse
+import json
+import random
+import time
+from typing import Any, Dict, List, Tuple
+
+import asyncpg
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# The pipeline modules build their default clients at import time
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("DATABASE_URL", "postgresql://benchmark@localhost/benchmark")
+
+from .chunker import DocumentChunk
+from .ingest import DocumentIngestionPipeline
+
+try:
+    from ..utils.db_utils import register_vector_codec
+    from ..utils.models import IngestionConfig
+except ImportError:
+    # For direct execution or testing
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from utils.db_utils import register_vector_codec
+    from utils.models import IngestionConfig
+
+
+SCRATCH_TABLES = """
+CREATE TEMP TABLE documents (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    title TEXT NOT NULL,
+    source TEXT NOT NULL,
+    content TEXT NOT NULL,
+    metadata JSONB DEFAULT '{{}}',
+    collection TEXT NOT NULL DEFAULT 'default',
+    tags TEXT[] NOT NULL DEFAULT '{{}}',
+    document_date TIMESTAMP WITH TIME ZONE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TEMP TABLE chunks (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    document_id UUID NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    collection TEXT NOT NULL DEFAULT 'default',
+    content TEXT NOT NULL,
+    embedding vector({dimensions}),
+    chunk_index INTEGER NOT NULL,
+    metadata JSONB DEFAULT '{{}}',
+    token_count INTEGER,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+
+def make_documents(
+    documents: int,
+    chunks: int,
+    dimensions: int,
+    seed: int = 42
+) -> List[Tuple[str, str, str, List[DocumentChunk], Dict[str, Any]]]:
+    """
+    Build synthetic embedded documents.
+    
+    Args:
+        documents: Number of documents
+        chunks: Chunks per document
+        dimensions: Embedding dimension
+        seed: Random seed
+    
+    Returns:
+        (title, source, content, chunks, metadata) tuples
+    """
+    rng = random.Random(seed)
+    result = []
+    for doc in range(documents):
+        doc_chunks = []
+        for index in range(chunks):
+            chunk = DocumentChunk(
+                content=f"Chunk {index} of document {doc}. " * 20,
+                index=index,
+                start_char=index * 600,
+                end_char=(index + 1) * 600,
+                metadata={"title": f"Document {doc}", "chunk_method": "benchmark"},
+                token_count=150
+            )
+            chunk.embedding = [rng.uniform(-1.0, 1.0) for _ in range(dimensions)]
+            doc_chunks.append(chunk)
+        content = " ".join(chunk.content for chunk in doc_chunks)
+        result.append((f"Document {doc}", f"doc_{doc}.md", content, doc_chunks, {"benchmark": True}))
+    return result
+
+
+async def insert_per_chunk(
+    conn: asyncpg.Connection,
+    documents: List[Tuple[str, str, str, List[DocumentChunk], Dict[str, Any]]]
+):
+    """Previous write path: one INSERT per row, embeddings formatted as text."""
+    for title, source, content, chunks, metadata in documents:
+        async with conn.transaction():
+            document_id = await conn.fetchval(
+                """
+                INSERT INTO documents (title, source, content, metadata)
+                VALUES ($1, $2, $3, $4)
+                RETURNING id::text
+                """,
+                title, source, content, json.dumps(metadata)
+            )
+            for chunk in chunks:
+                embedding_data = '[' + ','.join(map(str, chunk.embedding)) + ']'
+                await conn.execute(
+                    """
+                    INSERT INTO chunks (document_id, content, embedding, chunk_index, metadata, token_count)
+                    VALUES ($1::uuid, $2, $3::text::vector, $4, $5, $6)
+                    """,
+                    document_id, chunk.content, embedding_data, chunk.index,
+                    json.dumps(chunk.metadata), chunk.token_count
+                )
+
+
+async def copy_batched(
+    conn: asyncpg.Connection,
+    documents: List[Tuple[str, str, str, List[DocumentChunk], Dict[str, Any]]],
+    batch_size: int
+):
+    """Pipeline write path: binary COPY, several documents per transaction."""
+    pipeline = DocumentIngestionPipeline(IngestionConfig(use_semantic_chunking=False))
+    for start in range(0, len(documents), batch_size):
+        async with conn.transaction():
+            await pipeline.store._copy_documents(conn, documents[start:start + batch_size])
+
+
+async def run_case(conn: asyncpg.Connection, name: str, writer, documents) -> Dict[str, Any]:
+    """Time one write path on empty scratch tables."""
+    await conn.execute("TRUNCATE chunks, documents")
+    start = time.perf_counter()
+    await writer(conn, documents)
+    elapsed = time.perf_counter() - start
+    rows = await conn.fetchval("SELECT count(*) FROM chunks")
+    return {
+        "case": name,
+        "seconds": round(elapsed, 3),
+        "chunks": rows,
+        "chunks_per_second": round(rows / elapsed, 1)
+    }
+
+
+async def main():
+    """Run the store benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark chunk writes to PostgreSQL")
+    parser.add_argument("--database-url", default=DATABASE_URL, help="PostgreSQL URL")
+    parser.add_argument("--documents", type=int, default=50, help="Number of documents")
+    parser.add_argument("--chunks", type=int, default=20, help="Chunks per document")
+    parser.add_argument("--dimensions", type=int, default=1536, help="Embedding dimension")
+    parser.add_argument("--batch-size", type=int, default=8, help="Documents per COPY transaction")
+    parser.add_argument("--output", "-o", help="Write the JSON report to this file")
+    args = parser.parse_args()
+    
+    if not args.database_url:
+        parser.error("DATABASE_URL environment variable or --database-url is required")
+    
+    documents = make_documents(args.documents, args.chunks, args.dimensions)
+    
+    conn = await asyncpg.connect(args.database_url)
+    try:
+        await conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        await conn.execute(SCRATCH_TABLES.format(dimensions=args.dimensions))
+        await register_vector_codec(conn)
+        
+        reports = [
+            await run_case(conn, "insert_per_chunk_text", insert_per_chunk, documents),
+            await run_case(
+                conn, "copy_binary_batched",
+                lambda c, docs: copy_batched(c, docs, args.batch_size),
+                documents
+            )
+        ]
+    finally:
+        await conn.close()
+    
+    report = {
+        "documents": args.documents,
+        "chunks_per_document": args.chunks,
+        "dimensions": args.dimensions,
+        "batch_size": args.batch_size,
+        "cases": reports,
+        "speedup": round(reports[0]["seconds"] / reports[1]["seconds"], 2)
+    }
+    
+    print(json.dumps(report, indent=2))
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
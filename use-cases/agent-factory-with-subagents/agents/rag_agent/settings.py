@@ -5,6 +5,9 @@ from pydantic import Field, ConfigDict
 from dotenv import load_dotenv
 from typing import Optional
 
+from utils.embedding_cache import DEFAULT_EMBEDDING_CACHE_PATH
+from utils.local_store import DEFAULT_LOCAL_STORE_PATH
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -25,6 +28,16 @@ class Settings(BaseSettings):
         description="PostgreSQL connection URL with PGVector extension"
     )
     
+    vector_store: str = Field(
+        default="postgres",
+        description="Storage backend: postgres, or local for the embedded offline store"
+    )
+    
+    local_store_path: str = Field(
+        default=DEFAULT_LOCAL_STORE_PATH,
+        description="Directory of the local vector store"
+    )
+    
     # LLM Configuration (OpenAI-compatible)
     llm_provider: str = Field(
         default="openai",
@@ -62,6 +75,53 @@ class Settings(BaseSettings):
         description="Default text weight for hybrid search (0-1)"
     )
     
+    hybrid_candidate_count: int = Field(
+        default=50,
+        description="Vector and full-text candidates fused by hybrid search"
+    )
+    
+    search_collection: Optional[str] = Field(
+        default=None,
+        description="Collection searched when a search names none (None: all collections)"
+    )
+    
+    # Vector Index Configuration
+    hnsw_ef_search: int = Field(
+        default=40,
+        description="HNSW candidate list size per query (higher: better recall, slower)"
+    )
+    
+    ivfflat_probes: Optional[int] = Field(
+        default=None,
+        description="IVFFlat lists searched per query (default: sqrt of the index lists)"
+    )
+    
+    # Post-retrieval Configuration
+    mmr_fetch_factor: int = Field(
+        default=4,
+        description="Candidates fetched per requested result for MMR selection"
+    )
+    
+    mmr_budget_ms: float = Field(
+        default=50,
+        description="Latency budget for MMR selection; remaining results follow similarity"
+    )
+    
+    reranker: str = Field(
+        default="lexical",
+        description="Reranker backend: lexical, cross-encoder or cross-encoder:<model>"
+    )
+    
+    rerank_fetch_factor: int = Field(
+        default=4,
+        description="Candidates fetched per requested result for reranking"
+    )
+    
+    rerank_budget_ms: float = Field(
+        default=500,
+        description="Latency budget for reranking; on timeout results keep vector order"
+    )
+    
     # Connection Pool Configuration
     db_pool_min_size: int = Field(
         default=10,
@@ -74,6 +134,11 @@ class Settings(BaseSettings):
     )
     
     # Embedding Configuration
+    embedding_provider: str = Field(
+        default="openai",
+        description="Embedding provider: openai, or local for deterministic hashing embeddings"
+    )
+    
     embedding_model: str = Field(
         default="text-embedding-3-small",
         description="OpenAI embedding model"
@@ -83,6 +148,52 @@ class Settings(BaseSettings):
         default=1536,
         description="Embedding vector dimension"
     )
+    
+    embedding_cache_path: Optional[str] = Field(
+        default=DEFAULT_EMBEDDING_CACHE_PATH,
+        description="SQLite file for the persistent embedding cache (empty to disable)"
+    )
+    
+    embedding_cache_max_entries: int = Field(
+        default=100_000,
+        description="Maximum number of cached embeddings"
+    )
+    
+    query_embedding_cache_size: int = Field(
+        default=1024,
+        description="Query embeddings kept in memory"
+    )
+    
+    query_embedding_cache_ttl: float = Field(
+        default=600,
+        description="Seconds a query embedding stays in the in-memory cache"
+    )
+    
+    query_embedding_batch_window_ms: float = Field(
+        default=5,
+        description="Window for batching concurrent query embeddings into one request"
+    )
+    
+    query_embedding_max_batch_size: int = Field(
+        default=64,
+        description="Maximum queries per embeddings request"
+    )
+    
+    # Conversation memory (CLI)
+    memory_history_tokens: int = Field(
+        default=1500,
+        description="Token budget for recent turns kept verbatim in the prompt"
+    )
+    
+    memory_summary_tokens: int = Field(
+        default=300,
+        description="Token budget for the summary of older turns"
+    )
+    
+    memory_chunk_tokens: int = Field(
+        default=1500,
+        description="Token budget for chunks reused from earlier searches"
+    )
 
 
 def load_settings() -> Settings:
@@ -0,0 +1,73 @@
+-- Partitions the chunks table by collection (see utils/partitions.py).
+--
+-- A search filtered to one collection, for example one agent's knowledge,
+-- then scans only that collection's partition and its own HNSW graph,
+-- instead of the whole table with the other collections' rows filtered out.
+--
+-- Run on a database set up with schema.sql (or upgraded with
+-- search_filters.sql). Existing chunks are moved into one partition per
+-- collection. Partitions of new collections are created by the store
+-- before their first chunks are written; chunks of a collection without a
+-- partition go to chunks_default. Vector index builds on a partitioned
+-- table cannot run CONCURRENTLY and block writes while they run.
+
+BEGIN;
+
+ALTER TABLE chunks RENAME TO chunks_unpartitioned;
+DROP INDEX IF EXISTS idx_chunks_embedding;
+DROP INDEX IF EXISTS idx_chunks_document_id;
+DROP INDEX IF EXISTS idx_chunks_chunk_index;
+DROP INDEX IF EXISTS idx_chunks_content_trgm;
+DROP INDEX IF EXISTS idx_chunks_content_tsv;
+DROP INDEX IF EXISTS idx_chunks_collection;
+
+-- The primary key of a partitioned table must include the partition key
+CREATE TABLE chunks (
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    document_id UUID NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    collection TEXT NOT NULL DEFAULT 'default',
+    content TEXT NOT NULL,
+    embedding vector(1536),
+    chunk_index INTEGER NOT NULL,
+    metadata JSONB DEFAULT '{}',
+    token_count INTEGER,
+    content_tsv tsvector GENERATED ALWAYS AS (to_tsvector('english', content)) STORED,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, collection)
+) PARTITION BY LIST (collection);
+
+CREATE TABLE chunks_default PARTITION OF chunks DEFAULT;
+
+-- Partition names follow utils/partitions.py: chunks_<slug>_<md5 prefix>
+DO $$
+DECLARE
+    name TEXT;
+    slug TEXT;
+BEGIN
+    FOR name IN SELECT DISTINCT collection FROM chunks_unpartitioned LOOP
+        slug := left(trim(BOTH '_' FROM regexp_replace(lower(name), '[^a-z0-9]+', '_', 'g')), 40);
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF chunks FOR VALUES IN (%L)',
+            CASE WHEN slug = '' THEN 'chunks_' || left(md5(name), 8)
+                 ELSE 'chunks_' || slug || '_' || left(md5(name), 8) END,
+            name
+        );
+    END LOOP;
+END
+$$;
+
+INSERT INTO chunks (id, document_id, collection, content, embedding, chunk_index, metadata, token_count, created_at)
+SELECT id, document_id, collection, content, embedding, chunk_index, metadata, token_count, created_at
+FROM chunks_unpartitioned;
+
+DROP TABLE chunks_unpartitioned;
+
+-- Indexes on the partitioned table are created on every partition,
+-- including partitions added later
+CREATE INDEX idx_chunks_embedding ON chunks USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+CREATE INDEX idx_chunks_document_id ON chunks (document_id);
+CREATE INDEX idx_chunks_chunk_index ON chunks (document_id, chunk_index);
+CREATE INDEX idx_chunks_content_trgm ON chunks USING GIN (content gin_trgm_ops);
+CREATE INDEX idx_chunks_content_tsv ON chunks USING GIN (content_tsv);
+
+COMMIT;
@@ -8,6 +8,7 @@ DROP INDEX IF EXISTS idx_chunks_embedding;
 DROP INDEX IF EXISTS idx_chunks_document_id;
 DROP INDEX IF EXISTS idx_documents_metadata;
 DROP INDEX IF EXISTS idx_chunks_content_trgm;
+DROP INDEX IF EXISTS idx_chunks_content_tsv;
 
 CREATE TABLE documents (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -15,28 +16,46 @@ CREATE TABLE documents (
     source TEXT NOT NULL,
     content TEXT NOT NULL,
     metadata JSONB DEFAULT '{}',
+    -- Search filters (see utils/search_filter.py), set from the metadata
+    -- collection, tags and date at ingestion
+    collection TEXT NOT NULL DEFAULT 'default',
+    tags TEXT[] NOT NULL DEFAULT '{}',
+    document_date TIMESTAMP WITH TIME ZONE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
 CREATE INDEX idx_documents_metadata ON documents USING GIN (metadata);
 CREATE INDEX idx_documents_created_at ON documents (created_at DESC);
+CREATE INDEX idx_documents_collection ON documents (collection);
+-- text_pattern_ops serves source LIKE 'prefix%' under any collation
+CREATE INDEX idx_documents_source ON documents (source text_pattern_ops);
+CREATE INDEX idx_documents_tags ON documents USING GIN (tags);
+CREATE INDEX idx_documents_document_date ON documents (document_date);
 
 CREATE TABLE chunks (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     document_id UUID NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    -- Copy of the document's collection: the partition key when chunks is
+    -- partitioned (sql/partitioned_chunks.sql)
+    collection TEXT NOT NULL DEFAULT 'default',
     content TEXT NOT NULL,
     embedding vector(1536),
     chunk_index INTEGER NOT NULL,
     metadata JSONB DEFAULT '{}',
     token_count INTEGER,
+    content_tsv tsvector GENERATED ALWAYS AS (to_tsvector('english', content)) STORED,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX idx_chunks_embedding ON chunks USING ivfflat (embedding vector_cosine_ops) WITH (lists = 1);
+-- HNSW is maintained incrementally, so it can be created on the empty table.
+-- Ingestion re-tunes it for the corpus size (python -m ingestion.index).
+CREATE INDEX idx_chunks_embedding ON chunks USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
 CREATE INDEX idx_chunks_document_id ON chunks (document_id);
 CREATE INDEX idx_chunks_chunk_index ON chunks (document_id, chunk_index);
 CREATE INDEX idx_chunks_content_trgm ON chunks USING GIN (content gin_trgm_ops);
+CREATE INDEX idx_chunks_content_tsv ON chunks USING GIN (content_tsv);
+CREATE INDEX idx_chunks_collection ON chunks (collection);
 
 CREATE OR REPLACE FUNCTION match_chunks(
     query_embedding vector(1536),
@@ -71,11 +90,53 @@ BEGIN
 END;
 $$;
 
+-- match_chunks plus the chunk embeddings, for re-ranking candidates by
+-- maximal marginal relevance in the application
+CREATE OR REPLACE FUNCTION match_chunks_with_embeddings(
+    query_embedding vector(1536),
+    match_count INT DEFAULT 10
+)
+RETURNS TABLE (
+    chunk_id UUID,
+    document_id UUID,
+    content TEXT,
+    similarity FLOAT,
+    metadata JSONB,
+    document_title TEXT,
+    document_source TEXT,
+    embedding vector
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    SELECT 
+        c.id AS chunk_id,
+        c.document_id,
+        c.content,
+        1 - (c.embedding <=> query_embedding) AS similarity,
+        c.metadata,
+        d.title AS document_title,
+        d.source AS document_source,
+        c.embedding
+    FROM chunks c
+    JOIN documents d ON c.document_id = d.id
+    WHERE c.embedding IS NOT NULL
+    ORDER BY c.embedding <=> query_embedding
+    LIMIT match_count;
+END;
+$$;
+
+-- Reciprocal rank fusion of the top vector and full-text candidates. Each
+-- side is a LIMITed index scan (HNSW/IVFFlat and GIN), so hybrid search
+-- costs about as much as two small searches instead of a full table scan.
 CREATE OR REPLACE FUNCTION hybrid_search(
     query_embedding vector(1536),
     query_text TEXT,
     match_count INT DEFAULT 10,
-    text_weight FLOAT DEFAULT 0.3
+    text_weight FLOAT DEFAULT 0.3,
+    candidate_count INT DEFAULT 50,
+    rrf_k INT DEFAULT 60
 )
 RETURNS TABLE (
     chunk_id UUID,
@@ -90,48 +151,55 @@ RETURNS TABLE (
 )
 LANGUAGE plpgsql
 AS $$
+DECLARE
+    candidates INT := GREATEST(candidate_count, match_count);
+    text_query tsquery := plainto_tsquery('english', query_text);
 BEGIN
     RETURN QUERY
     WITH vector_results AS (
-        SELECT 
-            c.id AS chunk_id,
-            c.document_id,
-            c.content,
-            1 - (c.embedding <=> query_embedding) AS vector_sim,
-            c.metadata,
-            d.title AS doc_title,
-            d.source AS doc_source
-        FROM chunks c
-        JOIN documents d ON c.document_id = d.id
-        WHERE c.embedding IS NOT NULL
+        SELECT v.id, ROW_NUMBER() OVER (ORDER BY v.distance) AS rank
+        FROM (
+            SELECT c.id, c.embedding <=> query_embedding AS distance
+            FROM chunks c
+            WHERE c.embedding IS NOT NULL
+            ORDER BY c.embedding <=> query_embedding
+            LIMIT candidates
+        ) v
     ),
     text_results AS (
-        SELECT 
-            c.id AS chunk_id,
-            c.document_id,
-            c.content,
-            ts_rank_cd(to_tsvector('english', c.content), plainto_tsquery('english', query_text)) AS text_sim,
-            c.metadata,
-            d.title AS doc_title,
-            d.source AS doc_source
-        FROM chunks c
-        JOIN documents d ON c.document_id = d.id
-        WHERE to_tsvector('english', c.content) @@ plainto_tsquery('english', query_text)
+        SELECT t.id, ROW_NUMBER() OVER (ORDER BY t.text_rank DESC) AS rank
+        FROM (
+            SELECT c.id, ts_rank_cd(c.content_tsv, text_query) AS text_rank
+            FROM chunks c
+            WHERE c.content_tsv @@ text_query
+            ORDER BY text_rank DESC
+            LIMIT candidates
+        ) t
+    ),
+    fused AS (
+        SELECT
+            COALESCE(v.id, t.id) AS id,
+            COALESCE((1 - text_weight) / (rrf_k + v.rank), 0)
+                + COALESCE(text_weight / (rrf_k + t.rank), 0) AS score
+        FROM vector_results v
+        FULL OUTER JOIN text_results t ON v.id = t.id
+        ORDER BY score DESC
+        LIMIT match_count
     )
     SELECT 
-        COALESCE(v.chunk_id, t.chunk_id) AS chunk_id,
-        COALESCE(v.document_id, t.document_id) AS document_id,
-        COALESCE(v.content, t.content) AS content,
-        (COALESCE(v.vector_sim, 0) * (1 - text_weight) + COALESCE(t.text_sim, 0) * text_weight)::float8 AS combined_score,
-        COALESCE(v.vector_sim, 0)::float8 AS vector_similarity,
-        COALESCE(t.text_sim, 0)::float8 AS text_similarity,
-        COALESCE(v.metadata, t.metadata) AS metadata,
-        COALESCE(v.doc_title, t.doc_title) AS document_title,
-        COALESCE(v.doc_source, t.doc_source) AS document_source
-    FROM vector_results v
-    FULL OUTER JOIN text_results t ON v.chunk_id = t.chunk_id
-    ORDER BY combined_score DESC
-    LIMIT match_count;
+        c.id AS chunk_id,
+        c.document_id,
+        c.content,
+        f.score::float8 AS combined_score,
+        (1 - (c.embedding <=> query_embedding))::float8 AS vector_similarity,
+        ts_rank_cd(c.content_tsv, text_query)::float8 AS text_similarity,
+        c.metadata,
+        d.title AS document_title,
+        d.source AS document_source
+    FROM fused f
+    JOIN chunks c ON c.id = f.id
+    JOIN documents d ON c.document_id = d.id
+    ORDER BY f.score DESC;
 END;
 $$;
 
@@ -0,0 +1,39 @@
+-- Adds the search filter columns and indexes to a database created before
+-- them. Safe to run more than once; schema.sql already includes all of it.
+
+SET timezone = 'UTC';
+
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS collection TEXT NOT NULL DEFAULT 'default';
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS tags TEXT[] NOT NULL DEFAULT '{}';
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS document_date TIMESTAMP WITH TIME ZONE;
+ALTER TABLE chunks ADD COLUMN IF NOT EXISTS collection TEXT NOT NULL DEFAULT 'default';
+
+-- Backfill from the metadata recorded at ingestion, normalized like
+-- utils/search_filter.py: distinct lowercase tags, naive dates as UTC
+UPDATE documents SET
+    collection = COALESCE(NULLIF(metadata->>'collection', ''), collection),
+    tags = CASE jsonb_typeof(metadata->'tags')
+        WHEN 'array' THEN ARRAY(
+            SELECT DISTINCT lower(trim(t)) FROM jsonb_array_elements_text(metadata->'tags') t
+            WHERE trim(t) <> '' ORDER BY 1
+        )
+        WHEN 'string' THEN ARRAY(
+            SELECT DISTINCT lower(trim(t)) FROM regexp_split_to_table(metadata->>'tags', ',') t
+            WHERE trim(t) <> '' ORDER BY 1
+        )
+        ELSE tags
+    END,
+    document_date = CASE
+        WHEN metadata->>'date' ~ '^\d{4}-\d{2}-\d{2}' THEN (metadata->>'date')::timestamptz
+        ELSE document_date
+    END;
+
+UPDATE chunks c SET collection = d.collection
+FROM documents d
+WHERE c.document_id = d.id AND c.collection <> d.collection;
+
+CREATE INDEX IF NOT EXISTS idx_documents_collection ON documents (collection);
+CREATE INDEX IF NOT EXISTS idx_documents_source ON documents (source text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_documents_tags ON documents USING GIN (tags);
+CREATE INDEX IF NOT EXISTS idx_documents_document_date ON documents (document_date);
+CREATE INDEX IF NOT EXISTS idx_chunks_collection ON chunks (collection);
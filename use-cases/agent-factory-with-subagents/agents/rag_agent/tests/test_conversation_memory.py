@@ -0,0 +1,130 @@
+"""Test the token-budgeted conversation memory used by the CLI."""
+
+from pydantic import BaseModel
+
+from ..utils.conversation_memory import ConversationMemory, RetrievedChunkCache, format_prompt
+
+
+class WordCounter:
+    """One token per whitespace-separated word, for predictable budgets."""
+    
+    def count(self, text: str) -> int:
+        return len(text.split())
+
+
+def chunk(chunk_id: str, content: str, source: str = "doc.md") -> dict:
+    return {"chunk_id": chunk_id, "content": content, "document_title": source, "document_source": source}
+
+
+class TestConversationMemory:
+    """Test the history budget and summary."""
+    
+    def test_history_stays_within_budget(self):
+        """Old turns leave the verbatim history and are summarised instead."""
+        memory = ConversationMemory(history_tokens=60, summary_tokens=200, counter=WordCounter())
+        
+        for i in range(10):
+            memory.add_turn(f"Question {i} about topic{i}?", f"Answer {i}. " + "detail " * 20)
+        
+        assert sum(turn.tokens for turn in memory.turns) <= 60
+        assert memory.turns[-1].user == "Question 9 about topic9?"
+        assert memory.summarized_turns == 10 - len(memory.turns)
+        assert "User asked: Question 0 about topic0? Answer: Answer 0." in memory.summary
+    
+    def test_long_answer_is_truncated(self):
+        """A single answer larger than the budget is cut rather than kept whole."""
+        memory = ConversationMemory(history_tokens=50, counter=WordCounter())
+        
+        memory.add_turn("Explain everything", "word " * 500)
+        
+        assert len(memory.turns) == 1
+        assert memory.turns[0].tokens <= 50
+        assert memory.turns[0].assistant.endswith("...")
+    
+    def test_summary_keeps_newest_lines_within_budget(self):
+        """The summary drops its oldest lines once it outgrows its budget."""
+        memory = ConversationMemory(history_tokens=10, summary_tokens=30, counter=WordCounter())
+        
+        for i in range(20):
+            memory.add_turn(f"Question {i}", f"Answer {i}.")
+        
+        assert WordCounter().count(memory.summary) <= 30
+        assert "Question 18" in memory.summary
+        assert "Question 0 " not in memory.summary
+    
+    def test_clear_starts_over(self):
+        """Clearing forgets turns, summary and cached chunks."""
+        memory = ConversationMemory(history_tokens=10, counter=WordCounter())
+        for i in range(5):
+            memory.add_turn(f"Question {i}", f"Answer {i}.")
+        memory.remember_results([chunk("1", "pgvector index tuning")])
+        
+        memory.clear()
+        context = memory.build_context("pgvector index tuning")
+        
+        assert context == {"summary": "", "history": "", "chunks": []}
+
+
+class TestRetrievedChunkCache:
+    """Test reuse of chunks from earlier searches."""
+    
+    def test_follow_up_reuses_relevant_chunks(self):
+        """A follow-up on the same subject reuses cached chunks; a new subject does not."""
+        cache = RetrievedChunkCache()
+        cache.add([
+            chunk("1", "OpenAI raised $6.6 billion at a $157 billion valuation.", "openai.md"),
+            chunk("2", "Thrive Capital led the OpenAI round with Microsoft and Nvidia.", "openai.md"),
+            chunk("3", "The EU AI Act classifies systems by risk.", "regulation.md")
+        ])
+        
+        follow_up = cache.select("What valuation did OpenAI reach?", 1000, WordCounter().count)
+        new_subject = cache.select("Why does Nvidia dominate GPUs?", 1000, WordCounter().count)
+        
+        assert [c["content"] for c in follow_up][0].startswith("OpenAI raised $6.6 billion")
+        assert all(c["document_source"] == "openai.md" for c in follow_up)
+        assert new_subject == []
+    
+    def test_selection_respects_token_budget(self):
+        """Only chunks fitting the budget are returned."""
+        cache = RetrievedChunkCache()
+        cache.add([chunk(str(i), f"pgvector hnsw index tuning note {i} " + "pad " * 10) for i in range(5)])
+        
+        selected = cache.select("pgvector hnsw tuning", 40, WordCounter().count)
+        
+        assert len(selected) == 2
+    
+    def test_accepts_models_and_bounds_size(self):
+        """Tool results as pydantic models are cached; the oldest chunks are dropped first."""
+        
+        class Result(BaseModel):
+            chunk_id: str
+            content: str
+            document_title: str
+            document_source: str
+        
+        cache = RetrievedChunkCache(max_chunks=3)
+        added = cache.add([Result(chunk_id=str(i), content=f"text {i}", document_title="t", document_source="s")
+                           for i in range(5)])
+        
+        assert added == 5
+        assert len(cache) == 3
+        assert cache.add([Result(chunk_id="4", content="text 4", document_title="t", document_source="s")]) == 0
+
+
+class TestPrompt:
+    """Test the prompt built from the memory."""
+    
+    def test_prompt_sections(self):
+        """Reused passages come with an instruction to answer from them before searching."""
+        memory = ConversationMemory(history_tokens=100, counter=WordCounter())
+        memory.add_turn("How much did OpenAI raise?", "OpenAI raised $6.6 billion.")
+        memory.remember_results([chunk("1", "OpenAI raised $6.6 billion at a $157 billion valuation.")])
+        
+        with_chunks = format_prompt("What valuation did OpenAI reach?", memory.build_context("What valuation did OpenAI reach?"))
+        without = format_prompt("Tell me about Anthropic", memory.build_context("Tell me about Anthropic"))
+        
+        assert "Recent conversation:\nUser: How much did OpenAI raise?" in with_chunks
+        assert "Previously retrieved passages:" in with_chunks
+        assert "answer from them without searching again" in with_chunks
+        assert "Previously retrieved passages:" not in without
+        assert without.endswith("Provide a comprehensive summary of your findings.")
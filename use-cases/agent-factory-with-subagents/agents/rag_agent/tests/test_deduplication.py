@@ -0,0 +1,246 @@
+"""Test chunk deduplication at ingestion."""
+
+import pytest
+from types import SimpleNamespace
+
+from ..ingestion.dedup import ChunkDeduplicator, MinHasher, lsh_bands
+from ..ingestion.embedder import create_embedder
+from ..ingestion.ingest import DocumentIngestionPipeline, content_hash
+from ..utils.local_embeddings import HASHING_EMBEDDING_MODEL, HashingEmbedder, LocalEmbeddingClient
+from ..utils.local_store import LocalVectorStore
+from ..utils.models import IngestionConfig
+from ..utils.search_filter import SearchFilter
+from .test_ingestion_pipeline import FakeEmbedder, make_pipeline
+
+BOILERPLATE = (
+    "Always answer in the language of the user, cite the knowledge base for every claim, "
+    "keep answers short and structured, escalate to the orchestrator when a task needs another "
+    "agent and never invent tool results or file contents that were not returned."
+)
+
+TOPICS = [
+    "Payment webhooks must be verified with the provider signature before the order is marked paid.",
+    "Service workers cache the application shell so the progressive web app starts offline.",
+    "Deployment pipelines promote the same container image from staging to production."
+]
+
+
+def write_corpus(folder, topics=TOPICS):
+    """One document per topic, each ending with the shared boilerplate."""
+    for i, topic in enumerate(topics):
+        (folder / f"agent_{i}.md").write_text(
+            f"# Agent {i}\n\n" + f"{topic} " * 3 + f"\n\n{BOILERPLATE}", encoding="utf-8"
+        )
+
+
+def check(deduplicator: ChunkDeduplicator, text: str, source: str = "doc.md", index: int = 0):
+    return deduplicator.check(text, content_hash(text), source, index)
+
+
+class TestChunkDeduplicator:
+    """Test exact and MinHash/LSH near-duplicate detection."""
+    
+    def test_exact_duplicate_links_to_first_copy(self):
+        """The first chunk with some content is canonical."""
+        deduplicator = ChunkDeduplicator()
+        
+        assert check(deduplicator, BOILERPLATE, "a.md", 3) is None
+        match = check(deduplicator, BOILERPLATE, "b.md", 0)
+        
+        assert (match.source, match.chunk_index, match.exact) == ("a.md", 3, True)
+        assert match.content_hash == content_hash(BOILERPLATE)
+        assert (deduplicator.stats.chunks, deduplicator.stats.exact, deduplicator.stats.near) == (2, 1, 0)
+        assert len(deduplicator) == 1
+    
+    def test_near_duplicate_detected(self):
+        """A copy with a couple of edited words matches; a different text does not."""
+        deduplicator = ChunkDeduplicator(near_threshold=0.8)
+        check(deduplicator, BOILERPLATE, "a.md")
+        edited = BOILERPLATE.replace("short and structured", "brief and structured").replace("never", "do not")
+        
+        match = check(deduplicator, edited, "b.md")
+        
+        assert match is not None and not match.exact
+        assert 0.8 <= match.similarity < 1.0
+        assert check(deduplicator, TOPICS[0], "c.md") is None
+        assert deduplicator.stats.ratio == pytest.approx(1 / 3)
+    
+    def test_exact_only(self):
+        """Without a near-duplicate threshold only identical chunks match."""
+        deduplicator = ChunkDeduplicator(near_threshold=0)
+        check(deduplicator, BOILERPLATE)
+        
+        assert check(deduplicator, BOILERPLATE + " Thanks.") is None
+        assert check(deduplicator, BOILERPLATE).exact
+    
+    def test_scopes_are_separate(self):
+        """The same chunk in another scope is not a duplicate."""
+        deduplicator = ChunkDeduplicator(near_threshold=0.8)
+        
+        assert deduplicator.check(BOILERPLATE, content_hash(BOILERPLATE), "a.md", 0, scope="alpha") is None
+        assert deduplicator.check(BOILERPLATE, content_hash(BOILERPLATE), "b.md", 0, scope="beta") is None
+        assert deduplicator.check(BOILERPLATE, content_hash(BOILERPLATE), "c.md", 0, scope="beta").source == "b.md"
+    
+    def test_signature_estimates_jaccard(self):
+        """Signature agreement tracks the Jaccard similarity of the shingle sets."""
+        hasher = MinHasher(num_perm=256)
+        words = [f"w{i}" for i in range(200)]
+        # 3-grams of 200 words: 198; changing the last 40 words leaves 160 shared
+        first = " ".join(words)
+        second = " ".join(words[:160] + [f"x{i}" for i in range(40)])
+        jaccard = 158 / (198 + 198 - 158)
+        
+        assert MinHasher.similarity(hasher.signature(first), hasher.signature(second)) == pytest.approx(jaccard, abs=0.08)
+        assert hasher.signature("   ") is None
+    
+    def test_lsh_bands_keep_recall_at_threshold(self):
+        """Pairs at the threshold become candidates with high probability."""
+        for threshold in (0.5, 0.7, 0.85, 0.95):
+            bands, rows = lsh_bands(128, threshold)
+            assert bands * rows == 128
+            assert 1 - (1 - threshold ** rows) ** bands >= 0.99
+
+
+class TestPipelineDeduplication:
+    """Test duplicate chunks in the ingestion pipeline."""
+    
+    @pytest.mark.asyncio
+    async def test_shared_boilerplate_embedded_once(self, tmp_path):
+        """Later copies are not embedded or stored and link to the stored copy."""
+        write_corpus(tmp_path)
+        embedder = FakeEmbedder(delay=0.0)
+        pipeline = make_pipeline(tmp_path, embedder, chunk_size=200, chunk_overlap=0, chunk_workers=1)
+        
+        results = await pipeline.ingest_documents()
+        
+        stored = [chunk.content for document in pipeline.documents.values() for chunk in document["chunks"]]
+        assert stored.count(BOILERPLATE) == 1
+        assert embedder.embedded_chunks == len(stored)
+        assert sum(r.chunks_deduplicated for r in results) == 2
+        assert pipeline.dedup_stats.exact == 2
+        
+        links = [
+            link for document in pipeline.documents.values()
+            for link in document["metadata"].get("duplicate_chunks", [])
+        ]
+        assert {link["source"] for link in links} == {"agent_0.md"}
+        assert all(link["duplicate_of"] == content_hash(BOILERPLATE) for link in links)
+    
+    @pytest.mark.asyncio
+    async def test_copied_file_stored_without_chunks(self, tmp_path):
+        """A backup copy of a file is stored as a document whose chunks all link to the original."""
+        write_corpus(tmp_path, TOPICS[:1])
+        (tmp_path / "agent_0.backup.md").write_text((tmp_path / "agent_0.md").read_text(encoding="utf-8"), encoding="utf-8")
+        pipeline = make_pipeline(tmp_path, FakeEmbedder(delay=0.0), chunk_size=200, chunk_overlap=0, chunk_workers=1)
+        
+        results = await pipeline.ingest_documents()
+        
+        assert not any(r.errors for r in results)
+        backup, original = results
+        assert (backup.chunks_created, backup.chunks_deduplicated) == (len(pipeline.documents[backup.document_id]["chunks"]), 0)
+        assert original.chunks_created == 0
+        assert original.chunks_deduplicated == backup.chunks_created
+    
+    @pytest.mark.asyncio
+    async def test_disabled_deduplication_stores_every_copy(self, tmp_path):
+        """With deduplication off every chunk is embedded."""
+        write_corpus(tmp_path)
+        pipeline = make_pipeline(
+            tmp_path, FakeEmbedder(delay=0.0), chunk_size=200, chunk_overlap=0, deduplicate_chunks=False
+        )
+        
+        await pipeline.ingest_documents()
+        
+        stored = [chunk.content for document in pipeline.documents.values() for chunk in document["chunks"]]
+        assert stored.count(BOILERPLATE) == 3
+    
+    @pytest.mark.asyncio
+    async def test_changed_canonical_document_restores_copies(self, tmp_path):
+        """When the stored copy's document drops the chunk, linking documents get their own copy back."""
+        write_corpus(tmp_path)
+        pipeline = make_pipeline(
+            tmp_path, FakeEmbedder(delay=0.0), chunk_size=200, chunk_overlap=0, chunk_workers=1, incremental=True
+        )
+        await pipeline.ingest_documents()
+        
+        (tmp_path / "agent_0.md").write_text(f"# Agent 0\n\n{TOPICS[0]}", encoding="utf-8")
+        results = await pipeline.ingest_documents()
+        
+        assert [r.unchanged for r in results] == [False, False, False]
+        assert await pipeline._find_dangling_duplicates() == []
+        stored = [chunk.content for document in pipeline.documents.values() for chunk in document["chunks"]]
+        assert stored.count(BOILERPLATE) == 2
+        assert len(pipeline.documents) == 3
+
+
+class TestLocalStoreDanglingDuplicates:
+    """Test finding documents whose duplicate links lost their stored copy."""
+    
+    @pytest.mark.asyncio
+    async def test_find_dangling_duplicates(self, tmp_path):
+        store = LocalVectorStore(str(tmp_path / "store"))
+        chunk = SimpleNamespace(
+            content=BOILERPLATE, index=0, token_count=40, embedding=[1.0, 0.0],
+            metadata={"content_hash": content_hash(BOILERPLATE)}
+        )
+        link = {"duplicate_of": content_hash(BOILERPLATE), "source": "a.md"}
+        original, copy = await store.save_documents([
+            ("A", "a.md", BOILERPLATE, [chunk], {"ingest_root": "/docs"}),
+            ("B", "b.md", BOILERPLATE, [], {"ingest_root": "/docs", "duplicate_chunks": [link]})
+        ])
+        
+        assert await store.find_dangling_duplicates("/docs") == []
+        await store.delete_documents([original])
+        assert await store.find_dangling_duplicates("/docs") == ["b.md"]
+        assert await store.find_dangling_duplicates("/other") == []
+
+
+class TestFilteredSearchOverDuplicates:
+    """Test that deduplicated chunks stay reachable through search filters."""
+    
+    async def ingest(self, tmp_path, documents):
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        for name, text in documents.items():
+            (docs / name).parent.mkdir(parents=True, exist_ok=True)
+            (docs / name).write_text(text, encoding="utf-8")
+        pipeline = DocumentIngestionPipeline(
+            config=IngestionConfig(use_semantic_chunking=False, chunk_size=200, chunk_overlap=0, chunk_workers=1),
+            documents_folder=str(docs),
+            embedder=create_embedder(HASHING_EMBEDDING_MODEL, use_cache=False, client=LocalEmbeddingClient()),
+            store=LocalVectorStore(str(tmp_path / "store"))
+        )
+        await pipeline.ingest_documents()
+        return pipeline
+    
+    @staticmethod
+    async def search(pipeline, filters):
+        query = HashingEmbedder().embed(BOILERPLATE).tolist()
+        return [hit["content"] for hit in await pipeline.store.vector_search(query, 10, filters=filters)]
+    
+    @pytest.mark.asyncio
+    async def test_shared_chunk_kept_in_each_collection(self, tmp_path):
+        """Chunks are only deduplicated within a collection."""
+        pipeline = await self.ingest(tmp_path, {
+            "a.md": f"---\ncollection: alpha\n---\n# A\n\n{TOPICS[0]}\n\n{BOILERPLATE}",
+            "b.md": f"---\ncollection: beta\n---\n# B\n\n{TOPICS[1]}\n\n{BOILERPLATE}"
+        })
+        
+        for collection in ("alpha", "beta"):
+            assert BOILERPLATE in await self.search(pipeline, SearchFilter(collection=collection))
+        assert pipeline.dedup_stats.duplicates == 0
+        await pipeline.close()
+    
+    @pytest.mark.asyncio
+    async def test_source_and_tag_filters_follow_links(self, tmp_path):
+        """A document whose chunk is stored under another document still finds it."""
+        pipeline = await self.ingest(tmp_path, {
+            "a/first.md": f"---\ntags: [one]\n---\n# A\n\n{TOPICS[0]}\n\n{BOILERPLATE}",
+            "b/second.md": f"---\ntags: [two]\n---\n# B\n\n{TOPICS[1]}\n\n{BOILERPLATE}"
+        })
+        
+        assert pipeline.dedup_stats.exact == 1
+        assert BOILERPLATE in await self.search(pipeline, SearchFilter(source_prefix="b/"))
+        assert BOILERPLATE in await self.search(pipeline, SearchFilter(tags=["two"]))
+        assert TOPICS[0] not in " ".join(await self.search(pipeline, SearchFilter(source_prefix="b/")))
+        await pipeline.close()
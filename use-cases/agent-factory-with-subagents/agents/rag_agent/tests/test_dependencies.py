@@ -7,6 +7,7 @@ import openai
 
 from ..dependencies import AgentDependencies
 from ..settings import Settings, load_settings
+from ..utils.vector_codec import register_vector_codec
 
 
 class TestAgentDependencies:
@@ -66,7 +67,8 @@ class TestAgentDependencies:
                         mock_create_pool.assert_called_once_with(
                             test_settings.database_url,
                             min_size=test_settings.db_pool_min_size,
-                            max_size=test_settings.db_pool_max_size
+                            max_size=test_settings.db_pool_max_size,
+                            init=register_vector_codec
                         )
                         
                         # Verify OpenAI client creation
@@ -346,7 +348,8 @@ class TestDatabaseIntegration:
             mock_create_pool.assert_called_once_with(
                 test_settings.database_url,
                 min_size=test_settings.db_pool_min_size,
-                max_size=test_settings.db_pool_max_size
+                max_size=test_settings.db_pool_max_size,
+                init=register_vector_codec
             )
             assert deps.db_pool is mock_pool
     
@@ -0,0 +1,174 @@
+"""Test streaming document discovery and reading."""
+
+import asyncio
+import glob
+import os
+import pytest
+
+from ..ingestion.loader import (
+    DocumentTooLargeError,
+    DocumentWalker,
+    MemoryBudget,
+    detect_encoding,
+    read_document,
+    walk_documents
+)
+from .test_ingestion_pipeline import FakeEmbedder, make_pipeline, write_documents
+
+
+def write_tree(folder):
+    """Nested documents with names whose sort order differs by separator."""
+    for relative in [
+        "a.md", "a-b.md", "a/x.md", "a/z/deep.txt", "b.markdown", "b/c.md",
+        ".hidden/secret.md", ".draft.md", "notes.pdf", "a/ignored.py"
+    ]:
+        path = folder / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"# {relative}\n\nText.", encoding="utf-8")
+
+
+def globbed(folder):
+    """Files the ingestion pipeline used to find with a recursive glob."""
+    files = []
+    for pattern in ["*.md", "*.markdown", "*.txt"]:
+        files.extend(glob.glob(os.path.join(str(folder), "**", pattern), recursive=True))
+    return sorted(files)
+
+
+class TestWalkDocuments:
+    """Test the directory walk."""
+    
+    def test_matches_sorted_glob(self, tmp_path):
+        """The walk finds the glob's files, in the same order."""
+        write_tree(tmp_path)
+        
+        found = list(walk_documents(str(tmp_path)))
+        
+        assert [document.path for document in found] == globbed(tmp_path)
+        assert all(document.size == os.path.getsize(document.path) for document in found)
+    
+    @pytest.mark.asyncio
+    async def test_walker_streams_in_order(self, tmp_path):
+        """The first file arrives on its own; the rest follow in walk order."""
+        write_tree(tmp_path)
+        
+        async with DocumentWalker(str(tmp_path), batch_size=2) as walker:
+            assert await walker.prefetch(1) >= 1
+            paths = [document.path async for document in walker]
+        
+        assert paths == globbed(tmp_path)
+        assert walker.complete and walker.found == len(paths)
+    
+    @pytest.mark.asyncio
+    async def test_walker_stops_early(self, tmp_path):
+        """Leaving the context stops a walk paused on a full queue."""
+        write_documents(tmp_path, 20)
+        
+        async with DocumentWalker(str(tmp_path), batch_size=1, max_batches=1) as walker:
+            first = await walker.__anext__()
+        
+        assert first.path.endswith("doc_00.md")
+        assert not walker._thread.is_alive()
+
+
+class TestReadDocument:
+    """Test block-wise reading with one detected encoding."""
+    
+    def test_utf8_split_across_blocks(self, tmp_path):
+        """Multi-byte characters cut by a block boundary decode intact."""
+        text = "# Нотатки\n\n" + "Привіт, світе! " * 50
+        path = tmp_path / "doc.md"
+        path.write_text(text, encoding="utf-8")
+        
+        assert read_document(str(path), block_size=7) == text
+    
+    def test_byte_order_mark(self, tmp_path):
+        """A BOM selects the encoding and is not part of the text."""
+        path = tmp_path / "doc.md"
+        path.write_text("# Title\n\nBody", encoding="utf-16")
+        
+        assert read_document(str(path), block_size=5) == "# Title\n\nBody"
+        assert detect_encoding(b"\xef\xbb\xbf# Title") == "utf-8-sig"
+    
+    def test_legacy_encoding(self, tmp_path):
+        """Text that is not UTF-8 still decodes instead of failing."""
+        path = tmp_path / "doc.md"
+        path.write_bytes("Café crème brûlée, déjà vu.".encode("latin-1"))
+        
+        content = read_document(str(path))
+        
+        assert content.startswith("Caf") and "�" not in content
+        # A character cut off by the end of the first block is not evidence against UTF-8
+        assert detect_encoding("é".encode("utf-8")[:1], complete=False) == "utf-8"
+        assert detect_encoding("é".encode("utf-8")[:1]) != "utf-8"
+    
+    def test_size_limit(self, tmp_path):
+        """Reading stops as soon as the file exceeds the limit."""
+        path = tmp_path / "doc.md"
+        path.write_bytes(b"x" * 1000)
+        
+        assert len(read_document(str(path), max_bytes=1000, block_size=64)) == 1000
+        with pytest.raises(DocumentTooLargeError):
+            read_document(str(path), max_bytes=999, block_size=64)
+
+
+class TestMemoryBudget:
+    """Test the in-flight byte budget."""
+    
+    @pytest.mark.asyncio
+    async def test_acquire_waits_for_release(self):
+        budget = MemoryBudget(100)
+        await budget.acquire(60)
+        
+        waiting = asyncio.create_task(budget.acquire(60))
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+        
+        budget.release(60)
+        await asyncio.wait_for(waiting, 1)
+        assert (budget.reserved, budget.peak) == (60, 60)
+    
+    @pytest.mark.asyncio
+    async def test_oversized_reservation_runs_alone(self):
+        """A reservation larger than the budget is admitted once nothing else is held."""
+        budget = MemoryBudget(100)
+        await budget.acquire(10)
+        
+        waiting = asyncio.create_task(budget.acquire(500))
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+        
+        budget.release(10)
+        await asyncio.wait_for(waiting, 1)
+        assert budget.reserved == 500
+
+
+class TestPipelineLimits:
+    """Test size limits in the ingestion pipeline."""
+    
+    @pytest.mark.asyncio
+    async def test_oversized_file_fails_without_stopping(self, tmp_path):
+        write_documents(tmp_path, 3)
+        (tmp_path / "doc_01.md").write_text("# Big\n\n" + "word " * 400_000, encoding="utf-8")
+        pipeline = make_pipeline(tmp_path, FakeEmbedder(delay=0.0), max_file_mb=1)
+        
+        results = await pipeline.ingest_documents()
+        
+        assert [bool(r.errors) for r in results] == [False, True, False]
+        assert "size limit" in results[1].errors[0]
+        assert sorted(d["source"] for d in pipeline.documents.values()) == ["doc_00.md", "doc_02.md"]
+    
+    @pytest.mark.asyncio
+    async def test_memory_budget_bounds_documents_in_flight(self, tmp_path):
+        """With a budget of about two documents, at most two are held at once."""
+        write_documents(tmp_path, 12)
+        size = max(path.stat().st_size for path in tmp_path.iterdir())
+        pipeline = make_pipeline(
+            tmp_path, FakeEmbedder(delay=0.01), embed_workers=8, memory_budget_mb=2.5 * size / 2 ** 20
+        )
+        
+        results = await pipeline.ingest_documents()
+        
+        assert len(results) == 12 and not any(r.errors for r in results)
+        assert pipeline.memory_budget.peak <= 2.5 * size
+        assert pipeline.memory_budget.reserved == 0
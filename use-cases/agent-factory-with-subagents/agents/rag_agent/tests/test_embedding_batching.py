@@ -0,0 +1,159 @@
+"""Test token-packed, concurrent embedding requests."""
+
+import asyncio
+import time
+import pytest
+from types import SimpleNamespace
+
+from ..ingestion.chunker import DocumentChunk
+from ..ingestion.embedder import EmbeddingGenerator, TokenRateLimiter
+
+
+class FakeEmbeddingClient:
+    """Embedding client recording each request and rejecting poisoned inputs."""
+    
+    def __init__(self, delay: float = 0.0, poison: str = None):
+        self.delay = delay
+        self.poison = poison
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.embeddings = SimpleNamespace(create=self.create)
+    
+    async def create(self, model, input):
+        texts = [input] if isinstance(input, str) else list(input)
+        self.requests.append(texts)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.poison and any(self.poison in text for text in texts):
+                raise ValueError("invalid input")
+            return SimpleNamespace(data=[
+                SimpleNamespace(embedding=[float(len(text)), 1.0]) for text in texts
+            ])
+        finally:
+            self.in_flight -= 1
+
+
+def make_embedder(client, **kwargs) -> EmbeddingGenerator:
+    """Create an uncached embedder that retries without waiting."""
+    return EmbeddingGenerator(client=client, retry_delay=0.0, **kwargs)
+
+
+class TestTokenPacking:
+    """Test how texts are grouped into requests."""
+    
+    @pytest.mark.asyncio
+    async def test_requests_stay_within_token_limit(self):
+        """Requests are packed up to, never over, the token limit."""
+        client = FakeEmbeddingClient()
+        texts = [f"text {i} " + "word " * (20 * (i % 5 + 1)) for i in range(40)]
+        embedder = make_embedder(client)
+        embedder.max_batch_tokens = 3 * embedder.count_tokens(texts[-1])
+        
+        embeddings = await embedder.generate_embeddings_batch(texts)
+        
+        assert embeddings == [[float(len(text)), 1.0] for text in texts]
+        assert sum(len(request) for request in client.requests) == 40
+        for request in client.requests:
+            assert sum(embedder.count_tokens(text) for text in request) <= embedder.max_batch_tokens
+        assert 1 < len(client.requests) < 40
+    
+    @pytest.mark.asyncio
+    async def test_batch_size_caps_texts_per_request(self):
+        """Short texts are still split by the per-request text limit."""
+        client = FakeEmbeddingClient()
+        
+        await make_embedder(client, batch_size=4).generate_embeddings_batch([f"t{i}" for i in range(10)])
+        
+        assert [len(request) for request in sorted(client.requests, key=len, reverse=True)] == [4, 4, 2]
+    
+    @pytest.mark.asyncio
+    async def test_long_text_is_truncated(self):
+        """Texts over the model's input limit are cut to fit it."""
+        client = FakeEmbeddingClient()
+        embedder = make_embedder(client)
+        
+        await embedder.generate_embeddings_batch(["lorem ipsum " * 10000])
+        
+        assert embedder.count_tokens(client.requests[0][0]) <= embedder.config["max_tokens"]
+    
+    @pytest.mark.asyncio
+    async def test_empty_texts_are_not_sent(self):
+        """Empty texts get zero vectors without a request."""
+        client = FakeEmbeddingClient()
+        
+        embeddings = await make_embedder(client).generate_embeddings_batch(["", "text", "  "])
+        
+        assert client.requests == [["text"]]
+        assert embeddings[0] == [0.0] * 1536
+        assert embeddings[1] == [4.0, 1.0]
+
+
+class TestConcurrentRequests:
+    """Test request concurrency, bisection and rate limiting."""
+    
+    @pytest.mark.asyncio
+    async def test_requests_run_concurrently_up_to_limit(self):
+        """Packed requests overlap, bounded by max_concurrent_batches."""
+        client = FakeEmbeddingClient(delay=0.02)
+        embedder = make_embedder(client, batch_size=2, max_concurrent_batches=3)
+        
+        await embedder.generate_embeddings_batch([f"text {i}" for i in range(20)])
+        
+        assert len(client.requests) == 10
+        assert client.max_in_flight == 3
+    
+    @pytest.mark.asyncio
+    async def test_limit_is_shared_between_callers(self):
+        """Concurrent embed calls from several documents share the request limit."""
+        client = FakeEmbeddingClient(delay=0.02)
+        embedder = make_embedder(client, batch_size=1, max_concurrent_batches=2)
+        
+        await asyncio.gather(*(
+            embedder.generate_embeddings_batch([f"doc {d} chunk {c}" for c in range(3)])
+            for d in range(4)
+        ))
+        
+        assert client.max_in_flight == 2
+    
+    @pytest.mark.asyncio
+    async def test_failed_batch_is_bisected(self):
+        """A bad text is isolated by splitting instead of one call per text."""
+        client = FakeEmbeddingClient(poison="POISON")
+        texts = [f"text {i}" for i in range(32)]
+        texts[13] = "POISON"
+        embedder = make_embedder(client, max_retries=1)
+        
+        embeddings = await embedder.generate_embeddings_batch(texts)
+        
+        assert embeddings[13] == [0.0] * 1536
+        assert all(embeddings[i] == [float(len(texts[i])), 1.0] for i in range(32) if i != 13)
+        # One full request plus two halves per level: 1 + 2 * log2(32)
+        assert len(client.requests) == 11
+    
+    @pytest.mark.asyncio
+    async def test_failed_chunk_records_error(self):
+        """Chunks whose text cannot be embedded keep a zero vector and an error."""
+        client = FakeEmbeddingClient(poison="POISON")
+        chunks = [
+            DocumentChunk(content=text, index=i, start_char=0, end_char=len(text), metadata={})
+            for i, text in enumerate(["good text", "POISON", "more text"])
+        ]
+        
+        embedded = await make_embedder(client, max_retries=1).embed_chunks(chunks)
+        
+        assert [chunk.metadata.get("embedding_error") is not None for chunk in embedded] == [False, True, False]
+        assert embedded[0].embedding == [9.0, 1.0]
+    
+    @pytest.mark.asyncio
+    async def test_rate_limiter_paces_tokens(self):
+        """Spending more than the bucket holds waits for it to refill."""
+        limiter = TokenRateLimiter(tokens_per_minute=60_000)
+        await limiter.acquire(60_000)
+        
+        start = time.monotonic()
+        await limiter.acquire(100)
+        
+        assert time.monotonic() - start >= 0.09
@@ -0,0 +1,177 @@
+"""Test the persistent embedding cache and its use by embedders."""
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from ..dependencies import RAGAgentDependencies
+from ..ingestion.embedder import EmbeddingCache, EmbeddingGenerator
+from ..utils.embedding_cache import PersistentEmbeddingCache
+
+
+def fake_client():
+    """Embedding client returning one vector per input and counting inputs."""
+    client = SimpleNamespace(embeddings=SimpleNamespace(), inputs=[])
+    
+    async def create(model, input):
+        texts = [input] if isinstance(input, str) else list(input)
+        client.inputs.extend(texts)
+        return SimpleNamespace(data=[
+            SimpleNamespace(embedding=[float(len(text)), 0.5, -1.0]) for text in texts
+        ])
+    
+    client.embeddings.create = AsyncMock(side_effect=create)
+    return client
+
+
+class TestPersistentEmbeddingCache:
+    """Test SQLite-backed cache behaviour."""
+    
+    def test_round_trip_as_float32(self, tmp_path):
+        """Embeddings are stored per model and returned as float32 values."""
+        cache = PersistentEmbeddingCache(str(tmp_path / "cache.sqlite"))
+        cache.put("model-a", "hello", [0.1, 0.25, -2.0])
+        
+        assert cache.get("model-a", "hello") == pytest.approx([0.1, 0.25, -2.0])
+        assert cache.get("model-b", "hello") is None
+        assert cache.size_bytes == 12
+    
+    def test_survives_restart(self, tmp_path):
+        """A reopened cache serves embeddings stored by a previous process."""
+        path = str(tmp_path / "cache.sqlite")
+        cache = PersistentEmbeddingCache(path)
+        cache.put_many("model", ["a", "b"], [[1.0], [2.0]])
+        cache.close()
+        
+        reopened = PersistentEmbeddingCache(path)
+        
+        assert reopened.get_many("model", ["a", "b", "c"]) == [[1.0], [2.0], None]
+        assert reopened.stats()["hits"] == 2
+    
+    def test_evicts_least_recently_used(self, tmp_path):
+        """The least recently used entry is evicted, including after a restart."""
+        path = str(tmp_path / "cache.sqlite")
+        cache = PersistentEmbeddingCache(path, max_entries=3)
+        cache.put_many("model", ["a", "b", "c"], [[1.0], [2.0], [3.0]])
+        cache.get("model", "a")
+        cache.close()
+        
+        cache = PersistentEmbeddingCache(path, max_entries=3)
+        cache.put("model", "d", [4.0])
+        
+        assert cache.get("model", "b") is None
+        assert cache.get_many("model", ["a", "c", "d"]) == [[1.0], [3.0], [4.0]]
+        assert len(cache) == 3
+    
+    def test_shared_between_processes(self, tmp_path):
+        """Entries written or evicted through another connection are seen without reopening."""
+        path = str(tmp_path / "cache.sqlite")
+        reader = PersistentEmbeddingCache(path)
+        writer = PersistentEmbeddingCache(path)
+        
+        assert reader.get("model", "text") is None
+        writer.put("model", "text", [1.0, 2.0])
+        
+        assert reader.get("model", "text") == [1.0, 2.0]
+        assert len(reader) == 1 and reader.size_bytes == 8
+        
+        writer.clear()
+        assert reader.get("model", "text") is None
+        assert len(reader) == 0 and reader.size_bytes == 0
+        reader.close()
+        writer.close()
+    
+    def test_byte_limit(self, tmp_path):
+        """Entries are evicted once stored vectors exceed the byte limit."""
+        cache = PersistentEmbeddingCache(str(tmp_path / "cache.sqlite"), max_bytes=64)
+        
+        cache.put_many("model", [f"text {i}" for i in range(10)], [[float(i)] * 4 for i in range(10)])
+        
+        assert cache.size_bytes <= 64
+        assert len(cache) == 4
+        assert cache.get("model", "text 9") == [9.0] * 4
+
+
+class TestInMemoryEmbeddingCache:
+    """Test the in-memory LRU cache."""
+    
+    def test_evicts_least_recently_used(self):
+        """Reading an entry protects it from eviction."""
+        cache = EmbeddingCache(max_size=2)
+        cache.put("model", "a", [1.0])
+        cache.put("model", "b", [2.0])
+        cache.get("model", "a")
+        cache.put("model", "c", [3.0])
+        
+        assert cache.get_many("model", ["a", "b", "c"]) == [[1.0], None, [3.0]]
+
+
+class TestEmbeddingGeneratorCache:
+    """Test that embedders only call the API for uncached texts."""
+    
+    @pytest.mark.asyncio
+    async def test_repeat_batch_hits_cache(self, tmp_path):
+        """Re-embedding the same texts after a restart makes no API calls."""
+        path = str(tmp_path / "cache.sqlite")
+        client = fake_client()
+        texts = ["first chunk", "second chunk", "third chunk"]
+        
+        first = await EmbeddingGenerator(client=client, cache=PersistentEmbeddingCache(path)).generate_embeddings_batch(texts)
+        calls = client.embeddings.create.await_count
+        
+        embedder = EmbeddingGenerator(client=client, cache=PersistentEmbeddingCache(path))
+        second = await embedder.generate_embeddings_batch(texts)
+        
+        assert client.embeddings.create.await_count == calls
+        assert second == first
+    
+    @pytest.mark.asyncio
+    async def test_only_missing_texts_are_requested(self, tmp_path):
+        """A partially cached batch requests only the missing texts."""
+        client = fake_client()
+        embedder = EmbeddingGenerator(client=client, cache=PersistentEmbeddingCache(str(tmp_path / "c.sqlite")))
+        await embedder.generate_embeddings_batch(["a", "b"])
+        client.inputs.clear()
+        
+        embeddings = await embedder.generate_embeddings_batch(["a", "new text", "b"])
+        
+        assert client.inputs == ["new text"]
+        assert embeddings[1] == [8.0, 0.5, -1.0]
+    
+    @pytest.mark.asyncio
+    async def test_query_embedding_shares_cache(self, tmp_path):
+        """Query embeddings reuse vectors stored by a batch run."""
+        cache = PersistentEmbeddingCache(str(tmp_path / "cache.sqlite"))
+        client = fake_client()
+        embedder = EmbeddingGenerator(client=client, cache=cache)
+        await embedder.generate_embeddings_batch(["what is rag"])
+        calls = client.embeddings.create.await_count
+        
+        assert await embedder.embed_query("what is rag") == [11.0, 0.5, -1.0]
+        assert client.embeddings.create.await_count == calls
+
+
+class TestDependenciesEmbeddingCache:
+    """Test query-time embedding through agent dependencies."""
+    
+    @pytest.mark.asyncio
+    async def test_repeated_query_hits_cache(self, tmp_path):
+        """A repeated query is answered from the cache without an API call."""
+        client = fake_client()
+        deps = RAGAgentDependencies(
+            openai_client=client,
+            settings=SimpleNamespace(
+                embedding_model="text-embedding-3-small",
+                query_embedding_cache_size=1024,
+                query_embedding_cache_ttl=600,
+                query_embedding_batch_window_ms=5,
+                query_embedding_max_batch_size=64
+            ),
+            embedding_cache=PersistentEmbeddingCache(str(tmp_path / "cache.sqlite"))
+        )
+        
+        first = await deps.get_embedding("How does hybrid search work?")
+        second = await deps.get_embedding("How does hybrid search work?")
+        
+        assert client.embeddings.create.await_count == 1
+        assert second == first
@@ -0,0 +1,124 @@
+"""Test the labelled query set, ranking metrics and retrieval benchmark."""
+
+import pytest
+
+from ..ingestion.embedder import create_embedder
+from ..ingestion.retrieval_benchmark import run_benchmark
+from ..utils.evaluation import (
+    LabelledQuery, build_query_set, first_relevant_rank, is_relevant,
+    latency_metrics, load_query_set, ranking_metrics, save_query_set
+)
+from ..utils.local_embeddings import HASHING_EMBEDDING_MODEL, LocalEmbeddingClient
+
+PGVECTOR_DOC = """# Pgvector Guide
+
+Intro paragraph.
+
+## Index Types
+
+Short line.
+HNSW indexes trade memory and build time for fast approximate vector search.
+
+## Tuning
+
+- **ef_search** controls how many candidates HNSW visits per query at search time.
+"""
+
+FUNDING_DOC = """# Funding Report
+
+## Venture Rounds
+
+Venture capital investment in AI startups doubled compared to the previous year.
+"""
+
+
+@pytest.fixture
+def documents(tmp_path):
+    """A small documents folder with two markdown files."""
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "pgvector.md").write_text(PGVECTOR_DOC)
+    (docs / "funding.md").write_text(FUNDING_DOC)
+    return docs
+
+
+class TestQuerySet:
+    """Test building and storing labelled queries."""
+    
+    def test_sections_become_queries(self, documents):
+        """Each section heading yields one query answered by its first substantial line."""
+        queries = build_query_set(str(documents))
+        
+        assert [query.query for query in queries] == [
+            "Venture Rounds - Funding Report",
+            "Index Types - Pgvector Guide",
+            "Tuning - Pgvector Guide"
+        ]
+        assert queries[1].source == "pgvector.md"
+        assert queries[1].answer.startswith("HNSW indexes trade memory")
+        assert queries[2].answer.startswith("- **ef_search** controls")
+    
+    def test_save_and_load_round_trip(self, documents, tmp_path):
+        """A saved query set loads back unchanged."""
+        queries = build_query_set(str(documents))
+        path = tmp_path / "queries.json"
+        save_query_set(queries, str(path))
+        
+        assert load_query_set(str(path)) == queries
+    
+    def test_relevance_ignores_line_wraps(self):
+        """A chunk is relevant when it holds the answer from the same document."""
+        query = LabelledQuery("q", "a.md", "HNSW indexes trade memory and build time for fast search.")
+        wrapped = {"document_source": "a.md", "content": "Intro.\nHNSW indexes trade\nmemory and build time for fast search."}
+        
+        assert is_relevant(query, wrapped)
+        assert not is_relevant(query, {**wrapped, "document_source": "b.md"})
+        assert first_relevant_rank(query, [{"document_source": "a.md", "content": "other"}, wrapped]) == 2
+        assert first_relevant_rank(query, []) is None
+
+
+class TestMetrics:
+    """Test ranking and latency metrics."""
+    
+    def test_recall_and_mrr(self):
+        """Recall@k counts answers within the top k; MRR averages reciprocal ranks."""
+        metrics = ranking_metrics([1, 3, None, 2], ks=[1, 3])
+        
+        assert metrics["recall@1"] == 0.25
+        assert metrics["recall@3"] == 0.75
+        assert metrics["mrr"] == pytest.approx((1 + 1 / 3 + 1 / 2) / 4, abs=1e-4)
+    
+    def test_empty_inputs(self):
+        """No queries give zero metrics rather than errors."""
+        assert ranking_metrics([], ks=[5]) == {"recall@5": 0.0, "mrr": 0.0}
+        assert latency_metrics([]) == {"p50_ms": 0.0, "p95_ms": 0.0}
+        assert latency_metrics([1.0, 2.0, 3.0])["p50_ms"] == 2.0
+
+
+class TestRetrievalBenchmark:
+    """Test the benchmark grid on a tiny corpus."""
+    
+    @pytest.mark.asyncio
+    async def test_reports_every_combination(self, documents):
+        """One result per chunk size, mode and text weight, with quality and latency."""
+        queries = build_query_set(str(documents))
+        embedder = create_embedder(HASHING_EMBEDDING_MODEL, use_cache=False, client=LocalEmbeddingClient())
+        
+        results = await run_benchmark(
+            str(documents), queries, embedder,
+            chunkers=["simple"], chunk_sizes=[200, 400],
+            modes=["vector", "hybrid", "rerank"], text_weights=[0.0, 0.5],
+            ks=[1, 3], concurrency=2
+        )
+        
+        assert len(results) == 2 * 4
+        assert {(r["chunk_size"], r["mode"], r["text_weight"]) for r in results} >= {
+            (200, "vector", None), (400, "hybrid", 0.0), (400, "hybrid", 0.5), (200, "rerank", None)
+        }
+        for result in results:
+            assert result["chunks"] > 0
+            assert result["index"] == "exact"
+            assert 0.0 <= result["recall@1"] <= result["recall@3"] <= 1.0
+            assert result["p95_ms"] >= result["p50_ms"] > 0
+            assert result["qps"] > 0
+        assert max(result["recall@3"] for result in results) > 0
@@ -0,0 +1,405 @@
+"""Test the staged document ingestion pipeline."""
+
+import os
+import asyncio
+import pytest
+import numpy as np
+from typing import Any, Dict, List, Sequence, Tuple
+
+from ..ingestion.chunker import ChunkingConfig, DocumentChunk
+from ..ingestion.ingest import DocumentIngestionPipeline, content_hash, parse_document
+from ..utils.db_utils import decode_vector, encode_vector
+from ..utils.models import IngestionConfig
+
+
+class FakeEmbedder:
+    """Embedder that records how many documents are embedded at once."""
+    
+    model = "fake-embedding"
+    
+    def __init__(self, delay: float = 0.02, fail_on: str = None):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.embedded_chunks = 0
+    
+    async def embed_chunks(self, chunks: List[DocumentChunk]) -> List[DocumentChunk]:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.fail_on and any(self.fail_on in chunk.content for chunk in chunks):
+                raise RuntimeError("embedding service unavailable")
+            for chunk in chunks:
+                chunk.embedding = [0.1, 0.2, 0.3]
+            self.embedded_chunks += len(chunks)
+            return chunks
+        finally:
+            self.in_flight -= 1
+
+
+class InMemoryPipeline(DocumentIngestionPipeline):
+    """Pipeline that stores documents in memory instead of PostgreSQL."""
+    
+    def __init__(self, *args, store_delay: float = 0.0, fail_on: str = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.store_delay = store_delay
+        self.fail_on = fail_on
+        self.stored: List[str] = []
+        self.batches: List[int] = []
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self.index_tuned = 0
+    
+    async def initialize(self):
+        self._initialized = True
+    
+    async def close(self):
+        self._initialized = False
+    
+    async def _save_documents_to_postgres(
+        self,
+        documents: List[Tuple],
+        replaced_ids: Sequence[str] = ()
+    ) -> List[str]:
+        await asyncio.sleep(self.store_delay)
+        self.batches.append(len(documents))
+        ids = []
+        for _, source, content, chunks, metadata in documents:
+            if self.fail_on and self.fail_on in content:
+                raise RuntimeError("constraint violation")
+            assert all(chunk.embedding for chunk in chunks)
+            ids.append(f"doc-{len(self.stored) + len(ids) + 1}")
+        
+        await self._delete_documents(replaced_ids)
+        for document_id, (_, source, _, chunks, metadata) in zip(ids, documents):
+            self.documents[document_id] = {"source": source, "metadata": metadata, "chunks": chunks}
+        self.stored.extend(source for _, source, _, _, _ in documents)
+        return ids
+    
+    async def _load_manifest(self):
+        manifest = {}
+        for document_id, document in self.documents.items():
+            ids, _ = manifest.setdefault(document["source"], ([], document["metadata"]["content_hash"]))
+            ids.append(document_id)
+        return manifest
+    
+    async def _load_chunk_embeddings(self, document_ids):
+        return {
+            chunk.metadata["content_hash"]: chunk.embedding
+            for document_id in document_ids
+            for chunk in self.documents[document_id]["chunks"]
+        }
+    
+    async def _delete_documents(self, document_ids):
+        for document_id in document_ids:
+            del self.documents[document_id]
+    
+    async def _find_dangling_duplicates(self):
+        stored = {
+            chunk.metadata["content_hash"]
+            for document in self.documents.values()
+            for chunk in document["chunks"]
+        }
+        return sorted({
+            document["source"]
+            for document in self.documents.values()
+            for link in document["metadata"].get("duplicate_chunks", [])
+            if link["duplicate_of"] not in stored
+        })
+    
+    async def _tune_vector_index(self):
+        self.index_tuned += 1
+
+
+def write_documents(folder, count: int, marker_at: int = None):
+    """Write markdown documents doc_00.md ... into folder."""
+    for i in range(count):
+        body = f"# Document {i}\n\nParagraph about topic {i}.\n\nSecond paragraph."
+        if i == marker_at:
+            body += "\n\nBROKEN"
+        (folder / f"doc_{i:02d}.md").write_text(body, encoding="utf-8")
+
+
+def make_pipeline(folder, embedder, **config) -> InMemoryPipeline:
+    """Create an in-memory pipeline with simple chunking."""
+    store_delay = config.pop("store_delay", 0.0)
+    fail_on = config.pop("fail_on", None)
+    # Chunk in threads unless a test asks for worker processes
+    config.setdefault("chunk_processes", 0)
+    return InMemoryPipeline(
+        config=IngestionConfig(use_semantic_chunking=False, **config),
+        documents_folder=str(folder),
+        embedder=embedder,
+        store_delay=store_delay,
+        fail_on=fail_on
+    )
+
+
+class TestIngestionPipeline:
+    """Test staged ingestion concurrency and result handling."""
+    
+    @pytest.mark.asyncio
+    async def test_embedding_overlaps_across_documents(self, tmp_path):
+        """Embed workers process several documents concurrently."""
+        write_documents(tmp_path, 12)
+        embedder = FakeEmbedder(delay=0.05)
+        pipeline = make_pipeline(tmp_path, embedder, embed_workers=4)
+        
+        results = await pipeline.ingest_documents()
+        
+        assert len(results) == 12
+        assert embedder.max_in_flight == 4
+        assert len(pipeline.stored) == 12
+    
+    @pytest.mark.asyncio
+    async def test_results_keep_file_order(self, tmp_path):
+        """Results are returned in file order regardless of completion order."""
+        write_documents(tmp_path, 8)
+        pipeline = make_pipeline(tmp_path, FakeEmbedder(delay=0.01), embed_workers=8, store_workers=8)
+        progress = []
+        
+        results = await pipeline.ingest_documents(lambda done, total: progress.append((done, total)))
+        
+        assert [r.title for r in results] == [f"Document {i}" for i in range(8)]
+        assert all(r.chunks_created > 0 and not r.errors for r in results)
+        assert progress[-1] == (8, 8)
+        assert [done for done, _ in progress] == list(range(1, 9))
+        # The ANN index is tuned once, after all documents are stored
+        assert pipeline.index_tuned == 1
+    
+    @pytest.mark.asyncio
+    async def test_failed_document_does_not_stop_pipeline(self, tmp_path):
+        """A failing document gets an error result while others are stored."""
+        write_documents(tmp_path, 5, marker_at=2)
+        pipeline = make_pipeline(tmp_path, FakeEmbedder(fail_on="BROKEN"))
+        
+        results = await pipeline.ingest_documents()
+        
+        assert results[2].errors == ["embedding service unavailable"]
+        assert results[2].document_id == ""
+        assert len(pipeline.stored) == 4
+        assert all(not r.errors for i, r in enumerate(results) if i != 2)
+    
+    @pytest.mark.asyncio
+    async def test_slow_store_applies_backpressure(self, tmp_path):
+        """A slow store stage limits how far embedding runs ahead."""
+        write_documents(tmp_path, 10)
+        embedder = FakeEmbedder(delay=0.0)
+        pipeline = make_pipeline(
+            tmp_path, embedder,
+            chunk_workers=1, embed_workers=1, store_workers=1, queue_size=1, store_delay=0.02
+        )
+        
+        embedded = 0
+        original = embedder.embed_chunks
+        
+        async def counting_embed(chunks):
+            nonlocal embedded
+            embedded += 1
+            # One document being stored, one queued, one held by the embed worker
+            assert embedded - len(pipeline.stored) <= 3
+            return await original(chunks)
+        
+        embedder.embed_chunks = counting_embed
+        
+        results = await pipeline.ingest_documents()
+        
+        assert len(results) == 10
+        assert len(pipeline.stored) == 10
+    
+    @pytest.mark.asyncio
+    async def test_store_batches_waiting_documents(self, tmp_path):
+        """A busy store worker writes the documents queued behind it in one batch."""
+        write_documents(tmp_path, 12)
+        pipeline = make_pipeline(
+            tmp_path, FakeEmbedder(delay=0.0),
+            store_workers=1, store_batch_size=4, store_delay=0.02
+        )
+        
+        results = await pipeline.ingest_documents()
+        
+        assert len(pipeline.stored) == 12
+        assert max(pipeline.batches) == 4
+        assert len(pipeline.batches) < 12
+        assert len({r.document_id for r in results}) == 12
+    
+    @pytest.mark.asyncio
+    async def test_failed_batch_retries_documents_individually(self, tmp_path):
+        """Only the bad document fails when its batch write is rejected."""
+        write_documents(tmp_path, 6, marker_at=3)
+        pipeline = make_pipeline(
+            tmp_path, FakeEmbedder(delay=0.0),
+            store_workers=1, store_batch_size=6, store_delay=0.01, fail_on="BROKEN"
+        )
+        
+        results = await pipeline.ingest_documents()
+        
+        assert results[3].errors == ["constraint violation"]
+        assert len(pipeline.stored) == 5
+        assert all(not r.errors for i, r in enumerate(results) if i != 3)
+
+
+class TestIncrementalIngestion:
+    """Test content-hash based re-ingestion."""
+    
+    @pytest.mark.asyncio
+    async def test_unchanged_corpus_is_skipped(self, tmp_path):
+        """A second incremental run embeds and stores nothing."""
+        write_documents(tmp_path, 5)
+        embedder = FakeEmbedder(delay=0.0)
+        pipeline = make_pipeline(tmp_path, embedder, incremental=True)
+        await pipeline.ingest_documents()
+        first_embedded = embedder.embedded_chunks
+        
+        results = await pipeline.ingest_documents()
+        
+        assert all(r.unchanged for r in results)
+        assert embedder.embedded_chunks == first_embedded
+        assert len(pipeline.documents) == 5
+        assert {r.document_id for r in results} == set(pipeline.documents)
+    
+    @pytest.mark.asyncio
+    async def test_changed_file_reuses_unchanged_chunks(self, tmp_path):
+        """Only edited chunks are embedded and the old version is replaced."""
+        for i in range(3):
+            paragraphs = [f"Paragraph {p} of file {i}. " * 20 for p in range(4)]
+            (tmp_path / f"doc_{i}.md").write_text(f"# Doc {i}\n\n" + "\n\n".join(paragraphs), encoding="utf-8")
+        embedder = FakeEmbedder(delay=0.0)
+        pipeline = make_pipeline(tmp_path, embedder, incremental=True, chunk_size=200, chunk_overlap=0)
+        await pipeline.ingest_documents()
+        
+        text = (tmp_path / "doc_1.md").read_text(encoding="utf-8")
+        (tmp_path / "doc_1.md").write_text(text + "\n\nA new closing paragraph.", encoding="utf-8")
+        embedder.embedded_chunks = 0
+        
+        results = await pipeline.ingest_documents()
+        
+        assert [r.unchanged for r in results] == [True, False, True]
+        assert results[1].chunks_reused > 0
+        assert embedder.embedded_chunks == results[1].chunks_created - results[1].chunks_reused
+        assert sorted(d["source"] for d in pipeline.documents.values()) == ["doc_0.md", "doc_1.md", "doc_2.md"]
+    
+    @pytest.mark.asyncio
+    async def test_removed_file_is_deleted(self, tmp_path):
+        """Documents whose files were deleted are removed from the store."""
+        write_documents(tmp_path, 3)
+        pipeline = make_pipeline(tmp_path, FakeEmbedder(delay=0.0), incremental=True)
+        await pipeline.ingest_documents()
+        
+        (tmp_path / "doc_02.md").unlink()
+        results = await pipeline.ingest_documents()
+        
+        assert len(results) == 2
+        assert pipeline.removed_sources == ["doc_02.md"]
+        assert sorted(d["source"] for d in pipeline.documents.values()) == ["doc_00.md", "doc_01.md"]
+    
+    @pytest.mark.asyncio
+    async def test_missing_folder_deletes_nothing(self, tmp_path):
+        """A folder that is gone (or unmounted) is not treated as empty."""
+        write_documents(tmp_path, 3)
+        pipeline = make_pipeline(tmp_path, FakeEmbedder(delay=0.0), incremental=True)
+        await pipeline.ingest_documents()
+        
+        pipeline.documents_folder = str(tmp_path / "missing")
+        
+        assert await pipeline.ingest_documents() == []
+        assert pipeline.removed_sources == []
+        assert len(pipeline.documents) == 3
+    
+    @pytest.mark.asyncio
+    async def test_unreadable_folder_deletes_nothing(self, tmp_path, monkeypatch):
+        """Documents under a folder the walk could not read are kept."""
+        write_documents(tmp_path, 2)
+        (tmp_path / "sub").mkdir()
+        write_documents(tmp_path / "sub", 2)
+        pipeline = make_pipeline(tmp_path, FakeEmbedder(delay=0.0), incremental=True)
+        await pipeline.ingest_documents()
+        
+        scandir = os.scandir
+        
+        def failing_scandir(path):
+            if os.path.basename(path) == "sub":
+                raise PermissionError("Permission denied")
+            return scandir(path)
+        
+        monkeypatch.setattr(os, "scandir", failing_scandir)
+        results = await pipeline.ingest_documents()
+        
+        assert len(results) == 2
+        assert pipeline.removed_sources == []
+        assert len(pipeline.documents) == 4
+
+
+class TestProcessPoolChunking:
+    """Test parsing and chunking outside the event loop."""
+    
+    def test_parse_document_extracts_metadata_and_chunks(self, tmp_path):
+        """The worker function returns metadata and hashed chunks."""
+        path = tmp_path / "doc.md"
+        path.write_text("---\nauthor: Ada\n---\n# Notes\n\n" + "Some words here. " * 100, encoding="utf-8")
+        
+        title, content, digest, metadata, chunks = parse_document(
+            str(path), "doc.md", str(tmp_path), None, ChunkingConfig(chunk_size=500, chunk_overlap=50)
+        )
+        
+        assert title == "Notes"
+        assert digest == content_hash(content)
+        assert metadata["author"] == "Ada"
+        assert metadata["word_count"] == len(content.split())
+        assert len(chunks) > 1
+        assert all(chunk.metadata["content_hash"] == content_hash(chunk.content) for chunk in chunks)
+    
+    def test_unchanged_document_is_not_parsed(self, tmp_path):
+        """A matching previous hash skips metadata extraction and chunking."""
+        path = tmp_path / "doc.md"
+        path.write_text("# Same\n\nUnchanged text.", encoding="utf-8")
+        
+        _, content, digest, metadata, chunks = parse_document(
+            str(path), "doc.md", str(tmp_path), content_hash("# Same\n\nUnchanged text."), ChunkingConfig()
+        )
+        
+        assert (metadata, chunks) == (None, None)
+    
+    @pytest.mark.asyncio
+    async def test_process_pool_matches_threads(self, tmp_path):
+        """Documents chunked in worker processes match those chunked in threads."""
+        write_documents(tmp_path, 6)
+        
+        threaded = make_pipeline(tmp_path, FakeEmbedder(delay=0.0), chunk_processes=0)
+        pooled = make_pipeline(tmp_path, FakeEmbedder(delay=0.0), chunk_processes=2)
+        
+        expected = await threaded.ingest_documents()
+        results = await pooled.ingest_documents()
+        
+        assert [r.chunks_created for r in results] == [r.chunks_created for r in expected]
+        
+        def contents(pipeline):
+            return sorted((doc["source"], [c.content for c in doc["chunks"]]) for doc in pipeline.documents.values())
+        
+        assert contents(pooled) == contents(threaded)
+        assert pooled._process_pool is None
+
+
+class TestVectorCodec:
+    """Test the binary pgvector codec."""
+    
+    def test_round_trip(self):
+        """Vectors survive encoding in pgvector's binary format."""
+        vector = [0.5, -1.25, 3.0, 0.0]
+        
+        data = encode_vector(vector)
+        
+        assert data[:4] == b"\x00\x04\x00\x00"
+        assert len(data) == 4 + 4 * len(vector)
+        assert decode_vector(data) == vector
+    
+    def test_text_literal_accepted(self):
+        """Text literals used by older call sites are encoded too."""
+        assert decode_vector(encode_vector("[1,2.5,-3]")) == [1.0, 2.5, -3.0]
+    
+    def test_numpy_array_encoded_like_list(self):
+        """NumPy vectors are packed directly, matching the list encoding."""
+        vector = np.array([0.5, -1.25, 3.0], dtype=np.float64)
+        
+        assert encode_vector(vector) == encode_vector(vector.tolist())
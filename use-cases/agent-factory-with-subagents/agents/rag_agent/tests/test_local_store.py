@@ -0,0 +1,213 @@
+"""Test the offline local vector store and hashing embeddings."""
+
+import pytest
+import numpy as np
+from types import SimpleNamespace
+from typing import List, Sequence
+
+from ..ingestion.embedder import create_embedder
+from ..ingestion.ingest import DocumentIngestionPipeline
+from ..utils.local_embeddings import HASHING_EMBEDDING_MODEL, HashingEmbedder, LocalEmbeddingClient
+from ..utils.local_store import LocalVectorStore
+from ..utils.models import IngestionConfig
+
+EMBEDDER = HashingEmbedder(dimensions=256)
+
+
+def make_chunks(texts: Sequence[str], embed: bool = True) -> List[SimpleNamespace]:
+    """Chunks shaped like ingestion's DocumentChunk."""
+    return [
+        SimpleNamespace(
+            content=text,
+            index=i,
+            metadata={"content_hash": f"hash-{text}", "embedding_model": "hashing"},
+            token_count=len(text.split()),
+            embedding=EMBEDDER.embed(text).tolist() if embed else None
+        )
+        for i, text in enumerate(texts)
+    ]
+
+
+def document(title: str, texts: Sequence[str], root: str = "/docs") -> tuple:
+    return (title, f"{title}.md", " ".join(texts), make_chunks(texts), {"ingest_root": root, "content_hash": title})
+
+
+class TestHashingEmbedder:
+    """Test deterministic local embeddings."""
+    
+    def test_same_text_same_vector(self):
+        """Embeddings do not depend on the process or instance."""
+        first = HashingEmbedder(dimensions=64).embed("Vector search with pgvector")
+        second = HashingEmbedder(dimensions=64).embed("vector SEARCH with pgvector")
+        
+        assert np.array_equal(first, second)
+        assert np.linalg.norm(first) == pytest.approx(1.0)
+    
+    def test_shared_words_are_closer(self):
+        """Texts sharing words are more similar than unrelated ones."""
+        query = EMBEDDER.embed("hybrid search ranking")
+        related = EMBEDDER.embed("ranking results of hybrid search")
+        unrelated = EMBEDDER.embed("quarterly funding of startups")
+        
+        assert query @ related > query @ unrelated
+    
+    @pytest.mark.asyncio
+    async def test_client_matches_openai_response_shape(self):
+        """The local client answers embeddings.create like the OpenAI client."""
+        client = LocalEmbeddingClient(dimensions=32)
+        response = await client.embeddings.create(model=HASHING_EMBEDDING_MODEL, input=["a b", "c"])
+        
+        assert [len(item.embedding) for item in response.data] == [32, 32]
+        assert response.data[0].embedding == client.embedder.embed("a b").tolist()
+
+
+class TestLocalVectorStore:
+    """Test storage and search in the local store."""
+    
+    @pytest.mark.asyncio
+    async def test_vector_search_returns_nearest_chunks(self, tmp_path):
+        """Results carry the match_chunks columns, most similar first."""
+        store = LocalVectorStore(str(tmp_path))
+        await store.save_documents([
+            document("rag", ["retrieval augmented generation", "vector databases store embeddings"]),
+            document("funding", ["startups raised venture funding"])
+        ])
+        
+        results = await store.vector_search(EMBEDDER.embed("vector databases").tolist(), 2, with_embeddings=True)
+        
+        assert results[0]["content"] == "vector databases store embeddings"
+        assert results[0]["document_title"] == "rag"
+        assert results[0]["metadata"]["content_hash"] == "hash-vector databases store embeddings"
+        assert results[0]["similarity"] >= results[1]["similarity"]
+        assert len(results[0]["embedding"]) == 256
+        await store.close()
+    
+    @pytest.mark.asyncio
+    async def test_replace_and_delete(self, tmp_path):
+        """Replaced and deleted documents disappear from the manifest and searches."""
+        store = LocalVectorStore(str(tmp_path))
+        old_id, other_id = await store.save_documents([document("a", ["old text"]), document("b", ["other text"])])
+        new_ids = await store.save_documents([document("a", ["new text"])], replaced_ids=[old_id])
+        
+        manifest = await store.load_manifest("/docs")
+        assert manifest == {"a.md": (new_ids, "a"), "b.md": ([other_id], "b")}
+        assert set(await store.load_chunk_embeddings(new_ids, "hashing")) == {"hash-new text"}
+        
+        await store.delete_documents([other_id])
+        results = await store.vector_search(EMBEDDER.embed("text").tolist(), 10)
+        assert [result["content"] for result in results] == ["new text"]
+        await store.close()
+    
+    @pytest.mark.asyncio
+    async def test_data_persists_after_reopen(self, tmp_path):
+        """A reopened store serves the same results, including after compaction."""
+        store = LocalVectorStore(str(tmp_path))
+        ids = await store.save_documents([document(f"doc{i}", [f"topic {i} text"]) for i in range(5)])
+        await store.delete_documents(ids[:2])
+        await store.optimize()
+        query = EMBEDDER.embed("topic 3").tolist()
+        before = await store.vector_search(query, 3)
+        await store.close()
+        
+        reopened = LocalVectorStore(str(tmp_path))
+        after = await reopened.vector_search(query, 3)
+        
+        assert reopened.rows == 3
+        assert after == before
+        await reopened.close()
+    
+    @pytest.mark.asyncio
+    async def test_chunks_without_embeddings_are_only_found_by_keywords(self, tmp_path):
+        """Chunks missing an embedding are kept but skipped by vector search."""
+        store = LocalVectorStore(str(tmp_path))
+        await store.save_documents([
+            ("t", "t.md", "", make_chunks(["pgvector index tuning"], embed=False), {}),
+            document("u", ["embedding cache"])
+        ])
+        query = EMBEDDER.embed("pgvector index").tolist()
+        
+        assert [r["content"] for r in await store.vector_search(query, 5)] == ["embedding cache"]
+        hybrid = await store.hybrid_search(query, "pgvector index", 5, text_weight=0.8)
+        assert hybrid[0]["content"] == "pgvector index tuning"
+        assert hybrid[0]["vector_similarity"] is None
+        await store.close()
+    
+    @pytest.mark.asyncio
+    async def test_hybrid_search_fuses_keyword_and_vector_ranks(self, tmp_path):
+        """An exact keyword match is lifted by the text ranks, as in the SQL function."""
+        store = LocalVectorStore(str(tmp_path))
+        await store.save_documents([
+            document("d", ["error code E1234 in the ingestion pipeline", "ingestion pipeline overview"])
+        ])
+        query = EMBEDDER.embed("ingestion pipeline").tolist()
+        
+        vector_only = await store.hybrid_search(query, "E1234", 2, text_weight=0.0)
+        keyword_heavy = await store.hybrid_search(query, "E1234", 2, text_weight=0.9)
+        
+        assert vector_only[0]["content"] == "ingestion pipeline overview"
+        assert keyword_heavy[0]["content"] == "error code E1234 in the ingestion pipeline"
+        assert keyword_heavy[0]["text_similarity"] > 0
+        assert keyword_heavy[0]["combined_score"] == pytest.approx(0.1 / 62 + 0.9 / 61)
+        await store.close()
+    
+    @pytest.mark.asyncio
+    async def test_ivf_index_recall(self, tmp_path):
+        """IVF search finds the exact neighbours on clustered data and survives new rows."""
+        rng = np.random.default_rng(0)
+        centers = rng.standard_normal((8, 32))
+        vectors = (centers[rng.integers(8, size=400)] + 0.1 * rng.standard_normal((400, 32))).astype(np.float32)
+        chunks = [
+            SimpleNamespace(content=f"chunk {i}", index=i, metadata={}, token_count=2, embedding=vector.tolist())
+            for i, vector in enumerate(vectors)
+        ]
+        store = LocalVectorStore(str(tmp_path), ivf_min_rows=100)
+        await store.save_documents([("d", "d.md", "", chunks[:300], {})])
+        queries = [vector.tolist() for vector in vectors[::17]]
+        exact = [[r["chunk_id"] for r in await store.vector_search(q, 10)] for q in queries]
+        
+        assert await store.optimize() is not None
+        assert store.index.lists == 17
+        found = [[r["chunk_id"] for r in await store.vector_search(q, 10)] for q in queries]
+        recall = np.mean([len(set(a) & set(b)) / 10 for a, b in zip(exact, found)])
+        assert recall >= 0.9
+        
+        await store.save_documents([("e", "e.md", "", chunks[300:], {})])
+        results = await store.vector_search(vectors[350].tolist(), 1, probes=1)
+        assert results[0]["content"] == "chunk 350"
+        assert await store.optimize() is None
+        await store.close()
+
+
+class TestLocalIngestion:
+    """Test the ingestion pipeline writing to the local store."""
+    
+    @pytest.mark.asyncio
+    async def test_offline_ingest_and_incremental_run(self, tmp_path):
+        """Documents are searchable offline and unchanged files are skipped on re-runs."""
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        (docs / "pgvector.md").write_text("# Pgvector\n\nHNSW indexes speed up vector search.\n")
+        (docs / "funding.md").write_text("# Funding\n\nVenture capital flowed into AI startups.\n")
+        
+        def pipeline():
+            return DocumentIngestionPipeline(
+                config=IngestionConfig(use_semantic_chunking=False, incremental=True),
+                documents_folder=str(docs),
+                embedder=create_embedder(HASHING_EMBEDDING_MODEL, use_cache=False, client=LocalEmbeddingClient()),
+                store=LocalVectorStore(str(tmp_path / "store"))
+            )
+        
+        first = pipeline()
+        results = await first.ingest_documents()
+        await first.close()
+        assert all(not result.errors for result in results)
+        
+        second = pipeline()
+        rerun = await second.ingest_documents()
+        hits = await second.store.vector_search(
+            HashingEmbedder().embed("HNSW vector search").tolist(), 1
+        )
+        await second.close()
+        
+        assert all(result.unchanged for result in rerun)
+        assert hits[0]["document_source"] == "pgvector.md"
@@ -0,0 +1,219 @@
+"""Test query embedding caching, coalescing and micro-batching."""
+
+import asyncio
+import pytest
+import sqlite3
+from types import SimpleNamespace
+from typing import List
+
+from ..dependencies import RAGAgentDependencies
+from ..utils.embedding_cache import PersistentEmbeddingCache
+from ..utils.query_embedder import QueryEmbedder, TTLCache
+
+
+class CountingClient:
+    """Fake embeddings client that records every request and answers after a delay."""
+    
+    def __init__(self, delay: float = 0.01, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.requests: List[List[str]] = []
+        self.embeddings = SimpleNamespace(create=self.create)
+    
+    async def create(self, model: str, input):
+        texts = [input] if isinstance(input, str) else list(input)
+        self.requests.append(texts)
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("embedding service unavailable")
+        return SimpleNamespace(data=[
+            SimpleNamespace(embedding=[float(len(text)), 1.0]) for text in texts
+        ])
+
+
+class TestTTLCache:
+    """Test the in-memory query embedding cache."""
+    
+    def test_entries_expire(self):
+        """Entries are served until their TTL passes."""
+        now = [0.0]
+        cache = TTLCache(max_entries=10, ttl_seconds=60, clock=lambda: now[0])
+        cache.put("query", [1.0])
+        
+        now[0] = 59
+        assert cache.get("query") == [1.0]
+        now[0] = 61
+        assert cache.get("query") is None
+        assert len(cache) == 0
+    
+    def test_evicts_least_recently_used(self):
+        """Reading an entry protects it from eviction."""
+        cache = TTLCache(max_entries=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        
+        assert [cache.get(key) for key in "abc"] == [1, None, 3]
+
+
+class TestQueryEmbedder:
+    """Test API call reduction for concurrent queries."""
+    
+    @pytest.mark.asyncio
+    async def test_identical_concurrent_queries_share_one_call(self):
+        """Concurrent identical queries are coalesced into a single request."""
+        client = CountingClient()
+        embedder = QueryEmbedder(client, "model")
+        
+        results = await asyncio.gather(*(embedder.embed("what is rag") for _ in range(10)))
+        
+        assert client.requests == [["what is rag"]]
+        assert all(result == [11.0, 1.0] for result in results)
+        assert embedder.stats()["coalesced"] == 9
+    
+    @pytest.mark.asyncio
+    async def test_distinct_concurrent_queries_are_batched(self):
+        """Distinct queries within the batch window go out as one request."""
+        client = CountingClient()
+        embedder = QueryEmbedder(client, "model", batch_window_ms=0)
+        queries = [f"query {i}" for i in range(5)]
+        
+        results = await asyncio.gather(*(embedder.embed(query) for query in queries))
+        
+        assert client.requests == [queries]
+        assert results == [[7.0, 1.0]] * 5
+    
+    @pytest.mark.asyncio
+    async def test_batches_respect_max_size(self):
+        """A full batch is sent immediately and the rest follows in another request."""
+        client = CountingClient()
+        embedder = QueryEmbedder(client, "model", max_batch_size=4)
+        
+        await asyncio.gather(*(embedder.embed(f"q{i}") for i in range(6)))
+        
+        assert [len(batch) for batch in client.requests] == [4, 2]
+    
+    @pytest.mark.asyncio
+    async def test_repeat_query_hits_cache(self):
+        """A later identical query is served from the TTL cache."""
+        client = CountingClient()
+        embedder = QueryEmbedder(client, "model")
+        
+        await embedder.embed("hybrid search")
+        await embedder.embed("hybrid search")
+        
+        assert len(client.requests) == 1
+        assert embedder.stats()["hits"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_failure_reaches_every_waiter_and_is_not_cached(self):
+        """An API error fails all coalesced callers and the next call retries."""
+        client = CountingClient(fail=True)
+        embedder = QueryEmbedder(client, "model")
+        
+        results = await asyncio.gather(
+            embedder.embed("query"), embedder.embed("query"), return_exceptions=True
+        )
+        
+        assert all(isinstance(result, RuntimeError) for result in results)
+        client.fail = False
+        assert await embedder.embed("query") == [5.0, 1.0]
+        assert len(client.requests) == 2
+    
+    @pytest.mark.asyncio
+    async def test_short_response_fails_every_waiter(self):
+        """A response with fewer embeddings than inputs fails the batch instead of hanging."""
+        client = CountingClient()
+        create = client.create
+        
+        async def short(model: str, input):
+            response = await create(model, input)
+            return SimpleNamespace(data=response.data[:-1])
+        
+        client.embeddings = SimpleNamespace(create=short)
+        embedder = QueryEmbedder(client, "model")
+        
+        results = await asyncio.wait_for(asyncio.gather(
+            embedder.embed("first"), embedder.embed("second"), return_exceptions=True
+        ), 1)
+        
+        assert all(isinstance(result, ValueError) for result in results)
+        assert embedder._in_flight == {}
+        assert len(embedder.cache) == 0
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_shared_request(self):
+        """Cancelling one waiter leaves the others with their result."""
+        client = CountingClient(delay=0.05)
+        embedder = QueryEmbedder(client, "model")
+        
+        first = asyncio.ensure_future(embedder.embed("query"))
+        second = asyncio.ensure_future(embedder.embed("query"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        
+        assert await second == [5.0, 1.0]
+        assert len(client.requests) == 1
+    
+    @pytest.mark.asyncio
+    async def test_persistent_cache_is_read_and_filled(self, tmp_path):
+        """Queries embedded by the API are stored in the shared persistent cache."""
+        cache = PersistentEmbeddingCache(str(tmp_path / "cache.sqlite"))
+        cache.put("model", "stored", [9.0])
+        client = CountingClient()
+        embedder = QueryEmbedder(client, "model", persistent_cache=cache)
+        
+        assert await embedder.embed("stored") == [9.0]
+        await embedder.embed("new")
+        await embedder.drain()
+        
+        assert client.requests == [["new"]]
+        assert cache.get("model", "new") == [3.0, 1.0]
+    
+    @pytest.mark.asyncio
+    async def test_persistent_cache_failure_does_not_block_callers(self, tmp_path):
+        """A failed cache write still answers every waiter and the next call."""
+        cache = PersistentEmbeddingCache(str(tmp_path / "cache.sqlite"))
+        
+        def locked(model, texts, embeddings):
+            raise sqlite3.OperationalError("database is locked")
+        
+        cache.put_many = locked
+        client = CountingClient()
+        embedder = QueryEmbedder(client, "model", persistent_cache=cache)
+        
+        results = await asyncio.wait_for(
+            asyncio.gather(embedder.embed("query"), embedder.embed("query")), 1
+        )
+        await embedder.drain()
+        
+        assert results == [[5.0, 1.0], [5.0, 1.0]]
+        assert embedder._in_flight == {}
+        assert await asyncio.wait_for(embedder.embed("query"), 1) == [5.0, 1.0]
+        assert len(client.requests) == 1
+
+
+class TestDependenciesQueryEmbedding:
+    """Test get_embedding through agent dependencies."""
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_agent_queries(self):
+        """Concurrent get_embedding calls share requests across identical and distinct queries."""
+        client = CountingClient()
+        deps = RAGAgentDependencies(
+            openai_client=client,
+            settings=SimpleNamespace(
+                embedding_model="text-embedding-3-small",
+                query_embedding_cache_size=1024,
+                query_embedding_cache_ttl=600,
+                query_embedding_batch_window_ms=5,
+                query_embedding_max_batch_size=64
+            )
+        )
+        
+        queries = ["what is rag", "what is mmr", "what is rag", "what is bm25"] * 5
+        results = await asyncio.gather(*(deps.get_embedding(query) for query in queries))
+        
+        assert client.requests == [["what is rag", "what is mmr", "what is bm25"]]
+        assert results[0] == results[2] == [11.0, 1.0]
@@ -0,0 +1,100 @@
+"""Test MMR selection and reranking stages."""
+
+import time
+import pytest
+import numpy as np
+from typing import List, Sequence
+
+from ..utils.retrieval import (
+    LexicalReranker, Reranker, create_reranker, embedding_matrix, mmr_select, rerank
+)
+
+
+class SlowReranker(Reranker):
+    """Reranker that takes longer than any test budget."""
+    
+    name = "slow"
+    
+    def score(self, query: str, texts: Sequence[str]) -> List[float]:
+        time.sleep(0.2)
+        return [1.0] * len(texts)
+
+
+class TestMMR:
+    """Test maximal marginal relevance selection."""
+    
+    def setup_method(self):
+        """Two near-duplicates of the query and one distinct, slightly less similar candidate."""
+        self.query = [1.0, 0.0, 0.0]
+        self.candidates = np.array([
+            [1.0, 0.1, 0.0],
+            [1.0, 0.11, 0.0],
+            [0.8, 0.0, 0.6],
+        ], dtype=np.float32)
+    
+    def test_zero_diversity_keeps_similarity_order(self):
+        """Without a redundancy penalty MMR is plain similarity ranking."""
+        assert mmr_select(self.query, self.candidates, 3, diversity=0.0) == [0, 1, 2]
+    
+    def test_diversity_skips_near_duplicates(self):
+        """The distinct candidate is picked before the near-duplicate."""
+        assert mmr_select(self.query, self.candidates, 2, diversity=0.5) == [0, 2]
+    
+    def test_relevance_overrides_similarity(self):
+        """Supplied relevance (e.g. reranker scores) drives the first pick."""
+        selected = mmr_select(self.query, self.candidates, 1, relevance=[0.0, 0.2, 1.0])
+        
+        assert selected == [2]
+    
+    def test_expired_deadline_falls_back_to_relevance(self):
+        """Past its deadline MMR fills the remaining slots by similarity."""
+        selected = mmr_select(self.query, self.candidates, 2, diversity=0.5, deadline=0.0)
+        
+        assert selected == [0, 1]
+    
+    def test_k_larger_than_candidates(self):
+        """Asking for more results than candidates returns every candidate once."""
+        assert sorted(mmr_select(self.query, self.candidates, 10)) == [0, 1, 2]
+        assert mmr_select(self.query, self.candidates[:0], 5) == []
+    
+    def test_embedding_matrix_parses_pgvector_text(self):
+        """Embeddings returned as pgvector text are parsed into a matrix."""
+        matrix = embedding_matrix(["[1,2,3]", [4.0, 5.0, 6.0]])
+        
+        assert matrix.dtype == np.float32
+        assert matrix.tolist() == [[1, 2, 3], [4, 5, 6]]
+
+
+class TestRerank:
+    """Test rerankers and the rerank budget."""
+    
+    def test_lexical_prefers_exact_terms(self):
+        """BM25 ranks the passage containing the rare query term first."""
+        texts = [
+            "The agent searches documents for context.",
+            "Error code E1234 is raised when the index is missing.",
+            "Documents are split into chunks before embedding.",
+        ]
+        
+        scores = LexicalReranker().score("what does E1234 mean", texts)
+        
+        assert max(range(len(texts)), key=scores.__getitem__) == 1
+        assert LexicalReranker().score("anything", []) == []
+    
+    @pytest.mark.asyncio
+    async def test_rerank_within_budget(self):
+        """Scores are returned when the reranker finishes in time."""
+        scores = await rerank(LexicalReranker(), "chunks", ["chunks of text", "other"], budget_seconds=5)
+        
+        assert scores[0] > scores[1] == 0
+    
+    @pytest.mark.asyncio
+    async def test_rerank_timeout_returns_none(self):
+        """A reranker exceeding its budget yields None so callers keep vector order."""
+        assert await rerank(SlowReranker(), "query", ["a", "b"], budget_seconds=0.01) is None
+    
+    def test_create_reranker(self):
+        """Backends are created by name and unknown names are rejected."""
+        assert isinstance(create_reranker("lexical"), LexicalReranker)
+        with pytest.raises(ValueError):
+            create_reranker("unknown")
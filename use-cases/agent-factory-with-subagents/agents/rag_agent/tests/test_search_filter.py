@@ -0,0 +1,150 @@
+"""Test metadata-filtered search and collection partitions."""
+
+import sqlite3
+import pytest
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+from typing import Sequence
+
+from ..utils.local_embeddings import HashingEmbedder
+from ..utils.local_store import LocalVectorStore
+from ..utils.partitions import partition_name
+from ..utils.search_filter import SearchFilter, document_attributes
+
+EMBEDDER = HashingEmbedder(dimensions=128)
+
+
+def document(source: str, texts: Sequence[str], **metadata) -> tuple:
+    chunks = [
+        SimpleNamespace(
+            content=text,
+            index=i,
+            metadata={},
+            token_count=len(text.split()),
+            embedding=EMBEDDER.embed(text).tolist()
+        )
+        for i, text in enumerate(texts)
+    ]
+    return (source, source, " ".join(texts), chunks, metadata)
+
+
+def corpus() -> list:
+    """The same subject in two collections, with tags and dates."""
+    return [
+        document("news/openai.md", ["OpenAI raised funding", "OpenAI funding round valuation"],
+                 collection="news", tags=["Funding", "openai"], date="2024-10-02"),
+        document("news/anthropic.md", ["Anthropic raised funding from Amazon"],
+                 collection="news", tags="funding, anthropic", date="2025-03-14"),
+        document("reports/funding.md", ["Funding report on AI startups", "Venture funding totals"],
+                 collection="reports", tags=["funding"], date="2025-01-20"),
+        document("reports/chips.md", ["Nvidia chips dominate AI training"], collection="reports")
+    ]
+
+
+class TestSearchFilter:
+    """Test filter normalization and the SQL conditions."""
+    
+    def test_normalizes_tags_and_dates(self):
+        """Tags are deduplicated and lowercased; a date-only upper bound covers its day."""
+        filters = SearchFilter(tags=["Funding", "funding ", "AI"], date_from="2025-01-01", date_to=date(2025, 3, 31))
+        
+        assert filters.tags == ("ai", "funding")
+        assert filters.date_from == datetime(2025, 1, 1, tzinfo=timezone.utc)
+        assert filters.date_to == datetime(2025, 4, 1, tzinfo=timezone.utc)
+        assert SearchFilter().is_empty and not filters.is_empty
+        with pytest.raises(ValueError):
+            SearchFilter(date_from="2025-02-01", date_to="2025-01-01")
+    
+    def test_postgres_conditions(self):
+        """Conditions number their parameters after the ones already present."""
+        params = ["query"]
+        conditions = SearchFilter(
+            collection="news", source_prefix="news/100%_", tags=["openai"], date_to="2024-12-31"
+        ).postgres_conditions(params)
+        
+        assert conditions == [
+            "c.collection = $2", "d.source LIKE $3", "d.tags @> $4::text[]", "d.document_date < $5"
+        ]
+        assert params[1:4] == ["news", "news/100\\%\\_%", ["openai"]]
+    
+    def test_document_attributes(self):
+        """Collection, tags and date come from the metadata, with defaults."""
+        assert document_attributes({"tags": "b, A", "date": "2025-03-14T09:30:00+01:00"}) == (
+            "default", ["a", "b"], datetime.fromisoformat("2025-03-14T09:30:00+01:00")
+        )
+        assert document_attributes({"collection": "news", "date": "next week"}) == ("news", [], None)
+    
+    def test_partition_names(self):
+        """Partition names are valid identifiers that keep similar collections apart."""
+        assert partition_name("rag_agent") == partition_name("rag_agent")
+        assert partition_name("RAG agent") != partition_name("rag_agent")
+        assert partition_name("x" * 100).startswith("chunks_" + "x" * 40 + "_")
+        assert len(partition_name("знания" * 20)) <= 63
+
+
+class TestLocalStoreFilters:
+    """Test filtered search in the local store."""
+    
+    @pytest.mark.asyncio
+    async def test_vector_search_filters(self, tmp_path):
+        """Every filter restricts the ranked chunks before the top results are taken."""
+        store = LocalVectorStore(str(tmp_path))
+        await store.save_documents(corpus())
+        query = EMBEDDER.embed("funding").tolist()
+        
+        async def sources(**kwargs):
+            results = await store.vector_search(query, 10, filters=SearchFilter(**kwargs))
+            return {result["document_source"] for result in results}
+        
+        assert await sources(collection="reports") == {"reports/funding.md", "reports/chips.md"}
+        assert await sources(source_prefix="news/") == {"news/openai.md", "news/anthropic.md"}
+        assert await sources(tags=["funding", "anthropic"]) == {"news/anthropic.md"}
+        assert await sources(date_from="2025-01-01") == {"news/anthropic.md", "reports/funding.md"}
+        assert await sources(date_to="2024-10-02") == {"news/openai.md"}
+        assert await sources(collection="reports", tags=["funding"]) == {"reports/funding.md"}
+        assert await sources(collection="missing") == set()
+    
+    @pytest.mark.asyncio
+    async def test_filtered_search_fills_match_count(self, tmp_path):
+        """A filter matching few chunks still returns all of them, not just those in the global top."""
+        store = LocalVectorStore(str(tmp_path))
+        noise = [document(f"noise/{i}.md", [f"funding note {i}"], collection="noise") for i in range(50)]
+        await store.save_documents(noise + corpus())
+        
+        results = await store.vector_search(
+            EMBEDDER.embed("funding note").tolist(), 3, filters=SearchFilter(collection="reports")
+        )
+        
+        # The 50 noise chunks are all nearer to the query than any report chunk
+        assert len(results) == 3
+        assert all(result["document_source"].startswith("reports/") for result in results)
+    
+    @pytest.mark.asyncio
+    async def test_hybrid_search_filters_both_sides(self, tmp_path):
+        """Keyword and vector candidates both come from the filtered chunks."""
+        store = LocalVectorStore(str(tmp_path))
+        await store.save_documents(corpus())
+        
+        results = await store.hybrid_search(
+            EMBEDDER.embed("funding").tolist(), "funding", 10, filters=SearchFilter(collection="news")
+        )
+        
+        assert {result["document_source"] for result in results} == {"news/openai.md", "news/anthropic.md"}
+    
+    @pytest.mark.asyncio
+    async def test_store_without_filter_columns_is_migrated(self, tmp_path):
+        """A store created before the filter columns gets them on open."""
+        db = sqlite3.connect(str(tmp_path / "store.sqlite"))
+        db.execute(
+            "CREATE TABLE documents (id TEXT PRIMARY KEY, title TEXT NOT NULL, source TEXT NOT NULL, "
+            "content TEXT NOT NULL, metadata TEXT NOT NULL DEFAULT '{}', created_at REAL NOT NULL)"
+        )
+        db.close()
+        
+        store = LocalVectorStore(str(tmp_path))
+        await store.save_documents(corpus())
+        results = await store.vector_search(
+            EMBEDDER.embed("chips").tolist(), 5, filters=SearchFilter(collection="reports")
+        )
+        
+        assert results[0]["document_source"] == "reports/chips.md"
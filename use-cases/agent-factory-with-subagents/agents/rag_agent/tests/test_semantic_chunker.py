@@ -0,0 +1,181 @@
+"""Test embedding-based semantic chunking."""
+
+import numpy as np
+import pytest
+
+from ..ingestion.chunker import (
+    ChunkingConfig, SemanticChunker, SimpleChunker, create_chunker, split_markdown_sections
+)
+
+TOPICS = ["cooking", "rockets", "finance"]
+
+
+class TopicEmbedder:
+    """Embeds each sentence as a one-hot vector of the topic it mentions."""
+    
+    def __init__(self):
+        self.calls = 0
+    
+    async def generate_embeddings_batch(self, texts):
+        self.calls += 1
+        return [[float(topic in text) for topic in TOPICS] for text in texts]
+
+
+def topic_document(topics, sentences_per_topic: int = 6) -> str:
+    """Paragraph-free text whose topic changes every few sentences."""
+    return " ".join(
+        f"Sentence {i} is about {topic} and adds some more words to the text."
+        for topic in topics
+        for i in range(sentences_per_topic)
+    )
+
+
+def make_chunker(**config) -> SemanticChunker:
+    """Embedding chunker with a topic embedder."""
+    config.setdefault("chunk_size", 1000)
+    config.setdefault("chunk_overlap", 100)
+    return SemanticChunker(ChunkingConfig(**config), embedder=TopicEmbedder())
+
+
+class TestEmbeddingChunker:
+    """Test break placement, sizes and offsets."""
+    
+    @pytest.mark.asyncio
+    async def test_breaks_where_topic_changes(self):
+        """Chunk boundaries fall at the similarity valleys between topics."""
+        content = topic_document(TOPICS)
+        chunker = make_chunker(chunk_size=500)
+        
+        chunks = await chunker.chunk_document(content, "Topics", "topics.md")
+        
+        assert [chunk.content.count("about") for chunk in chunks] == [6, 6, 6]
+        for chunk, topic in zip(chunks, TOPICS):
+            assert set(chunk.content.split()) >= {topic}
+            assert chunk.metadata["chunk_method"] == "embedding"
+        assert chunker.embedder.calls == 1
+    
+    @pytest.mark.asyncio
+    async def test_offsets_are_exact(self):
+        """Chunk offsets slice the original content exactly."""
+        content = "# Title\n\n" + topic_document(TOPICS[:2]) + "\n\n## Next\n\n" + topic_document(TOPICS[2:])
+        
+        chunks = await make_chunker(chunk_size=300, min_chunk_size=50).chunk_document(content, "T", "t.md")
+        
+        for chunk in chunks:
+            assert content[chunk.start_char:chunk.end_char] == chunk.content
+        assert [chunk.start_char for chunk in chunks] == sorted(chunk.start_char for chunk in chunks)
+    
+    @pytest.mark.asyncio
+    async def test_uniform_text_respects_chunk_size(self):
+        """Without topic changes, chunks are still cut to the chunk size."""
+        content = topic_document(["cooking"], sentences_per_topic=40)
+        
+        chunks = await make_chunker(chunk_size=400).chunk_document(content, "Food", "food.md")
+        
+        assert len(chunks) > 1
+        assert all(len(chunk.content) <= 400 for chunk in chunks)
+        assert " ".join(chunk.content for chunk in chunks) == content
+    
+    @pytest.mark.asyncio
+    async def test_llm_is_not_called_by_default(self, monkeypatch):
+        """The LLM splitter is only used when requested."""
+        chunker = make_chunker(chunk_size=200)
+        
+        async def fail(*args):
+            raise AssertionError("LLM splitting used")
+        
+        monkeypatch.setattr(chunker, "_split_long_section", fail)
+        
+        chunks = await chunker.chunk_document(topic_document(TOPICS), "Topics", "topics.md")
+        
+        assert chunks
+        assert create_chunker(ChunkingConfig(semantic_method="llm")).config.semantic_method == "llm"
+    
+    def test_window_distances_match_pairwise_windows(self):
+        """Vectorised window distances equal the directly computed ones."""
+        rng = np.random.default_rng(0)
+        embeddings = rng.normal(size=(9, 5)).astype(np.float32)
+        unit = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        
+        expected = []
+        for boundary in range(1, 9):
+            left = unit[max(boundary - 2, 0):boundary].sum(axis=0)
+            right = unit[boundary:boundary + 2].sum(axis=0)
+            expected.append(1 - left @ right / (np.linalg.norm(left) * np.linalg.norm(right)))
+        
+        assert SemanticChunker._window_distances(embeddings, 2) == pytest.approx(expected, abs=1e-5)
+
+
+MARKDOWN = """# Guide
+
+Intro paragraph
+continues here.
+
+- first item
+  wrapped line
+- second item
+
+```python
+# not a header
+
+print("still code")
+```
+
+| a | b |
+|---|---|
+| 1 | 2 |
+
+## Next
+Closing text.
+"""
+
+
+class TestStructureSplitting:
+    """Test the single-pass markdown section tokenizer."""
+    
+    def test_sections_and_offsets(self):
+        """Each structural element becomes one section with exact offsets."""
+        sections = split_markdown_sections(MARKDOWN)
+        
+        assert [(kind, MARKDOWN[start:end]) for start, end, kind in sections] == [
+            ("header", "# Guide"),
+            ("paragraph", "Intro paragraph\ncontinues here."),
+            ("list", "- first item\n  wrapped line"),
+            ("list", "- second item"),
+            ("code", "```python\n# not a header\n\nprint(\"still code\")\n```"),
+            ("table", "| a | b |\n|---|---|\n| 1 | 2 |"),
+            ("header", "## Next"),
+            ("paragraph", "Closing text."),
+        ]
+    
+    def test_unclosed_code_block_runs_to_end(self):
+        """A code block without a closing fence extends to the end of the text."""
+        content = "Text.\n\n```\ncode\n\nmore code\n"
+        
+        assert split_markdown_sections(content)[-1] == (7, len(content) - 1, "code")
+    
+    @pytest.mark.asyncio
+    async def test_repeated_sections_get_distinct_offsets(self):
+        """Identical sections map to their own positions, not the first match."""
+        content = "\n\n".join(["## Same heading\n\n" + "Repeated paragraph text. " * 8] * 6)
+        chunker = SemanticChunker(ChunkingConfig(
+            chunk_size=300, chunk_overlap=50, max_chunk_size=600, semantic_method="llm"
+        ))
+        
+        chunks = await chunker.chunk_document(content, "Repeat", "repeat.md")
+        
+        assert len(chunks) == 6
+        assert len({chunk.start_char for chunk in chunks}) == 6
+        for chunk in chunks:
+            assert content[chunk.start_char:chunk.end_char] == chunk.content
+    
+    def test_simple_chunker_offsets_are_exact(self):
+        """Simple chunks slice the original content at their offsets."""
+        content = "\n\n".join(f"Paragraph {i} " + "text " * (i * 7 % 50) for i in range(40))
+        
+        chunks = SimpleChunker(ChunkingConfig(chunk_size=300, chunk_overlap=50)).chunk_document(content, "T", "t.md")
+        
+        assert len(chunks) > 1
+        for chunk in chunks:
+            assert content[chunk.start_char:chunk.end_char] == chunk.content
+            assert len(chunk.content) <= 300 or "\n\n" not in chunk.content
@@ -0,0 +1,182 @@
+"""Test ANN index selection, rebuilds and query-time settings."""
+
+import pytest
+from typing import Any, List, Optional
+
+from ..utils.vector_index import (
+    INDEX_NAME, VectorIndexPlan, apply_search_settings, choose_index_plan,
+    ensure_vector_index, parse_index_definition, vector_search_settings
+)
+
+
+class FakeConnection:
+    """Connection answering the index lookups and recording statements."""
+    
+    def __init__(
+        self,
+        rows: int,
+        definition: Optional[str] = None,
+        dimensions: int = 1536,
+        partitioned: bool = False
+    ):
+        self.rows = rows
+        self.definition = definition
+        self.dimensions = dimensions
+        self.partitioned = partitioned
+        self.statements: List[str] = []
+    
+    async def fetchval(self, query: str, *args: Any):
+        if "count(*)" in query:
+            return self.rows
+        if "atttypmod" in query:
+            return self.dimensions
+        if "pg_indexes" in query:
+            return self.definition
+        if "relkind" in query:
+            return "p" if self.partitioned else "r"
+        raise AssertionError(f"unexpected query: {query}")
+    
+    async def execute(self, query: str, *args: Any, timeout: float = None):
+        self.statements.append(" ".join([query, *map(str, args)]))
+    
+    def transaction(self):
+        return self
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        return False
+
+
+class TestIndexPlan:
+    """Test index method and parameter selection."""
+    
+    def test_hnsw_for_small_corpora(self):
+        """Corpora up to the HNSW limit get an HNSW index."""
+        plan = choose_index_plan(50_000)
+        
+        assert plan == VectorIndexPlan("hnsw", m=16, ef_construction=64)
+    
+    def test_ivfflat_lists_follow_sqrt_rows(self):
+        """Large corpora get IVFFlat with about sqrt(rows) lists."""
+        plan = choose_index_plan(4_000_000)
+        
+        assert plan.method == "ivfflat"
+        assert plan.lists == 2000
+        assert plan.default_probes == 45
+        assert choose_index_plan(10_000, method="ivfflat").lists == 100
+    
+    def test_no_index_above_pgvector_dimension_limit(self):
+        """Vectors wider than pgvector can index are searched exactly."""
+        assert choose_index_plan(1000, dimensions=3072).method == "none"
+    
+    def test_parse_definitions(self):
+        """Index definitions from pg_indexes are read back as plans."""
+        hnsw = parse_index_definition(
+            "CREATE INDEX idx_chunks_embedding ON public.chunks USING hnsw "
+            "(embedding vector_cosine_ops) WITH (m='24', ef_construction='100')"
+        )
+        ivfflat = parse_index_definition(
+            "CREATE INDEX idx_chunks_embedding ON public.chunks USING ivfflat "
+            "(embedding vector_cosine_ops) WITH (lists='1')"
+        )
+        
+        assert hnsw == VectorIndexPlan("hnsw", m=24, ef_construction=100)
+        assert ivfflat == VectorIndexPlan("ivfflat", lists=1)
+        assert parse_index_definition("CREATE INDEX x ON public.chunks USING btree (id)") is None
+    
+    def test_ivfflat_tolerates_small_growth(self):
+        """An IVFFlat index is kept while its lists are within a factor of two."""
+        target = VectorIndexPlan("ivfflat", lists=1000)
+        
+        assert VectorIndexPlan("ivfflat", lists=700).satisfies(target)
+        assert not VectorIndexPlan("ivfflat", lists=1).satisfies(target)
+        assert not VectorIndexPlan("hnsw", m=16, ef_construction=64).satisfies(target)
+
+
+class TestSearchSettings:
+    """Test query-time index settings."""
+    
+    def test_ef_search_covers_match_count(self):
+        """HNSW ef_search is never below the number of requested matches."""
+        hnsw = VectorIndexPlan("hnsw", m=16, ef_construction=64)
+        
+        assert vector_search_settings(hnsw, 10) == {"hnsw.ef_search": 40}
+        assert vector_search_settings(hnsw, 10, ef_search=200) == {"hnsw.ef_search": 200}
+        assert vector_search_settings(hnsw, 50, ef_search=20) == {"hnsw.ef_search": 50}
+    
+    def test_probes_default_to_sqrt_lists(self):
+        """IVFFlat probes default to sqrt(lists) and never exceed the lists."""
+        ivfflat = VectorIndexPlan("ivfflat", lists=1000)
+        
+        assert vector_search_settings(ivfflat, 10) == {"ivfflat.probes": 32}
+        assert vector_search_settings(ivfflat, 10, probes=5000) == {"ivfflat.probes": 1000}
+        assert vector_search_settings(None, 10) == {}
+    
+    @pytest.mark.asyncio
+    async def test_settings_are_transaction_local(self):
+        """Settings are applied with set_config(..., true)."""
+        conn = FakeConnection(rows=0)
+        
+        await apply_search_settings(conn, {"hnsw.ef_search": 80})
+        
+        assert conn.statements == ["SELECT set_config($1, $2, true) hnsw.ef_search 80"]
+
+
+class TestEnsureIndex:
+    """Test index rebuilds against the current corpus."""
+    
+    @pytest.mark.asyncio
+    async def test_replaces_single_list_ivfflat(self):
+        """The single-list IVFFlat index is replaced by HNSW, built concurrently."""
+        conn = FakeConnection(
+            rows=20_000,
+            definition=f"CREATE INDEX {INDEX_NAME} ON public.chunks USING ivfflat "
+                       "(embedding vector_cosine_ops) WITH (lists='1')"
+        )
+        
+        plan, rebuilt = await ensure_vector_index(conn)
+        
+        assert rebuilt and plan.method == "hnsw"
+        create = next(s for s in conn.statements if s.startswith("CREATE INDEX"))
+        assert create.startswith(f"CREATE INDEX CONCURRENTLY {INDEX_NAME}_new ON chunks USING hnsw")
+        assert f"ALTER INDEX {INDEX_NAME}_new RENAME TO {INDEX_NAME}" in conn.statements
+        # A leftover invalid build is dropped first
+        assert conn.statements[0] == f"DROP INDEX IF EXISTS {INDEX_NAME}_new"
+    
+    @pytest.mark.asyncio
+    async def test_partitioned_table_built_without_concurrently(self):
+        """CONCURRENTLY is not supported on a partitioned chunks table."""
+        conn = FakeConnection(rows=20_000, partitioned=True)
+        
+        plan, rebuilt = await ensure_vector_index(conn)
+        
+        assert rebuilt
+        create = next(s for s in conn.statements if s.startswith("CREATE INDEX"))
+        assert create.startswith(f"CREATE INDEX {INDEX_NAME}_new ON chunks USING hnsw")
+    
+    @pytest.mark.asyncio
+    async def test_keeps_adequate_index(self):
+        """Nothing is rebuilt when the current index suits the corpus."""
+        conn = FakeConnection(
+            rows=20_000,
+            definition=f"CREATE INDEX {INDEX_NAME} ON public.chunks USING hnsw "
+                       "(embedding vector_cosine_ops) WITH (m='16', ef_construction='64')"
+        )
+        
+        plan, rebuilt = await ensure_vector_index(conn)
+        
+        assert not rebuilt and plan.method == "hnsw"
+        assert conn.statements == []
+    
+    @pytest.mark.asyncio
+    async def test_switches_to_ivfflat_past_hnsw_limit(self):
+        """A corpus beyond the HNSW limit is rebuilt as IVFFlat."""
+        conn = FakeConnection(rows=250_000)
+        
+        plan, rebuilt = await ensure_vector_index(conn, hnsw_max_rows=100_000, maintenance_work_mem="1GB")
+        
+        assert rebuilt and plan == VectorIndexPlan("ivfflat", lists=500)
+        assert "SELECT set_config('maintenance_work_mem', $1, false) 1GB" in conn.statements
+        assert conn.statements[-1] == "RESET maintenance_work_mem"
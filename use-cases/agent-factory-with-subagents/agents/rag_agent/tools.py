@@ -4,9 +4,19 @@ from typing import Optional, List, Dict, Any
 from pydantic_ai import RunContext
 from pydantic import BaseModel, Field
 import asyncpg
-import json
-import httpx
+import time
 from dependencies import AgentDependencies
+from utils.retrieval import embedding_matrix, mmr_select, rerank
+from utils.search_filter import SearchFilter
+
+try:
+    from ..common.knowledge_client import search_agent_knowledge_text
+except ImportError:
+    # Агент запущен из своей папки
+    import os
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from common.knowledge_client import search_agent_knowledge_text
 
 
 class SearchResult(BaseModel):
@@ -18,23 +28,74 @@ class SearchResult(BaseModel):
     metadata: Dict[str, Any]
     document_title: str
     document_source: str
+    rerank_score: Optional[float] = None
+
+
+def build_search_filter(
+    deps: AgentDependencies,
+    collection: Optional[str] = None,
+    source_prefix: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None
+) -> Optional[SearchFilter]:
+    """
+    Search filter from tool arguments.
+    
+    Without a collection argument, searches stay in the configured
+    ``search_collection`` (all collections when unset).
+    
+    Returns:
+        Filter, None when nothing is filtered
+    """
+    filters = SearchFilter(
+        collection=collection or deps.settings.search_collection,
+        source_prefix=source_prefix,
+        tags=tuple(tags or ()),
+        date_from=date_from,
+        date_to=date_to
+    )
+    return None if filters.is_empty else filters
 
 
 async def semantic_search(
     ctx: RunContext[AgentDependencies],
     query: str,
-    match_count: Optional[int] = None
+    match_count: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    collection: Optional[str] = None,
+    source_prefix: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None
 ) -> List[SearchResult]:
     """
     Perform pure semantic search using vector similarity.
     
+    The retrieval strategy of the dependencies adds post-retrieval stages:
+    "mmr" selects diverse results from an over-fetched candidate set, and
+    "rerank" (or ``rerank_enabled``) reorders the candidates with the
+    configured reranker. Each stage over-fetches by its own factor and falls
+    back to similarity order when it exceeds its latency budget.
+    
+    The filter arguments restrict the search before ranking, so it still
+    returns ``match_count`` results when few documents match.
+    
     Args:
         ctx: Agent runtime context with dependencies
         query: Search query text
         match_count: Number of results to return (default: 10)
+        ef_search: HNSW candidates per query (default from settings)
+        probes: IVFFlat lists to search (default from settings)
+        collection: Only search this collection (default from settings)
+        source_prefix: Only search documents whose source path starts with this
+        tags: Only search documents carrying all of these tags
+        date_from: Only search documents dated on or after this ISO date
+        date_to: Only search documents dated on or before this ISO date
     
     Returns:
-        List of search results ordered by similarity
+        List of search results ordered by similarity (or by the strategy)
     """
     try:
         deps = ctx.deps
@@ -46,34 +107,71 @@ async def semantic_search(
         # Validate match count
         match_count = min(match_count, deps.settings.max_match_count)
         
+        # Over-fetch candidates for the post-retrieval stages
+        use_mmr = deps.retrieval_strategy == "mmr"
+        use_rerank = deps.retrieval_strategy == "rerank" or deps.rerank_enabled
+        fetch_count = match_count
+        if use_mmr:
+            fetch_count = max(fetch_count, match_count * deps.settings.mmr_fetch_factor)
+        if use_rerank:
+            fetch_count = max(fetch_count, match_count * deps.settings.rerank_fetch_factor)
+        
+        filters = build_search_filter(deps, collection, source_prefix, tags, date_from, date_to)
+        
         # Generate embedding for query
         query_embedding = await deps.get_embedding(query)
         
-        # Convert embedding to PostgreSQL vector string format
-        embedding_str = '[' + ','.join(map(str, query_embedding)) + ']'
+        # Execute semantic search; MMR needs the candidate embeddings
+        results = await deps.get_vector_store().vector_search(
+            query_embedding,
+            fetch_count,
+            with_embeddings=use_mmr,
+            ef_search=ef_search,
+            probes=probes,
+            filters=filters
+        )
+        
+        scores = None
+        if use_rerank and len(results) > 1:
+            scores = await rerank(
+                deps.get_reranker(),
+                query,
+                [row['content'] for row in results],
+                budget_seconds=deps.settings.rerank_budget_ms / 1000
+            )
         
-        # Execute semantic search
-        async with deps.db_pool.acquire() as conn:
-            results = await conn.fetch(
-                """
-                SELECT * FROM match_chunks($1::vector, $2)
-                """,
-                embedding_str,
-                match_count
+        if use_mmr and len(results) > 1:
+            relevance = None
+            if scores is not None:
+                # Reranker scores replace cosine similarity as relevance
+                low, high = min(scores), max(scores)
+                relevance = [(score - low) / ((high - low) or 1.0) for score in scores]
+            order = mmr_select(
+                query_embedding,
+                embedding_matrix([row['embedding'] for row in results]),
+                match_count,
+                diversity=deps.get_retrieval_config()['mmr_diversity'],
+                relevance=relevance,
+                deadline=time.perf_counter() + deps.settings.mmr_budget_ms / 1000
             )
+        elif scores is not None:
+            order = sorted(range(len(results)), key=lambda i: -scores[i])[:match_count]
+        else:
+            order = range(min(match_count, len(results)))
         
         # Convert to SearchResult objects
         return [
             SearchResult(
-                chunk_id=str(row['chunk_id']),
-                document_id=str(row['document_id']),
-                content=row['content'],
-                similarity=row['similarity'],
-                metadata=json.loads(row['metadata']) if row['metadata'] else {},
-                document_title=row['document_title'],
-                document_source=row['document_source']
+                chunk_id=results[i]['chunk_id'],
+                document_id=results[i]['document_id'],
+                content=results[i]['content'],
+                similarity=results[i]['similarity'],
+                metadata=results[i]['metadata'],
+                document_title=results[i]['document_title'],
+                document_source=results[i]['document_source'],
+                rerank_score=scores[i] if scores is not None else None
             )
-            for row in results
+            for i in order
         ]
     except Exception as e:
         print(e)
@@ -84,16 +182,33 @@ async def hybrid_search(
     ctx: RunContext[AgentDependencies],
     query: str,
     match_count: Optional[int] = None,
-    text_weight: Optional[float] = None
+    text_weight: Optional[float] = None,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    collection: Optional[str] = None,
+    source_prefix: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None
 ) -> List[Dict[str, Any]]:
     """
     Perform hybrid search combining semantic and keyword matching.
     
+    The top vector and full-text candidates are fused by reciprocal rank,
+    with ``text_weight`` weighting the full-text ranks.
+    
     Args:
         ctx: Agent runtime context with dependencies
         query: Search query text
         match_count: Number of results to return (default: 10)
         text_weight: Weight for text matching (0-1, default: 0.3)
+        ef_search: HNSW candidates per query (default from settings)
+        probes: IVFFlat lists to search (default from settings)
+        collection: Only search this collection (default from settings)
+        source_prefix: Only search documents whose source path starts with this
+        tags: Only search documents carrying all of these tags
+        date_from: Only search documents dated on or after this ISO date
+        date_to: Only search documents dated on or before this ISO date
     
     Returns:
         List of search results with combined scores
@@ -110,41 +225,23 @@ async def hybrid_search(
         # Validate parameters
         match_count = min(match_count, deps.settings.max_match_count)
         text_weight = max(0.0, min(1.0, text_weight))
+        candidate_count = max(match_count, deps.settings.hybrid_candidate_count)
+        filters = build_search_filter(deps, collection, source_prefix, tags, date_from, date_to)
         
         # Generate embedding for query
         query_embedding = await deps.get_embedding(query)
         
-        # Convert embedding to PostgreSQL vector string format
-        # PostgreSQL vector format: '[1.0,2.0,3.0]' (no spaces after commas)
-        embedding_str = '[' + ','.join(map(str, query_embedding)) + ']'
-        
         # Execute hybrid search
-        async with deps.db_pool.acquire() as conn:
-            results = await conn.fetch(
-                """
-                SELECT * FROM hybrid_search($1::vector, $2, $3, $4)
-                """,
-                embedding_str,
-                query,
-                match_count,
-                text_weight
-            )
-        
-        # Convert to dictionaries with additional scores
-        return [
-            {
-                'chunk_id': str(row['chunk_id']),
-                'document_id': str(row['document_id']),
-                'content': row['content'],
-                'combined_score': row['combined_score'],
-                'vector_similarity': row['vector_similarity'],
-                'text_similarity': row['text_similarity'],
-                'metadata': json.loads(row['metadata']) if row['metadata'] else {},
-                'document_title': row['document_title'],
-                'document_source': row['document_source']
-            }
-            for row in results
-        ]
+        return await deps.get_vector_store().hybrid_search(
+            query_embedding,
+            query,
+            match_count,
+            text_weight=text_weight,
+            candidate_count=candidate_count,
+            ef_search=ef_search,
+            probes=probes,
+            filters=filters
+        )
     except Exception as e:
         print(e)
         return f"Failed to perform hybrid search: {e}"
@@ -165,33 +262,12 @@ async def search_agent_knowledge(
     Returns:
         Найденная информация из базы знаний
     """
-    try:
-        # Используем теги для фильтрации по знаниям агента
-        search_query = f"{query} {' '.join(ctx.deps.knowledge_tags)}"
-
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{ctx.deps.archon_url}/rag/search-knowledge-base",
-                json={
-                    "query": search_query,
-                    "source_domain": ctx.deps.knowledge_domain,
-                    "match_count": match_count
-                }
-            )
-
-            if response.status_code == 200:
-                result = response.json()
-
-                if result.get("success") and result.get("results"):
-                    knowledge = "\n".join([
-                        f"**{r.get('metadata', {}).get('title', 'Знания')}:**\n{r['content']}"
-                        for r in result["results"]
-                    ])
-                    return f"База знаний RAG Agent:\n{knowledge}"
-                else:
-                    return "Информация не найдена в базе знаний агента."
-            else:
-                return f"Ошибка поиска: {response.status_code}"
-
-    except Exception as e:
-        return f"Ошибка доступа к базе знаний: {e}"
+    # Общий клиент Archon: пул соединений, кэш и объединение одинаковых запросов
+    return await search_agent_knowledge_text(
+        query=query,
+        tags=ctx.deps.knowledge_tags,
+        domain=ctx.deps.knowledge_domain,
+        match_count=match_count,
+        label="База знаний RAG Agent",
+        base_url=ctx.deps.archon_url
+    )
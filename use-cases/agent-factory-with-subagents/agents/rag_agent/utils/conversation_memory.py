@@ -0,0 +1,317 @@
+"""
+Token-budgeted conversation memory for multi-turn sessions.
+
+Recent turns are kept verbatim while they fit the history budget; older
+turns are folded one at a time into a running summary. Chunks returned by
+the search tools are cached across turns, so a follow-up question can be
+answered from passages already fetched instead of searching again.
+"""
+
+import re
+import math
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .retrieval import LexicalReranker, tokenize
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+# Words ignored when matching a question against cached chunks
+STOPWORDS = frozenset(
+    "a about all an and any are as at be been but by can could did do does for from had has have "
+    "he her his how i if in into is it its many me more much my no not of on or our she so some "
+    "tell than that the their them then there they this to was we were what when where which who "
+    "why will with would you your".split()
+)
+
+# Estimate when tiktoken or its encoding files are unavailable, matching the
+# ingestion embedder: about one token per three UTF-8 bytes
+_BYTES_PER_TOKEN = 3
+
+
+class TokenCounter:
+    """Counts tokens with tiktoken, or estimates them from the text length."""
+    
+    def __init__(self, encoding_name: str = "cl100k_base"):
+        """
+        Initialize counter.
+        
+        Args:
+            encoding_name: tiktoken encoding to count with
+        """
+        self._encoding = None
+        try:
+            import tiktoken
+            self._encoding = tiktoken.get_encoding(encoding_name)
+        except Exception as e:
+            logger.warning(f"Could not load tokenizer {encoding_name} ({e}), estimating token counts")
+    
+    def count(self, text: str) -> int:
+        """Number of tokens in a text."""
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return -(-len(text.encode("utf-8")) // _BYTES_PER_TOKEN)
+
+
+@dataclass
+class Turn:
+    """One user message and the assistant's answer."""
+    user: str
+    assistant: str
+    tokens: int
+
+
+def first_sentence(text: str, max_words: int) -> str:
+    """First sentence of a text, cut to at most ``max_words`` words."""
+    text = " ".join(text.split())
+    sentence = SENTENCE_END.split(text, maxsplit=1)[0]
+    words = sentence.split()
+    if len(words) > max_words:
+        return " ".join(words[:max_words]) + "..."
+    return sentence
+
+
+def extractive_summary(summary: str, turn: Turn) -> str:
+    """
+    Fold a turn into the summary as one line: the question and the answer's lead.
+    
+    Cheap and deterministic, so evicting a turn never waits on a model call.
+    """
+    line = f"- User asked: {first_sentence(turn.user, 30)} Answer: {first_sentence(turn.assistant, 40)}"
+    return f"{summary}\n{line}" if summary else line
+
+
+class RetrievedChunkCache:
+    """
+    Search results from earlier turns, keyed by chunk id.
+    
+    Chunks are kept in least recently used order. A chunk is reused for a new
+    question when it contains enough of the question's content words,
+    weighted by how rare each word is among the cached chunks, and reused
+    chunks are ordered by BM25.
+    """
+    
+    def __init__(self, max_chunks: int = 200):
+        """
+        Initialize cache.
+        
+        Args:
+            max_chunks: Chunks kept before the least recently used are dropped
+        """
+        self.max_chunks = max_chunks
+        self._chunks: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._scorer = LexicalReranker()
+    
+    def __len__(self) -> int:
+        return len(self._chunks)
+    
+    def add(self, results: Sequence[Any]) -> int:
+        """
+        Remember search results (``SearchResult`` models or result dicts).
+        
+        Returns:
+            Number of chunks not seen before
+        """
+        added = 0
+        for result in results:
+            row = result.model_dump() if hasattr(result, "model_dump") else result
+            if not isinstance(row, dict) or not row.get("content"):
+                continue
+            key = str(row.get("chunk_id") or hash(row["content"]))
+            if key not in self._chunks:
+                added += 1
+            self._chunks[key] = {
+                "content": row["content"],
+                "document_title": row.get("document_title", ""),
+                "document_source": row.get("document_source", "")
+            }
+            self._chunks.move_to_end(key)
+        while len(self._chunks) > self.max_chunks:
+            self._chunks.popitem(last=False)
+        return added
+    
+    def select(
+        self,
+        query: str,
+        token_budget: int,
+        count_tokens: Callable[[str], int],
+        min_coverage: float = 0.5
+    ) -> List[Dict[str, Any]]:
+        """
+        Cached chunks relevant to a question, best first, within a token budget.
+        
+        Args:
+            query: New user question
+            token_budget: Tokens the selected chunk texts may use
+            count_tokens: Token counter
+            min_coverage: Share of the question's content words, weighted by
+                rarity in the cache, that a chunk must contain
+        
+        Returns:
+            Selected chunks
+        """
+        terms = set(tokenize(query)) - STOPWORDS
+        if not self._chunks or not terms or token_budget <= 0:
+            return []
+        keys = list(self._chunks)
+        texts = [self._chunks[key]["content"] for key in keys]
+        chunk_terms = [set(tokenize(text)) for text in texts]
+        
+        # Rare words weigh most, so a question about a new entity is searched
+        # even when its common words are cached; missing words count as rare
+        weights = {
+            term: math.log((len(texts) + 1) / (max(sum(1 for words in chunk_terms if term in words), 1) + 0.5))
+            for term in terms
+        }
+        total = sum(weights.values())
+        coverage = [sum(weights[term] for term in terms & words) / total for words in chunk_terms]
+        scores = self._scorer.score(query, texts)
+        
+        selected = []
+        used = 0
+        for i in sorted(range(len(keys)), key=lambda i: -scores[i]):
+            if coverage[i] < min_coverage:
+                continue
+            chunk = self._chunks[keys[i]]
+            tokens = count_tokens(chunk["content"])
+            if used + tokens > token_budget:
+                continue
+            selected.append(chunk)
+            used += tokens
+            self._chunks.move_to_end(keys[i])
+        return selected
+    
+    def clear(self):
+        """Forget all cached chunks."""
+        self._chunks.clear()
+
+
+class ConversationMemory:
+    """
+    Conversation history that fits a fixed token budget.
+    
+    The prompt context holds a summary of evicted turns, the most recent
+    turns verbatim and the cached chunks relevant to the new question. Each
+    part has its own budget, so the prompt stops growing with the session.
+    """
+    
+    def __init__(
+        self,
+        history_tokens: int = 1500,
+        summary_tokens: int = 300,
+        chunk_tokens: int = 1500,
+        max_cached_chunks: int = 200,
+        counter: Optional[TokenCounter] = None,
+        summarizer: Callable[[str, Turn], str] = extractive_summary
+    ):
+        """
+        Initialize memory.
+        
+        Args:
+            history_tokens: Budget for the verbatim recent turns
+            summary_tokens: Budget for the summary of older turns
+            chunk_tokens: Budget for reused chunks from earlier searches
+            max_cached_chunks: Chunks kept across turns
+            counter: Token counter (tiktoken cl100k_base by default)
+            summarizer: Folds an evicted turn into the summary
+        """
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        self.chunk_tokens = chunk_tokens
+        self.counter = counter or TokenCounter()
+        self.summarizer = summarizer
+        self.chunks = RetrievedChunkCache(max_chunks=max_cached_chunks)
+        
+        self.turns: List[Turn] = []
+        self.summary = ""
+        self.summarized_turns = 0
+    
+    def add_turn(self, user: str, assistant: str):
+        """Record a finished turn and evict old turns beyond the budget."""
+        tokens = self.counter.count(f"User: {user}\nAssistant: {assistant}")
+        # A single long answer is cut to the budget rather than kept whole
+        while tokens > self.history_tokens and assistant:
+            keep = int(len(assistant) * self.history_tokens / tokens * 0.9)
+            assistant = assistant[:keep].rstrip(".") + "..." if keep > 0 else ""
+            tokens = self.counter.count(f"User: {user}\nAssistant: {assistant}")
+        self.turns.append(Turn(user, assistant, tokens))
+        
+        while len(self.turns) > 1 and sum(turn.tokens for turn in self.turns) > self.history_tokens:
+            self.summary = self.summarizer(self.summary, self.turns.pop(0))
+            self.summarized_turns += 1
+        
+        # Drop the oldest summary lines once the summary outgrows its budget
+        lines = self.summary.splitlines()
+        while len(lines) > 1 and self.counter.count("\n".join(lines)) > self.summary_tokens:
+            lines.pop(0)
+        self.summary = "\n".join(lines)
+    
+    def remember_results(self, results: Sequence[Any]) -> int:
+        """Cache search results for later turns; returns the number of new chunks."""
+        return self.chunks.add(results)
+    
+    def build_context(self, user_input: str) -> Dict[str, Any]:
+        """
+        Context for the next prompt.
+        
+        Args:
+            user_input: New user question
+        
+        Returns:
+            ``summary``, ``history`` (recent turns as text) and ``chunks``
+            (cached chunks relevant to the question)
+        """
+        history = "\n".join(f"User: {turn.user}\nAssistant: {turn.assistant}" for turn in self.turns)
+        chunks = self.chunks.select(user_input, self.chunk_tokens, self.counter.count)
+        return {"summary": self.summary, "history": history, "chunks": chunks}
+    
+    def clear(self):
+        """Start a new conversation."""
+        self.turns = []
+        self.summary = ""
+        self.summarized_turns = 0
+        self.chunks.clear()
+
+
+def format_prompt(user_input: str, context: Dict[str, Any]) -> str:
+    """
+    Agent prompt for a turn from the memory context.
+    
+    Args:
+        user_input: New user question
+        context: Result of ``ConversationMemory.build_context``
+    
+    Returns:
+        Prompt text
+    """
+    sections = []
+    if context["summary"]:
+        sections.append(f"Summary of earlier conversation:\n{context['summary']}")
+    if context["history"]:
+        sections.append(f"Recent conversation:\n{context['history']}")
+    if context["chunks"]:
+        passages = "\n\n".join(
+            f"[{chunk['document_title'] or chunk['document_source']}]\n{chunk['content']}"
+            for chunk in context["chunks"]
+        )
+        sections.append(f"Previously retrieved passages:\n{passages}")
+    
+    instructions = (
+        "Search the knowledge base to answer the user's question. Choose the appropriate search strategy "
+        "(semantic_search or hybrid_search) based on the query type. Provide a comprehensive summary of your findings."
+    )
+    if context["chunks"]:
+        instructions = (
+            "If the previously retrieved passages answer the user's question, answer from them without "
+            "searching again. Otherwise " + instructions[0].lower() + instructions[1:]
+        )
+    
+    sections.append(f"User: {user_input}")
+    sections.append(instructions)
+    return "\n\n".join(sections)
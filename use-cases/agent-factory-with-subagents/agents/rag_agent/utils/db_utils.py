@@ -15,6 +15,8 @@ import asyncpg
 from asyncpg.pool import Pool
 from dotenv import load_dotenv
 
+from .vector_codec import decode_vector, encode_vector, register_vector_codec
+
 # Load environment variables
 load_dotenv()
 
@@ -32,20 +34,22 @@ class DatabasePool:
             database_url: PostgreSQL connection URL
         """
         self.database_url = database_url or os.getenv("DATABASE_URL")
-        if not self.database_url:
-            raise ValueError("DATABASE_URL environment variable not set")
-        
         self.pool: Optional[Pool] = None
     
     async def initialize(self):
         """Create connection pool."""
         if not self.pool:
+            # Checked on first use so offline runs with the local store can
+            # import this module without a database
+            if not self.database_url:
+                raise ValueError("DATABASE_URL environment variable not set")
             self.pool = await asyncpg.create_pool(
                 self.database_url,
                 min_size=5,
                 max_size=20,
                 max_inactive_connection_lifetime=300,
-                command_timeout=60
+                command_timeout=60,
+                init=register_vector_codec
             )
             logger.info("Database connection pool initialized")
     
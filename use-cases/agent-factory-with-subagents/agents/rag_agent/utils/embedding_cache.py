@@ -0,0 +1,274 @@
+"""
+Persistent embedding cache backed by SQLite.
+"""
+
+import os
+import sys
+import hashlib
+import logging
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Default location, shared by ingestion and query-time embedding
+DEFAULT_EMBEDDING_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "rag_agent", "embeddings.sqlite"
+)
+
+
+def embedding_cache_key(text: str) -> bytes:
+    """SHA-256 digest of the text an embedding was generated for."""
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+def pack_embedding(embedding: Sequence[float]) -> bytes:
+    """Pack an embedding as little-endian float32."""
+    values = array("f", embedding)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def unpack_embedding(data: bytes) -> List[float]:
+    """Unpack an embedding stored by ``pack_embedding``."""
+    values = array("f")
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tolist()
+
+
+class PersistentEmbeddingCache:
+    """
+    Embedding cache keyed by (model, sha256(text)) that survives restarts.
+    
+    Vectors are stored in SQLite as packed float32. Recency order is kept in
+    memory in an ordered dict, so lookups, inserts and evictions are O(1) apart
+    from the SQLite primary-key access. Access times are written back in
+    batches and restore the LRU order when the cache is reopened.
+    
+    Several processes can share one cache file: lookups always ask SQLite, so
+    embeddings written by another process are hits, and entries another
+    process evicted are dropped from the in-memory order.
+    """
+    
+    def __init__(
+        self,
+        path: str = DEFAULT_EMBEDDING_CACHE_PATH,
+        max_entries: int = 100_000,
+        max_bytes: int = 1024 * 1024 * 1024,
+        flush_interval: int = 256
+    ):
+        """
+        Open or create the cache.
+        
+        Args:
+            path: SQLite database file (":memory:" for a non-persistent cache)
+            max_entries: Maximum number of cached embeddings
+            max_bytes: Maximum total size of stored vectors in bytes
+            flush_interval: Number of cache hits after which access times are persisted
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        
+        self.hits = 0
+        self.misses = 0
+        
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                key BLOB NOT NULL,
+                vector BLOB NOT NULL,
+                last_access INTEGER NOT NULL,
+                PRIMARY KEY (model, key)
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.commit()
+        
+        # (model, key) -> vector size in bytes, least recently used first
+        self._order: "OrderedDict[Tuple[str, bytes], int]" = OrderedDict()
+        self._touched: Dict[Tuple[str, bytes], int] = {}
+        self._bytes = 0
+        self._clock = 0
+        
+        for model, key, size, last_access in self._conn.execute(
+            "SELECT model, key, length(vector), last_access FROM embeddings ORDER BY last_access"
+        ):
+            self._order[(model, key)] = size
+            self._bytes += size
+            self._clock = last_access
+        
+        with self._lock:
+            self._evict()
+    
+    def __len__(self) -> int:
+        return len(self._order)
+    
+    @property
+    def size_bytes(self) -> int:
+        """Total size of stored vectors in bytes."""
+        return self._bytes
+    
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """Get a cached embedding, or None."""
+        return self.get_many(model, [text])[0]
+    
+    def put(self, model: str, text: str, embedding: Sequence[float]):
+        """Store an embedding."""
+        self.put_many(model, [text], [embedding])
+    
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """
+        Look up embeddings for several texts.
+        
+        Args:
+            model: Embedding model name
+            texts: Texts to look up
+        
+        Returns:
+            Embeddings in input order, None for texts that are not cached
+        """
+        keys = [embedding_cache_key(text) for text in texts]
+        
+        with self._lock:
+            # Not only keys known to this process: another one may have written them
+            wanted = list(dict.fromkeys(keys))
+            found: Dict[bytes, bytes] = {}
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(wanted), 500):
+                part = wanted[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE model = ? AND key IN ({','.join('?' * len(part))})",
+                    [model, *part]
+                )
+                found.update(rows)
+            
+            added = False
+            for key in wanted:
+                entry = (model, key)
+                if key not in found:
+                    # Evicted by another process
+                    size = self._order.pop(entry, None)
+                    if size is not None:
+                        self._bytes -= size
+                        self._touched.pop(entry, None)
+                    continue
+                
+                if entry in self._order:
+                    self._order.move_to_end(entry)
+                else:
+                    self._order[entry] = len(found[key])
+                    self._bytes += len(found[key])
+                    added = True
+                self._clock += 1
+                self._touched[entry] = self._clock
+            
+            if added:
+                self._evict()
+                self._conn.commit()
+            
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+            
+            if len(self._touched) >= self.flush_interval:
+                self._flush_access_times()
+                self._conn.commit()
+        
+        return [unpack_embedding(found[key]) if key in found else None for key in keys]
+    
+    def put_many(self, model: str, texts: Sequence[str], embeddings: Sequence[Sequence[float]]):
+        """
+        Store embeddings for several texts, evicting least recently used entries.
+        
+        Args:
+            model: Embedding model name
+            texts: Embedded texts
+            embeddings: Embeddings in the same order
+        """
+        rows = []
+        with self._lock:
+            for text, embedding in zip(texts, embeddings):
+                key = embedding_cache_key(text)
+                vector = pack_embedding(embedding)
+                self._clock += 1
+                
+                previous = self._order.pop((model, key), None)
+                if previous is not None:
+                    self._bytes -= previous
+                self._order[(model, key)] = len(vector)
+                self._bytes += len(vector)
+                self._touched.pop((model, key), None)
+                
+                rows.append((model, key, vector, self._clock))
+            
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, key, vector, last_access) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._evict()
+            self._conn.commit()
+    
+    def clear(self):
+        """Remove all cached embeddings."""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._order.clear()
+            self._touched.clear()
+            self._bytes = 0
+    
+    def close(self):
+        """Persist access times and close the database."""
+        with self._lock:
+            if self._conn is None:
+                return
+            self._flush_access_times()
+            self._conn.commit()
+            self._conn.close()
+            self._conn = None
+    
+    def stats(self) -> Dict[str, int]:
+        """Cache statistics."""
+        return {
+            "entries": len(self._order),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+    
+    def _evict(self):
+        """Drop least recently used entries until the cache is within its limits."""
+        evicted = []
+        while self._order and (len(self._order) > self.max_entries or self._bytes > self.max_bytes):
+            entry, size = self._order.popitem(last=False)
+            self._bytes -= size
+            self._touched.pop(entry, None)
+            evicted.append(entry)
+        
+        if evicted:
+            self._conn.executemany("DELETE FROM embeddings WHERE model = ? AND key = ?", evicted)
+            logger.debug(f"Evicted {len(evicted)} embeddings from cache")
+    
+    def _flush_access_times(self):
+        """Write pending access times to SQLite."""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_access = ? WHERE model = ? AND key = ?",
+                [(tick, model, key) for (model, key), tick in self._touched.items()]
+            )
+            self._touched.clear()
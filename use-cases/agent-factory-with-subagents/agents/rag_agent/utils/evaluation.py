@@ -0,0 +1,140 @@
+"""
+Labelled retrieval queries and ranking metrics for tuning experiments.
+"""
+
+import os
+import re
+import json
+import glob
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+
+WHITESPACE = re.compile(r"\s+")
+
+# Characters of the answer passage a chunk must contain to count as relevant
+ANSWER_PREFIX_CHARS = 60
+
+
+@dataclass
+class LabelledQuery:
+    """A query and the passage that answers it."""
+    query: str
+    source: str
+    answer: str
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so chunk boundaries and line wraps do not matter."""
+    return WHITESPACE.sub(" ", text).strip()
+
+
+def build_query_set(documents_folder: str, min_answer_chars: int = 40) -> List[LabelledQuery]:
+    """
+    Build labelled queries from the section headings of markdown documents.
+    
+    Each section heading becomes a query qualified by its document title, and
+    the first substantial line of the section body is its answer passage. A
+    retrieved chunk is relevant when it comes from the same document and
+    contains the start of the answer (see ``is_relevant``), which keeps the
+    labels valid across chunkers and chunk sizes.
+    
+    Args:
+        documents_folder: Folder with markdown documents
+        min_answer_chars: Shortest body line accepted as an answer
+    
+    Returns:
+        Labelled queries, in file and section order
+    """
+    queries: List[LabelledQuery] = []
+    paths = sorted(
+        glob.glob(os.path.join(documents_folder, "**", "*.md"), recursive=True)
+        + glob.glob(os.path.join(documents_folder, "**", "*.markdown"), recursive=True)
+    )
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        source = os.path.relpath(path, documents_folder)
+        
+        title = os.path.splitext(os.path.basename(path))[0]
+        heading: Optional[str] = None
+        for line in lines:
+            match = HEADING.match(line)
+            if match:
+                if len(match.group(1)) == 1:
+                    title = match.group(2)
+                    heading = None
+                else:
+                    heading = match.group(2)
+                continue
+            
+            body = normalize_text(line.lstrip("-*+> ").replace("**", ""))
+            if heading and len(body) >= min_answer_chars:
+                queries.append(LabelledQuery(f"{heading} - {title}", source, normalize_text(line)))
+                heading = None
+    
+    return queries
+
+
+def save_query_set(queries: Sequence[LabelledQuery], path: str):
+    """Write labelled queries as JSON."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([asdict(query) for query in queries], f, indent=2, ensure_ascii=False)
+
+
+def load_query_set(path: str) -> List[LabelledQuery]:
+    """Read labelled queries written by ``save_query_set`` or by hand."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [LabelledQuery(**item) for item in json.load(f)]
+
+
+def is_relevant(query: LabelledQuery, result: Dict[str, Any]) -> bool:
+    """Whether a search result contains the query's answer passage."""
+    if result.get("document_source") != query.source:
+        return False
+    return normalize_text(query.answer)[:ANSWER_PREFIX_CHARS] in normalize_text(result.get("content", ""))
+
+
+def first_relevant_rank(query: LabelledQuery, results: Sequence[Dict[str, Any]]) -> Optional[int]:
+    """1-based rank of the first relevant result, None if there is none."""
+    for rank, result in enumerate(results, start=1):
+        if is_relevant(query, result):
+            return rank
+    return None
+
+
+def ranking_metrics(ranks: Sequence[Optional[int]], ks: Sequence[int]) -> Dict[str, float]:
+    """
+    Recall@k and MRR over queries with one answer passage each.
+    
+    With a single relevant passage per query, recall@k is the fraction of
+    queries whose answer is within the top k results.
+    
+    Args:
+        ranks: First relevant rank of each query (None when not retrieved)
+        ks: Cut-offs to report
+    
+    Returns:
+        ``recall@k`` for each k and ``mrr``
+    """
+    if not ranks:
+        return {**{f"recall@{k}": 0.0 for k in ks}, "mrr": 0.0}
+    metrics = {
+        f"recall@{k}": round(sum(1 for rank in ranks if rank is not None and rank <= k) / len(ranks), 4)
+        for k in ks
+    }
+    metrics["mrr"] = round(sum(1 / rank for rank in ranks if rank is not None) / len(ranks), 4)
+    return metrics
+
+
+def latency_metrics(latencies_ms: Sequence[float]) -> Dict[str, float]:
+    """p50/p95 of per-query latencies in milliseconds."""
+    if not latencies_ms:
+        return {"p50_ms": 0.0, "p95_ms": 0.0}
+    return {
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies_ms, 95)), 3)
+    }
@@ -0,0 +1,107 @@
+"""
+Deterministic local embeddings for offline runs, tests and benchmarks.
+"""
+
+import math
+import zlib
+from collections import Counter
+from types import SimpleNamespace
+from typing import List, Sequence, Union
+
+import numpy as np
+
+from .retrieval import tokenize
+
+HASHING_EMBEDDING_MODEL = "local-hashing"
+
+DEFAULT_HASHING_DIMENSIONS = 1536
+
+
+class HashingEmbedder:
+    """
+    Embeds text by feature hashing of word unigrams and bigrams.
+    
+    Each feature is hashed with CRC-32 to a dimension and a sign, weighted by
+    ``1 + log(tf)`` and the vector is L2-normalised. Texts sharing words get
+    high cosine similarity, so retrieval behaves sensibly without a model,
+    and the same text always gets the same vector on every machine.
+    """
+    
+    def __init__(self, dimensions: int = DEFAULT_HASHING_DIMENSIONS, bigrams: bool = True):
+        """
+        Initialize embedder.
+        
+        Args:
+            dimensions: Vector size (1536 matches the database schema)
+            bigrams: Also hash adjacent word pairs
+        """
+        self.dimensions = dimensions
+        self.bigrams = bigrams
+    
+    def _features(self, text: str) -> Counter:
+        """Feature counts of a text."""
+        words = tokenize(text)
+        features = Counter(words)
+        if self.bigrams:
+            features.update(f"{first} {second}" for first, second in zip(words, words[1:]))
+        return features
+    
+    def embed(self, text: str) -> np.ndarray:
+        """
+        Embed one text.
+        
+        Args:
+            text: Text to embed
+        
+        Returns:
+            Unit float32 vector (all zeros for text without words)
+        """
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature, count in self._features(text).items():
+            digest = zlib.crc32(feature.encode("utf-8"))
+            sign = 1.0 if digest & 0x80000000 else -1.0
+            vector[(digest & 0x7FFFFFFF) % self.dimensions] += sign * (1.0 + math.log(count))
+        
+        norm = float(np.linalg.norm(vector))
+        if norm > 0:
+            vector /= norm
+        return vector
+    
+    def embed_many(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed texts into a matrix with one row per text."""
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for i, text in enumerate(texts):
+            matrix[i] = self.embed(text)
+        return matrix
+
+
+class LocalEmbeddingClient:
+    """
+    Stand-in for the OpenAI client that embeds with ``HashingEmbedder``.
+    
+    It implements ``embeddings.create(model=..., input=...)``, so the
+    ingestion embedder and the query embedder run unchanged without network
+    access or an API key.
+    """
+    
+    def __init__(self, dimensions: int = DEFAULT_HASHING_DIMENSIONS):
+        """
+        Initialize client.
+        
+        Args:
+            dimensions: Vector size
+        """
+        self.embedder = HashingEmbedder(dimensions)
+        self.embeddings = SimpleNamespace(create=self._create)
+    
+    async def _create(self, model: str, input: Union[str, List[str]], **kwargs) -> SimpleNamespace:
+        """Embed texts, returning a response shaped like the OpenAI API's."""
+        texts = [input] if isinstance(input, str) else list(input)
+        matrix = self.embedder.embed_many(texts)
+        return SimpleNamespace(
+            model=model,
+            data=[
+                SimpleNamespace(index=i, embedding=row.tolist())
+                for i, row in enumerate(matrix)
+            ]
+        )
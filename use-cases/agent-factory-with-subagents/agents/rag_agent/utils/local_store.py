@@ -0,0 +1,862 @@
+"""
+Embedded vector store for offline use, tests and benchmarks.
+
+Everything lives in one directory:
+
+- ``store.sqlite``: documents and chunks; each chunk records the row of its
+  embedding in the matrix file
+- ``embeddings.f32``: embeddings as a raw float32 matrix, appended on write
+  and memory-mapped for search
+- ``ivf.npz``: IVF centroids and row assignments, once an index is built
+
+Deleted chunks leave dead rows in the matrix until ``optimize()`` compacts it.
+"""
+
+import os
+import json
+import time
+import uuid
+import math
+import asyncio
+import logging
+import sqlite3
+import threading
+from collections import Counter
+from typing import Any, Container, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .retrieval import tokenize
+from .search_filter import DEFAULT_COLLECTION, SearchFilter, document_attributes
+from .storage import DocumentRecord, ManifestEntry, VectorStore
+from .vector_index import VectorIndexPlan, ivfflat_lists
+
+logger = logging.getLogger(__name__)
+
+# Default location, shared by ingestion and the agent
+DEFAULT_LOCAL_STORE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "rag_agent", "vector_store"
+)
+
+# Corpus size from which optimize(method="auto") builds an IVF index;
+# below it a brute-force scan is fast enough and exact
+DEFAULT_IVF_MIN_ROWS = 50_000
+
+# Same constant as the hybrid_search SQL function
+RRF_K = 60
+
+# Matrix rows processed at a time when scanning the whole file
+BLOCK_ROWS = 65536
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS documents (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    source TEXT NOT NULL,
+    content TEXT NOT NULL,
+    metadata TEXT NOT NULL DEFAULT '{}',
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    row INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    document_id TEXT NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    content TEXT NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    metadata TEXT NOT NULL DEFAULT '{}',
+    token_count INTEGER,
+    has_embedding INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_document_id ON chunks (document_id);
+"""
+
+# Search filter columns, added to stores created before them; tags are a
+# JSON array and dates Unix timestamps
+FILTER_COLUMNS = {
+    "collection": f"TEXT NOT NULL DEFAULT '{DEFAULT_COLLECTION}'",
+    "tags": "TEXT NOT NULL DEFAULT '[]'",
+    "document_date": "REAL"
+}
+
+FILTER_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_documents_collection ON documents (collection);
+CREATE INDEX IF NOT EXISTS idx_documents_source ON documents (source);
+CREATE INDEX IF NOT EXISTS idx_documents_document_date ON documents (document_date);
+"""
+
+
+class BM25Index:
+    """In-memory inverted index scoring chunks with BM25."""
+    
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        """
+        Initialize index.
+        
+        Args:
+            k1: Term frequency saturation
+            b: Length normalisation
+        """
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.lengths: Dict[int, int] = {}
+        self.total_length = 0
+    
+    def add(self, row: int, text: str):
+        """Index a chunk's text under its matrix row."""
+        counts = Counter(tokenize(text))
+        for term, count in counts.items():
+            self.postings.setdefault(term, {})[row] = count
+        length = sum(counts.values())
+        self.lengths[row] = length
+        self.total_length += length
+    
+    def search(self, query: str, limit: int, rows: Optional[Container[int]] = None) -> List[Tuple[int, float]]:
+        """
+        Best-scoring rows for a query.
+        
+        Args:
+            query: Query text
+            limit: Maximum number of rows
+            rows: Only score these rows (corpus statistics stay global)
+        
+        Returns:
+            (row, score) pairs, best first
+        """
+        if not self.lengths:
+            return []
+        count = len(self.lengths)
+        average_length = max(self.total_length / count, 1.0)
+        
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for row, tf in postings.items():
+                if rows is not None and row not in rows:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[row] / average_length)
+                scores[row] = scores.get(row, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+
+def kmeans(
+    vectors: np.ndarray,
+    clusters: int,
+    iterations: int = 10,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    Spherical k-means over unit vectors.
+    
+    Args:
+        vectors: Unit vectors, one per row
+        clusters: Number of centroids
+        iterations: Lloyd iterations
+        seed: Random seed for the initial centroids
+    
+    Returns:
+        Unit centroids, one per row
+    """
+    rng = np.random.default_rng(seed)
+    clusters = min(clusters, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), clusters, replace=False)].copy()
+    
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        for cluster in range(clusters):
+            members = vectors[assignments == cluster]
+            if len(members):
+                centroids[cluster] = members.sum(axis=0)
+            else:
+                # Re-seed empty clusters so every list stays in use
+                centroids[cluster] = vectors[rng.integers(len(vectors))]
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+    
+    return centroids.astype(np.float32)
+
+
+class LocalVectorStore(VectorStore):
+    """
+    Vector store in a local directory, with no server or network access.
+    
+    Vector search is an exact scan of the memory-mapped matrix, or an IVF
+    search over the ``probes`` nearest of about sqrt(rows) k-means lists once
+    ``optimize()`` has built the index. Hybrid search fuses it with BM25 by
+    reciprocal rank fusion exactly like the ``hybrid_search`` SQL function.
+    Blocking work runs in a thread.
+    """
+    
+    name = "local"
+    
+    def __init__(
+        self,
+        path: str,
+        ivf_min_rows: int = DEFAULT_IVF_MIN_ROWS,
+        probes: Optional[int] = None
+    ):
+        """
+        Initialize store.
+        
+        Args:
+            path: Directory holding the store files (created if missing)
+            ivf_min_rows: Corpus size from which the automatic index method builds IVF
+            probes: Default IVF lists searched per query (default: sqrt(lists))
+        """
+        self.path = path
+        self.ivf_min_rows = ivf_min_rows
+        self.probes = probes
+        
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._dimensions: Optional[int] = None
+        self._matrix: Optional[np.ndarray] = None
+        self._norms = np.zeros(0, dtype=np.float32)
+        # Rows referenced by a chunk, and rows with a searchable embedding
+        self._present = np.zeros(0, dtype=bool)
+        self._embedded = np.zeros(0, dtype=bool)
+        self._text_index: Optional[BM25Index] = None
+        
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._lists: List[np.ndarray] = []
+        self._ivf_dirty = False
+    
+    @property
+    def _matrix_path(self) -> str:
+        return os.path.join(self.path, "embeddings.f32")
+    
+    @property
+    def _ivf_path(self) -> str:
+        return os.path.join(self.path, "ivf.npz")
+    
+    @property
+    def rows(self) -> int:
+        """Rows in the matrix file, including dead ones."""
+        return len(self._present)
+    
+    @property
+    def index(self) -> Optional[VectorIndexPlan]:
+        """Current IVF index, None when searches scan the whole matrix."""
+        if self._centroids is None:
+            return None
+        return VectorIndexPlan("ivfflat", lists=len(self._centroids))
+    
+    async def initialize(self):
+        """Open the store, loading masks, norms and the IVF index."""
+        await asyncio.to_thread(self._open)
+    
+    async def close(self):
+        """Persist IVF assignments and close the database."""
+        await asyncio.to_thread(self._close)
+    
+    def _open(self):
+        with self._lock:
+            if self._db is not None:
+                return
+            os.makedirs(self.path, exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(self.path, "store.sqlite"), check_same_thread=False)
+            self._db.execute("PRAGMA foreign_keys = ON")
+            self._db.execute("PRAGMA journal_mode = WAL")
+            self._db.executescript(SCHEMA)
+            self._migrate()
+            
+            value = self._db.execute("SELECT value FROM meta WHERE key = 'dimensions'").fetchone()
+            self._dimensions = int(value[0]) if value else None
+            self._load_matrix()
+            self._load_ivf()
+    
+    def _migrate(self):
+        """Add the search filter columns and their indexes."""
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(documents)")}
+        with self._db:
+            for column, definition in FILTER_COLUMNS.items():
+                if column not in columns:
+                    self._db.execute(f"ALTER TABLE documents ADD COLUMN {column} {definition}")
+            self._db.executescript(FILTER_INDEXES)
+    
+    def _close(self):
+        with self._lock:
+            if self._db is None:
+                return
+            self._save_ivf()
+            self._db.close()
+            self._db = None
+            self._matrix = None
+    
+    def _load_matrix(self):
+        """Map the matrix file and rebuild row masks from the chunk table."""
+        rows = 0
+        if self._dimensions and os.path.exists(self._matrix_path):
+            row_bytes = self._dimensions * 4
+            size = os.path.getsize(self._matrix_path)
+            if size % row_bytes:
+                # Torn append from an interrupted write; no chunk references it
+                with open(self._matrix_path, "r+b") as f:
+                    f.truncate(size - size % row_bytes)
+            rows = size // row_bytes
+        
+        self._map_matrix(rows)
+        self._norms = np.zeros(rows, dtype=np.float32)
+        for start in range(0, rows, BLOCK_ROWS):
+            block = np.asarray(self._matrix[start:start + BLOCK_ROWS])
+            self._norms[start:start + len(block)] = np.linalg.norm(block, axis=1)
+        self._present = np.zeros(rows, dtype=bool)
+        self._embedded = np.zeros(rows, dtype=bool)
+        for row, has_embedding in self._db.execute("SELECT row, has_embedding FROM chunks"):
+            self._present[row] = True
+            self._embedded[row] = bool(has_embedding)
+        self._text_index = None
+    
+    def _map_matrix(self, rows: int):
+        if rows:
+            self._matrix = np.memmap(self._matrix_path, dtype=np.float32, mode="r", shape=(rows, self._dimensions))
+        else:
+            self._matrix = np.zeros((0, self._dimensions or 0), dtype=np.float32)
+    
+    def _load_ivf(self):
+        self._centroids = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._lists = []
+        if os.path.exists(self._ivf_path):
+            with np.load(self._ivf_path) as data:
+                if self._dimensions and data["centroids"].shape[1] == self._dimensions:
+                    self._centroids = data["centroids"]
+                    self._assignments = data["assignments"][:self.rows]
+        if self._centroids is not None:
+            # Rows appended since the index was saved go to their nearest list
+            self._assign(np.arange(len(self._assignments), self.rows))
+    
+    def _save_ivf(self):
+        if not self._ivf_dirty:
+            return
+        if self._centroids is None:
+            if os.path.exists(self._ivf_path):
+                os.remove(self._ivf_path)
+        else:
+            np.savez(self._ivf_path, centroids=self._centroids, assignments=self._assignments)
+        self._ivf_dirty = False
+    
+    def _index_lists(self):
+        """Rebuild the IVF lists from the row assignments."""
+        order = np.argsort(self._assignments, kind="stable")
+        bounds = np.searchsorted(self._assignments[order], np.arange(len(self._centroids) + 1))
+        self._lists = [order[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+    
+    def _assign(self, rows: np.ndarray):
+        """Add rows appended to the matrix to the IVF list of their nearest centroid."""
+        if self._centroids is None:
+            return
+        if len(self._lists) != len(self._centroids):
+            self._index_lists()
+        for start in range(0, len(rows), BLOCK_ROWS):
+            block = rows[start:start + BLOCK_ROWS]
+            vectors = np.asarray(self._matrix[block]) / np.maximum(self._norms[block], 1e-12)[:, None]
+            nearest = np.argmax(vectors @ self._centroids.T, axis=1).astype(np.int32)
+            self._assignments = np.concatenate([self._assignments, nearest])
+            for cluster in np.unique(nearest):
+                self._lists[cluster] = np.concatenate([self._lists[cluster], block[nearest == cluster]])
+        if len(rows):
+            self._ivf_dirty = True
+    
+    async def save_documents(
+        self,
+        documents: Sequence[DocumentRecord],
+        replaced_ids: Sequence[str] = ()
+    ) -> List[str]:
+        """Append embeddings to the matrix, then commit rows in one transaction."""
+        return await asyncio.to_thread(self._save_documents, documents, replaced_ids)
+    
+    def _save_documents(self, documents: Sequence[DocumentRecord], replaced_ids: Sequence[str]) -> List[str]:
+        self._open()
+        with self._lock:
+            chunks = [chunk for _, _, _, document_chunks, _ in documents for chunk in document_chunks]
+            embeddings = [getattr(chunk, "embedding", None) or None for chunk in chunks]
+            
+            dimensions = self._dimensions
+            for embedding in embeddings:
+                if embedding is None:
+                    continue
+                if dimensions is None:
+                    dimensions = len(embedding)
+                elif len(embedding) != dimensions:
+                    raise ValueError(f"Expected {dimensions}-dimensional embeddings, got {len(embedding)}")
+            if chunks and dimensions is None:
+                raise ValueError("Cannot store chunks before the embedding dimension is known")
+            
+            # Vectors are written first: if the transaction fails, the new rows
+            # are simply never referenced
+            first_row = self.rows
+            vectors = np.zeros((len(chunks), dimensions or 0), dtype=np.float32)
+            for i, embedding in enumerate(embeddings):
+                if embedding is not None:
+                    vectors[i] = embedding
+            if len(chunks):
+                with open(self._matrix_path, "ab") as f:
+                    f.write(vectors.tobytes())
+            
+            document_ids = [str(uuid.uuid4()) for _ in documents]
+            attributes = [document_attributes(metadata) for _, _, _, _, metadata in documents]
+            now = time.time()
+            removed_rows: List[int] = []
+            with self._db:
+                if dimensions != self._dimensions:
+                    self._db.execute("INSERT OR REPLACE INTO meta VALUES ('dimensions', ?)", (str(dimensions),))
+                if replaced_ids:
+                    removed_rows = self._delete_rows(replaced_ids)
+                self._db.executemany(
+                    "INSERT INTO documents (id, title, source, content, metadata, created_at, "
+                    "collection, tags, document_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            document_id, title, source, content, json.dumps(metadata), now,
+                            collection, json.dumps(tags), document_date.timestamp() if document_date else None
+                        )
+                        for document_id, (title, source, content, _, metadata), (collection, tags, document_date)
+                        in zip(document_ids, documents, attributes)
+                    ]
+                )
+                self._db.executemany(
+                    "INSERT INTO chunks (row, id, document_id, content, chunk_index, metadata, token_count, has_embedding) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            first_row + i, str(uuid.uuid4()), document_id, chunk.content, chunk.index,
+                            json.dumps(chunk.metadata), chunk.token_count, embeddings[i] is not None
+                        )
+                        for i, (document_id, chunk) in enumerate(
+                            (document_id, chunk)
+                            for document_id, (_, _, _, document_chunks, _) in zip(document_ids, documents)
+                            for chunk in document_chunks
+                        )
+                    ]
+                )
+            
+            self._dimensions = dimensions
+            self._map_matrix(first_row + len(chunks))
+            self._norms = np.concatenate([self._norms, np.linalg.norm(vectors, axis=1).astype(np.float32)])
+            self._present = np.concatenate([self._present, np.ones(len(chunks), dtype=bool)])
+            self._embedded = np.concatenate([self._embedded, np.array([e is not None for e in embeddings], dtype=bool)])
+            self._forget_rows(removed_rows)
+            self._assign(np.arange(first_row, self.rows))
+            if self._text_index is not None and not removed_rows:
+                for i, chunk in enumerate(chunks):
+                    self._text_index.add(first_row + i, chunk.content)
+            
+            return document_ids
+    
+    def _delete_rows(self, document_ids: Sequence[str]) -> List[int]:
+        """Delete documents inside the current transaction, returning their chunk rows."""
+        placeholders = ",".join("?" * len(document_ids))
+        rows = [
+            row for (row,) in self._db.execute(
+                f"SELECT row FROM chunks WHERE document_id IN ({placeholders})", list(document_ids)
+            )
+        ]
+        self._db.execute(f"DELETE FROM documents WHERE id IN ({placeholders})", list(document_ids))
+        return rows
+    
+    def _forget_rows(self, rows: Sequence[int]):
+        """Exclude deleted rows from searches."""
+        if not rows:
+            return
+        self._present[rows] = False
+        self._embedded[rows] = False
+        # Rebuilt lazily so corpus statistics exclude the deleted chunks
+        self._text_index = None
+    
+    async def load_manifest(self, ingest_root: str) -> Dict[str, ManifestEntry]:
+        """Documents whose metadata records the ingest root, newest first."""
+        return await asyncio.to_thread(self._load_manifest, ingest_root)
+    
+    def _load_manifest(self, ingest_root: str) -> Dict[str, ManifestEntry]:
+        self._open()
+        with self._lock:
+            rows = self._db.execute(
+                """
+                SELECT id, source, json_extract(metadata, '$.content_hash')
+                FROM documents
+                WHERE json_extract(metadata, '$.ingest_root') = ?
+                ORDER BY created_at DESC, rowid DESC
+                """,
+                (ingest_root,)
+            ).fetchall()
+        
+        manifest: Dict[str, ManifestEntry] = {}
+        for document_id, source, digest in rows:
+            document_ids, _ = manifest.setdefault(source, ([], digest))
+            document_ids.append(document_id)
+        return manifest
+    
+    async def load_chunk_embeddings(
+        self,
+        document_ids: Sequence[str],
+        model: str
+    ) -> Dict[str, List[float]]:
+        """Embeddings of chunks with a content hash, generated by the model."""
+        return await asyncio.to_thread(self._load_chunk_embeddings, document_ids, model)
+    
+    def _load_chunk_embeddings(self, document_ids: Sequence[str], model: str) -> Dict[str, List[float]]:
+        self._open()
+        with self._lock:
+            if not document_ids:
+                return {}
+            placeholders = ",".join("?" * len(document_ids))
+            rows = self._db.execute(
+                f"""
+                SELECT json_extract(metadata, '$.content_hash'), row
+                FROM chunks
+                WHERE document_id IN ({placeholders})
+                  AND has_embedding
+                  AND json_extract(metadata, '$.content_hash') IS NOT NULL
+                  AND json_extract(metadata, '$.embedding_model') = ?
+                """,
+                [*document_ids, model]
+            ).fetchall()
+            return {digest: self._matrix[row].tolist() for digest, row in rows}
+    
+    async def find_dangling_duplicates(self, ingest_root: str) -> List[str]:
+        """Documents linking to chunks that were deleted."""
+        return await asyncio.to_thread(self._find_dangling_duplicates, ingest_root)
+    
+    def _find_dangling_duplicates(self, ingest_root: str) -> List[str]:
+        # The uncorrelated subquery is built once into a temporary index
+        self._open()
+        with self._lock:
+            rows = self._db.execute(
+                """
+                SELECT DISTINCT d.source
+                FROM documents d, json_each(d.metadata, '$.duplicate_chunks') AS link
+                WHERE json_extract(d.metadata, '$.ingest_root') = ?
+                  AND (d.collection, json_extract(link.value, '$.duplicate_of')) NOT IN (
+                      SELECT cd.collection, json_extract(c.metadata, '$.content_hash')
+                      FROM chunks c JOIN documents cd ON c.document_id = cd.id
+                      WHERE json_extract(c.metadata, '$.content_hash') IS NOT NULL
+                  )
+                ORDER BY d.source
+                """,
+                (ingest_root,)
+            ).fetchall()
+        return [source for source, in rows]
+    
+    async def delete_documents(self, document_ids: Sequence[str]):
+        """Delete documents and their chunks."""
+        await asyncio.to_thread(self._delete_documents, document_ids)
+    
+    def _delete_documents(self, document_ids: Sequence[str]):
+        self._open()
+        with self._lock:
+            if not document_ids:
+                return
+            with self._db:
+                rows = self._delete_rows(document_ids)
+            self._forget_rows(rows)
+    
+    async def clear(self, drop_index: bool = False):
+        """Delete all documents and truncate the matrix."""
+        await asyncio.to_thread(self._clear, drop_index)
+    
+    def _clear(self, drop_index: bool):
+        self._open()
+        with self._lock:
+            with self._db:
+                self._db.execute("DELETE FROM chunks")
+                self._db.execute("DELETE FROM documents")
+            self._matrix = None
+            if os.path.exists(self._matrix_path):
+                os.truncate(self._matrix_path, 0)
+            self._load_matrix()
+            
+            self._assignments = np.zeros(0, dtype=np.int32)
+            self._lists = []
+            if drop_index:
+                self._centroids = None
+            self._ivf_dirty = True
+            self._save_ivf()
+    
+    async def optimize(self, method: str = "auto") -> Optional[str]:
+        """
+        Compact dead rows and build the IVF index the corpus size calls for.
+        
+        With "auto", corpora of at least ``ivf_min_rows`` embeddings get an
+        IVF index with about sqrt(rows) lists and smaller ones are scanned.
+        An existing index is kept while its list count stays within a factor
+        of two of the target. HNSW is not available in the local store.
+        """
+        if method not in ("auto", "ivfflat", "none"):
+            raise ValueError(f"Index method {method!r} is not supported by the local store")
+        return await asyncio.to_thread(self._optimize, method)
+    
+    def _optimize(self, method: str) -> Optional[str]:
+        self._open()
+        with self._lock:
+            self._compact()
+            
+            embedded = int(self._embedded.sum())
+            if method == "none" or embedded == 0 or (method == "auto" and embedded < self.ivf_min_rows):
+                target = VectorIndexPlan("none")
+            else:
+                target = VectorIndexPlan("ivfflat", lists=ivfflat_lists(embedded))
+            
+            current = self.index or VectorIndexPlan("none")
+            if current.satisfies(target):
+                self._save_ivf()
+                return None
+            
+            if target.method == "none":
+                self._centroids = None
+                self._assignments = np.zeros(0, dtype=np.int32)
+                self._lists = []
+            else:
+                self._build_ivf(target.lists)
+            self._ivf_dirty = True
+            self._save_ivf()
+            return str(target)
+    
+    def _compact(self):
+        """Rewrite the matrix without dead rows, renumbering chunks in order."""
+        keep = np.flatnonzero(self._present)
+        if len(keep) == self.rows:
+            return
+        
+        temporary = self._matrix_path + ".tmp"
+        with open(temporary, "wb") as f:
+            for start in range(0, len(keep), BLOCK_ROWS):
+                f.write(np.asarray(self._matrix[keep[start:start + BLOCK_ROWS]]).tobytes())
+        
+        # Rows only move down, so each target row is free when it is reached
+        with self._db:
+            self._db.executemany(
+                "UPDATE chunks SET row = ? WHERE row = ?",
+                [(new, int(old)) for new, old in enumerate(keep) if new != old]
+            )
+        self._matrix = None
+        os.replace(temporary, self._matrix_path)
+        
+        logger.info(f"Compacted local store from {self.rows} to {len(keep)} rows")
+        if self._centroids is not None:
+            self._assignments = self._assignments[keep]
+            self._index_lists()
+            self._ivf_dirty = True
+        self._load_matrix()
+    
+    def _build_ivf(self, lists: int, sample_size: int = 256):
+        """Train centroids on a sample of embeddings and assign every row."""
+        rows = np.flatnonzero(self._embedded)
+        rng = np.random.default_rng(0)
+        sample = rows if len(rows) <= lists * sample_size else np.sort(rng.choice(rows, lists * sample_size, replace=False))
+        vectors = np.asarray(self._matrix[sample]) / np.maximum(self._norms[sample], 1e-12)[:, None]
+        
+        started = time.perf_counter()
+        self._centroids = kmeans(vectors, lists)
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._lists = []
+        self._assign(np.arange(self.rows))
+        logger.info(
+            f"Built IVF index with {len(self._centroids)} lists over {len(rows)} rows "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+    
+    def _unit_query(self, query_embedding: Sequence[float]) -> np.ndarray:
+        query = np.asarray(query_embedding, dtype=np.float32)
+        if len(query) != self._dimensions:
+            raise ValueError(f"Expected a {self._dimensions}-dimensional query, got {len(query)}")
+        return query / max(float(np.linalg.norm(query)), 1e-12)
+    
+    def _nearest(
+        self,
+        query: np.ndarray,
+        limit: int,
+        probes: Optional[int],
+        rows: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rows and cosine similarities of the nearest embeddings, best first.
+        
+        ``rows`` restricts the search to a filter's rows, which are scored
+        exactly: probing IVF lists could leave fewer matching rows than asked.
+        """
+        if rows is not None:
+            candidates = rows[self._embedded[rows]]
+        elif self._centroids is not None:
+            probes = min(probes or self.probes or self.index.default_probes, len(self._centroids))
+            probed = np.argsort(-(self._centroids @ query))[:probes]
+            candidates = np.concatenate([self._lists[cluster] for cluster in probed])
+            candidates = candidates[self._embedded[candidates]]
+        else:
+            candidates = np.flatnonzero(self._embedded)
+        if not len(candidates):
+            return candidates, np.zeros(0, dtype=np.float32)
+        
+        if len(candidates) == self.rows:
+            scores = np.asarray(self._matrix @ query)
+        else:
+            scores = np.asarray(self._matrix[candidates] @ query)
+        scores = scores / np.maximum(self._norms[candidates], 1e-12)
+        
+        if limit < len(candidates):
+            top = np.argpartition(-scores, limit)[:limit]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return candidates[top], scores[top]
+    
+    def _filter_rows(self, filters: Optional[SearchFilter]) -> Optional[np.ndarray]:
+        """Matrix rows of the chunks matching a filter, None without one."""
+        if filters is None or filters.is_empty:
+            return None
+        params: List[Any] = []
+        conditions = filters.sqlite_conditions(params, linked_duplicates=True)
+        rows = self._db.execute(
+            f"""
+            SELECT c.row
+            FROM chunks c
+            JOIN documents d ON c.document_id = d.id
+            WHERE {" AND ".join(conditions)}
+            ORDER BY c.row
+            """,
+            params
+        ).fetchall()
+        return np.array([row for (row,) in rows], dtype=np.int64)
+    
+    def _fetch_chunks(self, rows: Sequence[int]) -> Dict[int, Dict[str, Any]]:
+        """Search result columns of chunks by matrix row."""
+        if not len(rows):
+            return {}
+        placeholders = ",".join("?" * len(rows))
+        results = self._db.execute(
+            f"""
+            SELECT c.row, c.id, c.document_id, c.content, c.metadata, d.title, d.source
+            FROM chunks c
+            JOIN documents d ON c.document_id = d.id
+            WHERE c.row IN ({placeholders})
+            """,
+            [int(row) for row in rows]
+        )
+        return {
+            row: {
+                'chunk_id': chunk_id,
+                'document_id': document_id,
+                'content': content,
+                'metadata': json.loads(metadata) if metadata else {},
+                'document_title': title,
+                'document_source': source
+            }
+            for row, chunk_id, document_id, content, metadata, title, source in results
+        }
+    
+    async def vector_search(
+        self,
+        query_embedding: Sequence[float],
+        match_count: int,
+        with_embeddings: bool = False,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        filters: Optional[SearchFilter] = None
+    ) -> List[Dict[str, Any]]:
+        """Exact or IVF cosine search (``ef_search`` does not apply); filtered searches are exact."""
+        return await asyncio.to_thread(
+            self._vector_search, query_embedding, match_count, with_embeddings, probes, filters
+        )
+    
+    def _vector_search(
+        self,
+        query_embedding: Sequence[float],
+        match_count: int,
+        with_embeddings: bool,
+        probes: Optional[int],
+        filters: Optional[SearchFilter] = None
+    ) -> List[Dict[str, Any]]:
+        self._open()
+        with self._lock:
+            if not self._dimensions:
+                return []
+            rows, similarities = self._nearest(
+                self._unit_query(query_embedding), match_count, probes, self._filter_rows(filters)
+            )
+            chunks = self._fetch_chunks(rows)
+            results = []
+            for row, similarity in zip(rows.tolist(), similarities.tolist()):
+                result = dict(chunks[row], similarity=similarity)
+                if with_embeddings:
+                    result['embedding'] = self._matrix[row].tolist()
+                results.append(result)
+            return results
+    
+    async def hybrid_search(
+        self,
+        query_embedding: Sequence[float],
+        query_text: str,
+        match_count: int,
+        text_weight: float = 0.3,
+        candidate_count: int = 50,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        filters: Optional[SearchFilter] = None
+    ) -> List[Dict[str, Any]]:
+        """Reciprocal rank fusion of vector and BM25 candidates."""
+        return await asyncio.to_thread(
+            self._hybrid_search, query_embedding, query_text, match_count, text_weight, candidate_count, probes, filters
+        )
+    
+    def _hybrid_search(
+        self,
+        query_embedding: Sequence[float],
+        query_text: str,
+        match_count: int,
+        text_weight: float,
+        candidate_count: int,
+        probes: Optional[int],
+        filters: Optional[SearchFilter] = None
+    ) -> List[Dict[str, Any]]:
+        self._open()
+        with self._lock:
+            if not self._dimensions:
+                return []
+            candidates = max(candidate_count, match_count)
+            query = self._unit_query(query_embedding)
+            rows = self._filter_rows(filters)
+            
+            vector_rows, _ = self._nearest(query, candidates, probes, rows)
+            text_results = self._get_text_index().search(
+                query_text, candidates, rows=set(rows.tolist()) if rows is not None else None
+            )
+            
+            scores: Dict[int, float] = {}
+            for rank, row in enumerate(vector_rows.tolist(), start=1):
+                scores[row] = (1 - text_weight) / (RRF_K + rank)
+            for rank, (row, _) in enumerate(text_results, start=1):
+                scores[row] = scores.get(row, 0.0) + text_weight / (RRF_K + rank)
+            fused = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:match_count]
+            
+            text_scores = dict(text_results)
+            chunks = self._fetch_chunks([row for row, _ in fused])
+            results = []
+            for row, score in fused:
+                vector_similarity = (
+                    float(self._matrix[row] @ query) / max(float(self._norms[row]), 1e-12)
+                    if self._embedded[row] else None
+                )
+                results.append(dict(
+                    chunks[row],
+                    combined_score=score,
+                    vector_similarity=vector_similarity,
+                    text_similarity=text_scores.get(row, 0.0)
+                ))
+            return results
+    
+    def _get_text_index(self) -> BM25Index:
+        """BM25 index over all chunks, built on first use."""
+        if self._text_index is None:
+            index = BM25Index()
+            for row, content in self._db.execute("SELECT row, content FROM chunks"):
+                index.add(row, content)
+            self._text_index = index
+        return self._text_index
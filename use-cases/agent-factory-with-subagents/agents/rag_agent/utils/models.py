@@ -176,6 +176,47 @@ class IngestionConfig(BaseModel):
     chunk_overlap: int = Field(default=200, ge=0, le=1000)
     max_chunk_size: int = Field(default=2000, ge=500, le=10000)
     use_semantic_chunking: bool = True
+    semantic_method: Literal["embedding", "llm"] = "embedding"
+    
+    # Pipeline stage concurrency and backpressure
+    chunk_workers: int = Field(default=4, ge=1, le=64, description="Concurrent read/chunk workers")
+    chunk_processes: Optional[int] = Field(
+        default=None, ge=0, le=256,
+        description="Processes for parsing and rule-based chunking (None: CPU count, 0: threads)"
+    )
+    embed_workers: int = Field(default=8, ge=1, le=256, description="Concurrent embedding requests")
+    store_workers: int = Field(default=4, ge=1, le=64, description="Concurrent database writers")
+    queue_size: int = Field(default=32, ge=1, le=10000, description="Documents buffered between stages")
+    store_batch_size: int = Field(default=8, ge=1, le=1000, description="Documents written per transaction")
+    
+    # Documents are streamed from the folder; these bound what is held at once
+    max_file_mb: Optional[float] = Field(default=50.0, gt=0, description="Larger files are skipped (None: no limit)")
+    memory_budget_mb: Optional[float] = Field(
+        default=512.0, gt=0,
+        description="File bytes of documents in flight across all stages (None: bounded by queue_size only)"
+    )
+    
+    # Embedding requests are packed by tokens and shared across documents
+    embedding_concurrency: int = Field(default=8, ge=1, le=256, description="Embedding requests in flight")
+    embedding_tokens_per_minute: Optional[int] = Field(default=None, ge=1, description="Embedding token-per-minute limit")
+    
+    # Skip unchanged files and reuse embeddings of unchanged chunks
+    incremental: bool = False
+    
+    # Store one copy of repeated chunks per collection; later copies link to it
+    deduplicate_chunks: bool = True
+    near_duplicate_threshold: float = Field(
+        default=0.0, ge=0.0, le=1.0,
+        description="Estimated word-shingle Jaccard similarity of near-duplicate chunks, "
+                    "whose differing text is dropped (0: exact duplicates only)"
+    )
+    
+    # ANN index on chunk embeddings, rebuilt after bulk loads
+    manage_vector_index: bool = True
+    vector_index_method: Literal["auto", "hnsw", "ivfflat", "none"] = "auto"
+    
+    # Search filter collection; a document's frontmatter "collection" wins
+    collection: Optional[str] = Field(default=None, description="Collection of the ingested documents")
     
     @field_validator('chunk_overlap')
     @classmethod
@@ -193,4 +234,7 @@ class IngestionResult(BaseModel):
     title: str
     chunks_created: int
     processing_time_ms: float
+    chunks_reused: int = 0
+    chunks_deduplicated: int = 0
+    unchanged: bool = False
     errors: List[str] = Field(default_factory=list)
\ No newline at end of file
@@ -0,0 +1,170 @@
+"""
+List partitions of the chunks table by collection.
+
+With ``sql/partitioned_chunks.sql`` applied, ``chunks`` is partitioned by
+its ``collection`` column: each collection (for example one agent's
+knowledge) gets its own partition with its own vector, full-text and
+document indexes, and a search filtered to a collection scans only that
+partition. Chunks of collections without a partition land in the default
+partition ``chunks_default``.
+
+Creating a partition locks the partitioned table and, through the foreign
+key, ``documents``. Writers that have already touched both would deadlock
+with it, so writers hold a shared advisory lock for their transaction
+(``lock_for_writes``) and partition changes take it exclusively.
+"""
+
+import re
+import hashlib
+import logging
+from typing import Dict
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PARTITION = "chunks_default"
+
+# Advisory lock key shared by chunk writers and partition changes
+PARTITION_LOCK_KEY = 0x63686E6B
+
+
+async def lock_for_writes(conn: asyncpg.Connection):
+    """
+    Wait for partition changes to finish and keep new ones out.
+    
+    Call first in a transaction that writes chunks or documents of a
+    partitioned table; the lock is released when the transaction ends.
+    """
+    await conn.execute("SELECT pg_advisory_xact_lock_shared($1)", PARTITION_LOCK_KEY)
+
+
+async def is_partitioned(conn: asyncpg.Connection) -> bool:
+    """Whether the chunks table is partitioned."""
+    kind = await conn.fetchval("SELECT relkind::text FROM pg_class WHERE oid = to_regclass('chunks')")
+    return kind == "p"
+
+
+def partition_name(collection: str) -> str:
+    """
+    Table name of a collection's partition.
+    
+    The readable part is cut to fit PostgreSQL's 63 character identifiers,
+    and a hash of the full name keeps different collections apart. Matches
+    the names given by ``sql/partitioned_chunks.sql``.
+    """
+    slug = re.sub(r"[^a-z0-9]+", "_", collection.lower()).strip("_")[:40]
+    digest = hashlib.md5(collection.encode("utf-8")).hexdigest()[:8]
+    return f"chunks_{slug}_{digest}" if slug else f"chunks_{digest}"
+
+
+async def list_partitions(conn: asyncpg.Connection) -> Dict[str, str]:
+    """
+    Collections with their own partition.
+    
+    Args:
+        conn: Database connection
+    
+    Returns:
+        Partition table name by collection
+    """
+    rows = await conn.fetch(
+        """
+        SELECT child.relname AS name, pg_get_expr(child.relpartbound, child.oid) AS bound
+        FROM pg_inherits i
+        JOIN pg_class child ON child.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass('chunks')
+        """
+    )
+    partitions = {}
+    for row in rows:
+        # FOR VALUES IN ('name'); the default partition has no list
+        match = re.fullmatch(r"FOR VALUES IN \('((?:[^']|'')*)'\)", row["bound"])
+        if match:
+            partitions[match.group(1).replace("''", "'")] = row["name"]
+    return partitions
+
+
+async def create_partition(conn: asyncpg.Connection, collection: str) -> bool:
+    """
+    Create the partition of a collection.
+    
+    The new partition inherits every index of the partitioned table. This
+    fails when the default partition already holds chunks of the collection;
+    they stay there (still searchable, without pruning) and a warning is
+    logged. Move them with ``move_collection``.
+    
+    Args:
+        conn: Database connection, not inside a transaction
+        collection: Collection name
+    
+    Returns:
+        Whether the partition exists afterwards
+    """
+    statement = await conn.fetchval(
+        "SELECT format('CREATE TABLE IF NOT EXISTS %I PARTITION OF chunks FOR VALUES IN (%L)', $1::text, $2::text)",
+        partition_name(collection),
+        collection
+    )
+    await conn.execute("SELECT pg_advisory_lock($1)", PARTITION_LOCK_KEY)
+    try:
+        await conn.execute(statement)
+    except asyncpg.CheckViolationError:
+        logger.warning(
+            f"Chunks of collection {collection!r} are already in {DEFAULT_PARTITION}; "
+            f"not creating a partition for it. Move them with utils.partitions.move_collection()"
+        )
+        return False
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", PARTITION_LOCK_KEY)
+    logger.info(f"Created partition {partition_name(collection)} for collection {collection!r}")
+    return True
+
+
+async def move_collection(conn: asyncpg.Connection, collection: str) -> int:
+    """
+    Move a collection's chunks from the default partition to their own.
+    
+    In one transaction: detach ``chunks_default``, create the collection's
+    partition, copy the collection's rows from the detached table into
+    ``chunks`` (which routes them to the new partition), delete them from
+    the detached table and attach it again as the default. Chunks are not
+    searchable by other sessions until the transaction commits.
+    
+    Args:
+        conn: Database connection, not inside a transaction
+        collection: Collection name
+    
+    Returns:
+        Number of chunks moved
+    """
+    # Generated columns (the full-text vector) are computed again on insert
+    statements = await conn.fetchrow(
+        """
+        WITH stored AS (
+            SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum) AS columns
+            FROM pg_attribute
+            WHERE attrelid = to_regclass('chunks') AND attnum > 0
+              AND NOT attisdropped AND attgenerated = ''
+        )
+        SELECT format('ALTER TABLE chunks DETACH PARTITION %I', $1::text) AS detach,
+               format('CREATE TABLE IF NOT EXISTS %I PARTITION OF chunks FOR VALUES IN (%L)', $2::text, $3::text) AS "create",
+               format('INSERT INTO chunks (%s) SELECT %s FROM %I WHERE collection = $1',
+                      columns, columns, $1::text) AS copy,
+               format('DELETE FROM %I WHERE collection = $1', $1::text) AS delete,
+               format('ALTER TABLE chunks ATTACH PARTITION %I DEFAULT', $1::text) AS attach
+        FROM stored
+        """,
+        DEFAULT_PARTITION,
+        partition_name(collection),
+        collection
+    )
+    async with conn.transaction():
+        await conn.execute("SELECT pg_advisory_xact_lock($1)", PARTITION_LOCK_KEY)
+        await conn.execute(statements["detach"])
+        await conn.execute(statements["create"])
+        moved = int((await conn.execute(statements["copy"], collection)).split()[-1])
+        await conn.execute(statements["delete"], collection)
+        await conn.execute(statements["attach"])
+    logger.info(f"Moved {moved} chunks of collection {collection!r} to {partition_name(collection)}")
+    return moved
@@ -9,6 +9,8 @@ from pydantic_ai.providers.openai import OpenAIProvider
 import openai
 from dotenv import load_dotenv
 
+from .local_embeddings import HASHING_EMBEDDING_MODEL, LocalEmbeddingClient
+
 # Load environment variables
 load_dotenv()
 
@@ -29,13 +31,29 @@ def get_llm_model() -> OpenAIModel:
     return OpenAIModel(llm_choice, provider=OpenAIProvider(api_key=api_key))
 
 
+def get_embedding_provider() -> str:
+    """
+    Get embedding provider name.
+    
+    Returns:
+        "openai", or "local" for offline hashing embeddings
+    """
+    return os.getenv('EMBEDDING_PROVIDER', 'openai').lower()
+
+
 def get_embedding_client() -> openai.AsyncOpenAI:
     """
     Get OpenAI client for embeddings.
     
+    With EMBEDDING_PROVIDER=local a client producing deterministic hashing
+    embeddings is returned instead, so no API key is needed.
+    
     Returns:
         Configured OpenAI client for embeddings
     """
+    if get_embedding_provider() == 'local':
+        return LocalEmbeddingClient()
+    
     api_key = os.getenv('OPENAI_API_KEY')
     
     if not api_key:
@@ -51,7 +69,8 @@ def get_embedding_model() -> str:
     Returns:
         Embedding model name
     """
-    return os.getenv('EMBEDDING_MODEL', 'text-embedding-3-small')
+    default = HASHING_EMBEDDING_MODEL if get_embedding_provider() == 'local' else 'text-embedding-3-small'
+    return os.getenv('EMBEDDING_MODEL', default)
 
 
 def get_ingestion_model() -> OpenAIModel:
@@ -98,6 +117,6 @@ def get_model_info() -> dict:
     return {
         "llm_provider": "openai",
         "llm_model": os.getenv('LLM_CHOICE', 'gpt-4.1-mini'),
-        "embedding_provider": "openai",
+        "embedding_provider": get_embedding_provider(),
         "embedding_model": get_embedding_model(),
     }
\ No newline at end of file
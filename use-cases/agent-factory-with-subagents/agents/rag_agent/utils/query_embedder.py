@@ -0,0 +1,226 @@
+"""
+Query-time embedding with a TTL cache, request coalescing and micro-batching.
+"""
+
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .embedding_cache import PersistentEmbeddingCache
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Bounded LRU mapping whose entries expire after a fixed time.
+    
+    Entries are kept in recency order in an ordered dict, so lookups,
+    inserts and evictions are O(1). Expired entries are dropped when read.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 600.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize cache.
+        
+        Args:
+            max_entries: Maximum number of entries
+            ttl_seconds: Lifetime of an entry
+            clock: Monotonic time source
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+    
+    def get(self, key: Any) -> Optional[Any]:
+        """Value for the key, or None when missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires <= self.clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+    
+    def put(self, key: Any, value: Any):
+        """Store a value, evicting the least recently used entries."""
+        self._entries[key] = (self.clock() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class QueryEmbedder:
+    """
+    Embeds search queries for concurrent agent runs with as few API calls as possible.
+    
+    A query is answered, in order, from:
+    
+    1. a TTL/LRU cache of recent query embeddings;
+    2. an identical request already in flight, whose result is shared
+       (single-flight coalescing);
+    3. the persistent embedding cache, when one is given;
+    4. the embeddings API. Distinct queries arriving within the batch window
+       are sent as one request of up to ``max_batch_size`` inputs.
+    """
+    
+    def __init__(
+        self,
+        client: Any,
+        model: str,
+        persistent_cache: Optional[PersistentEmbeddingCache] = None,
+        max_entries: int = 1024,
+        ttl_seconds: float = 600.0,
+        batch_window_ms: float = 5.0,
+        max_batch_size: int = 64
+    ):
+        """
+        Initialize query embedder.
+        
+        Args:
+            client: OpenAI-compatible async client
+            model: Embedding model
+            persistent_cache: Embedding cache shared with ingestion
+            max_entries: Maximum query embeddings kept in memory
+            ttl_seconds: Lifetime of an in-memory query embedding
+            batch_window_ms: Time to collect concurrent queries into one request
+                (0 batches only queries issued in the same event loop step)
+            max_batch_size: Maximum inputs per embeddings request
+        """
+        self.client = client
+        self.model = model
+        self.persistent_cache = persistent_cache
+        self.cache = TTLCache(max_entries, ttl_seconds)
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch_size = max_batch_size
+        
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._pending: List[str] = []
+        self._flush_handle: Optional[asyncio.Handle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        
+        self.hits = 0
+        self.coalesced = 0
+        self.requests = 0
+        self.embedded = 0
+    
+    async def embed(self, text: str) -> List[float]:
+        """
+        Embed a query.
+        
+        Args:
+            text: Query text
+        
+        Returns:
+            Embedding vector
+        """
+        cached = self.cache.get(text)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        
+        future = self._in_flight.get(text)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            if self.persistent_cache is not None:
+                stored = self.persistent_cache.get(self.model, text)
+                if stored is not None:
+                    self.hits += 1
+                    self.cache.put(text, stored)
+                    return stored
+            future = asyncio.get_running_loop().create_future()
+            self._in_flight[text] = future
+            self._enqueue(text)
+        
+        # Shielded so a cancelled caller does not fail the others waiting on it
+        return await asyncio.shield(future)
+    
+    async def drain(self):
+        """Wait for pending batches, including their persistent cache writes."""
+        self._flush()
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+    
+    def stats(self) -> Dict[str, int]:
+        """Cache hits, coalesced waits, API requests and texts embedded."""
+        return {
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "requests": self.requests,
+            "embedded": self.embedded,
+            "cached": len(self.cache)
+        }
+    
+    def _enqueue(self, text: str):
+        """Add a query to the next batch, flushing when the batch is full."""
+        self._pending.append(text)
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            if self.batch_window > 0:
+                self._flush_handle = loop.call_later(self.batch_window, self._flush)
+            else:
+                self._flush_handle = loop.call_soon(self._flush)
+    
+    def _flush(self):
+        """Send the pending queries as one embeddings request."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._embed_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def _embed_batch(self, texts: List[str]):
+        """Embed a batch, resolve the futures waiting on it, then store it."""
+        self.requests += 1
+        self.embedded += len(texts)
+        try:
+            try:
+                response = await self.client.embeddings.create(model=self.model, input=texts)
+                embeddings = [item.embedding for item in response.data]
+                if len(embeddings) != len(texts):
+                    raise ValueError(f"Expected {len(texts)} embeddings, got {len(embeddings)}")
+            except Exception as e:
+                logger.error(f"Query embedding request for {len(texts)} texts failed: {e}")
+                for text in texts:
+                    future = self._in_flight.get(text)
+                    if future is not None and not future.done():
+                        future.set_exception(e)
+                return
+            
+            for text, embedding in zip(texts, embeddings):
+                self.cache.put(text, embedding)
+                future = self._in_flight.get(text)
+                if future is not None and not future.done():
+                    future.set_result(embedding)
+        finally:
+            # A waiter left without a result would wait forever
+            for text in texts:
+                future = self._in_flight.pop(text, None)
+                if future is not None and not future.done():
+                    future.set_exception(RuntimeError("Query embedding batch ended without a result"))
+        
+        if self.persistent_cache is not None:
+            # Waiting queries already have their vectors; a failed write only costs a later miss
+            try:
+                await asyncio.to_thread(self.persistent_cache.put_many, self.model, texts, embeddings)
+            except Exception as e:
+                logger.warning(f"Could not store {len(texts)} query embeddings in the cache: {e}")
@@ -0,0 +1,241 @@
+"""
+Post-retrieval stages: maximal marginal relevance and reranking.
+"""
+
+import re
+import json
+import math
+import time
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+WORD = re.compile(r"\w+")
+
+DEFAULT_CROSS_ENCODER = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens used for lexical scoring."""
+    return WORD.findall(text.lower())
+
+
+def embedding_matrix(embeddings: Sequence[Union[Sequence[float], str]]) -> np.ndarray:
+    """
+    Stack embeddings returned by the database into a float32 matrix.
+    
+    Args:
+        embeddings: Float lists, or pgvector text literals like '[1,2,3]'
+    
+    Returns:
+        Matrix with one row per embedding
+    """
+    return np.asarray(
+        [json.loads(value) if isinstance(value, str) else value for value in embeddings],
+        dtype=np.float32
+    )
+
+
+def mmr_select(
+    query_embedding: Sequence[float],
+    candidate_embeddings: np.ndarray,
+    k: int,
+    diversity: float = 0.3,
+    relevance: Optional[Sequence[float]] = None,
+    deadline: Optional[float] = None
+) -> List[int]:
+    """
+    Pick k candidates by maximal marginal relevance.
+    
+    Each step takes the candidate maximising
+    ``(1 - diversity) * sim(query, c) - diversity * max sim(c, selected)``.
+    Similarities to the selected set are kept as a running maximum, so a
+    step costs one matrix-vector product over the candidates.
+    
+    Args:
+        query_embedding: Query vector
+        candidate_embeddings: Candidate vectors, one per row, in retrieval order
+        k: Number of candidates to select
+        diversity: Weight of the redundancy penalty (0 keeps similarity order)
+        relevance: Relevance of each candidate in [0, 1], e.g. normalised
+            reranker scores (default: cosine similarity to the query)
+        deadline: ``time.perf_counter()`` value after which the remaining
+            slots are filled in similarity order
+    
+    Returns:
+        Indexes of the selected candidates, in selection order
+    """
+    count = len(candidate_embeddings)
+    k = min(k, count)
+    if k == 0:
+        return []
+    
+    candidates = candidate_embeddings / np.maximum(
+        np.linalg.norm(candidate_embeddings, axis=1, keepdims=True), 1e-12
+    )
+    if relevance is None:
+        query = np.asarray(query_embedding, dtype=np.float32)
+        relevance = candidates @ (query / max(float(np.linalg.norm(query)), 1e-12))
+    else:
+        relevance = np.asarray(relevance, dtype=np.float32)
+    
+    selected: List[int] = []
+    available = np.ones(count, dtype=bool)
+    redundancy = np.full(count, -np.inf, dtype=np.float32)
+    
+    while len(selected) < k:
+        if deadline is not None and time.perf_counter() > deadline:
+            logger.warning(f"MMR budget exceeded after {len(selected)} of {k} picks")
+            rest = np.flatnonzero(available)
+            selected.extend(rest[np.argsort(-relevance[rest], kind="stable")][:k - len(selected)].tolist())
+            break
+        
+        penalty = redundancy if selected else 0.0
+        scores = np.where(available, (1 - diversity) * relevance - diversity * penalty, -np.inf)
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, candidates @ candidates[best])
+    
+    return selected
+
+
+class Reranker(ABC):
+    """Scores query-passage pairs; higher scores rank first."""
+    
+    name: str = "reranker"
+    
+    @abstractmethod
+    def score(self, query: str, texts: Sequence[str]) -> List[float]:
+        """Relevance of each text to the query."""
+
+
+class LexicalReranker(Reranker):
+    """
+    Offline reranker scoring candidates with BM25.
+    
+    Term statistics come from the candidate set itself, so no index or model
+    is needed. It rewards exact term matches that embeddings tend to blur,
+    such as names, numbers and identifiers.
+    """
+    
+    name = "lexical"
+    
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        """
+        Initialize reranker.
+        
+        Args:
+            k1: Term frequency saturation
+            b: Length normalisation
+        """
+        self.k1 = k1
+        self.b = b
+    
+    def score(self, query: str, texts: Sequence[str]) -> List[float]:
+        """BM25 score of each text for the query terms."""
+        documents = [Counter(tokenize(text)) for text in texts]
+        if not documents:
+            return []
+        lengths = [sum(counts.values()) for counts in documents]
+        average_length = max(sum(lengths) / len(lengths), 1.0)
+        
+        scores = [0.0] * len(documents)
+        for term in set(tokenize(query)):
+            frequency = sum(1 for counts in documents if term in counts)
+            if not frequency:
+                continue
+            idf = math.log(1 + (len(documents) - frequency + 0.5) / (frequency + 0.5))
+            for i, (counts, length) in enumerate(zip(documents, lengths)):
+                tf = counts.get(term, 0)
+                if tf:
+                    norm = self.k1 * (1 - self.b + self.b * length / average_length)
+                    scores[i] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+
+class CrossEncoderReranker(Reranker):
+    """Reranker running a local cross-encoder (requires sentence-transformers)."""
+    
+    name = "cross-encoder"
+    
+    def __init__(self, model_name: str = DEFAULT_CROSS_ENCODER, batch_size: int = 32):
+        """
+        Initialize reranker.
+        
+        Args:
+            model_name: Cross-encoder model name or path
+            batch_size: Pairs scored per forward pass
+        """
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError as e:
+            raise ImportError(
+                "The cross-encoder reranker requires sentence-transformers: "
+                "pip install sentence-transformers"
+            ) from e
+        
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.model = CrossEncoder(model_name)
+    
+    def score(self, query: str, texts: Sequence[str]) -> List[float]:
+        """Cross-encoder relevance of each text for the query."""
+        if not texts:
+            return []
+        pairs = [(query, text) for text in texts]
+        return [float(value) for value in self.model.predict(pairs, batch_size=self.batch_size)]
+
+
+def create_reranker(backend: str = "lexical") -> Reranker:
+    """
+    Create a reranker from a backend name.
+    
+    Args:
+        backend: "lexical", "cross-encoder" or "cross-encoder:<model name>"
+    
+    Returns:
+        Reranker instance
+    """
+    name, _, model = backend.partition(":")
+    if name == "lexical":
+        return LexicalReranker()
+    if name == "cross-encoder":
+        return CrossEncoderReranker(model or DEFAULT_CROSS_ENCODER)
+    raise ValueError(f"Unknown reranker backend: {backend}")
+
+
+async def rerank(
+    reranker: Reranker,
+    query: str,
+    texts: Sequence[str],
+    budget_seconds: Optional[float] = None
+) -> Optional[List[float]]:
+    """
+    Score texts with a reranker within a latency budget.
+    
+    Scoring runs in a worker thread so the event loop stays responsive.
+    
+    Args:
+        reranker: Reranker to score with
+        query: Search query
+        texts: Candidate texts in retrieval order
+        budget_seconds: Time allowed for scoring, None for no limit
+    
+    Returns:
+        Score of each text, or None when the budget ran out
+    """
+    try:
+        return await asyncio.wait_for(
+            asyncio.to_thread(reranker.score, query, list(texts)),
+            timeout=budget_seconds
+        )
+    except asyncio.TimeoutError:
+        logger.warning(f"{reranker.name} reranking exceeded its {budget_seconds * 1000:.0f} ms budget")
+        return None
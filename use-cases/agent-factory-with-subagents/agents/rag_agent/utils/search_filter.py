@@ -0,0 +1,259 @@
+"""
+Metadata filters for vector and hybrid search.
+
+A ``SearchFilter`` restricts a search to one collection, a source path
+prefix, documents carrying all of a set of tags and a document date range.
+Stores apply it inside the search query, before ranking, so a filtered
+search returns ``match_count`` matching chunks instead of whatever is left
+of the unfiltered top results.
+
+Documents get their collection, tags and date at ingestion, from the
+``collection``, ``tags`` and ``date`` metadata keys (YAML frontmatter or the
+ingestion ``--collection`` option).
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Collection of documents ingested without one
+DEFAULT_COLLECTION = "default"
+
+DateLike = Union[datetime, date, str, None]
+
+
+def normalize_tags(tags: Union[str, Iterable[Any], None]) -> Tuple[str, ...]:
+    """
+    Tags as a sorted tuple of distinct lowercase strings.
+    
+    Args:
+        tags: Tag list, or one comma-separated string
+    
+    Returns:
+        Normalized tags
+    """
+    if not tags:
+        return ()
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    return tuple(sorted({str(tag).strip().lower() for tag in tags if str(tag).strip()}))
+
+
+def parse_date(value: DateLike, end_of_day: bool = False) -> Optional[datetime]:
+    """
+    Timezone-aware datetime from a date, datetime or ISO 8601 string.
+    
+    Naive values are taken as UTC.
+    
+    Args:
+        value: Date to parse
+        end_of_day: Turn a plain date into the start of the next day, so an
+            exclusive upper bound includes the whole day
+    
+    Returns:
+        Datetime, None for an empty value
+    
+    Raises:
+        ValueError: The string is not an ISO 8601 date
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        text = value.strip()
+        value = datetime.fromisoformat(text) if "T" in text or " " in text else date.fromisoformat(text)
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, time.min) + (timedelta(days=1) if end_of_day else timedelta())
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def document_attributes(metadata: Dict[str, Any]) -> Tuple[str, List[str], Optional[datetime]]:
+    """
+    Filterable attributes of a document from its metadata.
+    
+    Args:
+        metadata: Document metadata
+    
+    Returns:
+        Tuple of (collection, tags, document date)
+    """
+    collection = str(metadata.get("collection") or DEFAULT_COLLECTION)
+    tags = list(normalize_tags(metadata.get("tags")))
+    try:
+        document_date = parse_date(metadata.get("date"))
+    except (TypeError, ValueError):
+        logger.warning(f"Ignoring unparseable document date {metadata.get('date')!r}")
+        document_date = None
+    return collection, tags, document_date
+
+
+def like_prefix(prefix: str) -> str:
+    """LIKE pattern matching strings that start with ``prefix``."""
+    escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+
+@dataclass(frozen=True)
+class SearchFilter:
+    """
+    Restrictions applied to the chunks a search ranks.
+    
+    All given conditions must hold. Dates without a time cover the whole
+    day: ``date_to="2025-03-31"`` includes documents dated March 31.
+    """
+    collection: Optional[str] = None
+    source_prefix: Optional[str] = None
+    tags: Tuple[str, ...] = ()
+    date_from: DateLike = None
+    date_to: DateLike = None
+    
+    def __post_init__(self):
+        object.__setattr__(self, "tags", normalize_tags(self.tags))
+        object.__setattr__(self, "date_from", parse_date(self.date_from))
+        object.__setattr__(self, "date_to", parse_date(self.date_to, end_of_day=True))
+        if self.date_from and self.date_to and self.date_from >= self.date_to:
+            raise ValueError("date_from must be before date_to")
+    
+    @property
+    def is_empty(self) -> bool:
+        """Whether the filter lets every chunk through."""
+        return (
+            self.collection is None and not self.source_prefix and not self.tags
+            and self.date_from is None and self.date_to is None
+        )
+    
+    def matches(
+        self,
+        collection: str,
+        source: str,
+        tags: Iterable[str] = (),
+        document_date: Optional[datetime] = None
+    ) -> bool:
+        """
+        Whether a document passes the filter, evaluated in Python.
+        
+        Args:
+            collection: Document collection
+            source: Document source path
+            tags: Normalized document tags
+            document_date: Document date, None if unknown
+        
+        Returns:
+            True when every condition holds
+        """
+        if self.collection is not None and collection != self.collection:
+            return False
+        if self.source_prefix and not source.startswith(self.source_prefix):
+            return False
+        if self.tags and not set(self.tags) <= set(tags):
+            return False
+        if self.date_from is not None and (document_date is None or document_date < self.date_from):
+            return False
+        if self.date_to is not None and (document_date is None or document_date >= self.date_to):
+            return False
+        return True
+    
+    def postgres_conditions(self, params: List[Any], linked_duplicates: bool = False) -> List[str]:
+        """
+        WHERE conditions over ``chunks c JOIN documents d``.
+        
+        Each condition matches an index from ``sql/schema.sql``; the
+        collection condition is on ``c.collection`` so that a partitioned
+        chunks table is pruned to one partition.
+        
+        Args:
+            params: Query parameters so far; the filter values are appended
+            linked_duplicates: Also match chunks that a matching document of
+                the same collection links to in its ``duplicate_chunks``
+                metadata. Ingestion stores a repeated chunk once, under the
+                first document that has it, so without this a filter on the
+                other documents would miss it.
+        
+        Returns:
+            Conditions referencing the appended parameters
+        """
+        conditions = []
+        if self.collection is not None:
+            params.append(self.collection)
+            conditions.append(f"c.collection = ${len(params)}")
+        
+        document = self._postgres_document_conditions(params, "d")
+        if not document or not linked_duplicates:
+            return conditions + document
+        linked = self._postgres_document_conditions(params, "l")
+        conditions.append(
+            f"({' AND '.join(document)} OR (c.collection, c.metadata->>'content_hash') IN ("
+            "SELECT l.collection, link->>'duplicate_of' FROM documents l "
+            "CROSS JOIN LATERAL jsonb_array_elements(l.metadata->'duplicate_chunks') AS link "
+            f"WHERE l.metadata ? 'duplicate_chunks' AND {' AND '.join(linked)}))"
+        )
+        return conditions
+    
+    def _postgres_document_conditions(self, params: List[Any], alias: str) -> List[str]:
+        """Source, tag and date conditions on the documents table ``alias``."""
+        conditions = []
+        
+        def add(condition: str, value: Any):
+            params.append(value)
+            conditions.append(condition.format(alias, f"${len(params)}"))
+        
+        if self.source_prefix:
+            add("{}.source LIKE {}", like_prefix(self.source_prefix))
+        if self.tags:
+            add("{}.tags @> {}::text[]", list(self.tags))
+        if self.date_from is not None:
+            add("{}.document_date >= {}", self.date_from)
+        if self.date_to is not None:
+            add("{}.document_date < {}", self.date_to)
+        return conditions
+    
+    def sqlite_conditions(self, params: List[Any], linked_duplicates: bool = False) -> List[str]:
+        """
+        WHERE conditions over ``documents d`` in the local store.
+        
+        Args:
+            params: Query parameters so far; the filter values are appended
+            linked_duplicates: Also match chunks linked from matching
+                documents, as in ``postgres_conditions``; the conditions then
+                reference ``chunks c`` as well
+        
+        Returns:
+            Conditions with ``?`` placeholders
+        """
+        conditions = []
+        if self.collection is not None:
+            conditions.append("d.collection = ?")
+            params.append(self.collection)
+        
+        document = self._sqlite_document_conditions(params, "d")
+        if not document or not linked_duplicates:
+            return conditions + document
+        linked = self._sqlite_document_conditions(params, "l")
+        conditions.append(
+            f"({' AND '.join(document)} OR (d.collection, json_extract(c.metadata, '$.content_hash')) IN ("
+            "SELECT l.collection, json_extract(link.value, '$.duplicate_of') "
+            "FROM documents l, json_each(l.metadata, '$.duplicate_chunks') AS link "
+            f"WHERE {' AND '.join(linked)}))"
+        )
+        return conditions
+    
+    def _sqlite_document_conditions(self, params: List[Any], alias: str) -> List[str]:
+        """Source, tag and date conditions on the documents table ``alias``."""
+        conditions = []
+        if self.source_prefix:
+            conditions.append(f"substr({alias}.source, 1, ?) = ?")
+            params.extend([len(self.source_prefix), self.source_prefix])
+        for tag in self.tags:
+            conditions.append(f"EXISTS (SELECT 1 FROM json_each({alias}.tags) WHERE value = ?)")
+            params.append(tag)
+        if self.date_from is not None:
+            conditions.append(f"{alias}.document_date >= ?")
+            params.append(self.date_from.timestamp())
+        if self.date_to is not None:
+            conditions.append(f"{alias}.document_date < ?")
+            params.append(self.date_to.timestamp())
+        return conditions
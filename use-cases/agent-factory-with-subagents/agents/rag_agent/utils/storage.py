@@ -0,0 +1,738 @@
+"""
+Storage backends for documents, chunks and their embeddings.
+"""
+
+import json
+import math
+import uuid
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .partitions import create_partition, is_partitioned, list_partitions, lock_for_writes
+from .search_filter import SearchFilter, document_attributes
+from .vector_index import (
+    VectorIndexPlan, apply_search_settings, drop_vector_index, ensure_vector_index,
+    get_vector_index, vector_search_settings
+)
+
+logger = logging.getLogger(__name__)
+
+# Filtered searches the planner expects to match at most this many chunks
+# rank the matching chunks exactly instead of going through the ANN index
+FILTER_EXACT_MAX_ROWS = 20_000
+
+# Largest hnsw.ef_search pgvector accepts
+MAX_EF_SEARCH = 1000
+
+# Reciprocal rank fusion constant of the hybrid_search SQL function
+RRF_K = 60
+
+# Search result columns over chunks c JOIN documents d
+SEARCH_COLUMNS = """
+    c.id AS chunk_id,
+    c.document_id,
+    c.content,
+    c.metadata,
+    d.title AS document_title,
+    d.source AS document_source
+"""
+
+# (title, source, content, chunks, metadata); chunks carry content, index,
+# metadata, token_count and embedding like ingestion's DocumentChunk
+DocumentRecord = Tuple[str, str, str, List[Any], Dict[str, Any]]
+
+# Manifest entry: document IDs of a source, newest first, and its content hash
+ManifestEntry = Tuple[List[str], Optional[str]]
+
+
+class VectorStore(ABC):
+    """
+    Storage behind ingestion and the search tools.
+    
+    Search methods return one dictionary per chunk with the columns of the
+    ``match_chunks`` and ``hybrid_search`` SQL functions: ``chunk_id``,
+    ``document_id``, ``content``, ``metadata`` (a dict), ``document_title``,
+    ``document_source`` and the scores. With a ``SearchFilter`` only
+    matching chunks are ranked.
+    """
+    
+    name: str = "store"
+    
+    async def initialize(self):
+        """Open connections or files."""
+    
+    async def close(self):
+        """Release connections or files."""
+    
+    @abstractmethod
+    async def save_documents(
+        self,
+        documents: Sequence[DocumentRecord],
+        replaced_ids: Sequence[str] = ()
+    ) -> List[str]:
+        """
+        Save documents and their chunks atomically.
+        
+        Args:
+            documents: Documents to save
+            replaced_ids: Previous document versions to delete in the same write
+        
+        Returns:
+            Document IDs, in input order
+        """
+    
+    @abstractmethod
+    async def load_manifest(self, ingest_root: str) -> Dict[str, ManifestEntry]:
+        """Documents previously ingested from a folder, by source path."""
+    
+    @abstractmethod
+    async def load_chunk_embeddings(
+        self,
+        document_ids: Sequence[str],
+        model: str
+    ) -> Dict[str, List[float]]:
+        """Stored embeddings generated by a model, by chunk content hash."""
+    
+    @abstractmethod
+    async def find_dangling_duplicates(self, ingest_root: str) -> List[str]:
+        """
+        Sources of documents from a folder whose ``duplicate_chunks`` links
+        point to a content hash no stored chunk has.
+        """
+    
+    @abstractmethod
+    async def delete_documents(self, document_ids: Sequence[str]):
+        """Delete documents and their chunks."""
+    
+    @abstractmethod
+    async def clear(self, drop_index: bool = False):
+        """
+        Delete all documents.
+        
+        Args:
+            drop_index: Also drop the vector index, so a bulk load does not
+                maintain it row by row
+        """
+    
+    async def optimize(self, method: str = "auto") -> Optional[str]:
+        """
+        Build or re-tune the vector index for the current corpus.
+        
+        Args:
+            method: "auto", "hnsw", "ivfflat" or "none"
+        
+        Returns:
+            Description of the new index if it was rebuilt, else None
+        """
+        return None
+    
+    @abstractmethod
+    async def vector_search(
+        self,
+        query_embedding: Sequence[float],
+        match_count: int,
+        with_embeddings: bool = False,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        filters: Optional[SearchFilter] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Chunks most similar to the query embedding.
+        
+        Args:
+            query_embedding: Query vector
+            match_count: Number of chunks to return
+            with_embeddings: Include each chunk's ``embedding``
+            ef_search: HNSW candidates per query, where applicable
+            probes: Inverted lists searched per query, where applicable
+            filters: Only rank chunks matching the filter
+        
+        Returns:
+            Chunks with ``similarity``, most similar first
+        """
+    
+    @abstractmethod
+    async def hybrid_search(
+        self,
+        query_embedding: Sequence[float],
+        query_text: str,
+        match_count: int,
+        text_weight: float = 0.3,
+        candidate_count: int = 50,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        filters: Optional[SearchFilter] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Reciprocal rank fusion of the top vector and keyword candidates.
+        
+        Args:
+            query_embedding: Query vector
+            query_text: Query text for keyword matching
+            match_count: Number of chunks to return
+            text_weight: Weight of the keyword ranks (0-1)
+            candidate_count: Candidates taken from each side
+            ef_search: HNSW candidates per query, where applicable
+            probes: Inverted lists searched per query, where applicable
+            filters: Only rank chunks matching the filter
+        
+        Returns:
+            Chunks with ``combined_score``, ``vector_similarity`` and
+            ``text_similarity``, best first
+        """
+
+
+def _chunk_row(row: Any, with_embeddings: bool = False) -> Dict[str, Any]:
+    """Search result dictionary from a database row."""
+    result = {
+        'chunk_id': str(row['chunk_id']),
+        'document_id': str(row['document_id']),
+        'content': row['content'],
+        'metadata': json.loads(row['metadata']) if row['metadata'] else {},
+        'document_title': row['document_title'],
+        'document_source': row['document_source']
+    }
+    for column in ('similarity', 'combined_score', 'vector_similarity', 'text_similarity'):
+        if column in row.keys():
+            result[column] = row[column]
+    if with_embeddings:
+        result['embedding'] = row['embedding']
+    return result
+
+
+class PostgresVectorStore(VectorStore):
+    """
+    PostgreSQL + pgvector storage using the functions in ``sql/schema.sql``.
+    
+    Connections must have the binary vector codec registered (see
+    ``register_vector_codec``).
+    
+    Filtered searches run as SQL built from the filter. pgvector applies
+    WHERE conditions after the ANN scan, so a selective filter would leave
+    few of the scanned candidates: searches the planner expects to match at
+    most ``filter_exact_rows`` chunks rank the matching chunks exactly, found
+    through the filter indexes. Larger ones use the ANN index with its
+    candidate list scaled by the filter's selectivity, and fall back to the
+    exact ranking if that still returns too few rows. On a chunks table
+    partitioned by collection, a collection filter scans one partition.
+    A chunk that ingestion stored once for several documents matches when
+    any of those documents does.
+    """
+    
+    name = "postgres"
+    
+    def __init__(
+        self,
+        pool: Any,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        manage_pool: bool = False,
+        filter_exact_rows: int = FILTER_EXACT_MAX_ROWS
+    ):
+        """
+        Initialize store.
+        
+        Args:
+            pool: asyncpg pool, or any object with an ``acquire()`` context manager
+            ef_search: Default HNSW candidates per query
+            probes: Default IVFFlat lists searched per query
+            manage_pool: Initialize and close the pool with the store
+            filter_exact_rows: Estimated matching chunks up to which a
+                filtered search ranks them exactly
+        """
+        self.pool = pool
+        self.ef_search = ef_search
+        self.probes = probes
+        self.manage_pool = manage_pool
+        self.filter_exact_rows = filter_exact_rows
+        self._vector_index: Optional[VectorIndexPlan] = None
+        self._vector_index_loaded = False
+        self._partitioned: Optional[bool] = None
+        self._partitions: Optional[Set[str]] = None
+        self._partition_lock = asyncio.Lock()
+    
+    async def initialize(self):
+        """Initialize the pool when the store manages it."""
+        if self.manage_pool:
+            await self.pool.initialize()
+    
+    async def close(self):
+        """Close the pool when the store manages it."""
+        if self.manage_pool:
+            await self.pool.close()
+    
+    async def save_documents(
+        self,
+        documents: Sequence[DocumentRecord],
+        replaced_ids: Sequence[str] = ()
+    ) -> List[str]:
+        """Save documents in one transaction, writing rows with binary COPY."""
+        async with self.pool.acquire() as conn:
+            # Outside the write transaction, which would otherwise hold the
+            # partition's lock on chunks until it commits
+            await self._ensure_partitions(conn, (document_attributes(document[4])[0] for document in documents))
+            async with conn.transaction():
+                await self._lock_for_writes(conn)
+                if replaced_ids:
+                    await conn.execute(
+                        "DELETE FROM documents WHERE id = ANY($1::uuid[])",
+                        list(replaced_ids)
+                    )
+                return await self._copy_documents(conn, documents)
+    
+    async def _ensure_partitions(self, conn: Any, collections: Iterable[str]):
+        """Create the partitions of new collections when chunks is partitioned."""
+        async with self._partition_lock:
+            if not await self._chunks_partitioned(conn):
+                return
+            if self._partitions is None:
+                self._partitions = set(await list_partitions(conn))
+            for collection in sorted(set(collections) - self._partitions):
+                await create_partition(conn, collection)
+                # A collection left in the default partition is not retried
+                self._partitions.add(collection)
+    
+    async def _lock_for_writes(self, conn: Any):
+        """Keep partition creation out of the current write transaction."""
+        if await self._chunks_partitioned(conn):
+            await lock_for_writes(conn)
+    
+    async def _copy_documents(self, conn: Any, documents: Sequence[DocumentRecord]) -> List[str]:
+        """
+        Write documents and chunks with binary COPY.
+        
+        Document IDs are generated client-side so chunk rows can reference
+        them without a round trip per document. Embeddings are sent in
+        pgvector's binary format (see ``register_vector_codec``).
+        
+        Args:
+            conn: Connection with the vector codec registered
+            documents: Documents to write
+        
+        Returns:
+            Document IDs, in input order
+        """
+        document_ids = [uuid.uuid4() for _ in documents]
+        attributes = [document_attributes(metadata) for _, _, _, _, metadata in documents]
+        
+        await conn.copy_records_to_table(
+            "documents",
+            columns=["id", "title", "source", "content", "metadata", "collection", "tags", "document_date"],
+            records=[
+                (document_id, title, source, content, json.dumps(metadata), collection, tags, document_date)
+                for document_id, (title, source, content, _, metadata), (collection, tags, document_date)
+                in zip(document_ids, documents, attributes)
+            ]
+        )
+        
+        chunk_records = [
+            (
+                document_id,
+                collection,
+                chunk.content,
+                getattr(chunk, "embedding", None) or None,
+                chunk.index,
+                json.dumps(chunk.metadata),
+                chunk.token_count
+            )
+            for document_id, (_, _, _, chunks, _), (collection, _, _) in zip(document_ids, documents, attributes)
+            for chunk in chunks
+        ]
+        if chunk_records:
+            await conn.copy_records_to_table(
+                "chunks",
+                columns=["document_id", "collection", "content", "embedding", "chunk_index", "metadata", "token_count"],
+                records=chunk_records
+            )
+        
+        return [str(document_id) for document_id in document_ids]
+    
+    async def load_manifest(self, ingest_root: str) -> Dict[str, ManifestEntry]:
+        """Documents whose metadata records the ingest root, newest first."""
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                """
+                SELECT id::text, source, metadata->>'content_hash' AS content_hash
+                FROM documents
+                WHERE metadata->>'ingest_root' = $1
+                ORDER BY created_at DESC
+                """,
+                ingest_root
+            )
+        
+        manifest: Dict[str, ManifestEntry] = {}
+        for row in rows:
+            document_ids, _ = manifest.setdefault(row["source"], ([], row["content_hash"]))
+            document_ids.append(row["id"])
+        return manifest
+    
+    async def load_chunk_embeddings(
+        self,
+        document_ids: Sequence[str],
+        model: str
+    ) -> Dict[str, List[float]]:
+        """Embeddings of chunks with a content hash, generated by the model."""
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                """
+                SELECT metadata->>'content_hash' AS content_hash, embedding
+                FROM chunks
+                WHERE document_id = ANY($1::uuid[])
+                  AND embedding IS NOT NULL
+                  AND metadata->>'content_hash' IS NOT NULL
+                  AND metadata->>'embedding_model' = $2
+                """,
+                list(document_ids),
+                model
+            )
+        return {row["content_hash"]: row["embedding"] for row in rows}
+    
+    async def find_dangling_duplicates(self, ingest_root: str) -> List[str]:
+        """Documents linking to chunks that were deleted, by one anti-join."""
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                """
+                SELECT DISTINCT d.source
+                FROM documents d
+                CROSS JOIN LATERAL jsonb_path_query(
+                    d.metadata, '$.duplicate_chunks[*].duplicate_of'
+                ) AS link(content_hash)
+                WHERE d.metadata ? 'duplicate_chunks'
+                  AND d.metadata->>'ingest_root' = $1
+                  AND NOT EXISTS (
+                      SELECT 1 FROM chunks c
+                      WHERE c.metadata->>'content_hash' = link.content_hash #>> '{}'
+                        AND c.collection = d.collection
+                  )
+                ORDER BY d.source
+                """,
+                ingest_root
+            )
+        return [row["source"] for row in rows]
+    
+    async def delete_documents(self, document_ids: Sequence[str]):
+        """Delete documents and, through the foreign key, their chunks."""
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await self._lock_for_writes(conn)
+                await conn.execute(
+                    "DELETE FROM documents WHERE id = ANY($1::uuid[])",
+                    list(document_ids)
+                )
+    
+    async def clear(self, drop_index: bool = False):
+        """Delete all chunks and documents."""
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await self._lock_for_writes(conn)
+                await conn.execute("DELETE FROM chunks")
+                await conn.execute("DELETE FROM documents")
+            
+            if drop_index:
+                await drop_vector_index(conn)
+                self._vector_index_loaded = False
+    
+    async def optimize(self, method: str = "auto") -> Optional[str]:
+        """Build the ANN index that suits the corpus size (see ``ensure_vector_index``)."""
+        async with self.pool.acquire() as conn:
+            plan, rebuilt = await ensure_vector_index(conn, method=method)
+        
+        self._vector_index = plan if plan.method != "none" else None
+        self._vector_index_loaded = True
+        return str(plan) if rebuilt else None
+    
+    async def get_vector_index(self, conn: Any) -> Optional[VectorIndexPlan]:
+        """ANN index on chunk embeddings, looked up once per store."""
+        if not self._vector_index_loaded:
+            self._vector_index = await get_vector_index(conn)
+            self._vector_index_loaded = True
+        return self._vector_index
+    
+    async def _search_settings(self, conn: Any, candidates: int, ef_search: Optional[int], probes: Optional[int]):
+        """Index settings for a search fetching ``candidates`` rows."""
+        return vector_search_settings(
+            await self.get_vector_index(conn),
+            candidates,
+            ef_search=ef_search or self.ef_search,
+            probes=probes or self.probes
+        )
+    
+    
+    async def _chunks_partitioned(self, conn: Any) -> bool:
+        """Whether chunks is partitioned by collection, looked up once per store."""
+        if self._partitioned is None:
+            self._partitioned = await is_partitioned(conn)
+        return self._partitioned
+    
+    async def _estimate_rows(self, conn: Any, filters: Optional[SearchFilter]) -> float:
+        """Planner estimate of the embedded chunks matching a filter."""
+        params: List[Any] = []
+        conditions = ["c.embedding IS NOT NULL"]
+        if filters is not None:
+            conditions += filters.postgres_conditions(params)
+        plan = await conn.fetchval(
+            f"""
+            EXPLAIN (FORMAT JSON)
+            SELECT 1 FROM chunks c JOIN documents d ON c.document_id = d.id
+            WHERE {" AND ".join(conditions)}
+            """,
+            *params
+        )
+        return float(json.loads(plan)[0]["Plan"]["Plan Rows"])
+    
+    async def _filtered_search_settings(
+        self,
+        conn: Any,
+        filters: SearchFilter,
+        candidates: int,
+        ef_search: Optional[int],
+        probes: Optional[int]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Index settings for a filtered ANN search.
+        
+        The candidate list is scaled by the share of the scanned chunks the
+        filter is expected to keep. On a partitioned table a collection
+        filter selects the partition, so only the other conditions count.
+        
+        Returns:
+            Settings, None when the matching chunks should be ranked exactly
+        """
+        index = await self.get_vector_index(conn)
+        if index is None:
+            return None
+        matching = await self._estimate_rows(conn, filters)
+        if matching <= self.filter_exact_rows:
+            return None
+        
+        scanned = None
+        if filters.collection is not None and await self._chunks_partitioned(conn):
+            scanned = SearchFilter(collection=filters.collection)
+        selectivity = min(1.0, matching / max(await self._estimate_rows(conn, scanned), 1.0))
+        
+        settings: Dict[str, Any] = vector_search_settings(
+            index,
+            min(math.ceil(candidates / selectivity), MAX_EF_SEARCH),
+            ef_search=ef_search or self.ef_search,
+            probes=probes or self.probes
+        )
+        if "ivfflat.probes" in settings:
+            settings["ivfflat.probes"] = min(index.lists or 1, math.ceil(settings["ivfflat.probes"] / selectivity))
+        return settings
+    
+    async def _filtered_nearest(
+        self,
+        conn: Any,
+        query_embedding: Sequence[float],
+        limit: int,
+        filters: SearchFilter,
+        columns: str,
+        ef_search: Optional[int],
+        probes: Optional[int]
+    ) -> List[Any]:
+        """
+        Chunks matching a filter nearest to the query, inside a transaction.
+        
+        Args:
+            conn: Connection inside a transaction
+            query_embedding: Query vector
+            limit: Number of chunks
+            filters: Search filter
+            columns: Select list over ``chunks c``, ``documents d`` and the
+                query vector ``$1``
+            ef_search: HNSW candidates per query
+            probes: IVFFlat lists searched per query
+        
+        Returns:
+            Rows, nearest first
+        """
+        settings = await self._filtered_search_settings(conn, filters, limit, ef_search, probes)
+        # Plans for the actual filter values, so prefix and partition
+        # conditions can use their indexes
+        await apply_search_settings(conn, {**(settings or {}), "plan_cache_mode": "force_custom_plan"})
+        
+        params: List[Any] = [query_embedding]
+        where = " AND ".join([
+            "c.embedding IS NOT NULL", *filters.postgres_conditions(params, linked_duplicates=True)
+        ])
+        params.append(limit)
+        limit_param = f"${len(params)}"
+        
+        if settings is not None:
+            rows = await conn.fetch(
+                f"""
+                SELECT {columns}
+                FROM chunks c
+                JOIN documents d ON c.document_id = d.id
+                WHERE {where}
+                ORDER BY c.embedding <=> $1
+                LIMIT {limit_param}
+                """,
+                *params
+            )
+            if len(rows) >= limit:
+                return rows
+            # pgvector filters the ANN candidates after the scan, which can
+            # leave fewer than requested
+            logger.debug(f"Filtered ANN search returned {len(rows)} of {limit} rows, ranking exactly")
+        
+        # MATERIALIZED keeps the planner from ordering through the ANN index
+        return await conn.fetch(
+            f"""
+            WITH matching AS MATERIALIZED (
+                SELECT c.id, c.collection, c.embedding <=> $1 AS distance
+                FROM chunks c
+                JOIN documents d ON c.document_id = d.id
+                WHERE {where}
+            ),
+            nearest AS (
+                SELECT id, collection, distance
+                FROM matching
+                ORDER BY distance
+                LIMIT {limit_param}
+            )
+            SELECT {columns}
+            FROM nearest n
+            JOIN chunks c ON c.id = n.id AND c.collection = n.collection
+            JOIN documents d ON c.document_id = d.id
+            ORDER BY n.distance
+            """,
+            *params
+        )
+    
+    async def vector_search(
+        self,
+        query_embedding: Sequence[float],
+        match_count: int,
+        with_embeddings: bool = False,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        filters: Optional[SearchFilter] = None
+    ) -> List[Dict[str, Any]]:
+        """Search through ``match_chunks`` (or ``match_chunks_with_embeddings``), or filtered SQL."""
+        if filters is not None and not filters.is_empty:
+            columns = SEARCH_COLUMNS + ", 1 - (c.embedding <=> $1) AS similarity"
+            if with_embeddings:
+                columns += ", c.embedding"
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    rows = await self._filtered_nearest(
+                        conn, query_embedding, match_count, filters, columns, ef_search, probes
+                    )
+            return [_chunk_row(row, with_embeddings) for row in rows]
+        
+        function = "match_chunks_with_embeddings" if with_embeddings else "match_chunks"
+        async with self.pool.acquire() as conn:
+            index_settings = await self._search_settings(conn, match_count, ef_search, probes)
+            # Index settings are scoped to the search transaction
+            async with conn.transaction():
+                await apply_search_settings(conn, index_settings)
+                rows = await conn.fetch(
+                    f"""
+                    SELECT * FROM {function}($1::vector, $2)
+                    """,
+                    query_embedding,
+                    match_count
+                )
+        return [_chunk_row(row, with_embeddings) for row in rows]
+    
+    async def hybrid_search(
+        self,
+        query_embedding: Sequence[float],
+        query_text: str,
+        match_count: int,
+        text_weight: float = 0.3,
+        candidate_count: int = 50,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        filters: Optional[SearchFilter] = None
+    ) -> List[Dict[str, Any]]:
+        """Search through the ``hybrid_search`` SQL function, or filtered SQL."""
+        if filters is not None and not filters.is_empty:
+            return await self._filtered_hybrid_search(
+                query_embedding, query_text, match_count, text_weight, candidate_count, ef_search, probes, filters
+            )
+        
+        async with self.pool.acquire() as conn:
+            # The vector side fetches candidate_count rows from the index
+            index_settings = await self._search_settings(conn, candidate_count, ef_search, probes)
+            async with conn.transaction():
+                await apply_search_settings(conn, index_settings)
+                rows = await conn.fetch(
+                    """
+                    SELECT * FROM hybrid_search($1::vector, $2, $3, $4, $5)
+                    """,
+                    query_embedding,
+                    query_text,
+                    match_count,
+                    text_weight,
+                    candidate_count
+                )
+        return [_chunk_row(row) for row in rows]
+    
+    async def _filtered_hybrid_search(
+        self,
+        query_embedding: Sequence[float],
+        query_text: str,
+        match_count: int,
+        text_weight: float,
+        candidate_count: int,
+        ef_search: Optional[int],
+        probes: Optional[int],
+        filters: SearchFilter
+    ) -> List[Dict[str, Any]]:
+        """The ``hybrid_search`` fusion over the chunks matching a filter."""
+        candidates = max(candidate_count, match_count)
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                vector_rows = await self._filtered_nearest(
+                    conn, query_embedding, candidates, filters, "c.id", ef_search, probes
+                )
+                
+                params: List[Any] = [
+                    query_embedding, query_text, [row["id"] for row in vector_rows],
+                    candidates, text_weight, match_count
+                ]
+                where = " AND ".join(filters.postgres_conditions(params, linked_duplicates=True))
+                rows = await conn.fetch(
+                    f"""
+                    WITH vector_results AS (
+                        SELECT v.id, v.rank
+                        FROM unnest($3::uuid[]) WITH ORDINALITY AS v(id, rank)
+                    ),
+                    text_results AS (
+                        SELECT t.id, ROW_NUMBER() OVER (ORDER BY t.text_rank DESC) AS rank
+                        FROM (
+                            SELECT c.id, ts_rank_cd(c.content_tsv, plainto_tsquery('english', $2)) AS text_rank
+                            FROM chunks c
+                            JOIN documents d ON c.document_id = d.id
+                            WHERE c.content_tsv @@ plainto_tsquery('english', $2) AND {where}
+                            ORDER BY text_rank DESC
+                            LIMIT $4
+                        ) t
+                    ),
+                    fused AS (
+                        SELECT
+                            COALESCE(v.id, t.id) AS id,
+                            COALESCE((1 - $5::float8) / ({RRF_K} + v.rank), 0)
+                                + COALESCE($5::float8 / ({RRF_K} + t.rank), 0) AS score
+                        FROM vector_results v
+                        FULL OUTER JOIN text_results t ON v.id = t.id
+                        ORDER BY score DESC
+                        LIMIT $6
+                    )
+                    SELECT {SEARCH_COLUMNS},
+                        f.score::float8 AS combined_score,
+                        (1 - (c.embedding <=> $1))::float8 AS vector_similarity,
+                        ts_rank_cd(c.content_tsv, plainto_tsquery('english', $2))::float8 AS text_similarity
+                    FROM fused f
+                    JOIN chunks c ON c.id = f.id
+                    JOIN documents d ON c.document_id = d.id
+                    WHERE {where}
+                    ORDER BY f.score DESC
+                    """,
+                    *params
+                )
+        return [_chunk_row(row) for row in rows]
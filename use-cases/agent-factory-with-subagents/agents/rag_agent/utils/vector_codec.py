@@ -0,0 +1,91 @@
+"""
+Binary codec for the pgvector ``vector`` type.
+"""
+
+import sys
+import struct
+import logging
+from array import array
+from typing import List, Sequence, Union
+
+import asyncpg
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# pgvector binary format: int16 dimensions, int16 unused, float32 values (big-endian)
+_VECTOR_HEADER = struct.Struct(">HH")
+
+
+def encode_vector(vector: Union[Sequence[float], np.ndarray, str]) -> bytes:
+    """
+    Encode a vector in pgvector's binary wire format.
+    
+    Args:
+        vector: Sequence of floats, a 1-D NumPy array, or a pgvector text
+            literal like '[1,2,3]'
+    
+    Returns:
+        Binary representation accepted by the vector type
+    """
+    if isinstance(vector, np.ndarray):
+        return _VECTOR_HEADER.pack(len(vector), 0) + vector.astype(">f4", copy=False).tobytes()
+    
+    if isinstance(vector, str):
+        vector = [float(value) for value in vector.strip("[] ").split(",") if value.strip()]
+    
+    values = array("f", vector)
+    if sys.byteorder == "little":
+        values.byteswap()
+    return _VECTOR_HEADER.pack(len(values), 0) + values.tobytes()
+
+
+def decode_vector(data: bytes) -> List[float]:
+    """
+    Decode a vector from pgvector's binary wire format.
+    
+    Args:
+        data: Binary vector value
+    
+    Returns:
+        Vector as a list of floats
+    """
+    dimensions, _ = _VECTOR_HEADER.unpack_from(data)
+    values = array("f")
+    values.frombytes(data[_VECTOR_HEADER.size:_VECTOR_HEADER.size + 4 * dimensions])
+    if sys.byteorder == "little":
+        values.byteswap()
+    return values.tolist()
+
+
+async def register_vector_codec(conn: asyncpg.Connection):
+    """
+    Register the binary pgvector codec on a connection.
+    
+    Vectors are then sent and received as float lists in binary form instead
+    of being formatted and parsed as text, and COPY can write vector columns.
+    Does nothing if the vector extension is not installed.
+    
+    Use it as the ``init`` callback of every pool that queries vectors.
+    
+    Args:
+        conn: Database connection
+    """
+    schema = await conn.fetchval(
+        """
+        SELECT n.nspname FROM pg_type t
+        JOIN pg_namespace n ON n.oid = t.typnamespace
+        WHERE t.typname = 'vector'
+        """
+    )
+    if schema is None:
+        logger.warning("pgvector extension not found, vector codec not registered")
+        return
+    
+    await conn.set_type_codec(
+        "vector",
+        schema=schema,
+        encoder=encode_vector,
+        decoder=decode_vector,
+        format="binary"
+    )
@@ -0,0 +1,327 @@
+"""
+Approximate nearest neighbour index management for the chunks table.
+"""
+
+import re
+import math
+import time
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import asyncpg
+
+from .partitions import is_partitioned
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "idx_chunks_embedding"
+
+# Above this many vectors the HNSW graph no longer fits a typical
+# maintenance_work_mem and builds slow down sharply; IVFFlat is used instead
+HNSW_MAX_ROWS = 1_000_000
+
+# pgvector indexes vector columns of up to 2000 dimensions
+MAX_INDEX_DIMENSIONS = 2000
+
+DEFAULT_M = 16
+DEFAULT_EF_CONSTRUCTION = 64
+DEFAULT_EF_SEARCH = 40
+
+# Index builds outlast the pool's command timeout
+BUILD_TIMEOUT = 24 * 3600
+
+INDEX_DEFINITION = re.compile(r"USING (?P<method>\w+) \([^)]*\)(?: WITH \((?P<options>[^)]*)\))?")
+INDEX_OPTION = re.compile(r"(\w+)\s*=\s*'?(\d+)'?")
+
+
+@dataclass(frozen=True)
+class VectorIndexPlan:
+    """ANN index method and build parameters for the embedding column."""
+    method: str  # "hnsw", "ivfflat" or "none"
+    lists: Optional[int] = None
+    m: Optional[int] = None
+    ef_construction: Optional[int] = None
+    
+    @property
+    def default_probes(self) -> int:
+        """IVFFlat lists searched per query when none are configured."""
+        return max(1, round(math.sqrt(self.lists or 1)))
+    
+    def definition(self, name: str = INDEX_NAME, concurrently: bool = False) -> str:
+        """CREATE INDEX statement for this plan."""
+        if self.method == "hnsw":
+            options = f"m = {self.m}, ef_construction = {self.ef_construction}"
+        elif self.method == "ivfflat":
+            options = f"lists = {self.lists}"
+        else:
+            raise ValueError("No index to create for method 'none'")
+        
+        keyword = "CONCURRENTLY " if concurrently else ""
+        return (
+            f"CREATE INDEX {keyword}{name} ON chunks "
+            f"USING {self.method} (embedding vector_cosine_ops) WITH ({options})"
+        )
+    
+    def satisfies(self, target: "VectorIndexPlan") -> bool:
+        """
+        Whether an existing index built with this plan is good enough for target.
+        
+        IVFFlat indexes are kept while their list count stays within a factor
+        of two of the target, so small corpus changes do not trigger rebuilds.
+        """
+        if self.method != target.method:
+            return False
+        if self.method == "ivfflat":
+            return target.lists / 2 <= (self.lists or 0) <= target.lists * 2
+        if self.method == "hnsw":
+            return self.m == target.m and self.ef_construction == target.ef_construction
+        return True
+
+
+def ivfflat_lists(rows: int) -> int:
+    """Number of IVFFlat lists for a table of the given size (about sqrt(rows))."""
+    return max(1, round(math.sqrt(rows)))
+
+
+def choose_index_plan(
+    rows: int,
+    method: str = "auto",
+    dimensions: Optional[int] = None,
+    hnsw_max_rows: int = HNSW_MAX_ROWS,
+    m: int = DEFAULT_M,
+    ef_construction: int = DEFAULT_EF_CONSTRUCTION
+) -> VectorIndexPlan:
+    """
+    Choose the ANN index for a corpus.
+    
+    HNSW gives the best recall at a given latency and is maintained
+    incrementally, so it is used up to ``hnsw_max_rows`` vectors. Larger
+    corpora get IVFFlat with about sqrt(rows) lists, which builds much faster
+    and with far less memory.
+    
+    Args:
+        rows: Number of embedded chunks
+        method: "auto", "hnsw", "ivfflat" or "none"
+        dimensions: Embedding dimension, if known
+        hnsw_max_rows: Largest corpus indexed with HNSW in auto mode
+        m: HNSW connections per node
+        ef_construction: HNSW candidate list size while building
+    
+    Returns:
+        Index plan
+    """
+    if method not in ("auto", "hnsw", "ivfflat", "none"):
+        raise ValueError(f"Unknown index method: {method}")
+    
+    if method == "none" or (dimensions is not None and dimensions > MAX_INDEX_DIMENSIONS):
+        return VectorIndexPlan("none")
+    
+    if method == "auto":
+        method = "hnsw" if rows <= hnsw_max_rows else "ivfflat"
+    
+    if method == "hnsw":
+        return VectorIndexPlan("hnsw", m=m, ef_construction=ef_construction)
+    return VectorIndexPlan("ivfflat", lists=ivfflat_lists(rows))
+
+
+def parse_index_definition(definition: str) -> Optional[VectorIndexPlan]:
+    """
+    Read the plan back from an index definition as returned by pg_indexes.
+    
+    Args:
+        definition: CREATE INDEX statement
+    
+    Returns:
+        Plan of an hnsw or ivfflat index, None for other index types
+    """
+    match = INDEX_DEFINITION.search(definition)
+    if not match or match.group("method") not in ("hnsw", "ivfflat"):
+        return None
+    
+    options = {key: int(value) for key, value in INDEX_OPTION.findall(match.group("options") or "")}
+    if match.group("method") == "hnsw":
+        return VectorIndexPlan(
+            "hnsw",
+            m=options.get("m", DEFAULT_M),
+            ef_construction=options.get("ef_construction", DEFAULT_EF_CONSTRUCTION)
+        )
+    # pgvector defaults to 100 lists
+    return VectorIndexPlan("ivfflat", lists=options.get("lists", 100))
+
+
+def vector_search_settings(
+    index: Optional[VectorIndexPlan],
+    match_count: int,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    Query-time settings for the current ANN index.
+    
+    An HNSW scan returns at most ``ef_search`` rows, so it is raised to the
+    number of requested matches. IVFFlat defaults to sqrt(lists) probes.
+    
+    Args:
+        index: Current index plan, None if there is no ANN index
+        match_count: Number of results requested
+        ef_search: HNSW candidate list size
+        probes: IVFFlat lists to search
+    
+    Returns:
+        Setting names and values
+    """
+    if index is None or index.method == "none":
+        return {}
+    if index.method == "hnsw":
+        return {"hnsw.ef_search": max(ef_search or DEFAULT_EF_SEARCH, match_count)}
+    return {"ivfflat.probes": min(probes or index.default_probes, index.lists or 1)}
+
+
+async def apply_search_settings(conn: asyncpg.Connection, settings: Dict[str, int]):
+    """
+    Apply query-time index settings for the current transaction.
+    
+    Args:
+        conn: Database connection inside a transaction
+        settings: Settings from ``vector_search_settings``
+    """
+    for name, value in settings.items():
+        await conn.execute("SELECT set_config($1, $2, true)", name, str(value))
+
+
+async def get_vector_index(conn: asyncpg.Connection) -> Optional[VectorIndexPlan]:
+    """
+    Look up the ANN index on the embedding column.
+    
+    Args:
+        conn: Database connection
+    
+    Returns:
+        Plan of the existing index, None if there is none
+    """
+    definition = await conn.fetchval(
+        "SELECT indexdef FROM pg_indexes WHERE tablename = 'chunks' AND indexname = $1",
+        INDEX_NAME
+    )
+    return parse_index_definition(definition) if definition else None
+
+
+async def get_embedding_dimensions(conn: asyncpg.Connection) -> Optional[int]:
+    """Declared dimension of the embedding column, None if unconstrained."""
+    typmod = await conn.fetchval(
+        """
+        SELECT atttypmod FROM pg_attribute
+        WHERE attrelid = 'chunks'::regclass AND attname = 'embedding'
+        """
+    )
+    return typmod if typmod and typmod > 0 else None
+
+
+async def drop_vector_index(conn: asyncpg.Connection):
+    """Drop the ANN index, e.g. before a bulk load into an empty table."""
+    await conn.execute(f"DROP INDEX IF EXISTS {INDEX_NAME}")
+
+
+async def build_vector_index(
+    conn: asyncpg.Connection,
+    plan: VectorIndexPlan,
+    concurrently: bool = True,
+    maintenance_work_mem: Optional[str] = None,
+    parallel_workers: Optional[int] = None
+):
+    """
+    Build the ANN index and swap it in for the current one.
+    
+    The new index is built under a temporary name, with CONCURRENTLY so
+    searches and ingestion keep running, then replaces the old index in a
+    short transaction. With the "none" plan the current index is dropped.
+    A partitioned chunks table cannot be indexed CONCURRENTLY; its index is
+    built on every partition with writes blocked.
+    
+    Args:
+        conn: Database connection, not inside a transaction
+        plan: Index to build
+        concurrently: Build without blocking writes to the table
+        maintenance_work_mem: Memory for the build, e.g. "2GB"
+        parallel_workers: Parallel maintenance workers for the build
+    """
+    if plan.method == "none":
+        await drop_vector_index(conn)
+        return
+    
+    if concurrently and await is_partitioned(conn):
+        logger.info("Chunks table is partitioned, building the index without CONCURRENTLY")
+        concurrently = False
+    
+    building = f"{INDEX_NAME}_new"
+    # A failed concurrent build leaves an invalid index behind
+    await conn.execute(f"DROP INDEX IF EXISTS {building}")
+    
+    if maintenance_work_mem:
+        await conn.execute("SELECT set_config('maintenance_work_mem', $1, false)", maintenance_work_mem)
+    if parallel_workers is not None:
+        await conn.execute(
+            "SELECT set_config('max_parallel_maintenance_workers', $1, false)", str(parallel_workers)
+        )
+    
+    try:
+        start = time.perf_counter()
+        await conn.execute(plan.definition(building, concurrently=concurrently), timeout=BUILD_TIMEOUT)
+        logger.info(f"Built {plan.method} index in {time.perf_counter() - start:.1f}s")
+        
+        async with conn.transaction():
+            await conn.execute(f"DROP INDEX IF EXISTS {INDEX_NAME}")
+            await conn.execute(f"ALTER INDEX {building} RENAME TO {INDEX_NAME}")
+    finally:
+        if maintenance_work_mem:
+            await conn.execute("RESET maintenance_work_mem")
+        if parallel_workers is not None:
+            await conn.execute("RESET max_parallel_maintenance_workers")
+
+
+async def ensure_vector_index(
+    conn: asyncpg.Connection,
+    method: str = "auto",
+    force: bool = False,
+    concurrently: bool = True,
+    hnsw_max_rows: int = HNSW_MAX_ROWS,
+    maintenance_work_mem: Optional[str] = None,
+    parallel_workers: Optional[int] = None
+) -> Tuple[VectorIndexPlan, bool]:
+    """
+    Make sure the chunks table has the right ANN index for its size.
+    
+    Args:
+        conn: Database connection, not inside a transaction
+        method: "auto", "hnsw", "ivfflat" or "none"
+        force: Rebuild even if the current index is adequate
+        concurrently: Build without blocking writes to the table
+        hnsw_max_rows: Largest corpus indexed with HNSW in auto mode
+        maintenance_work_mem: Memory for the build, e.g. "2GB"
+        parallel_workers: Parallel maintenance workers for the build
+    
+    Returns:
+        Chosen plan and whether the index was (re)built
+    """
+    rows = await conn.fetchval("SELECT count(*) FROM chunks WHERE embedding IS NOT NULL")
+    dimensions = await get_embedding_dimensions(conn)
+    plan = choose_index_plan(rows, method, dimensions=dimensions, hnsw_max_rows=hnsw_max_rows)
+    
+    current = await get_vector_index(conn)
+    if not force:
+        if plan.method == "none" and current is None:
+            return plan, False
+        if current is not None and current.satisfies(plan):
+            logger.info(f"Keeping {current.method} index for {rows} vectors")
+            return current, False
+    
+    logger.info(f"Building {plan.method} index for {rows} vectors (previous: {current})")
+    await build_vector_index(
+        conn,
+        plan,
+        concurrently=concurrently,
+        maintenance_work_mem=maintenance_work_mem,
+        parallel_workers=parallel_workers
+    )
+    return plan, True
@@ -15,6 +15,15 @@ from bandit import manager as bandit_manager
 import httpx
 from dependencies import SecurityAuditDependencies
 
+try:
+    from ..common.knowledge_client import search_agent_knowledge_text
+except ImportError:
+    # Агент запущен из своей папки
+    import os
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from common.knowledge_client import search_agent_knowledge_text
+
 
 class SecurityFinding(BaseModel):
     """Model for security findings."""
@@ -647,36 +656,15 @@ async def search_agent_knowledge(
     Returns:
         Найденная информация из базы знаний
     """
-    try:
-        # Используем теги для фильтрации по знаниям агента
-        search_query = f"{query} {' '.join(ctx.deps.knowledge_tags)}"
-
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{ctx.deps.archon_url}/rag/search-knowledge-base",
-                json={
-                    "query": search_query,
-                    "source_domain": ctx.deps.knowledge_domain,
-                    "match_count": match_count
-                }
-            )
-
-            if response.status_code == 200:
-                result = response.json()
-
-                if result.get("success") and result.get("results"):
-                    knowledge = "\n".join([
-                        f"**{r.get('metadata', {}).get('title', 'Знания')}:**\n{r['content']}"
-                        for r in result["results"]
-                    ])
-                    return f"База знаний Security Audit:\n{knowledge}"
-                else:
-                    return "Информация не найдена в базе знаний агента."
-            else:
-                return f"Ошибка поиска: {response.status_code}"
-
-    except Exception as e:
-        return f"Ошибка доступа к базе знаний: {e}"
+    # Общий клиент Archon: пул соединений, кэш и объединение одинаковых запросов
+    return await search_agent_knowledge_text(
+        query=query,
+        tags=ctx.deps.knowledge_tags,
+        domain=ctx.deps.knowledge_domain,
+        match_count=match_count,
+        label="База знаний Security Audit",
+        base_url=ctx.deps.archon_url
+    )
 
 
 def _calculate_security_metrics(scan_results: List[VulnerabilityReport]) -> Dict[str, Any]:
@@ -11,7 +11,8 @@ from .core.types import (
     Task, Agent, TaskResult, TaskStatus, TaskPriority, AgentStatus,
     ExecutionMode, OrchestrationConfig, OrchestrationEvent
 )
-from .core.interfaces import IOrchestrator
+from .core.interfaces import IOrchestrator, IClock
+from .core.clock import SystemClock
 
 # Основные компоненты
 from .schedulers.task_queue import PriorityTaskQueue
@@ -20,6 +21,8 @@ from .managers.dependency_manager import TaskDependencyManager
 from .managers.priority_manager import SmartPriorityManager
 from .balancers.load_balancer import SmartLoadBalancer
 from .engines.execution_engine import ParallelExecutionEngine
+from .monitoring.metrics import MetricsRegistry, MetricsServer
+from .monitoring.tracing import Tracer
 
 __version__ = "1.0.0"
 
@@ -40,6 +43,8 @@ __all__ = [
 
     # Интерфейсы
     "IOrchestrator",
+    "IClock",
+    "SystemClock",
 
     # Компоненты
     "PriorityTaskQueue",
@@ -48,4 +53,9 @@ __all__ = [
     "SmartPriorityManager",
     "SmartLoadBalancer",
     "ParallelExecutionEngine",
+
+    # Мониторинг
+    "MetricsRegistry",
+    "MetricsServer",
+    "Tracer",
 ]
\ No newline at end of file
@@ -7,13 +7,14 @@
 
 import asyncio
 from typing import List, Dict, Optional, Callable, Any, Tuple
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timedelta
 from enum import Enum
 import logging
 import random
 import math
 
-from ..core.interfaces import ILoadBalancer
+from ..core.clock import SystemClock
+from ..core.interfaces import IClock, ILoadBalancer
 from ..core.types import Task, Agent, TaskPriority, AgentStatus, LoadBalancingStrategy
 
 
@@ -39,14 +40,17 @@ class SmartLoadBalancer(ILoadBalancer):
     - Метрики производительности
     """
 
-    def __init__(self, default_strategy: BalancingStrategy = BalancingStrategy.ADAPTIVE):
+    def __init__(self, default_strategy: BalancingStrategy = BalancingStrategy.ADAPTIVE,
+                 clock: Optional[IClock] = None):
         """
         Инициализация балансировщика.
 
         Args:
             default_strategy: Стратегия балансировки по умолчанию
+            clock: Источник времени (по умолчанию - системные часы)
         """
         self.default_strategy = default_strategy
+        self.clock = clock or SystemClock()
         self.logger = logging.getLogger(__name__)
 
         # Метрики агентов
@@ -207,7 +211,7 @@ class SmartLoadBalancer(ILoadBalancer):
 
             # Обновляем метрики
             self._agent_metrics[agent_id].update(metrics)
-            self._agent_metrics[agent_id]["last_updated"] = datetime.now(timezone.utc)
+            self._agent_metrics[agent_id]["last_updated"] = self.clock.now()
 
             # Обновляем кэш производительности
             await self._update_performance_cache(agent_id)
@@ -414,7 +418,7 @@ class SmartLoadBalancer(ILoadBalancer):
         assignment = {
             "task_id": task.id,
             "agent_id": agent.id,
-            "timestamp": datetime.now(timezone.utc),
+            "timestamp": self.clock.now(),
             "task_priority": task.priority.value,
             "agent_load_before": agent.current_load
         }
@@ -556,7 +560,7 @@ class SmartLoadBalancer(ILoadBalancer):
         async with self._lock:
             recent_assignments = [
                 assignment for assignment in self._task_history
-                if assignment["timestamp"] > datetime.now(timezone.utc) - self._performance_window
+                if assignment["timestamp"] > self.clock.now() - self._performance_window
             ]
 
             strategy_usage = {}
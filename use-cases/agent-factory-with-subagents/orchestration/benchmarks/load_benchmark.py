@@ -0,0 +1,357 @@
+"""
+Нагрузочный бенчмарк оркестратора.
+
+Прогоняет AgentOrchestrator через синтетические нагрузки (пачки, глубокие
+DAG, перекос agent_type, внедренные отказы) с фиктивным исполнителем и
+сохраняет результаты в JSON для сравнения между коммитами:
+- пропускная способность (задач в секунду);
+- задержка диспетчеризации p50/p99 (от готовности задачи до начала выполнения);
+- ожидание в очереди и время выбора агента по метрикам оркестратора;
+- CPU и память процесса, а с --profile - CPU и память по компонентам.
+
+Запуск:
+    python -m orchestration.benchmarks.load_benchmark --output results.json
+    python -m orchestration.benchmarks.load_benchmark --profile --compare results.json
+"""
+
+import argparse
+import asyncio
+import cProfile
+import json
+import logging
+import math
+import os
+import platform
+import pstats
+import resource
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from ..core.orchestrator import AgentOrchestrator
+from ..core.types import OrchestrationConfig
+from ..monitoring.metrics import Histogram, MetricFamily
+from .workloads import WORKLOADS, FakeExecutionEngine, Workload
+
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """
+    Вычислить перцентиль методом ближайшего ранга.
+
+    Args:
+        values: Значения
+        q: Перцентиль в диапазоне [0, 1]
+
+    Returns:
+        Значение перцентиля или None для пустого списка
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _histogram_summary(family: Optional[MetricFamily]) -> Dict[str, Optional[float]]:
+    """Свести гистограмму оркестратора (по всем меткам) к count/mean/p50/p99."""
+    children = list(family.children().values()) if family else []
+    if not children:
+        return {"count": 0, "mean": None, "p50": None, "p99": None}
+
+    merged = Histogram(children[0].min_value, len(children[0].bounds))
+    for child in children:
+        merged.count += child.count
+        merged.sum += child.sum
+        merged.counts = [a + b for a, b in zip(merged.counts, child.counts)]
+
+    return {"count": merged.count, "mean": merged.mean,
+            "p50": merged.quantile(0.5), "p99": merged.quantile(0.99)}
+
+
+def _component_name(filename: str) -> str:
+    """Определить компонент оркестрации по пути к файлу."""
+    path = os.path.abspath(filename)
+    if path.startswith(PACKAGE_DIR + os.sep):
+        relative = os.path.relpath(path, PACKAGE_DIR)
+        return os.path.splitext(relative)[0].replace(os.sep, "/")
+    if "asyncio" in path:
+        return "asyncio"
+    return "other"
+
+
+def _cpu_by_component(profiler: cProfile.Profile) -> Dict[str, float]:
+    """Собственное время CPU (tottime) по компонентам, секунды."""
+    stats = pstats.Stats(profiler)
+    totals: Dict[str, float] = {}
+    for (filename, _, _), (_, _, tottime, _, _) in stats.stats.items():
+        component = _component_name(filename)
+        totals[component] = totals.get(component, 0.0) + tottime
+    return dict(sorted(totals.items(), key=lambda item: -item[1]))
+
+
+def _memory_by_component(snapshot: tracemalloc.Snapshot) -> Dict[str, int]:
+    """Живые аллокации по компонентам (по месту аллокации), байты."""
+    totals: Dict[str, int] = {}
+    for stat in snapshot.statistics("filename"):
+        component = _component_name(stat.traceback[0].filename)
+        totals[component] = totals.get(component, 0) + stat.size
+    return dict(sorted(totals.items(), key=lambda item: -item[1]))
+
+
+async def run_workload(workload: Workload, monitoring_interval: float = 0.005,
+                       timeout: float = 300.0) -> Dict[str, Any]:
+    """
+    Прогнать нагрузку через оркестратор.
+
+    Args:
+        workload: Нагрузка
+        monitoring_interval: Интервал цикла диспетчеризации оркестратора
+        timeout: Максимальное время прогона в секундах
+
+    Returns:
+        Результаты прогона
+    """
+    tasks = workload.tasks
+    config = OrchestrationConfig(
+        max_concurrent_tasks=len(workload.agents),
+        max_queue_size=len(tasks) * 2,
+        monitoring_interval=monitoring_interval
+    )
+    orchestrator = AgentOrchestrator(config)
+
+    # Подменяем исполнитель фиктивным
+    engine = FakeExecutionEngine(
+        task_duration=workload.task_duration,
+        failing_task_ids=workload.failing_task_ids,
+        max_concurrent_tasks=config.max_concurrent_tasks,
+        tracer=orchestrator.tracer
+    )
+    engine.expected_finished = workload.expected_finished()
+    orchestrator.execution_engine = engine
+
+    await orchestrator.start()
+    for agent in workload.agents:
+        await orchestrator.register_agent(agent)
+
+    submitted_at: Dict[str, float] = {}
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+
+    for index, burst in enumerate(workload.bursts):
+        burst_time = time.perf_counter()
+        await orchestrator.submit_tasks(burst)
+        for task in burst:
+            submitted_at[task.id] = burst_time
+        if workload.burst_interval and index < len(workload.bursts) - 1:
+            await asyncio.sleep(workload.burst_interval)
+
+    timed_out = False
+    try:
+        await asyncio.wait_for(engine.finished.wait(), timeout)
+    except asyncio.TimeoutError:
+        timed_out = True
+
+    wall_time = time.perf_counter() - wall_start
+    cpu_time = time.process_time() - cpu_start
+    residual_queue = await orchestrator.task_queue.size()
+    registry = orchestrator.metrics_registry
+    await orchestrator.shutdown()
+
+    # Задержка диспетчеризации: от готовности (подача или завершение
+    # последней зависимости) до начала выполнения
+    dispatch_latencies = []
+    for task in tasks:
+        started = engine.started_at.get(task.id)
+        if started is None:
+            continue
+        ready = submitted_at[task.id]
+        for dependency in task.dependencies:
+            ready = max(ready, engine.finished_at.get(dependency.task_id, ready))
+        dispatch_latencies.append(started - ready)
+
+    finished = len(engine.finished_at)
+    return {
+        "tasks": len(tasks),
+        "agents": len(workload.agents),
+        "expected_finished": engine.expected_finished,
+        "finished": finished,
+        "failed": len(workload.failing_task_ids & set(engine.finished_at)),
+        "timed_out": timed_out,
+        "wall_seconds": wall_time,
+        "cpu_seconds": cpu_time,
+        "cpu_utilization": cpu_time / wall_time if wall_time > 0 else None,
+        "throughput_tasks_per_second": finished / wall_time if wall_time > 0 else None,
+        "dispatch_latency_seconds": {
+            "p50": percentile(dispatch_latencies, 0.5),
+            "p99": percentile(dispatch_latencies, 0.99),
+            "max": max(dispatch_latencies) if dispatch_latencies else None
+        },
+        "orchestrator_queue_wait_seconds": _histogram_summary(registry.get("queue_wait_seconds")),
+        "orchestrator_agent_selection_seconds": _histogram_summary(registry.get("dispatch_latency_seconds")),
+        "residual_queue_size": residual_queue,
+        "parameters": workload.parameters
+    }
+
+
+def run_profiled(factory: Callable[..., Workload], seed: int,
+                 monitoring_interval: float) -> Dict[str, Any]:
+    """
+    Прогнать нагрузку под cProfile и tracemalloc.
+
+    Профилирование искажает время, поэтому выполняется отдельным прогоном.
+
+    Args:
+        factory: Генератор нагрузки
+        seed: Seed генератора
+        monitoring_interval: Интервал цикла диспетчеризации
+
+    Returns:
+        CPU и память по компонентам
+    """
+    workload = factory(seed=seed)
+    profiler = cProfile.Profile()
+
+    tracemalloc.start()
+    profiler.enable()
+    try:
+        asyncio.run(run_workload(workload, monitoring_interval))
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "cpu_seconds_by_component": _cpu_by_component(profiler),
+        "live_bytes_by_component": _memory_by_component(snapshot),
+        "traced_peak_bytes": peak
+    }
+
+
+def _git_commit() -> Optional[str]:
+    """Получить текущий коммит (если доступен git)."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PACKAGE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(workload_names: List[str], seed: int = 0, profile: bool = False,
+              monitoring_interval: float = 0.005) -> Dict[str, Any]:
+    """
+    Выполнить набор нагрузок.
+
+    Args:
+        workload_names: Имена нагрузок из WORKLOADS
+        seed: Seed генераторов
+        profile: Выполнять ли профилированные прогоны
+        monitoring_interval: Интервал цикла диспетчеризации
+
+    Returns:
+        Результаты всех нагрузок с метаданными
+    """
+    results: Dict[str, Any] = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": seed,
+            "monitoring_interval": monitoring_interval
+        },
+        "workloads": {}
+    }
+
+    for name in workload_names:
+        factory = WORKLOADS[name]
+        workload_result = asyncio.run(run_workload(factory(seed=seed), monitoring_interval))
+        if profile:
+            workload_result["profile"] = run_profiled(factory, seed, monitoring_interval)
+        results["workloads"][name] = workload_result
+
+    results["meta"]["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return results
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """
+    Сравнить результаты с базовыми.
+
+    Args:
+        current: Текущие результаты
+        baseline: Базовые результаты
+
+    Returns:
+        Строки отчета об изменениях
+    """
+    lines = []
+    for name, result in current["workloads"].items():
+        base = baseline.get("workloads", {}).get(name)
+        if not base:
+            continue
+
+        for label, key_path in (("throughput", ("throughput_tasks_per_second",)),
+                                ("dispatch p50", ("dispatch_latency_seconds", "p50")),
+                                ("dispatch p99", ("dispatch_latency_seconds", "p99"))):
+            new_value, old_value = result, base
+            for key in key_path:
+                new_value, old_value = new_value.get(key), old_value.get(key)
+            if new_value is None or not old_value:
+                continue
+            change = (new_value - old_value) / old_value * 100
+            lines.append(f"{name:>18} {label:<13} {old_value:.6g} -> {new_value:.6g} ({change:+.1f}%)")
+
+    return lines
+
+
+def main():
+    """Точка входа командной строки."""
+    parser = argparse.ArgumentParser(description="Orchestrator load benchmark")
+    parser.add_argument("--workloads", nargs="+", choices=sorted(WORKLOADS), default=list(WORKLOADS),
+                        help="Workloads to run")
+    parser.add_argument("--seed", type=int, default=0, help="Workload generator seed")
+    parser.add_argument("--monitoring-interval", type=float, default=0.005,
+                        help="Orchestrator dispatch loop interval in seconds")
+    parser.add_argument("--profile", action="store_true",
+                        help="Add a profiled run with CPU and memory per component")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Baseline JSON results to compare against")
+    args = parser.parse_args()
+
+    # Логирование на уровне INFO искажает замеры
+    logging.basicConfig(level=logging.ERROR)
+
+    results = run_suite(args.workloads, args.seed, args.profile, args.monitoring_interval)
+
+    for name, result in results["workloads"].items():
+        latency = result["dispatch_latency_seconds"]
+        print(f"{name:>18}: {result['finished']}/{result['expected_finished']} tasks "
+              f"in {result['wall_seconds']:.2f}s, "
+              f"{result['throughput_tasks_per_second']:.0f} tasks/s, "
+              f"dispatch p50 {latency['p50'] * 1000:.1f} ms / p99 {latency['p99'] * 1000:.1f} ms, "
+              f"cpu {result['cpu_utilization']:.0%}"
+              + (" [TIMED OUT]" if result["timed_out"] else ""))
+        if "profile" in result:
+            top = list(result["profile"]["cpu_seconds_by_component"].items())[:5]
+            print(" " * 20 + "cpu: " + ", ".join(f"{c} {s:.2f}s" for c, s in top))
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            for line in compare(results, json.load(f)):
+                print(line)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
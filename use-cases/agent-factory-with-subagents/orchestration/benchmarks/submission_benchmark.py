@@ -0,0 +1,147 @@
+"""
+Бенчмарк подачи задач: поштучная подача против пакетной.
+
+Сравнивает цикл из AgentOrchestrator.submit_task с одним вызовом
+AgentOrchestrator.submit_tasks на одинаковом плане задач с зависимостями.
+
+Запуск:
+    python -m orchestration.benchmarks.submission_benchmark --tasks 10000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, Any, List
+
+from ..core.orchestrator import AgentOrchestrator
+from ..core.types import Task, TaskDependency, TaskPriority, OrchestrationConfig
+
+
+def build_plan(task_count: int, fan_in: int = 2, prefix: str = "task") -> List[Task]:
+    """
+    Построить план задач в виде DAG.
+
+    Каждая задача зависит от не более чем fan_in предыдущих задач,
+    поэтому граф гарантированно ацикличен.
+
+    Args:
+        task_count: Количество задач
+        fan_in: Максимальное количество зависимостей у задачи
+        prefix: Префикс ID задач
+
+    Returns:
+        Список задач
+    """
+    priorities = list(TaskPriority)
+    tasks = []
+
+    for i in range(task_count):
+        dependencies = [
+            TaskDependency(task_id=f"{prefix}-{i - offset}")
+            for offset in range(1, fan_in + 1)
+            if i - offset >= 0 and (i + offset) % 3 == 0
+        ]
+        tasks.append(Task(
+            id=f"{prefix}-{i}",
+            name=f"Benchmark task {i}",
+            priority=priorities[i % len(priorities)],
+            agent_type=f"agent-type-{i % 8}",
+            dependencies=dependencies,
+            estimated_duration=10
+        ))
+
+    return tasks
+
+
+async def _run_mode(mode: str, task_count: int, fan_in: int) -> Dict[str, Any]:
+    """
+    Подать план одним из способов и замерить время.
+
+    Args:
+        mode: "per_task" или "bulk"
+        task_count: Количество задач
+        fan_in: Максимальное количество зависимостей у задачи
+
+    Returns:
+        Результаты замера
+    """
+    config = OrchestrationConfig(
+        max_queue_size=task_count * 2,
+        monitoring_interval=3600
+    )
+    orchestrator = AgentOrchestrator(config)
+    await orchestrator.start()
+
+    tasks = build_plan(task_count, fan_in, prefix=mode)
+
+    try:
+        start = time.perf_counter()
+        if mode == "bulk":
+            submitted = await orchestrator.submit_tasks(tasks)
+        else:
+            submitted = [await orchestrator.submit_task(task) for task in tasks]
+        elapsed = time.perf_counter() - start
+    finally:
+        await orchestrator.shutdown()
+
+    return {
+        "mode": mode,
+        "tasks": len(submitted),
+        "seconds": elapsed,
+        "tasks_per_second": len(submitted) / elapsed if elapsed > 0 else 0.0,
+        "microseconds_per_task": elapsed / len(submitted) * 1e6 if submitted else 0.0
+    }
+
+
+async def run_benchmark(task_count: int = 10000, fan_in: int = 2) -> Dict[str, Any]:
+    """
+    Выполнить сравнение поштучной и пакетной подачи.
+
+    Args:
+        task_count: Количество задач в плане
+        fan_in: Максимальное количество зависимостей у задачи
+
+    Returns:
+        Результаты обоих режимов и ускорение пакетной подачи
+    """
+    per_task = await _run_mode("per_task", task_count, fan_in)
+    bulk = await _run_mode("bulk", task_count, fan_in)
+
+    return {
+        "task_count": task_count,
+        "fan_in": fan_in,
+        "per_task": per_task,
+        "bulk": bulk,
+        "speedup": per_task["seconds"] / bulk["seconds"] if bulk["seconds"] > 0 else None
+    }
+
+
+def main():
+    """Точка входа командной строки."""
+    parser = argparse.ArgumentParser(description="Per-task vs bulk submission benchmark")
+    parser.add_argument("--tasks", type=int, default=10000, help="Number of tasks in the plan")
+    parser.add_argument("--fan-in", type=int, default=2, help="Max dependencies per task")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    # Логирование на уровне INFO искажает замеры
+    logging.basicConfig(level=logging.WARNING)
+
+    results = asyncio.run(run_benchmark(args.tasks, args.fan_in))
+
+    for mode in ("per_task", "bulk"):
+        stats = results[mode]
+        print(f"{mode:>9}: {stats['seconds']:.3f}s, "
+              f"{stats['tasks_per_second']:.0f} tasks/s, "
+              f"{stats['microseconds_per_task']:.1f} us/task")
+    print(f"  speedup: {results['speedup']:.1f}x")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
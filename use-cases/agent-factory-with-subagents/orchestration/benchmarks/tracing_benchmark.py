@@ -0,0 +1,97 @@
+"""
+Бенчмарк накладных расходов трассировки.
+
+Измеряет стоимость одного спана в разных режимах: явные start/end,
+контекстный менеджер с вложенностью, запись готового интервала и
+выключенный трассировщик.
+
+Запуск:
+    python -m orchestration.benchmarks.tracing_benchmark --spans 200000
+"""
+
+import argparse
+import json
+import time
+from typing import Dict, Callable
+
+from ..monitoring.tracing import Tracer
+
+
+def _measure(operation: Callable[[int], None], iterations: int) -> float:
+    """
+    Замерить среднее время операции.
+
+    Args:
+        operation: Операция, принимающая номер итерации
+        iterations: Количество повторений
+
+    Returns:
+        Среднее время одной операции в наносекундах
+    """
+    start = time.perf_counter_ns()
+    for i in range(iterations):
+        operation(i)
+    return (time.perf_counter_ns() - start) / iterations
+
+
+def run_benchmark(spans: int = 200000) -> Dict[str, float]:
+    """
+    Выполнить замеры накладных расходов.
+
+    Args:
+        spans: Количество спанов на каждый режим
+
+    Returns:
+        Среднее время на спан (нс) по режимам
+    """
+    tracer = Tracer(max_spans=spans)
+    tracer.start_task_trace("bench-task")
+
+    def start_end(_):
+        tracer.end_span(tracer.start_span("bench.span", "bench-task"))
+
+    def context_manager(_):
+        with tracer.span("bench.span", "bench-task"):
+            pass
+
+    def record(i):
+        tracer.record_span("bench.span", "bench-task", i, i + 1)
+
+    disabled = Tracer(enabled=False)
+
+    def disabled_context_manager(_):
+        with disabled.span("bench.span", "bench-task"):
+            pass
+
+    results = {
+        "start_end_ns": _measure(start_end, spans),
+        "context_manager_ns": _measure(context_manager, spans),
+        "record_span_ns": _measure(record, spans),
+        "disabled_context_manager_ns": _measure(disabled_context_manager, spans),
+    }
+
+    start = time.perf_counter_ns()
+    tracer.to_otlp()
+    results["otlp_serialize_ns_per_span"] = (time.perf_counter_ns() - start) / len(tracer.finished_spans())
+
+    return results
+
+
+def main():
+    """Точка входа командной строки."""
+    parser = argparse.ArgumentParser(description="Tracing overhead benchmark")
+    parser.add_argument("--spans", type=int, default=200000, help="Spans per mode")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.spans)
+    for name, value in results.items():
+        print(f"{name:>30}: {value / 1000:.2f} us")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""
+Синтетические нагрузки и фиктивный исполнитель для бенчмарков оркестратора.
+
+Каждая нагрузка описывает пачки задач (подаются через submit_tasks с
+заданным интервалом), набор агентов и заранее выбранные задачи, которые
+завершатся ошибкой. Все генераторы детерминированы при фиксированном seed.
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from ..core.types import Agent, Task, TaskDependency, TaskPriority
+from ..engines.execution_engine import ParallelExecutionEngine
+
+
+@dataclass
+class Workload:
+    """Описание синтетической нагрузки."""
+    name: str
+    bursts: List[List[Task]]
+    agents: List[Agent]
+    burst_interval: float = 0.0  # секунды между пачками
+    task_duration: float = 0.001  # среднее время выполнения в фиктивном исполнителе
+    failing_task_ids: Set[str] = field(default_factory=set)
+    parameters: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def tasks(self) -> List[Task]:
+        """Все задачи нагрузки в порядке подачи."""
+        return [task for burst in self.bursts for task in burst]
+
+    def expected_finished(self) -> int:
+        """
+        Количество задач, которые достигнут конечного состояния.
+
+        Задачи, зависящие (транзитивно) от упавших, остаются заблокированными.
+
+        Returns:
+            Ожидаемое число завершенных (успешно или с ошибкой) задач
+        """
+        blocked: Set[str] = set()
+        for task in self.tasks:
+            for dependency in task.dependencies:
+                if dependency.task_id in blocked or dependency.task_id in self.failing_task_ids:
+                    blocked.add(task.id)
+                    break
+        return len(self.tasks) - len(blocked)
+
+
+class FakeExecutionEngine(ParallelExecutionEngine):
+    """
+    Движок выполнения с фиктивным исполнителем.
+
+    Вместо вызова агента ждет заданное время и завершает задачи из
+    failing_task_ids ошибкой. Фиксирует время начала и окончания каждой
+    задачи для расчета задержки диспетчеризации.
+    """
+
+    def __init__(self, task_duration: float = 0.001, failing_task_ids: Optional[Set[str]] = None,
+                 seed: int = 0, **kwargs):
+        """
+        Инициализация фиктивного движка.
+
+        Args:
+            task_duration: Среднее время выполнения задачи в секундах
+            failing_task_ids: ID задач, которые завершатся ошибкой
+            seed: Seed генератора длительностей
+            **kwargs: Параметры ParallelExecutionEngine
+        """
+        super().__init__(**kwargs)
+        self.task_duration = task_duration
+        self.failing_task_ids = failing_task_ids or set()
+        self._random = random.Random(seed)
+
+        self.started_at: Dict[str, float] = {}
+        self.finished_at: Dict[str, float] = {}
+        self.finished = asyncio.Event()
+        self.expected_finished = 0
+
+    async def _simulate_task_execution(self, task: Task, agent: Agent, context: Dict[str, Any]) -> float:
+        """Имитировать выполнение задачи."""
+        self.started_at[task.id] = time.perf_counter()
+        try:
+            # Экспоненциальное распределение длительностей
+            duration = self._random.expovariate(1 / self.task_duration) if self.task_duration > 0 else 0
+            await asyncio.sleep(duration)
+
+            if task.id in self.failing_task_ids:
+                raise RuntimeError(f"Injected failure for task {task.id}")
+            return duration
+        finally:
+            self.finished_at[task.id] = time.perf_counter()
+            if self.expected_finished and len(self.finished_at) >= self.expected_finished:
+                self.finished.set()
+
+
+def _make_agents(agent_types: List[str], agents_per_type: int) -> List[Agent]:
+    """Создать агентов: по agents_per_type на каждый тип."""
+    return [
+        Agent(
+            id=f"{agent_type}-agent-{i}",
+            name=f"{agent_type} agent {i}",
+            type=agent_type,
+            capabilities=[agent_type],
+            max_concurrent_tasks=1
+        )
+        for agent_type in agent_types
+        for i in range(agents_per_type)
+    ]
+
+
+def _agent_types(count: int) -> List[str]:
+    """Имена типов агентов одинаковой длины (чтобы не совпадали как подстроки)."""
+    return [f"type-{i:02d}" for i in range(count)]
+
+
+def _make_task(task_id: str, agent_type: str, rng: random.Random,
+               dependencies: Optional[List[str]] = None) -> Task:
+    """Создать задачу нагрузки."""
+    return Task(
+        id=task_id,
+        name=task_id,
+        agent_type=agent_type,
+        priority=rng.choice(list(TaskPriority)),
+        dependencies=[TaskDependency(task_id=dep) for dep in dependencies or []]
+    )
+
+
+def _split_bursts(tasks: List[Task], burst_size: int) -> List[List[Task]]:
+    """Разбить задачи на пачки."""
+    return [tasks[i:i + burst_size] for i in range(0, len(tasks), burst_size)]
+
+
+def bursty_workload(tasks: int = 2000, burst_size: int = 250, burst_interval: float = 0.05,
+                    agent_types: int = 4, agents_per_type: int = 8, seed: int = 0) -> Workload:
+    """
+    Независимые задачи, прибывающие пачками.
+
+    Args:
+        tasks: Количество задач
+        burst_size: Размер пачки
+        burst_interval: Интервал между пачками в секундах
+        agent_types: Количество типов агентов
+        agents_per_type: Агентов на тип
+        seed: Seed генератора
+
+    Returns:
+        Нагрузка
+    """
+    rng = random.Random(seed)
+    types = _agent_types(agent_types)
+    task_list = [_make_task(f"bursty-{i}", rng.choice(types), rng) for i in range(tasks)]
+
+    return Workload(
+        name="bursty",
+        bursts=_split_bursts(task_list, burst_size),
+        agents=_make_agents(types, agents_per_type),
+        burst_interval=burst_interval,
+        parameters={"tasks": tasks, "burst_size": burst_size, "burst_interval": burst_interval,
+                    "agent_types": agent_types, "agents_per_type": agents_per_type, "seed": seed}
+    )
+
+
+def deep_dag_workload(chains: int = 16, depth: int = 64, cross_edge_probability: float = 0.2,
+                      agent_types: int = 4, agents_per_type: int = 4, seed: int = 0) -> Workload:
+    """
+    Глубокий DAG: параллельные цепочки с перекрестными зависимостями.
+
+    Задача уровня d зависит от задачи уровня d-1 своей цепочки и с
+    заданной вероятностью - от задачи уровня d-1 другой цепочки.
+
+    Args:
+        chains: Количество цепочек
+        depth: Глубина цепочки
+        cross_edge_probability: Вероятность перекрестной зависимости
+        agent_types: Количество типов агентов
+        agents_per_type: Агентов на тип
+        seed: Seed генератора
+
+    Returns:
+        Нагрузка
+    """
+    rng = random.Random(seed)
+    types = _agent_types(agent_types)
+    task_list = []
+
+    for level in range(depth):
+        for chain in range(chains):
+            dependencies = []
+            if level > 0:
+                dependencies.append(f"dag-{chain}-{level - 1}")
+                if chains > 1 and rng.random() < cross_edge_probability:
+                    other = rng.choice([c for c in range(chains) if c != chain])
+                    dependencies.append(f"dag-{other}-{level - 1}")
+            task_list.append(_make_task(f"dag-{chain}-{level}", rng.choice(types), rng, dependencies))
+
+    return Workload(
+        name="deep_dag",
+        bursts=[task_list],
+        agents=_make_agents(types, agents_per_type),
+        parameters={"chains": chains, "depth": depth,
+                    "cross_edge_probability": cross_edge_probability,
+                    "agent_types": agent_types, "agents_per_type": agents_per_type, "seed": seed}
+    )
+
+
+def skewed_workload(tasks: int = 2000, agent_types: int = 8, agents_per_type: int = 2,
+                    zipf_exponent: float = 1.5, seed: int = 0) -> Workload:
+    """
+    Независимые задачи с распределением agent_type по закону Ципфа.
+
+    Агентов каждого типа поровну, поэтому популярные типы перегружены.
+
+    Args:
+        tasks: Количество задач
+        agent_types: Количество типов агентов
+        agents_per_type: Агентов на тип
+        zipf_exponent: Показатель распределения Ципфа
+        seed: Seed генератора
+
+    Returns:
+        Нагрузка
+    """
+    rng = random.Random(seed)
+    types = _agent_types(agent_types)
+    weights = [1 / (rank + 1) ** zipf_exponent for rank in range(agent_types)]
+    task_list = [
+        _make_task(f"skewed-{i}", rng.choices(types, weights)[0], rng)
+        for i in range(tasks)
+    ]
+
+    return Workload(
+        name="skewed",
+        bursts=[task_list],
+        agents=_make_agents(types, agents_per_type),
+        parameters={"tasks": tasks, "agent_types": agent_types,
+                    "agents_per_type": agents_per_type, "zipf_exponent": zipf_exponent, "seed": seed}
+    )
+
+
+def failure_workload(tasks: int = 2000, failure_rate: float = 0.05, max_dependencies: int = 2,
+                     dependency_window: int = 50, agent_types: int = 4, agents_per_type: int = 8,
+                     seed: int = 0) -> Workload:
+    """
+    Случайный DAG с внедренными отказами.
+
+    Отказавшая задача оставляет своих потомков заблокированными, что
+    проверяет поведение планировщика при частичных сбоях.
+
+    Args:
+        tasks: Количество задач
+        failure_rate: Доля задач, завершающихся ошибкой
+        max_dependencies: Максимум зависимостей у задачи
+        dependency_window: Зависимости выбираются среди последних N задач
+        agent_types: Количество типов агентов
+        agents_per_type: Агентов на тип
+        seed: Seed генератора
+
+    Returns:
+        Нагрузка
+    """
+    rng = random.Random(seed)
+    types = _agent_types(agent_types)
+    task_list = []
+
+    for i in range(tasks):
+        candidates = range(max(0, i - dependency_window), i)
+        count = min(len(candidates), rng.randint(0, max_dependencies))
+        dependencies = [f"failure-{j}" for j in rng.sample(candidates, count)]
+        task_list.append(_make_task(f"failure-{i}", rng.choice(types), rng, dependencies))
+
+    failing = {task.id for task in task_list if rng.random() < failure_rate}
+
+    return Workload(
+        name="failure_injection",
+        bursts=_split_bursts(task_list, 500),
+        agents=_make_agents(types, agents_per_type),
+        failing_task_ids=failing,
+        parameters={"tasks": tasks, "failure_rate": failure_rate,
+                    "max_dependencies": max_dependencies, "dependency_window": dependency_window,
+                    "agent_types": agent_types, "agents_per_type": agents_per_type, "seed": seed}
+    )
+
+
+WORKLOADS: Dict[str, Callable[..., Workload]] = {
+    "bursty": bursty_workload,
+    "deep_dag": deep_dag_workload,
+    "skewed": skewed_workload,
+    "failure_injection": failure_workload,
+}
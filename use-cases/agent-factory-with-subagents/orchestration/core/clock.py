@@ -0,0 +1,23 @@
+"""
+Источники времени для системы оркестрации.
+
+По умолчанию компоненты используют системные часы. Виртуальные часы для
+детерминированной симуляции находятся в пакете simulation.
+"""
+
+import time
+from datetime import datetime, timezone
+
+from .interfaces import IClock
+
+
+class SystemClock(IClock):
+    """Системные часы: реальное UTC-время и time.monotonic."""
+
+    def now(self) -> datetime:
+        """Текущее время (UTC)."""
+        return datetime.now(timezone.utc)
+
+    def monotonic(self) -> float:
+        """Монотонное время в секундах."""
+        return time.monotonic()
@@ -6,8 +6,28 @@
 """
 
 from abc import ABC, abstractmethod
+from datetime import datetime
 from typing import List, Optional, Dict, Any, AsyncIterator
-from .types import Task, Agent, TaskResult, ExecutionPlan, OrchestrationEvent
+from .types import Task, Agent, TaskResult, TaskStatus, TaskDependency, ExecutionPlan, OrchestrationEvent
+
+
+class IClock(ABC):
+    """
+    Интерфейс источника времени.
+
+    Компоненты получают текущее время только через часы, что позволяет
+    запускать оркестратор на виртуальном времени в режиме симуляции.
+    """
+
+    @abstractmethod
+    def now(self) -> datetime:
+        """Текущее время (UTC, timezone-aware)."""
+        pass
+
+    @abstractmethod
+    def monotonic(self) -> float:
+        """Монотонное время в секундах для измерения интервалов."""
+        pass
 
 
 class ITaskQueue(ABC):
@@ -18,6 +38,11 @@ class ITaskQueue(ABC):
         """Добавить задачу в очередь."""
         pass
 
+    @abstractmethod
+    async def enqueue_many(self, tasks: List[Task]) -> bool:
+        """Добавить пакет задач в очередь за одну операцию."""
+        pass
+
     @abstractmethod
     async def dequeue(self, agent_capabilities: Optional[List[str]] = None) -> Optional[Task]:
         """Извлечь задачу из очереди для агента с указанными возможностями."""
@@ -62,6 +87,16 @@ class ITaskScheduler(ABC):
         """Запланировать выполнение нескольких задач."""
         pass
 
+    @abstractmethod
+    async def find_scheduled(self, task_ids: List[str]) -> List[str]:
+        """Найти среди ID уже запланированные задачи."""
+        pass
+
+    @abstractmethod
+    async def unschedule_tasks(self, task_ids: List[str]) -> int:
+        """Снять задачи с планирования без отмены (откат пакета)."""
+        pass
+
     @abstractmethod
     async def cancel_task(self, task_id: str) -> bool:
         """Отменить запланированную задачу."""
@@ -92,6 +127,16 @@ class IDependencyManager(ABC):
         """Добавить зависимость между задачами."""
         pass
 
+    @abstractmethod
+    async def add_dependencies_bulk(self, tasks: List[Task]) -> Dict[str, List[TaskDependency]]:
+        """Добавить зависимости пакета задач с единой проверкой на циклы."""
+        pass
+
+    @abstractmethod
+    async def remove_dependencies_bulk(self, edges: Dict[str, List[TaskDependency]]) -> int:
+        """Удалить зависимости, добавленные add_dependencies_bulk (откат пакета)."""
+        pass
+
     @abstractmethod
     async def remove_dependency(self, task_id: str, dependency_task_id: str) -> bool:
         """Удалить зависимость между задачами."""
@@ -112,6 +157,16 @@ class IDependencyManager(ABC):
         """Проверить, готова ли задача к выполнению (все зависимости выполнены)."""
         pass
 
+    @abstractmethod
+    async def check_ready_batch(self, task_ids: List[str]) -> Dict[str, bool]:
+        """Проверить готовность нескольких задач за один вызов."""
+        pass
+
+    @abstractmethod
+    async def update_task_status(self, task_id: str, status: TaskStatus):
+        """Сообщить менеджеру новый статус задачи."""
+        pass
+
     @abstractmethod
     async def resolve_execution_order(self, tasks: List[Task]) -> List[Task]:
         """Определить порядок выполнения задач с учетом зависимостей."""
@@ -7,26 +7,29 @@
 
 import asyncio
 from typing import List, Dict, Optional, Any, Set
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timedelta
 import logging
 import uuid
 
-from ..interfaces import (
+from .interfaces import (
     IOrchestrator, ITaskQueue, ITaskScheduler, IDependencyManager,
     ILoadBalancer, IExecutionEngine, IPriorityManager, IAgentRegistry,
-    IEventDispatcher, IMonitor, IErrorHandler
+    IEventDispatcher, IMonitor, IErrorHandler, IClock
 )
-from ..types import (
+from .clock import SystemClock
+from .types import (
     Task, Agent, TaskResult, TaskStatus, AgentStatus, OrchestrationConfig,
-    OrchestrationEvent, ExecutionPlan
+    OrchestrationEvent, ExecutionPlan, TaskDependency
 )
 
-from ...schedulers.task_queue import PriorityTaskQueue
-from ...schedulers.task_scheduler import SmartTaskScheduler
-from ...managers.dependency_manager import TaskDependencyManager
-from ...managers.priority_manager import SmartPriorityManager
-from ...balancers.load_balancer import SmartLoadBalancer
-from ...engines.execution_engine import ParallelExecutionEngine
+from ..schedulers.task_queue import PriorityTaskQueue
+from ..schedulers.task_scheduler import SmartTaskScheduler
+from ..managers.dependency_manager import TaskDependencyManager
+from ..managers.priority_manager import SmartPriorityManager
+from ..balancers.load_balancer import SmartLoadBalancer
+from ..engines.execution_engine import ParallelExecutionEngine
+from ..monitoring.metrics import MetricsRegistry, MetricsServer
+from ..monitoring.tracing import Tracer
 
 
 class AgentOrchestrator(IOrchestrator):
@@ -41,14 +44,18 @@ class AgentOrchestrator(IOrchestrator):
     - Мониторинг и логирование
     """
 
-    def __init__(self, config: Optional[OrchestrationConfig] = None):
+    def __init__(self, config: Optional[OrchestrationConfig] = None,
+                 clock: Optional[IClock] = None):
         """
         Инициализация оркестратора.
 
         Args:
             config: Конфигурация оркестрации
+            clock: Источник времени для всех компонентов (по умолчанию -
+                системные часы; в режиме симуляции - виртуальные)
         """
         self.config = config or OrchestrationConfig()
+        self.clock = clock or SystemClock()
         self.logger = logging.getLogger(__name__)
 
         # Инициализация компонентов
@@ -69,17 +76,56 @@ class AgentOrchestrator(IOrchestrator):
             "tasks_failed": 0,
             "average_wait_time": 0.0,
             "average_execution_time": 0.0,
-            "system_uptime": datetime.now(timezone.utc)
+            "system_uptime": self.clock.now()
         }
 
+        # Реестр метрик и HTTP endpoint для Prometheus
+        self.metrics_registry = MetricsRegistry()
+        self._metrics_server: Optional[MetricsServer] = None
+        self._init_metrics()
+
+        # Монотонное время подачи задач для расчета ожидания в очереди
+        self._submitted_at: Dict[str, float] = {}
+
         # Блокировка для thread-safety
         self._lock = asyncio.Lock()
 
+    def _init_metrics(self):
+        """Зарегистрировать метрики оркестратора."""
+        registry = self.metrics_registry
+
+        self._tasks_submitted_total = registry.counter(
+            "tasks_submitted_total", "Tasks accepted by the orchestrator", ["agent_type"])
+        self._tasks_finished_total = registry.counter(
+            "tasks_finished_total", "Tasks that finished execution", ["agent_type", "status"])
+
+        self._queue_wait_seconds = registry.histogram(
+            "queue_wait_seconds", "Time from submission to agent assignment", ["agent_type"])
+        self._dispatch_latency_seconds = registry.histogram(
+            "dispatch_latency_seconds", "Time spent selecting an agent and dispatching a task")
+        self._execution_seconds = registry.histogram(
+            "execution_seconds", "Task execution time", ["agent_type"])
+        self._task_retries = registry.histogram(
+            "task_retries", "Retry count of finished tasks", ["agent_type"],
+            min_value=1, bucket_count=8)
+
+        self._queue_depth = registry.gauge("queue_depth", "Tasks waiting in the queue")
+        self._ready_tasks = registry.gauge("ready_tasks", "Tasks ready for dispatch")
+        self._running_tasks = registry.gauge("running_tasks", "Tasks currently executing")
+        self._registered_agents = registry.gauge("registered_agents", "Registered agents")
+
     def _init_components(self):
         """Инициализировать все компоненты системы."""
+        # Трассировщик (общий для планировщика и движка выполнения)
+        self.tracer = Tracer(
+            enabled=self.config.enable_tracing,
+            max_spans=self.config.max_trace_spans
+        )
+
         # Очередь задач
         self.task_queue: ITaskQueue = PriorityTaskQueue(
-            max_size=self.config.max_queue_size
+            max_size=self.config.max_queue_size,
+            clock=self.clock
         )
 
         # Менеджер зависимостей
@@ -87,18 +133,22 @@ class AgentOrchestrator(IOrchestrator):
 
         # Планировщик
         self.scheduler: ITaskScheduler = SmartTaskScheduler(
-            dependency_manager=self.dependency_manager
+            dependency_manager=self.dependency_manager,
+            tracer=self.tracer,
+            clock=self.clock
         )
 
         # Менеджер приоритетов
-        self.priority_manager: IPriorityManager = SmartPriorityManager()
+        self.priority_manager: IPriorityManager = SmartPriorityManager(clock=self.clock)
 
         # Балансировщик нагрузки
-        self.load_balancer: ILoadBalancer = SmartLoadBalancer()
+        self.load_balancer: ILoadBalancer = SmartLoadBalancer(clock=self.clock)
 
         # Движок выполнения
         self.execution_engine: IExecutionEngine = ParallelExecutionEngine(
-            max_concurrent_tasks=self.config.max_concurrent_tasks
+            max_concurrent_tasks=self.config.max_concurrent_tasks,
+            tracer=self.tracer,
+            clock=self.clock
         )
 
         # Реестр агентов (простая реализация)
@@ -124,18 +174,24 @@ class AgentOrchestrator(IOrchestrator):
             # Запускаем компоненты
             await self.scheduler.start()
 
+            if self.config.metrics_port is not None:
+                self._metrics_server = MetricsServer(
+                    self.metrics_registry, self.config.metrics_host, self.config.metrics_port
+                )
+                await self._metrics_server.start()
+
             # Запускаем фоновые задачи
             self._monitoring_task = asyncio.create_task(self._monitoring_loop())
             self._auto_escalation_task = asyncio.create_task(self._auto_escalation_loop())
 
             self._is_running = True
-            self._metrics["system_uptime"] = datetime.now(timezone.utc)
+            self._metrics["system_uptime"] = self.clock.now()
 
             self.logger.info("Agent Orchestrator started successfully")
 
             # Публикуем событие запуска
             await self._publish_event("orchestrator.started", {
-                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "timestamp": self.clock.now().isoformat(),
                 "config": self.config.__dict__
             })
 
@@ -181,9 +237,16 @@ class AgentOrchestrator(IOrchestrator):
             await self.scheduler.stop()
             await self.execution_engine.shutdown()
 
+            if self._metrics_server:
+                await self._metrics_server.stop()
+                self._metrics_server = None
+
+            if self.config.enable_tracing and self.config.trace_export_path:
+                self.tracer.export_json(self.config.trace_export_path)
+
             # Публикуем событие завершения
             await self._publish_event("orchestrator.shutdown", {
-                "timestamp": datetime.now(timezone.utc).isoformat()
+                "timestamp": self.clock.now().isoformat()
             })
 
             self.logger.info("Agent Orchestrator shutdown completed")
@@ -207,21 +270,31 @@ class AgentOrchestrator(IOrchestrator):
             raise RuntimeError("Orchestrator is not running")
 
         async with self._lock:
+            enqueue_start = self.tracer.now_ns()
+
             # Назначаем приоритет
             task = await self.priority_manager.assign_priority(task)
 
+            # Регистрируем зависимости задачи
+            edges = await self.dependency_manager.add_dependencies_bulk([task])
+
             # Планируем задачу
             scheduled = await self.scheduler.schedule_task(task)
             if not scheduled:
+                await self._rollback_submission([], edges)
                 raise RuntimeError(f"Failed to schedule task {task.id}")
 
             # Добавляем в очередь
             queued = await self.task_queue.enqueue(task)
             if not queued:
+                await self._rollback_submission([task.id], edges)
                 raise RuntimeError(f"Failed to enqueue task {task.id}")
 
             # Обновляем метрики
             self._metrics["tasks_submitted"] += 1
+            self._submitted_at[task.id] = self.clock.monotonic()
+            self._tasks_submitted_total.labels(task.agent_type or "").inc()
+            self._trace_submission(task, enqueue_start, self.tracer.now_ns())
 
             # Публикуем событие
             await self._publish_event("task.submitted", {
@@ -237,21 +310,99 @@ class AgentOrchestrator(IOrchestrator):
         """
         Подать несколько задач на выполнение.
 
+        Пакет обрабатывается за один проход под одной блокировкой:
+        задачи проверяются целиком, циклы ищутся один раз для всего графа,
+        зависимости добавляются пачкой, а очередь перестраивается одним
+        heapify. Пакет принимается или отклоняется целиком: ID проверяются
+        до изменения компонентов, а если пакет отклонит планировщик или
+        очередь, добавленные зависимости и планирование откатываются.
+
         Args:
             tasks: Список задач
 
         Returns:
             Список ID задач
+
+        Raises:
+            ValueError: Если пакет содержит дубликаты ID, уже поданные задачи
+                или циклические зависимости
+            RuntimeError: Если пакет не удалось запланировать или поставить в очередь
         """
-        task_ids = []
-        for task in tasks:
-            try:
-                task_id = await self.submit_task(task)
-                task_ids.append(task_id)
-            except Exception as e:
-                self.logger.error(f"Failed to submit task {task.id}: {e}")
+        if not self._is_running:
+            raise RuntimeError("Orchestrator is not running")
+
+        if not tasks:
+            return []
+
+        async with self._lock:
+            # Проверяем пакет до изменения состояния компонентов
+            enqueue_start = self.tracer.now_ns()
+            task_ids = [task.id for task in tasks]
+            if len(set(task_ids)) != len(task_ids):
+                raise ValueError("Batch contains duplicate task IDs")
+
+            submitted = await self.scheduler.find_scheduled(task_ids)
+            if submitted:
+                raise ValueError(f"Tasks already submitted: {', '.join(submitted)}")
+
+            queue_size = await self.task_queue.size()
+            if queue_size + len(tasks) > self.config.max_queue_size:
+                raise RuntimeError(f"Queue cannot fit {len(tasks)} tasks "
+                                   f"(size: {queue_size}/{self.config.max_queue_size})")
+
+            # Назначаем приоритеты
+            tasks = await self.priority_manager.assign_priorities(tasks)
+
+            # Регистрируем зависимости (единая проверка на циклы)
+            edges = await self.dependency_manager.add_dependencies_bulk(tasks)
+
+            # Планируем пакет
+            scheduled = await self.scheduler.schedule_tasks(tasks)
+            if not scheduled:
+                await self._rollback_submission([], edges)
+                raise RuntimeError(f"Failed to schedule batch of {len(tasks)} tasks")
+
+            # Добавляем в очередь одной операцией
+            queued = await self.task_queue.enqueue_many(tasks)
+            if not queued:
+                await self._rollback_submission(task_ids, edges)
+                raise RuntimeError(f"Failed to enqueue batch of {len(tasks)} tasks")
 
-        return task_ids
+            # Обновляем метрики
+            self._metrics["tasks_submitted"] += len(tasks)
+            submitted_at = self.clock.monotonic()
+            enqueue_end = self.tracer.now_ns()
+            for task in tasks:
+                self._submitted_at[task.id] = submitted_at
+                self._tasks_submitted_total.labels(task.agent_type or "").inc()
+                self._trace_submission(task, enqueue_start, enqueue_end, batch_size=len(tasks))
+
+            # Публикуем события только при наличии подписчиков
+            if self._event_subscribers.get("task.submitted"):
+                for task in tasks:
+                    await self._publish_event("task.submitted", {
+                        "task_id": task.id,
+                        "priority": task.priority.name,
+                        "agent_type": task.agent_type
+                    })
+
+            self.logger.info(f"Submitted batch of {len(tasks)} tasks")
+            return task_ids
+
+    async def _rollback_submission(self, scheduled_ids: List[str], edges: Dict[str, List[TaskDependency]]):
+        """
+        Отменить подачу задач, отклоненную планировщиком или очередью.
+
+        Args:
+            scheduled_ids: ID задач, которые уже успел принять планировщик
+            edges: Зависимости, добавленные add_dependencies_bulk
+        """
+        if scheduled_ids:
+            await self.scheduler.unschedule_tasks(scheduled_ids)
+            for task_id in scheduled_ids:
+                self._submitted_at.pop(task_id, None)
+        if edges:
+            await self.dependency_manager.remove_dependencies_bulk(edges)
 
     async def get_task_status(self, task_id: str) -> Optional[str]:
         """
@@ -312,6 +463,7 @@ class AgentOrchestrator(IOrchestrator):
             success = cancelled_in_scheduler or stopped_execution or removed_from_queue
 
             if success:
+                self.tracer.finish_task_trace(task_id, error="cancelled")
                 await self._publish_event("task.cancelled", {"task_id": task_id})
                 self.logger.info(f"Task {task_id} cancelled")
 
@@ -321,6 +473,10 @@ class AgentOrchestrator(IOrchestrator):
             self.logger.error(f"Failed to cancel task {task_id}: {e}")
             return False
 
+        finally:
+            # Отмененная задача уже не будет ждать в очереди
+            self._submitted_at.pop(task_id, None)
+
     async def wait_for_completion(self, task_id: str, timeout: Optional[int] = None) -> TaskResult:
         """
         Ждать завершения задачи.
@@ -332,7 +488,7 @@ class AgentOrchestrator(IOrchestrator):
         Returns:
             Результат выполнения задачи
         """
-        start_time = datetime.now(timezone.utc)
+        start_time = self.clock.now()
         timeout_seconds = timeout or self.config.default_task_timeout
 
         while True:
@@ -342,7 +498,7 @@ class AgentOrchestrator(IOrchestrator):
                 return result
 
             # Проверяем таймаут
-            elapsed = (datetime.now(timezone.utc) - start_time).total_seconds()
+            elapsed = (self.clock.now() - start_time).total_seconds()
             if elapsed > timeout_seconds:
                 raise TimeoutError(f"Task {task_id} did not complete within {timeout_seconds} seconds")
 
@@ -364,7 +520,8 @@ class AgentOrchestrator(IOrchestrator):
             balancer_stats = await self.load_balancer.get_balancer_stats()
             priority_analytics = await self.priority_manager.get_priority_analytics()
 
-            uptime = (datetime.now(timezone.utc) - self._metrics["system_uptime"]).total_seconds()
+            uptime = (self.clock.now() - self._metrics["system_uptime"]).total_seconds()
+            self._refresh_average_metrics()
 
             return {
                 "orchestrator": {
@@ -479,21 +636,46 @@ class AgentOrchestrator(IOrchestrator):
             self.config.max_concurrent_tasks
         )
 
-        tasks_to_process = ready_tasks[:max_tasks]
+        # Сначала более приоритетные и более ранние задачи; ID делает порядок детерминированным
+        ready_tasks.sort(key=lambda t: (-t.priority.value, t.created_at, t.id))
+
+        # Типы задач, для которых в этом цикле не осталось свободных агентов:
+        # их задачи пропускаются, не занимая места задач других типов
+        exhausted_types: Set[str] = set()
+        dispatched = 0
+
+        for task in ready_tasks:
+            if dispatched >= max_tasks or not available_agents:
+                break
+            if task.agent_type in exhausted_types:
+                continue
 
-        for task in tasks_to_process:
             try:
+                dispatch_start = self.clock.monotonic()
+                dispatch_start_ns = self.tracer.now_ns()
+
                 # Выбираем агента
                 agent = await self.load_balancer.select_agent(task, available_agents)
                 if agent:
                     # Отмечаем задачу как выполняющуюся
                     await self.scheduler.mark_task_running(task.id)
 
+                    dispatched_at = self.clock.monotonic()
+                    self._dispatch_latency_seconds.observe(dispatched_at - dispatch_start)
+                    submitted_at = self._submitted_at.pop(task.id, None)
+                    if submitted_at is not None:
+                        self._queue_wait_seconds.labels(task.agent_type or "").observe(
+                            dispatched_at - submitted_at)
+                    self._trace_dispatch(task, agent, dispatch_start_ns)
+
                     # Запускаем выполнение асинхронно
                     asyncio.create_task(self._execute_task_with_monitoring(task, agent))
 
                     # Удаляем агента из доступных для этого цикла
                     available_agents = [a for a in available_agents if a.id != agent.id]
+                    dispatched += 1
+                else:
+                    exhausted_types.add(task.agent_type)
 
             except Exception as e:
                 self.logger.error(f"Failed to process task {task.id}: {e}")
@@ -506,18 +688,34 @@ class AgentOrchestrator(IOrchestrator):
             task: Задача
             agent: Агент
         """
+        agent_type = task.agent_type or ""
+        self._running_tasks.inc()
+        execution_start = self.clock.monotonic()
+        error: Optional[str] = None
+
         try:
             # Обновляем статус агента
             agent.status = AgentStatus.BUSY
             agent.current_load += 1
 
-            # Выполняем задачу
-            result = await self.execution_engine.execute_task(task, agent)
+            # Выполняем задачу (вложенные спаны агента привязываются к спану выполнения)
+            with self.tracer.span("task.execution", task.id, {
+                "agent.id": agent.id, "task.retry_count": task.retry_count
+            }) as span:
+                result = await self.execution_engine.execute_task(task, agent)
+                if span is not None and result.status != TaskStatus.COMPLETED:
+                    span.error = result.error_message or result.status.value
 
             # Отмечаем задачу как завершенную
             success = result.status == TaskStatus.COMPLETED
             await self.scheduler.mark_task_completed(task.id, success)
 
+            self._execution_seconds.labels(agent_type).observe(self.clock.monotonic() - execution_start)
+            self._tasks_finished_total.labels(agent_type, result.status.value).inc()
+            self._task_retries.labels(agent_type).observe(task.retry_count)
+            if not success:
+                error = result.error_message or result.status.value
+
             # Обновляем метрики
             if success:
                 self._metrics["tasks_completed"] += 1
@@ -536,8 +734,13 @@ class AgentOrchestrator(IOrchestrator):
             self.logger.error(f"Error executing task {task.id}: {e}")
             await self.scheduler.mark_task_completed(task.id, False)
             self._metrics["tasks_failed"] += 1
+            self._tasks_finished_total.labels(agent_type, TaskStatus.FAILED.value).inc()
+            error = str(e)
 
         finally:
+            self._running_tasks.dec()
+            self.tracer.finish_task_trace(task.id, error=error)
+
             # Освобождаем агента
             agent.status = AgentStatus.IDLE
             agent.current_load = max(0, agent.current_load - 1)
@@ -546,10 +749,15 @@ class AgentOrchestrator(IOrchestrator):
         """Цикл автоматической эскалации приоритетов."""
         while not self._shutdown_event.is_set():
             try:
-                # Получаем все активные задачи
+                # Получаем все активные задачи (готовые задачи есть и среди
+                # запланированных, а выполняющиеся и завершенные не эскалируются)
                 scheduled_tasks = await self.scheduler.get_scheduled_tasks()
                 ready_tasks = await self.scheduler.get_ready_tasks()
-                all_tasks = scheduled_tasks + ready_tasks
+                active_tasks = {
+                    task.id: task for task in scheduled_tasks + ready_tasks
+                    if task.status in (TaskStatus.PENDING, TaskStatus.BLOCKED, TaskStatus.QUEUED)
+                }
+                all_tasks = list(active_tasks.values())
 
                 # Выполняем автоэскалацию
                 escalated = await self.priority_manager.auto_escalate_tasks(all_tasks)
@@ -566,16 +774,97 @@ class AgentOrchestrator(IOrchestrator):
                 await asyncio.sleep(60)
 
     async def _update_system_metrics(self):
-        """Обновить системные метрики."""
-        # Здесь можно добавить более сложную логику сбора метрик
-        pass
+        """
+        Обновить системные метрики.
+
+        Измерители состояния обновляются раз в цикл мониторинга, а не на
+        каждой операции, чтобы не нагружать горячий путь.
+        """
+        self._queue_depth.set(await self.task_queue.size())
+        self._ready_tasks.set(len(await self.scheduler.get_ready_tasks()))
+        self._registered_agents.set(len(self._agents))
+        self._refresh_average_metrics()
+
+    def _refresh_average_metrics(self):
+        """Пересчитать средние значения в self._metrics по гистограммам."""
+        for key, family in (("average_wait_time", self._queue_wait_seconds),
+                            ("average_execution_time", self._execution_seconds)):
+            children = family.children().values()
+            count = sum(child.count for child in children)
+            if count:
+                self._metrics[key] = sum(child.sum for child in children) / count
+
+    def export_metrics(self) -> str:
+        """
+        Экспортировать метрики в текстовом формате Prometheus.
+
+        Returns:
+            Текст экспозиции метрик
+        """
+        return self.metrics_registry.render_prometheus()
+
+    def _trace_submission(self, task: Task, enqueue_start: int, enqueue_end: int,
+                          batch_size: int = 1):
+        """
+        Открыть трейс задачи и записать спан подачи в очередь.
+
+        Args:
+            task: Задача
+            enqueue_start: Начало подачи (монотонные наносекунды)
+            enqueue_end: Конец подачи
+            batch_size: Размер пакета при пакетной подаче
+        """
+        if not self.tracer.enabled:
+            return
+
+        attributes = {
+            "task.agent_type": task.agent_type or "",
+            "task.priority": task.priority.name,
+            "task.retry_count": task.retry_count
+        }
+        if task.dependencies:
+            # Нужны для воспроизведения трейса в симуляторе
+            attributes["task.dependencies"] = ",".join(dep.task_id for dep in task.dependencies)
+        self.tracer.start_task_trace(task.id, enqueue_start, attributes)
+        self.tracer.record_span("task.enqueue", task.id, enqueue_start, enqueue_end,
+                                {"batch.size": batch_size})
+        self.tracer.mark(task.id, "enqueued", enqueue_end)
+
+    def _trace_dispatch(self, task: Task, agent: Agent, dispatch_start: int):
+        """
+        Записать спаны ожидания и назначения агента.
+
+        Интервал от подачи до готовности - ожидание зависимостей
+        (task.blocked), от готовности до начала диспетчеризации - ожидание
+        в очереди (task.queued), затем выбор агента (task.assignment).
+
+        Args:
+            task: Задача
+            agent: Назначенный агент
+            dispatch_start: Начало диспетчеризации (монотонные наносекунды)
+        """
+        if not self.tracer.enabled:
+            return
+
+        enqueued = self.tracer.get_mark(task.id, "enqueued")
+        ready = self.tracer.get_mark(task.id, "ready")
+
+        if enqueued is not None:
+            # Задача, готовая сразу при подаче, не ждет зависимостей
+            ready = max(ready or enqueued, enqueued)
+            if ready > enqueued:
+                self.tracer.record_span("task.blocked", task.id, enqueued, ready)
+            self.tracer.record_span("task.queued", task.id, ready, dispatch_start)
+
+        self.tracer.record_span("task.assignment", task.id, dispatch_start, self.tracer.now_ns(),
+                                {"agent.id": agent.id, "agent.type": agent.type})
 
     async def _check_agent_health(self):
         """Проверить здоровье агентов."""
         for agent in self._agents.values():
             # Простая проверка: если агент давно не активен, помечаем как недоступный
             if agent.last_activity:
-                inactive_time = datetime.now(timezone.utc) - agent.last_activity
+                inactive_time = self.clock.now() - agent.last_activity
                 if inactive_time > timedelta(minutes=10):
                     agent.status = AgentStatus.UNAVAILABLE
 
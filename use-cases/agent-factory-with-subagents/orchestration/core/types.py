@@ -7,7 +7,7 @@
 
 from enum import Enum
 from typing import Dict, List, Optional, Any, Callable, Union
-from datetime import datetime
+from datetime import datetime, timezone
 from dataclasses import dataclass, field
 from pydantic import BaseModel, Field
 
@@ -94,7 +94,7 @@ class Task(BaseModel):
     context: Dict[str, Any] = Field(default_factory=dict, description="Контекст выполнения")
 
     # Временные параметры
-    created_at: datetime = Field(default_factory=datetime.now, description="Время создания")
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), description="Время создания")
     scheduled_at: Optional[datetime] = Field(None, description="Время планируемого выполнения")
     started_at: Optional[datetime] = Field(None, description="Время начала выполнения")
     completed_at: Optional[datetime] = Field(None, description="Время завершения")
@@ -167,6 +167,11 @@ class OrchestrationConfig:
     enable_load_balancing: bool = True
     monitoring_interval: int = 30  # секунды
     cleanup_completed_tasks_after: int = 3600  # 1 час
+    metrics_host: str = "127.0.0.1"
+    metrics_port: Optional[int] = None  # None - endpoint метрик не запускается
+    enable_tracing: bool = False
+    trace_export_path: Optional[str] = None  # Файл OTLP/JSON, записывается при остановке
+    max_trace_spans: int = 100000
 
 
 class OrchestrationEvent(BaseModel):
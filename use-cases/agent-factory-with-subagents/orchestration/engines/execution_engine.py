@@ -7,13 +7,15 @@
 
 import asyncio
 from typing import List, Dict, Optional, Any, Callable, Set
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timedelta
 import logging
 from enum import Enum
 import json
 
-from ..core.interfaces import IExecutionEngine, IErrorHandler
+from ..core.clock import SystemClock
+from ..core.interfaces import IClock, IExecutionEngine, IErrorHandler
 from ..core.types import Task, Agent, TaskResult, ExecutionPlan, TaskStatus, ExecutionMode, OrchestrationEvent
+from ..monitoring.tracing import Tracer
 
 
 class ExecutionStatus(Enum):
@@ -40,16 +42,22 @@ class ParallelExecutionEngine(IExecutionEngine):
     """
 
     def __init__(self, max_concurrent_tasks: int = 10,
-                 error_handler: Optional[IErrorHandler] = None):
+                 error_handler: Optional[IErrorHandler] = None,
+                 tracer: Optional[Tracer] = None,
+                 clock: Optional[IClock] = None):
         """
         Инициализация движка выполнения.
 
         Args:
             max_concurrent_tasks: Максимальное количество одновременных задач
             error_handler: Обработчик ошибок
+            tracer: Трассировщик для спанов вызовов агентов
+            clock: Источник времени (по умолчанию - системные часы)
         """
+        self.clock = clock or SystemClock()
         self.max_concurrent_tasks = max_concurrent_tasks
         self.error_handler = error_handler
+        self.tracer = tracer or Tracer(enabled=False)
         self.logger = logging.getLogger(__name__)
 
         # Активные выполнения
@@ -333,7 +341,7 @@ class ParallelExecutionEngine(IExecutionEngine):
         Returns:
             Результат выполнения
         """
-        start_time = datetime.now(timezone.utc)
+        start_time = self.clock.now()
         task.status = TaskStatus.RUNNING
         task.started_at = start_time
 
@@ -346,7 +354,8 @@ class ParallelExecutionEngine(IExecutionEngine):
                     return self._create_result(task, TaskStatus.CANCELLED, "Execution stopped")
 
             # Симуляция выполнения задачи (в реальной системе здесь был бы вызов агента)
-            execution_time = await self._simulate_task_execution(task, agent, context)
+            with self.tracer.span("agent.call", task.id, {"agent.id": agent.id, "agent.type": agent.type}):
+                execution_time = await self._simulate_task_execution(task, agent, context)
 
             # Проверяем таймаут
             if task.timeout and execution_time > task.timeout:
@@ -355,7 +364,7 @@ class ParallelExecutionEngine(IExecutionEngine):
 
             # Создаем успешный результат
             task.status = TaskStatus.COMPLETED
-            end_time = datetime.now(timezone.utc)
+            end_time = self.clock.now()
             actual_duration = (end_time - start_time).total_seconds()
 
             result_data = {
@@ -468,10 +477,10 @@ class ParallelExecutionEngine(IExecutionEngine):
         return {
             "task_id": task.id,
             "agent_id": agent.id,
-            "started_at": datetime.now(timezone.utc),
+            "started_at": self.clock.now(),
             "input_data": task.input_data.copy(),
             "context": task.context.copy(),
-            "execution_id": f"{task.id}_{agent.id}_{int(datetime.now().timestamp())}"
+            "execution_id": f"{task.id}_{agent.id}_{int(self.clock.now().timestamp())}"
         }
 
     def _create_result(self, task: Task, status: TaskStatus, message: str,
@@ -497,7 +506,7 @@ class ParallelExecutionEngine(IExecutionEngine):
             error_message=message if status == TaskStatus.FAILED else None,
             execution_time=execution_time,
             started_at=task.started_at,
-            completed_at=datetime.now(timezone.utc)
+            completed_at=self.clock.now()
         )
 
     def _create_error_result(self, task: Task, error_message: str) -> TaskResult:
@@ -86,6 +86,106 @@ class TaskDependencyManager(IDependencyManager):
             self.logger.info(f"Added {dependency_type} dependency: {dependency_task_id} -> {task_id}")
             return True
 
+    async def add_dependencies_bulk(self, tasks: List[Task]) -> Dict[str, List[TaskDependency]]:
+        """
+        Добавить зависимости пакета задач за один проход.
+
+        Ребра берутся из Task.dependencies. Пакет проверяется целиком
+        (самозависимости, циклы с учетом уже существующего графа) до
+        изменения графа, поэтому при ошибке граф остается нетронутым.
+        Уже существующие ребра пропускаются.
+
+        Args:
+            tasks: Список задач с заполненными зависимостями
+
+        Returns:
+            Действительно добавленные зависимости: {task_id: [зависимости]}
+
+        Raises:
+            ValueError: Если пакет содержит самозависимость или цикл
+        """
+        async with self._lock:
+            new_edges: Dict[str, List[TaskDependency]] = defaultdict(list)
+
+            for task in tasks:
+                existing = {dep.task_id for dep in self._dependencies.get(task.id, [])}
+                for dependency in task.dependencies:
+                    if dependency.task_id == task.id:
+                        raise ValueError(f"Task {task.id} cannot depend on itself")
+                    if dependency.task_id in existing:
+                        continue
+                    existing.add(dependency.task_id)
+                    new_edges[task.id].append(dependency)
+
+            if not new_edges:
+                return {}
+
+            cycle = self._find_cycle_with_edges(new_edges)
+            if cycle:
+                raise ValueError(f"Circular dependency detected: {' -> '.join(cycle)}")
+
+            added = 0
+            for task_id, dependencies in new_edges.items():
+                self._dependencies[task_id].extend(dependencies)
+                for dependency in dependencies:
+                    self._dependents[dependency.task_id].add(task_id)
+                added += len(dependencies)
+
+            self.logger.info(f"Added {added} dependencies for {len(new_edges)} tasks in bulk")
+            return dict(new_edges)
+
+    async def remove_dependencies_bulk(self, edges: Dict[str, List[TaskDependency]]) -> int:
+        """
+        Удалить зависимости, добавленные add_dependencies_bulk.
+
+        Удаляются только переданные ребра, поэтому откат пакета не трогает
+        зависимости, зарегистрированные раньше.
+
+        Args:
+            edges: Результат add_dependencies_bulk: {task_id: [зависимости]}
+
+        Returns:
+            Количество удаленных зависимостей
+        """
+        async with self._lock:
+            removed = 0
+            for task_id, added in edges.items():
+                dependencies = self._dependencies.get(task_id)
+                if not dependencies:
+                    continue
+
+                added_ids = {id(dependency) for dependency in added}
+                kept = [dep for dep in dependencies if id(dep) not in added_ids]
+                removed += len(dependencies) - len(kept)
+                if kept:
+                    self._dependencies[task_id] = kept
+                else:
+                    del self._dependencies[task_id]
+
+                for dependency in added:
+                    dependents = self._dependents.get(dependency.task_id)
+                    if dependents is not None:
+                        dependents.discard(task_id)
+                        if not dependents:
+                            del self._dependents[dependency.task_id]
+
+            if removed:
+                self.logger.info(f"Removed {removed} dependencies for {len(edges)} tasks in bulk")
+            return removed
+
+    async def check_ready_batch(self, task_ids: List[str]) -> Dict[str, bool]:
+        """
+        Проверить готовность нескольких задач под одной блокировкой.
+
+        Args:
+            task_ids: Список ID задач
+
+        Returns:
+            Словарь {task_id: готова ли задача к выполнению}
+        """
+        async with self._lock:
+            return {task_id: await self._is_ready_unlocked(task_id) for task_id in task_ids}
+
     async def remove_dependency(self, task_id: str, dependency_task_id: str) -> bool:
         """
         Удалить зависимость между задачами.
@@ -153,33 +253,45 @@ class TaskDependencyManager(IDependencyManager):
             True если все зависимости выполнены
         """
         async with self._lock:
-            dependencies = self._dependencies.get(task_id, [])
+            return await self._is_ready_unlocked(task_id)
 
-            for dependency in dependencies:
-                dep_task_id = dependency.task_id
-                dep_type = dependency.dependency_type
-
-                # Проверяем статус зависимости
-                dep_status = self._task_statuses.get(dep_task_id)
-
-                if dep_type == "completion":
-                    if dep_status != TaskStatus.COMPLETED:
-                        return False
-                elif dep_type == "data":
-                    # Для зависимостей по данным проверяем, что задача завершена успешно
-                    if dep_status not in [TaskStatus.COMPLETED]:
-                        return False
-                elif dep_type == "resource":
-                    # Для ресурсных зависимостей проверяем, что ресурс не занят
-                    if dep_status == TaskStatus.RUNNING:
-                        return False
-
-                # Проверяем условие, если оно есть
-                if dependency.condition:
-                    if not await self._evaluate_condition(dependency.condition, dep_task_id):
-                        return False
+    async def _is_ready_unlocked(self, task_id: str) -> bool:
+        """
+        Проверить готовность задачи (вызывающий код должен держать блокировку).
 
-            return True
+        Args:
+            task_id: ID задачи
+
+        Returns:
+            True если все зависимости выполнены
+        """
+        dependencies = self._dependencies.get(task_id, [])
+
+        for dependency in dependencies:
+            dep_task_id = dependency.task_id
+            dep_type = dependency.dependency_type
+
+            # Проверяем статус зависимости
+            dep_status = self._task_statuses.get(dep_task_id)
+
+            if dep_type == "completion":
+                if dep_status != TaskStatus.COMPLETED:
+                    return False
+            elif dep_type == "data":
+                # Для зависимостей по данным проверяем, что задача завершена успешно
+                if dep_status not in [TaskStatus.COMPLETED]:
+                    return False
+            elif dep_type == "resource":
+                # Для ресурсных зависимостей проверяем, что ресурс не занят
+                if dep_status == TaskStatus.RUNNING:
+                    return False
+
+            # Проверяем условие, если оно есть
+            if dependency.condition:
+                if not await self._evaluate_condition(dependency.condition, dep_task_id):
+                    return False
+
+        return True
 
     async def resolve_execution_order(self, tasks: List[Task]) -> List[Task]:
         """
@@ -307,6 +419,58 @@ class TaskDependencyManager(IDependencyManager):
 
         return False
 
+    def _find_cycle_with_edges(self, new_edges: Dict[str, List[TaskDependency]]) -> List[str]:
+        """
+        Найти цикл в графе с учетом новых ребер одним итеративным DFS.
+
+        Существующий граф ацикличен, поэтому любой цикл проходит через новое
+        ребро: обход запускается только из задач, получающих зависимости.
+
+        Args:
+            new_edges: Новые зависимости {task_id: [TaskDependency]}
+
+        Returns:
+            Путь цикла (первый и последний элементы совпадают) или пустой список
+        """
+        WHITE, GRAY, BLACK = 0, 1, 2
+        colors: Dict[str, int] = {}
+
+        def neighbors(node: str) -> List[str]:
+            deps = [dep.task_id for dep in self._dependencies.get(node, [])]
+            deps.extend(dep.task_id for dep in new_edges.get(node, []))
+            return deps
+
+        # Задача без входящих ребер не может лежать на цикле - такие корни
+        # (типичный случай для новых задач) пропускаются без обхода графа
+        new_targets = {dep.task_id for deps in new_edges.values() for dep in deps}
+
+        for root in new_edges:
+            if colors.get(root, WHITE) != WHITE:
+                continue
+            if not self._dependents.get(root) and root not in new_targets:
+                continue
+
+            colors[root] = GRAY
+            path = [root]
+            stack = [iter(neighbors(root))]
+
+            while stack:
+                neighbor = next(stack[-1], None)
+                if neighbor is None:
+                    colors[path.pop()] = BLACK
+                    stack.pop()
+                    continue
+
+                color = colors.get(neighbor, WHITE)
+                if color == GRAY:
+                    return path[path.index(neighbor):] + [neighbor]
+                if color == WHITE:
+                    colors[neighbor] = GRAY
+                    path.append(neighbor)
+                    stack.append(iter(neighbors(neighbor)))
+
+        return []
+
     async def _topological_sort(self, task_ids: Set[str],
                               dependencies: Dict[str, List[TaskDependency]]) -> List[str]:
         """
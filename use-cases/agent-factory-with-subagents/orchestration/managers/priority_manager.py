@@ -7,12 +7,13 @@
 
 import asyncio
 from typing import List, Dict, Optional, Any, Callable
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timedelta
 from enum import Enum
 import logging
 import math
 
-from ..core.interfaces import IPriorityManager
+from ..core.clock import SystemClock
+from ..core.interfaces import IClock, IPriorityManager
 from ..core.types import Task, TaskPriority, TaskStatus
 
 
@@ -58,8 +59,14 @@ class SmartPriorityManager(IPriorityManager):
     - Адаптивное обучение приоритетов
     """
 
-    def __init__(self):
-        """Инициализация менеджера приоритетов."""
+    def __init__(self, clock: Optional[IClock] = None):
+        """
+        Инициализация менеджера приоритетов.
+
+        Args:
+            clock: Источник времени (по умолчанию - системные часы)
+        """
+        self.clock = clock or SystemClock()
         self.logger = logging.getLogger(__name__)
 
         # Правила для вычисления приоритета
@@ -147,6 +154,25 @@ class SmartPriorityManager(IPriorityManager):
 
             return task
 
+    async def assign_priorities(self, tasks: List[Task]) -> List[Task]:
+        """
+        Назначить приоритеты пакету задач под одной блокировкой.
+
+        Args:
+            tasks: Список задач
+
+        Returns:
+            Задачи с назначенными приоритетами
+        """
+        async with self._lock:
+            for task in tasks:
+                if task.priority == TaskPriority.NORMAL:
+                    dynamic_priority = await self.calculate_dynamic_priority(task)
+                    task.priority = self._convert_score_to_priority(dynamic_priority)
+
+            self.logger.debug(f"Assigned priorities to {len(tasks)} tasks")
+            return tasks
+
     async def update_priority(self, task_id: str, new_priority: str) -> bool:
         """
         Обновить приоритет задачи.
@@ -167,7 +193,7 @@ class SmartPriorityManager(IPriorityManager):
                     self._escalation_history[task_id] = []
 
                 self._escalation_history[task_id].append({
-                    "timestamp": datetime.now(timezone.utc),
+                    "timestamp": self.clock.now(),
                     "new_priority": priority_enum.name,
                     "reason": "manual_update"
                 })
@@ -221,7 +247,7 @@ class SmartPriorityManager(IPriorityManager):
                 self._escalation_history[task_id] = []
 
             escalation = {
-                "timestamp": datetime.now(timezone.utc),
+                "timestamp": self.clock.now(),
                 "reason": reason,
                 "escalation_type": "automatic"
             }
@@ -291,7 +317,7 @@ class SmartPriorityManager(IPriorityManager):
         if not task.created_at:
             return 0.0
 
-        age_hours = (datetime.now(timezone.utc) - task.created_at).total_seconds() / 3600
+        age_hours = (self.clock.now() - task.created_at).total_seconds() / 3600
 
         # Постепенное увеличение приоритета с возрастом
         if age_hours < 1:
@@ -322,7 +348,7 @@ class SmartPriorityManager(IPriorityManager):
 
         try:
             deadline = datetime.fromisoformat(deadline_str.replace('Z', '+00:00'))
-            time_to_deadline = (deadline - datetime.now(timezone.utc)).total_seconds() / 3600
+            time_to_deadline = (deadline - self.clock.now()).total_seconds() / 3600
 
             if time_to_deadline < 0:
                 return 5.0  # Просроченные задачи имеют максимальный приоритет
@@ -410,7 +436,7 @@ class SmartPriorityManager(IPriorityManager):
         # Бонус за недавние эскалации
         recent_escalations = [
             e for e in escalations
-            if (datetime.now(timezone.utc) - e["timestamp"]).total_seconds() < 3600
+            if (self.clock.now() - e["timestamp"]).total_seconds() < 3600
         ]
         recent_bonus = len(recent_escalations) * 0.25
 
@@ -462,6 +488,20 @@ class SmartPriorityManager(IPriorityManager):
             if len(self._priority_rules) < original_length:
                 self.logger.info(f"Removed priority rule: {factor.value}")
 
+    async def update_rule_weights(self, weights: Dict[PriorityFactor, float]):
+        """
+        Обновить веса существующих правил приоритета.
+
+        Args:
+            weights: Новые веса по факторам (отсутствующие факторы не меняются)
+        """
+        async with self._lock:
+            for rule in self._priority_rules:
+                if rule.factor in weights:
+                    rule.weight = weights[rule.factor]
+            self.logger.info(f"Updated priority rule weights: "
+                             f"{ {factor.value: weight for factor, weight in weights.items()} }")
+
     async def update_escalation_settings(self, settings: Dict[str, Any]):
         """
         Обновить настройки эскалации.
@@ -484,7 +524,7 @@ class SmartPriorityManager(IPriorityManager):
             Список ID эскалированных задач
         """
         escalated_tasks = []
-        current_time = datetime.now(timezone.utc)
+        current_time = self.clock.now()
 
         for task in tasks:
             should_escalate = False
@@ -563,7 +603,7 @@ class SmartPriorityManager(IPriorityManager):
             days: Количество дней для хранения данных
         """
         async with self._lock:
-            cutoff_time = datetime.now(timezone.utc) - timedelta(days=days)
+            cutoff_time = self.clock.now() - timedelta(days=days)
 
             # Очищаем старые эскалации
             for task_id in list(self._escalation_history.keys()):
@@ -0,0 +1,17 @@
+"""Мониторинг системы оркестрации: метрики, трассировка и экспорт."""
+
+from .metrics import (
+    Counter, Gauge, Histogram, MetricFamily, MetricsRegistry, MetricsServer
+)
+from .tracing import Span, Tracer
+
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "MetricFamily",
+    "MetricsRegistry",
+    "MetricsServer",
+    "Span",
+    "Tracer",
+]
@@ -0,0 +1,425 @@
+"""
+Реестр метрик оркестратора с экспортом в формате Prometheus.
+
+Этот модуль содержит счетчики, измерители и гистограммы с логарифмическими
+корзинами. Обновление любой метрики на горячем пути выполняется за O(1):
+без блокировок, без сканирования коллекций и без аллокаций на значение.
+Экспорт в текстовом формате Prometheus доступен через локальный HTTP endpoint.
+"""
+
+import asyncio
+import math
+from typing import Dict, List, Optional, Tuple, Iterable
+import logging
+
+
+LabelValues = Tuple[str, ...]
+
+
+class Counter:
+    """Монотонно возрастающий счетчик."""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        """
+        Увеличить счетчик.
+
+        Args:
+            amount: Неотрицательное приращение
+        """
+        if amount < 0:
+            raise ValueError("Counter can only increase")
+        self.value += amount
+
+
+class Gauge:
+    """Измеритель текущего значения (может расти и убывать)."""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        """Установить значение."""
+        self.value = float(value)
+
+    def inc(self, amount: float = 1.0):
+        """Увеличить значение."""
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        """Уменьшить значение."""
+        self.value -= amount
+
+
+class Histogram:
+    """
+    Гистограмма с логарифмическими корзинами.
+
+    Границы корзин растут в 2 раза: min_value, 2*min_value, 4*min_value, ...
+    Индекс корзины вычисляется через math.frexp за O(1), поэтому стоимость
+    observe не зависит ни от числа корзин, ни от числа наблюдений.
+    """
+
+    __slots__ = ("min_value", "bounds", "counts", "count", "sum")
+
+    def __init__(self, min_value: float = 1e-6, bucket_count: int = 36):
+        """
+        Инициализация гистограммы.
+
+        Args:
+            min_value: Верхняя граница первой корзины
+            bucket_count: Количество конечных корзин (плюс корзина +Inf)
+        """
+        self.min_value = min_value
+        self.bounds = [min_value * (2 ** i) for i in range(bucket_count)]
+        self.counts = [0] * (bucket_count + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        """
+        Зарегистрировать наблюдение.
+
+        Args:
+            value: Наблюдаемое значение (например, длительность в секундах)
+        """
+        self.count += 1
+        self.sum += value
+
+        scaled = value / self.min_value
+        if scaled <= 1.0:
+            index = 0
+        else:
+            mantissa, exponent = math.frexp(scaled)
+            index = exponent - 1 if mantissa == 0.5 else exponent
+
+        self.counts[min(index, len(self.bounds))] += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Оценить квантиль по корзинам.
+
+        Внутри корзины значение интерполируется геометрически, поэтому
+        относительная погрешность оценки не превышает ширины корзины.
+
+        Args:
+            q: Квантиль в диапазоне [0, 1]
+
+        Returns:
+            Оценка квантиля или None, если наблюдений нет
+        """
+        if self.count == 0:
+            return None
+
+        rank = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count == 0:
+                continue
+            if cumulative + bucket_count >= rank:
+                if index >= len(self.bounds):
+                    return self.bounds[-1]
+                upper = self.bounds[index]
+                lower = upper / 2 if index > 0 else 0.0
+                fraction = (rank - cumulative) / bucket_count
+                if lower == 0.0:
+                    return upper * fraction
+                return lower * (upper / lower) ** fraction
+            cumulative += bucket_count
+
+        return self.bounds[-1]
+
+    @property
+    def mean(self) -> Optional[float]:
+        """Среднее значение наблюдений."""
+        return self.sum / self.count if self.count else None
+
+
+class MetricFamily:
+    """
+    Семейство метрик одного имени с набором меток.
+
+    Дочерние метрики создаются при первом обращении к комбинации меток
+    и дальше извлекаются из словаря за O(1).
+    """
+
+    def __init__(self, name: str, documentation: str, metric_type: str,
+                 labelnames: Iterable[str] = (), **metric_kwargs):
+        """
+        Инициализация семейства.
+
+        Args:
+            name: Имя метрики
+            documentation: Описание метрики (HELP)
+            metric_type: Тип метрики: counter, gauge или histogram
+            labelnames: Имена меток
+            **metric_kwargs: Параметры конструктора дочерних метрик
+        """
+        self.name = name
+        self.documentation = documentation
+        self.metric_type = metric_type
+        self.labelnames: Tuple[str, ...] = tuple(labelnames)
+        self._metric_kwargs = metric_kwargs
+        self._children: Dict[LabelValues, object] = {}
+
+    def labels(self, *values: str, **kwargs: str):
+        """
+        Получить дочернюю метрику для значений меток.
+
+        Args:
+            *values: Значения меток по порядку
+            **kwargs: Значения меток по имени
+
+        Returns:
+            Counter, Gauge или Histogram
+        """
+        if kwargs:
+            values = tuple(str(kwargs[name]) for name in self.labelnames)
+        else:
+            values = tuple(str(value) for value in values)
+
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"Metric {self.name} expects labels {self.labelnames}")
+            child = self._create_child()
+            self._children[values] = child
+        return child
+
+    def _create_child(self):
+        """Создать дочернюю метрику нужного типа."""
+        if self.metric_type == "counter":
+            return Counter()
+        if self.metric_type == "gauge":
+            return Gauge()
+        return Histogram(**self._metric_kwargs)
+
+    def children(self) -> Dict[LabelValues, object]:
+        """Получить все дочерние метрики."""
+        return dict(self._children)
+
+    # Методы для семейств без меток
+    def inc(self, amount: float = 1.0):
+        """Увеличить метрику без меток."""
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        """Уменьшить метрику без меток."""
+        self.labels().dec(amount)
+
+    def set(self, value: float):
+        """Установить значение метрики без меток."""
+        self.labels().set(value)
+
+    def observe(self, value: float):
+        """Зарегистрировать наблюдение метрики без меток."""
+        self.labels().observe(value)
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик.
+
+    Повторная регистрация метрики с тем же именем и типом возвращает
+    существующее семейство, поэтому компоненты могут объявлять метрики
+    независимо друг от друга.
+    """
+
+    def __init__(self, namespace: str = "orchestrator"):
+        """
+        Инициализация реестра.
+
+        Args:
+            namespace: Префикс имен метрик
+        """
+        self.namespace = namespace
+        self._families: Dict[str, MetricFamily] = {}
+
+    def counter(self, name: str, documentation: str,
+                labelnames: Iterable[str] = ()) -> MetricFamily:
+        """Зарегистрировать счетчик."""
+        return self._register(name, documentation, "counter", labelnames)
+
+    def gauge(self, name: str, documentation: str,
+              labelnames: Iterable[str] = ()) -> MetricFamily:
+        """Зарегистрировать измеритель."""
+        return self._register(name, documentation, "gauge", labelnames)
+
+    def histogram(self, name: str, documentation: str,
+                  labelnames: Iterable[str] = (),
+                  min_value: float = 1e-6, bucket_count: int = 36) -> MetricFamily:
+        """Зарегистрировать гистограмму с логарифмическими корзинами."""
+        return self._register(name, documentation, "histogram", labelnames,
+                              min_value=min_value, bucket_count=bucket_count)
+
+    def get(self, name: str) -> Optional[MetricFamily]:
+        """
+        Получить семейство метрик по имени.
+
+        Args:
+            name: Имя метрики без префикса
+
+        Returns:
+            Семейство или None
+        """
+        return self._families.get(self._full_name(name))
+
+    def _full_name(self, name: str) -> str:
+        """Получить имя метрики с префиксом."""
+        return f"{self.namespace}_{name}" if self.namespace else name
+
+    def _register(self, name: str, documentation: str, metric_type: str,
+                  labelnames: Iterable[str], **metric_kwargs) -> MetricFamily:
+        """Зарегистрировать семейство или вернуть существующее."""
+        full_name = self._full_name(name)
+        family = self._families.get(full_name)
+
+        if family is not None:
+            if family.metric_type != metric_type:
+                raise ValueError(f"Metric {full_name} already registered as {family.metric_type}")
+            return family
+
+        family = MetricFamily(full_name, documentation, metric_type, labelnames, **metric_kwargs)
+        self._families[full_name] = family
+        return family
+
+    def render_prometheus(self) -> str:
+        """
+        Сформировать текстовый формат экспозиции Prometheus (версия 0.0.4).
+
+        Returns:
+            Текст со всеми метриками реестра
+        """
+        lines: List[str] = []
+
+        for family in self._families.values():
+            lines.append(f"# HELP {family.name} {_escape_help(family.documentation)}")
+            lines.append(f"# TYPE {family.name} {family.metric_type}")
+
+            for label_values, child in family.children().items():
+                labels = list(zip(family.labelnames, label_values))
+
+                if family.metric_type != "histogram":
+                    lines.append(f"{family.name}{_format_labels(labels)} {_format_value(child.value)}")
+                    continue
+
+                cumulative = 0
+                for bound, bucket_count in zip(child.bounds, child.counts):
+                    cumulative += bucket_count
+                    bucket_labels = labels + [("le", _format_value(bound))]
+                    lines.append(f"{family.name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+
+                bucket_labels = labels + [("le", "+Inf")]
+                lines.append(f"{family.name}_bucket{_format_labels(bucket_labels)} {child.count}")
+                lines.append(f"{family.name}_sum{_format_labels(labels)} {_format_value(child.sum)}")
+                lines.append(f"{family.name}_count{_format_labels(labels)} {child.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """
+    Локальный HTTP endpoint для сбора метрик Prometheus.
+
+    Отдает содержимое реестра по GET /metrics. Реализован на asyncio
+    без внешних зависимостей и работает в цикле событий оркестратора.
+    """
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9464):
+        """
+        Инициализация сервера.
+
+        Args:
+            registry: Реестр метрик
+            host: Адрес для прослушивания
+            port: Порт (0 - выбрать свободный)
+        """
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.logger = logging.getLogger(__name__)
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> int:
+        """
+        Запустить сервер.
+
+        Returns:
+            Фактический порт сервера
+        """
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.logger.info(f"Metrics endpoint listening on http://{self.host}:{self.port}/metrics")
+        return self.port
+
+    async def stop(self):
+        """Остановить сервер."""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Обработать HTTP запрос."""
+        try:
+            request_line = await reader.readline()
+            # Заголовки запроса не используются, но их нужно дочитать
+            while True:
+                line = await reader.readline()
+                if not line or line in (b"\r\n", b"\n"):
+                    break
+
+            parts = request_line.decode("latin-1").split()
+            path = parts[1].split("?")[0] if len(parts) >= 2 else ""
+
+            if len(parts) >= 2 and parts[0] == "GET" and path in ("/metrics", "/"):
+                status = "200 OK"
+                body = self.registry.render_prometheus().encode("utf-8")
+            else:
+                status = "404 Not Found"
+                body = b"Not Found\n"
+
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                f"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+        except Exception as e:
+            self.logger.error(f"Error serving metrics request: {e}")
+        finally:
+            writer.close()
+
+
+def _escape_help(text: str) -> str:
+    """Экранировать текст HELP."""
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_labels(labels: List[Tuple[str, str]]) -> str:
+    """Сформировать блок меток Prometheus."""
+    if not labels:
+        return ""
+    escaped = [f'{name}="{_escape_label_value(value)}"' for name, value in labels]
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape_label_value(value: str) -> str:
+    """Экранировать значение метки."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    """Отформатировать число для Prometheus."""
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
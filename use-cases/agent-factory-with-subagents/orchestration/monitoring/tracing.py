@@ -0,0 +1,373 @@
+"""
+Легковесная трассировка задач оркестратора.
+
+Каждая задача получает трейс с корневым спаном "task" и дочерними спанами
+этапов: подача в очередь, ожидание зависимостей, ожидание в очереди,
+назначение агента, выполнение и вложенные вызовы агента/инструментов.
+Время измеряется монотонными часами (perf_counter_ns) и переводится в
+unix-время только при экспорте в OpenTelemetry-совместимый JSON (OTLP/JSON).
+"""
+
+import contextvars
+import json
+import random
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import Any, Deque, Dict, List, Optional
+import logging
+
+
+# Текущий активный спан для автоматического построения вложенности
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "orchestration_current_span", default=None
+)
+
+
+class Span:
+    """Отрезок времени внутри трейса."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start_ns", "end_ns",
+                 "attributes", "events", "error")
+
+    def __init__(self, trace_id: int, span_id: int, parent_id: Optional[int], name: str,
+                 start_ns: int, attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = start_ns
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes or {}
+        self.events: Optional[List[tuple]] = None
+        self.error: Optional[str] = None
+
+    @property
+    def duration_ns(self) -> Optional[int]:
+        """Длительность спана в наносекундах."""
+        return self.end_ns - self.start_ns if self.end_ns is not None else None
+
+
+class Tracer:
+    """
+    Трассировщик задач.
+
+    Хранит открытые корневые спаны задач и ограниченный буфер завершенных
+    спанов. Если трассировка выключена, все методы возвращают управление
+    сразу, не создавая объектов.
+    """
+
+    def __init__(self, service_name: str = "agent-orchestrator", enabled: bool = True,
+                 max_spans: int = 100000):
+        """
+        Инициализация трассировщика.
+
+        Args:
+            service_name: Имя сервиса в экспортируемых данных
+            enabled: Включена ли трассировка
+            max_spans: Максимальное количество хранимых завершенных спанов
+        """
+        self.service_name = service_name
+        self.enabled = enabled
+        self.logger = logging.getLogger(__name__)
+
+        # Смещение монотонных часов относительно unix-времени (для экспорта)
+        self._epoch_offset_ns = time.time_ns() - time.perf_counter_ns()
+
+        self._finished: Deque[Span] = deque(maxlen=max_spans)
+        self._task_roots: Dict[str, Span] = {}
+        self._task_marks: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def now_ns() -> int:
+        """Текущее значение монотонных часов в наносекундах."""
+        return time.perf_counter_ns()
+
+    def start_span(self, name: str, task_id: Optional[str] = None,
+                   parent: Optional[Span] = None, start_ns: Optional[int] = None,
+                   attributes: Optional[Dict[str, Any]] = None) -> Optional[Span]:
+        """
+        Открыть спан.
+
+        Родитель выбирается так: явно переданный parent, затем активный спан
+        контекста, затем корневой спан задачи task_id. Без родителя
+        создается новый трейс.
+
+        Args:
+            name: Имя спана
+            task_id: ID задачи, к трейсу которой относится спан
+            parent: Родительский спан
+            start_ns: Время начала (по умолчанию - сейчас)
+            attributes: Атрибуты спана
+
+        Returns:
+            Открытый спан или None, если трассировка выключена
+        """
+        if not self.enabled:
+            return None
+
+        if parent is None:
+            parent = _current_span.get()
+            if parent is None and task_id is not None:
+                parent = self._task_roots.get(task_id)
+
+        if parent is not None:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        else:
+            trace_id, parent_id = random.getrandbits(128) or 1, None
+
+        return Span(trace_id, random.getrandbits(64) or 1, parent_id, name,
+                    start_ns if start_ns is not None else time.perf_counter_ns(), attributes)
+
+    def end_span(self, span: Optional[Span], end_ns: Optional[int] = None,
+                 error: Optional[str] = None):
+        """
+        Закрыть спан и поместить его в буфер завершенных.
+
+        Args:
+            span: Спан (None игнорируется)
+            end_ns: Время окончания (по умолчанию - сейчас)
+            error: Сообщение об ошибке, если этап завершился неудачно
+        """
+        if span is None:
+            return
+        span.end_ns = end_ns if end_ns is not None else time.perf_counter_ns()
+        if error is not None:
+            span.error = error
+        self._finished.append(span)
+
+    def record_span(self, name: str, task_id: str, start_ns: int, end_ns: int,
+                    attributes: Optional[Dict[str, Any]] = None) -> Optional[Span]:
+        """
+        Записать уже завершившийся этап задачи.
+
+        Args:
+            name: Имя спана
+            task_id: ID задачи
+            start_ns: Время начала
+            end_ns: Время окончания
+            attributes: Атрибуты спана
+
+        Returns:
+            Записанный спан или None
+        """
+        if not self.enabled:
+            return None
+        span = self.start_span(name, task_id, self._task_roots.get(task_id), start_ns, attributes)
+        self.end_span(span, end_ns)
+        return span
+
+    def span(self, name: str, task_id: Optional[str] = None,
+             attributes: Optional[Dict[str, Any]] = None):
+        """
+        Контекстный менеджер спана.
+
+        Внутри блока спан становится активным, поэтому вложенные вызовы
+        (агенты, инструменты) автоматически становятся его дочерними спанами.
+        Исключение внутри блока помечает спан как ошибочный.
+
+        Args:
+            name: Имя спана
+            task_id: ID задачи
+            attributes: Атрибуты спана
+
+        Returns:
+            Контекстный менеджер, возвращающий открытый спан или None
+        """
+        if not self.enabled:
+            return _NULL_SPAN_CONTEXT
+        return _SpanContext(self, self.start_span(name, task_id, attributes=attributes))
+
+    def add_event(self, span: Optional[Span], name: str,
+                  attributes: Optional[Dict[str, Any]] = None):
+        """
+        Добавить событие к спану.
+
+        Args:
+            span: Спан (None игнорируется)
+            name: Имя события
+            attributes: Атрибуты события
+        """
+        if span is None:
+            return
+        if span.events is None:
+            span.events = []
+        span.events.append((time.perf_counter_ns(), name, attributes or {}))
+
+    def start_task_trace(self, task_id: str, start_ns: Optional[int] = None,
+                         attributes: Optional[Dict[str, Any]] = None) -> Optional[Span]:
+        """
+        Открыть корневой спан задачи.
+
+        Повторная подача задачи с тем же ID (например, повторная попытка)
+        продолжает существующий трейс и добавляет к нему событие.
+
+        Args:
+            task_id: ID задачи
+            start_ns: Время начала
+            attributes: Атрибуты задачи
+
+        Returns:
+            Корневой спан задачи или None
+        """
+        if not self.enabled:
+            return None
+
+        root = self._task_roots.get(task_id)
+        if root is not None:
+            self.add_event(root, "task.resubmitted", attributes)
+            return root
+
+        # Корневой спан не наследует активный контекст: у задачи свой трейс
+        root = Span(random.getrandbits(128) or 1, random.getrandbits(64) or 1, None, "task",
+                    start_ns if start_ns is not None else time.perf_counter_ns(),
+                    {"task.id": task_id, **(attributes or {})})
+        self._task_roots[task_id] = root
+        return root
+
+    def finish_task_trace(self, task_id: str, error: Optional[str] = None):
+        """
+        Закрыть корневой спан задачи.
+
+        Args:
+            task_id: ID задачи
+            error: Сообщение об ошибке, если задача завершилась неудачно
+        """
+        if not self.enabled:
+            return
+        self._task_marks.pop(task_id, None)
+        self.end_span(self._task_roots.pop(task_id, None), error=error)
+
+    def task_root(self, task_id: str) -> Optional[Span]:
+        """Получить корневой спан задачи."""
+        return self._task_roots.get(task_id)
+
+    def mark(self, task_id: str, name: str, timestamp_ns: Optional[int] = None):
+        """
+        Запомнить момент перехода задачи между состояниями.
+
+        Компоненты без доступа к спанам (например, планировщик) отмечают
+        переходы, а оркестратор превращает интервалы между отметками в спаны.
+
+        Args:
+            task_id: ID задачи
+            name: Имя отметки
+            timestamp_ns: Время отметки (по умолчанию - сейчас)
+        """
+        if not self.enabled:
+            return
+        marks = self._task_marks.get(task_id)
+        if marks is None:
+            marks = self._task_marks[task_id] = {}
+        marks[name] = timestamp_ns if timestamp_ns is not None else time.perf_counter_ns()
+
+    def get_mark(self, task_id: str, name: str) -> Optional[int]:
+        """Получить отметку задачи."""
+        marks = self._task_marks.get(task_id)
+        return marks.get(name) if marks else None
+
+    def finished_spans(self) -> List[Span]:
+        """Получить завершенные спаны."""
+        return list(self._finished)
+
+    def clear(self):
+        """Очистить буфер завершенных спанов."""
+        self._finished.clear()
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """
+        Сформировать OTLP/JSON представление завершенных спанов.
+
+        Returns:
+            Словарь в формате ExportTraceServiceRequest
+        """
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": "orchestration"},
+                    "spans": [self._span_to_otlp(span) for span in self._finished]
+                }]
+            }]
+        }
+
+    def export_json(self, path: str) -> int:
+        """
+        Экспортировать завершенные спаны в файл OTLP/JSON.
+
+        Args:
+            path: Путь к файлу
+
+        Returns:
+            Количество экспортированных спанов
+        """
+        payload = self.to_otlp()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+
+        count = len(self._finished)
+        self.logger.info(f"Exported {count} spans to {path}")
+        return count
+
+    def _span_to_otlp(self, span: Span) -> Dict[str, Any]:
+        """Преобразовать спан в OTLP/JSON."""
+        data = {
+            "traceId": f"{span.trace_id:032x}",
+            "spanId": f"{span.span_id:016x}",
+            "name": span.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(span.start_ns + self._epoch_offset_ns),
+            "endTimeUnixNano": str(span.end_ns + self._epoch_offset_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in span.attributes.items()],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1}
+        }
+        if span.parent_id is not None:
+            data["parentSpanId"] = f"{span.parent_id:016x}"
+        if span.events:
+            data["events"] = [
+                {
+                    "timeUnixNano": str(timestamp + self._epoch_offset_ns),
+                    "name": name,
+                    "attributes": [_otlp_attribute(key, value) for key, value in attributes.items()]
+                }
+                for timestamp, name, attributes in span.events
+            ]
+        return data
+
+
+class _SpanContext:
+    """Контекстный менеджер активного спана."""
+
+    __slots__ = ("tracer", "span", "token")
+
+    def __init__(self, tracer: Tracer, span: Span):
+        self.tracer = tracer
+        self.span = span
+        self.token = None
+
+    def __enter__(self) -> Span:
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        _current_span.reset(self.token)
+        if exc_type is not None:
+            self.span.error = f"{exc_type.__name__}: {exc}"
+        self.tracer.end_span(self.span)
+        return False
+
+
+_NULL_SPAN_CONTEXT = nullcontext()
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    """Преобразовать атрибут в OTLP/JSON KeyValue."""
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
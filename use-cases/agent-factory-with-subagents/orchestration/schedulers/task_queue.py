@@ -8,10 +8,11 @@
 import asyncio
 import heapq
 from typing import List, Optional, Dict, Any, Set
-from datetime import datetime, timezone
+from datetime import datetime
 import logging
 
-from ..core.interfaces import ITaskQueue
+from ..core.clock import SystemClock
+from ..core.interfaces import IClock, ITaskQueue
 from ..core.types import Task, TaskPriority, TaskStatus
 
 
@@ -26,14 +27,16 @@ class PriorityTaskQueue(ITaskQueue):
     - Ограничение размера очереди
     """
 
-    def __init__(self, max_size: int = 1000):
+    def __init__(self, max_size: int = 1000, clock: Optional[IClock] = None):
         """
         Инициализация очереди.
 
         Args:
             max_size: Максимальный размер очереди
+            clock: Источник времени (по умолчанию - системные часы)
         """
         self.max_size = max_size
+        self.clock = clock or SystemClock()
         self.logger = logging.getLogger(__name__)
 
         # Основная очередь с приоритетами: [(priority_score, timestamp, task), ...]
@@ -73,7 +76,7 @@ class PriorityTaskQueue(ITaskQueue):
                 return False
 
             # Если задача запланирована на будущее
-            if task.scheduled_at and task.scheduled_at > datetime.now(timezone.utc):
+            if task.scheduled_at and task.scheduled_at > self.clock.now():
                 self._scheduled_tasks[task.id] = task
                 self.logger.info(f"Task {task.id} scheduled for {task.scheduled_at}")
                 return True
@@ -92,6 +95,62 @@ class PriorityTaskQueue(ITaskQueue):
             self.logger.info(f"Task {task.id} enqueued with priority score {priority_score}")
             return True
 
+    async def enqueue_many(self, tasks: List[Task]) -> bool:
+        """
+        Добавить пакет задач в очередь за одну операцию.
+
+        Вся пачка проверяется до изменения очереди: при переполнении или
+        дублировании ID не добавляется ни одна задача. Крупный пакет
+        встраивается в кучу одним вызовом heapify, мелкий - через heappush.
+
+        Args:
+            tasks: Задачи для добавления
+
+        Returns:
+            True если все задачи добавлены успешно
+        """
+        async with self._lock:
+            current_time = self.clock.now()
+            immediate = [task for task in tasks
+                         if not (task.scheduled_at and task.scheduled_at > current_time)]
+
+            if len(self._queue) + len(immediate) > self.max_size:
+                self.logger.warning(f"Queue cannot fit {len(immediate)} tasks "
+                                    f"(size: {len(self._queue)}/{self.max_size})")
+                return False
+
+            seen: Set[str] = set()
+            for task in tasks:
+                if task.id in self._task_index or task.id in self._scheduled_tasks or task.id in seen:
+                    self.logger.warning(f"Task {task.id} already in queue")
+                    return False
+                seen.add(task.id)
+
+            # Небольшой пакет в большую кучу дешевле вставить по одной задаче
+            # (k*log n), чем перестраивать всю кучу (n)
+            rebuild = len(immediate) * max(1, len(self._queue).bit_length()) > len(self._queue)
+
+            for task in tasks:
+                if task.scheduled_at and task.scheduled_at > current_time:
+                    self._scheduled_tasks[task.id] = task
+                    continue
+
+                self._counter += 1
+                entry = (self._calculate_priority_score(task, current_time), self._counter, task)
+                if rebuild:
+                    self._queue.append(entry)
+                else:
+                    heapq.heappush(self._queue, entry)
+                self._task_index[task.id] = task
+                task.status = TaskStatus.QUEUED
+
+            if rebuild:
+                heapq.heapify(self._queue)
+
+            self.logger.info(f"Enqueued {len(immediate)} tasks in bulk "
+                             f"({len(tasks) - len(immediate)} scheduled for later)")
+            return True
+
     async def dequeue(self, agent_capabilities: Optional[List[str]] = None) -> Optional[Task]:
         """
         Извлечь задачу из очереди для агента с указанными возможностями.
@@ -114,7 +173,7 @@ class PriorityTaskQueue(ITaskQueue):
                 _, _, task = heapq.heappop(self._queue)
                 del self._task_index[task.id]
                 task.status = TaskStatus.RUNNING
-                task.started_at = datetime.now(timezone.utc)
+                task.started_at = self.clock.now()
                 self.logger.info(f"Dequeued task {task.id} without capability filter")
                 return task
 
@@ -129,7 +188,7 @@ class PriorityTaskQueue(ITaskQueue):
                     result_task = task
                     del self._task_index[task.id]
                     task.status = TaskStatus.RUNNING
-                    task.started_at = datetime.now(timezone.utc)
+                    task.started_at = self.clock.now()
                     self.logger.info(f"Dequeued task {task.id} for capabilities {agent_capabilities}")
                 else:
                     temp_tasks.append((priority_score, counter, task))
@@ -232,7 +291,8 @@ class PriorityTaskQueue(ITaskQueue):
                 self.logger.warning(f"Invalid priority: {priority}")
                 return []
 
-    def _calculate_priority_score(self, task: Task) -> float:
+    def _calculate_priority_score(self, task: Task,
+                                  current_time: Optional[datetime] = None) -> float:
         """
         Вычислить приоритетный счет для задачи.
 
@@ -240,6 +300,7 @@ class PriorityTaskQueue(ITaskQueue):
 
         Args:
             task: Задача
+            current_time: Текущее время (для пакетной обработки вычисляется один раз)
 
         Returns:
             Приоритетный счет
@@ -250,7 +311,8 @@ class PriorityTaskQueue(ITaskQueue):
         # Фактор времени ожидания
         age_factor = 0
         if task.created_at:
-            age_hours = (datetime.now(timezone.utc) - task.created_at).total_seconds() / 3600
+            current_time = current_time or self.clock.now()
+            age_hours = (current_time - task.created_at).total_seconds() / 3600
             age_factor = min(age_hours * 0.1, 2.0)  # Максимум +2 к приоритету
 
         # Фактор повторных попыток
@@ -289,7 +351,7 @@ class PriorityTaskQueue(ITaskQueue):
 
     async def _move_ready_scheduled_tasks(self):
         """Переместить готовые запланированные задачи в основную очередь."""
-        current_time = datetime.now(timezone.utc)
+        current_time = self.clock.now()
         ready_tasks = []
 
         for task_id, task in list(self._scheduled_tasks.items()):
@@ -336,7 +398,7 @@ class PriorityTaskQueue(ITaskQueue):
         if not self._queue:
             return None
 
-        current_time = datetime.now(timezone.utc)
+        current_time = self.clock.now()
         oldest_time = min(task.created_at for _, _, task in self._queue if task.created_at)
 
         if oldest_time:
@@ -348,7 +410,7 @@ class PriorityTaskQueue(ITaskQueue):
         if not self._queue:
             return None
 
-        current_time = datetime.now(timezone.utc)
+        current_time = self.clock.now()
         wait_times = []
 
         for _, _, task in self._queue:
@@ -7,11 +7,13 @@
 
 import asyncio
 from typing import List, Optional, Dict, Any, Set
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timedelta
 import logging
 
-from ..core.interfaces import ITaskScheduler, IDependencyManager
+from ..core.clock import SystemClock
+from ..core.interfaces import IClock, ITaskScheduler, IDependencyManager
 from ..core.types import Task, TaskStatus, TaskPriority, ExecutionPlan
+from ..monitoring.tracing import Tracer
 
 
 class SmartTaskScheduler(ITaskScheduler):
@@ -25,14 +27,19 @@ class SmartTaskScheduler(ITaskScheduler):
     - Автоматическое перепланирование при сбоях
     """
 
-    def __init__(self, dependency_manager: Optional[IDependencyManager] = None):
+    def __init__(self, dependency_manager: Optional[IDependencyManager] = None,
+                 tracer: Optional[Tracer] = None, clock: Optional[IClock] = None):
         """
         Инициализация планировщика.
 
         Args:
             dependency_manager: Менеджер зависимостей
+            tracer: Трассировщик для отметки момента готовности задач
+            clock: Источник времени (по умолчанию - системные часы)
         """
         self.dependency_manager = dependency_manager
+        self.tracer = tracer
+        self.clock = clock or SystemClock()
         self.logger = logging.getLogger(__name__)
 
         # Запланированные задачи: {task_id: task}
@@ -41,6 +48,9 @@ class SmartTaskScheduler(ITaskScheduler):
         # Задачи, готовые к выполнению
         self._ready_tasks: Dict[str, Task] = {}
 
+        # Задачи, отложенные до наступления scheduled_at
+        self._deferred_tasks: Dict[str, Task] = {}
+
         # Задачи в процессе выполнения
         self._running_tasks: Dict[str, Task] = {}
 
@@ -105,6 +115,10 @@ class SmartTaskScheduler(ITaskScheduler):
         """
         Запланировать выполнение нескольких задач.
 
+        Пакет планируется под одной блокировкой: готовность всех задач
+        запрашивается у менеджера зависимостей одним вызовом. Если хотя бы
+        одна задача уже запланирована, пакет отклоняется целиком.
+
         Args:
             tasks: Список задач для планирования
 
@@ -112,27 +126,68 @@ class SmartTaskScheduler(ITaskScheduler):
             True если все задачи запланированы успешно
         """
         async with self._lock:
-            # Сортируем задачи с учетом зависимостей
-            if self.dependency_manager:
-                try:
-                    sorted_tasks = await self.dependency_manager.resolve_execution_order(tasks)
-                except Exception as e:
-                    self.logger.error(f"Failed to resolve task dependencies: {e}")
+            for task in tasks:
+                if task.id in self._scheduled_tasks:
+                    self.logger.warning(f"Task {task.id} already scheduled")
                     return False
+
+            # Проверяем зависимости всего пакета за один вызов
+            if self.dependency_manager:
+                readiness = await self.dependency_manager.check_ready_batch(
+                    [task.id for task in tasks]
+                )
             else:
-                sorted_tasks = sorted(tasks, key=lambda t: t.priority.value, reverse=True)
+                readiness = {}
+
+            blocked_count = 0
+            for task in tasks:
+                if readiness.get(task.id, True):
+                    await self._make_task_ready(task)
+                else:
+                    task.status = TaskStatus.BLOCKED
+                    blocked_count += 1
+                self._scheduled_tasks[task.id] = task
 
-            # Планируем задачи в порядке зависимостей
-            success_count = 0
-            for task in sorted_tasks:
-                if await self.schedule_task(task):
-                    success_count += 1
+            self.logger.info(f"Scheduled {len(tasks)} tasks ({blocked_count} blocked by dependencies)")
+            return True
 
-            success_rate = success_count / len(tasks) if tasks else 1.0
-            self.logger.info(f"Scheduled {success_count}/{len(tasks)} tasks "
-                           f"(success rate: {success_rate:.2%})")
+    async def find_scheduled(self, task_ids: List[str]) -> List[str]:
+        """
+        Найти среди ID уже запланированные задачи.
 
-            return success_count == len(tasks)
+        Args:
+            task_ids: Список ID задач
+
+        Returns:
+            ID задач, которые уже запланированы, в исходном порядке
+        """
+        async with self._lock:
+            return [task_id for task_id in task_ids if task_id in self._scheduled_tasks]
+
+    async def unschedule_tasks(self, task_ids: List[str]) -> int:
+        """
+        Снять задачи с планирования.
+
+        В отличие от cancel_task задачи не отменяются и зависимые задачи
+        не блокируются: планировщик возвращается в состояние до
+        schedule_tasks. Используется для отката отклоненного пакета.
+
+        Args:
+            task_ids: Список ID задач
+
+        Returns:
+            Количество снятых задач
+        """
+        async with self._lock:
+            removed = 0
+            for task_id in task_ids:
+                if self._scheduled_tasks.pop(task_id, None) is not None:
+                    removed += 1
+                self._ready_tasks.pop(task_id, None)
+                self._deferred_tasks.pop(task_id, None)
+
+            self.logger.info(f"Unscheduled {removed} tasks")
+            return removed
 
     async def cancel_task(self, task_id: str) -> bool:
         """
@@ -146,6 +201,7 @@ class SmartTaskScheduler(ITaskScheduler):
         """
         async with self._lock:
             task = None
+            self._deferred_tasks.pop(task_id, None)
 
             # Ищем задачу в различных состояниях
             if task_id in self._scheduled_tasks:
@@ -199,13 +255,16 @@ class SmartTaskScheduler(ITaskScheduler):
                 task.scheduled_at = None
 
             # Проверяем, готова ли задача к выполнению сейчас
-            if not new_time or task.scheduled_at <= datetime.now(timezone.utc):
+            if not new_time or task.scheduled_at <= self.clock.now():
                 if self.dependency_manager:
                     is_ready = await self.dependency_manager.is_ready_to_execute(task_id)
                     if is_ready:
                         await self._make_task_ready(task)
                 else:
                     await self._make_task_ready(task)
+            elif (task_id not in self._ready_tasks and task_id not in self._running_tasks
+                    and task_id not in self._completed_tasks):
+                self._deferred_tasks[task_id] = task
 
             self.logger.info(f"Task {task_id} rescheduled for {task.scheduled_at or 'immediate execution'}")
             return True
@@ -238,15 +297,20 @@ class SmartTaskScheduler(ITaskScheduler):
             task: Задача
         """
         # Проверяем время выполнения
-        current_time = datetime.now(timezone.utc)
+        current_time = self.clock.now()
         if task.scheduled_at and task.scheduled_at > current_time:
             task.status = TaskStatus.PENDING
+            self._deferred_tasks[task.id] = task
             return
 
         # Переводим в готовые
+        self._deferred_tasks.pop(task.id, None)
         task.status = TaskStatus.QUEUED
         self._ready_tasks[task.id] = task
 
+        if self.tracer:
+            self.tracer.mark(task.id, "ready")
+
         self.logger.debug(f"Task {task.id} is ready for execution")
 
     async def _monitor_scheduled_tasks(self):
@@ -264,12 +328,13 @@ class SmartTaskScheduler(ITaskScheduler):
     async def _check_ready_tasks(self):
         """Проверить и переместить готовые задачи."""
         async with self._lock:
-            current_time = datetime.now(timezone.utc)
+            current_time = self.clock.now()
             ready_task_ids = []
 
-            for task_id, task in self._scheduled_tasks.items():
+            # Проверяем только отложенные задачи, а не всю историю планирования
+            for task_id, task in self._deferred_tasks.items():
                 # Проверяем время выполнения
-                if task.scheduled_at and task.scheduled_at <= current_time:
+                if task.scheduled_at <= current_time:
                     if self.dependency_manager:
                         is_ready = await self.dependency_manager.is_ready_to_execute(task_id)
                         if is_ready:
@@ -279,8 +344,8 @@ class SmartTaskScheduler(ITaskScheduler):
 
             # Перемещаем готовые задачи
             for task_id in ready_task_ids:
-                task = self._scheduled_tasks.pop(task_id)
-                await self._make_task_ready(task)
+                self._scheduled_tasks.pop(task_id, None)
+                await self._make_task_ready(self._deferred_tasks[task_id])
 
             if ready_task_ids:
                 self.logger.info(f"Moved {len(ready_task_ids)} tasks to ready state")
@@ -288,7 +353,7 @@ class SmartTaskScheduler(ITaskScheduler):
     async def _cleanup_completed_tasks(self):
         """Очистка завершенных задач (старше 1 часа)."""
         async with self._lock:
-            current_time = datetime.now(timezone.utc)
+            current_time = self.clock.now()
             cleanup_threshold = current_time - timedelta(hours=1)
 
             completed_to_remove = []
@@ -343,7 +408,7 @@ class SmartTaskScheduler(ITaskScheduler):
                 return
 
             task.status = TaskStatus.COMPLETED if success else TaskStatus.FAILED
-            task.completed_at = datetime.now(timezone.utc)
+            task.completed_at = self.clock.now()
 
             # Вычисляем время выполнения
             if task.started_at:
@@ -352,9 +417,11 @@ class SmartTaskScheduler(ITaskScheduler):
 
             self._completed_tasks[task_id] = task
 
-            # Проверяем зависимые задачи
-            if success and self.dependency_manager:
-                await self._check_dependent_tasks(task_id)
+            # Сообщаем статус менеджеру зависимостей и проверяем зависимые задачи
+            if self.dependency_manager:
+                await self.dependency_manager.update_task_status(task_id, task.status)
+                if success:
+                    await self._check_dependent_tasks(task_id)
 
             self.logger.info(f"Task {task_id} marked as {'completed' if success else 'failed'}")
 
@@ -369,7 +436,7 @@ class SmartTaskScheduler(ITaskScheduler):
             task = self._ready_tasks.pop(task_id, None)
             if task:
                 task.status = TaskStatus.RUNNING
-                task.started_at = datetime.now(timezone.utc)
+                task.started_at = self.clock.now()
                 self._running_tasks[task_id] = task
                 self.logger.info(f"Task {task_id} started running")
 
@@ -387,7 +454,11 @@ class SmartTaskScheduler(ITaskScheduler):
 
         for dependent_id in dependent_tasks:
             dependent_task = self._scheduled_tasks.get(dependent_id)
-            if dependent_task and dependent_task.status == TaskStatus.BLOCKED:
+            # Статус задачи в очереди перезаписывается (QUEUED), поэтому
+            # заблокированность определяется по отсутствию в активных коллекциях
+            if (dependent_task and dependent_id not in self._ready_tasks
+                    and dependent_id not in self._running_tasks
+                    and dependent_id not in self._completed_tasks):
                 is_ready = await self.dependency_manager.is_ready_to_execute(dependent_id)
                 if is_ready:
                     await self._make_task_ready(dependent_task)
@@ -403,7 +474,7 @@ class SmartTaskScheduler(ITaskScheduler):
         Returns:
             План выполнения
         """
-        plan_id = f"plan_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        plan_id = f"plan_{self.clock.now().strftime('%Y%m%d_%H%M%S')}"
 
         if self.dependency_manager:
             # Определяем порядок выполнения с учетом зависимостей
@@ -0,0 +1,22 @@
+"""Дискретно-событийная симуляция оркестратора на виртуальном времени."""
+
+from .simulator import (
+    OrchestrationSimulator, SimulatedExecutionEngine, SimulatedTask, SimulationScenario,
+    compare_strategies, load_scenario, scenario_from_otlp, scenario_from_workload
+)
+from .virtual_time import SimulationDeadlockError, SimulationEventLoop, VirtualClock, run_simulation
+
+__all__ = [
+    "OrchestrationSimulator",
+    "SimulatedExecutionEngine",
+    "SimulatedTask",
+    "SimulationScenario",
+    "compare_strategies",
+    "load_scenario",
+    "scenario_from_otlp",
+    "scenario_from_workload",
+    "SimulationDeadlockError",
+    "SimulationEventLoop",
+    "VirtualClock",
+    "run_simulation",
+]
@@ -0,0 +1,5 @@
+"""Запуск симулятора: python -m orchestration.simulation."""
+
+from .simulator import main
+
+main()
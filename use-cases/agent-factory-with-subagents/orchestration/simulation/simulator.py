@@ -0,0 +1,588 @@
+"""
+Дискретно-событийная симуляция оркестратора.
+
+Оркестратор запускается целиком (очередь, планировщик, менеджер
+приоритетов, балансировщик, движок выполнения) на виртуальном времени.
+Выполнение задач заменяется ожиданием заданной длительности, поэтому
+сутки нагрузки проигрываются за секунды, а результат при одинаковом seed
+воспроизводится побитово. Сценарий задается вручную, строится из
+синтетической нагрузки бенчмарков или восстанавливается из трейса
+OTLP/JSON, записанного трассировщиком в продакшене.
+
+Запуск:
+    python -m orchestration.simulation --workload bursty --strategies round_robin least_loaded
+    python -m orchestration.simulation --scenario traces.json --weights '{"age": 0.5}'
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import time
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, List, Optional, Set
+
+from ..balancers.load_balancer import BalancingStrategy, SmartLoadBalancer
+from ..benchmarks.load_benchmark import percentile
+from ..benchmarks.workloads import WORKLOADS, Workload
+from ..core.orchestrator import AgentOrchestrator
+from ..core.types import Agent, OrchestrationConfig, Task, TaskDependency, TaskPriority
+from ..engines.execution_engine import ParallelExecutionEngine
+from ..managers.priority_manager import PriorityFactor
+from .virtual_time import DEFAULT_EPOCH, SimulationEventLoop, VirtualClock, run_simulation
+
+
+@dataclass
+class SimulatedTask:
+    """Задача сценария симуляции."""
+    id: str
+    arrival: float  # виртуальные секунды от начала симуляции
+    duration: float  # длительность выполнения в виртуальных секундах
+    agent_type: str
+    priority: TaskPriority = TaskPriority.NORMAL
+    dependencies: List[str] = field(default_factory=list)
+    fails: bool = False
+
+
+@dataclass
+class SimulationScenario:
+    """Сценарий симуляции: поток задач и пул агентов."""
+    name: str
+    tasks: List[SimulatedTask]
+    agents: List[Agent]
+
+    def expected_finished(self) -> int:
+        """
+        Количество задач, которые достигнут конечного состояния.
+
+        Задачи, зависящие (транзитивно) от упавших, остаются заблокированными.
+
+        Returns:
+            Ожидаемое число завершенных (успешно или с ошибкой) задач
+        """
+        failed = {task.id for task in self.tasks if task.fails}
+        blocked: Set[str] = set()
+        for task in sorted(self.tasks, key=lambda t: t.arrival):
+            if any(dep in failed or dep in blocked for dep in task.dependencies):
+                blocked.add(task.id)
+        return len(self.tasks) - len(blocked)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Сериализовать сценарий в JSON-совместимый словарь."""
+        return {
+            "name": self.name,
+            "agents": [
+                {"id": agent.id, "type": agent.type, "max_concurrent_tasks": agent.max_concurrent_tasks}
+                for agent in self.agents
+            ],
+            "tasks": [
+                {"id": task.id, "arrival": task.arrival, "duration": task.duration,
+                 "agent_type": task.agent_type, "priority": task.priority.name,
+                 "dependencies": task.dependencies, "fails": task.fails}
+                for task in self.tasks
+            ]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SimulationScenario":
+        """
+        Загрузить сценарий из словаря (формат to_dict).
+
+        Args:
+            data: Словарь сценария
+
+        Returns:
+            Сценарий
+        """
+        agents = [
+            _make_agent(item["id"], item["type"], item.get("max_concurrent_tasks", 1))
+            for item in data["agents"]
+        ]
+        tasks = [
+            SimulatedTask(
+                id=item["id"],
+                arrival=float(item.get("arrival", 0.0)),
+                duration=float(item["duration"]),
+                agent_type=item["agent_type"],
+                priority=TaskPriority[item.get("priority", "NORMAL")],
+                dependencies=list(item.get("dependencies", [])),
+                fails=bool(item.get("fails", False))
+            )
+            for item in data["tasks"]
+        ]
+        return cls(name=data.get("name", "scenario"), tasks=tasks, agents=agents)
+
+
+def _make_agent(agent_id: str, agent_type: str, max_concurrent_tasks: int = 1) -> Agent:
+    """Создать агента сценария."""
+    return Agent(id=agent_id, name=agent_id, type=agent_type, capabilities=[agent_type],
+                 max_concurrent_tasks=max_concurrent_tasks)
+
+
+def scenario_from_workload(workload: Workload, seed: int = 0) -> SimulationScenario:
+    """
+    Построить сценарий из синтетической нагрузки бенчмарков.
+
+    Пачки прибывают с интервалом burst_interval, длительности задач
+    распределены экспоненциально со средним task_duration.
+
+    Args:
+        workload: Нагрузка
+        seed: Seed генератора длительностей
+
+    Returns:
+        Сценарий
+    """
+    rng = random.Random(seed)
+    tasks = []
+    for index, burst in enumerate(workload.bursts):
+        for task in burst:
+            tasks.append(SimulatedTask(
+                id=task.id,
+                arrival=index * workload.burst_interval,
+                duration=rng.expovariate(1 / workload.task_duration) if workload.task_duration > 0 else 0.0,
+                agent_type=task.agent_type,
+                priority=task.priority,
+                dependencies=[dependency.task_id for dependency in task.dependencies],
+                fails=task.id in workload.failing_task_ids
+            ))
+    return SimulationScenario(name=workload.name, tasks=tasks,
+                              agents=[agent.model_copy() for agent in workload.agents])
+
+
+def scenario_from_otlp(payload: Dict[str, Any], name: str = "trace") -> SimulationScenario:
+    """
+    Восстановить сценарий из трейса OTLP/JSON, экспортированного Tracer.
+
+    Момент прибытия задачи - начало корневого спана "task", длительность -
+    спан "agent.call", отказ - ошибочный статус "task.execution". Агенты
+    восстанавливаются по атрибутам agent.id/agent.type. Задачам, которые
+    не успели выполниться, назначается средняя длительность по трейсу.
+
+    Args:
+        payload: Содержимое OTLP/JSON
+        name: Имя сценария
+
+    Returns:
+        Сценарий
+    """
+    roots: Dict[str, Dict[str, Any]] = {}
+    durations: Dict[str, float] = {}
+    failed_traces: Set[str] = set()
+    agents: Dict[str, str] = {}
+
+    for resource_spans in payload.get("resourceSpans", []):
+        for scope_spans in resource_spans.get("scopeSpans", []):
+            for span in scope_spans.get("spans", []):
+                trace_id = span["traceId"]
+                attributes = {item["key"]: _otlp_value(item["value"]) for item in span.get("attributes", [])}
+                start_ns = int(span["startTimeUnixNano"])
+                end_ns = int(span["endTimeUnixNano"])
+
+                if span["name"] == "task" and "parentSpanId" not in span:
+                    roots[trace_id] = {"start_ns": start_ns, "attributes": attributes}
+                elif span["name"] == "agent.call":
+                    durations[trace_id] = (end_ns - start_ns) / 1e9
+                    if "agent.id" in attributes:
+                        agents[str(attributes["agent.id"])] = str(attributes.get("agent.type", ""))
+                elif span["name"] == "task.execution" and span.get("status", {}).get("code") == 2:
+                    failed_traces.add(trace_id)
+
+    if not roots:
+        raise ValueError("Trace contains no task root spans")
+
+    origin = min(root["start_ns"] for root in roots.values())
+    default_duration = sum(durations.values()) / len(durations) if durations else 1.0
+
+    tasks = []
+    for trace_id, root in sorted(roots.items(), key=lambda item: (item[1]["start_ns"], item[0])):
+        attributes = root["attributes"]
+        dependencies = str(attributes.get("task.dependencies", ""))
+        tasks.append(SimulatedTask(
+            id=str(attributes["task.id"]),
+            arrival=(root["start_ns"] - origin) / 1e9,
+            duration=durations.get(trace_id, default_duration),
+            agent_type=str(attributes.get("task.agent_type", "")),
+            priority=TaskPriority[str(attributes.get("task.priority", "NORMAL"))],
+            dependencies=[dep for dep in dependencies.split(",") if dep],
+            fails=trace_id in failed_traces
+        ))
+
+    # Типы задач без записанного агента обслуживаются одним агентом
+    known_types = set(agents.values())
+    for task in tasks:
+        if task.agent_type not in known_types:
+            agents[f"{task.agent_type or 'default'}-replay-agent"] = task.agent_type
+            known_types.add(task.agent_type)
+
+    return SimulationScenario(
+        name=name,
+        tasks=tasks,
+        agents=[_make_agent(agent_id, agent_type) for agent_id, agent_type in sorted(agents.items())]
+    )
+
+
+def _otlp_value(value: Dict[str, Any]) -> Any:
+    """Преобразовать OTLP/JSON AnyValue в значение Python."""
+    if "intValue" in value:
+        return int(value["intValue"])
+    if "doubleValue" in value:
+        return float(value["doubleValue"])
+    if "boolValue" in value:
+        return bool(value["boolValue"])
+    return value.get("stringValue", "")
+
+
+def load_scenario(path: str) -> SimulationScenario:
+    """
+    Загрузить сценарий из файла: формат сценария или OTLP/JSON трейс.
+
+    Args:
+        path: Путь к JSON-файлу
+
+    Returns:
+        Сценарий
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if "resourceSpans" in data:
+        return scenario_from_otlp(data, name=path)
+    return SimulationScenario.from_dict(data)
+
+
+class SimulatedExecutionEngine(ParallelExecutionEngine):
+    """
+    Движок выполнения для симуляции.
+
+    Вместо вызова агента ждет длительность задачи из сценария (в
+    виртуальном времени) и фиксирует начало, окончание и агента каждой задачи.
+    """
+
+    def __init__(self, scenario: SimulationScenario, **kwargs):
+        """
+        Инициализация движка симуляции.
+
+        Args:
+            scenario: Сценарий с длительностями и отказами задач
+            **kwargs: Параметры ParallelExecutionEngine
+        """
+        super().__init__(**kwargs)
+        self._tasks = {task.id: task for task in scenario.tasks}
+
+        self.started_at: Dict[str, float] = {}
+        self.finished_at: Dict[str, float] = {}
+        self.assigned_agent: Dict[str, str] = {}
+        self.priorities: Dict[str, str] = {}
+        self.failed: Set[str] = set()
+        self.finished = asyncio.Event()
+        self.expected_finished = scenario.expected_finished()
+        if self.expected_finished == 0:
+            self.finished.set()
+
+    async def _simulate_task_execution(self, task: Task, agent: Agent, context: Dict[str, Any]) -> float:
+        """Выполнить задачу за ее длительность из сценария."""
+        simulated = self._tasks[task.id]
+        self.started_at[task.id] = self.clock.monotonic()
+        self.assigned_agent[task.id] = agent.id
+        self.priorities[task.id] = task.priority.name
+        try:
+            await asyncio.sleep(simulated.duration)
+            if simulated.fails:
+                self.failed.add(task.id)
+                raise RuntimeError(f"Simulated failure for task {task.id}")
+            return simulated.duration
+        finally:
+            self.finished_at[task.id] = self.clock.monotonic()
+            if len(self.finished_at) >= self.expected_finished:
+                self.finished.set()
+
+
+class OrchestrationSimulator:
+    """
+    Симулятор оркестратора.
+
+    Каждый прогон создает новый оркестратор на виртуальных часах с заданной
+    стратегией балансировки и весами правил приоритета, проигрывает
+    сценарий и возвращает отчет: время выполнения, ожидание по приоритетам,
+    загрузку агентов и дайджест расписания для проверки воспроизводимости.
+    """
+
+    def __init__(self, scenario: SimulationScenario,
+                 config: Optional[OrchestrationConfig] = None,
+                 balancing_strategy: BalancingStrategy = BalancingStrategy.ADAPTIVE,
+                 priority_weights: Optional[Dict[PriorityFactor, float]] = None,
+                 seed: int = 0, horizon: Optional[float] = None):
+        """
+        Инициализация симулятора.
+
+        Args:
+            scenario: Сценарий
+            config: Конфигурация оркестратора (по умолчанию - как в
+                продакшене; размер очереди расширяется до размера сценария)
+            balancing_strategy: Стратегия балансировки
+            priority_weights: Веса правил приоритета по факторам
+            seed: Seed для случайных решений компонентов
+            horizon: Предел виртуального времени в секундах (None - до
+                завершения всех задач)
+        """
+        self.scenario = scenario
+        self.config = replace(config) if config else OrchestrationConfig()
+        # Очередь должна вместить весь сценарий, иначе подача отклоняется
+        self.config.max_queue_size = max(self.config.max_queue_size, len(scenario.tasks) + 1)
+        self.balancing_strategy = balancing_strategy
+        self.priority_weights = priority_weights or {}
+        self.seed = seed
+        self.horizon = horizon
+        self.logger = logging.getLogger(__name__)
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Выполнить симуляцию.
+
+        Returns:
+            Отчет симуляции
+        """
+        wall_start = time.perf_counter()
+        engine, virtual_seconds, truncated = run_simulation(self._simulate, DEFAULT_EPOCH)
+        wall_seconds = time.perf_counter() - wall_start
+
+        report = self._build_report(engine, virtual_seconds, truncated)
+        report["wall_seconds"] = wall_seconds
+        report["speedup"] = virtual_seconds / wall_seconds if wall_seconds > 0 else None
+        return report
+
+    async def _simulate(self, loop: SimulationEventLoop, clock: VirtualClock):
+        """Проиграть сценарий на виртуальном времени."""
+        # Балансировщик использует модуль random: фиксируем его состояние
+        random.seed(self.seed)
+
+        orchestrator = AgentOrchestrator(self.config, clock=clock)
+        orchestrator.load_balancer = SmartLoadBalancer(self.balancing_strategy, clock=clock)
+        if self.priority_weights:
+            await orchestrator.priority_manager.update_rule_weights(self.priority_weights)
+
+        engine = SimulatedExecutionEngine(
+            self.scenario,
+            max_concurrent_tasks=self.config.max_concurrent_tasks,
+            tracer=orchestrator.tracer,
+            clock=clock
+        )
+        orchestrator.execution_engine = engine
+
+        for agent in self.scenario.agents:
+            await orchestrator.register_agent(agent.model_copy())
+        await orchestrator.start()
+
+        arrivals = asyncio.create_task(self._submit_arrivals(orchestrator, loop, clock))
+        truncated = False
+        try:
+            await asyncio.wait_for(engine.finished.wait(), self.horizon)
+        except asyncio.TimeoutError:
+            truncated = True
+        finally:
+            virtual_seconds = loop.time()
+            arrivals.cancel()
+            try:
+                await arrivals
+            except asyncio.CancelledError:
+                pass
+            await orchestrator.shutdown()
+
+        self.logger.info(f"Simulated {virtual_seconds:.0f}s of scenario {self.scenario.name}")
+        return engine, virtual_seconds, truncated
+
+    async def _submit_arrivals(self, orchestrator: AgentOrchestrator,
+                               loop: SimulationEventLoop, clock: VirtualClock):
+        """Подавать задачи в моменты их прибытия (одновременные - одним пакетом)."""
+        ordered = sorted(self.scenario.tasks, key=lambda t: t.arrival)
+        index = 0
+        while index < len(ordered):
+            arrival = ordered[index].arrival
+            group = []
+            while index < len(ordered) and ordered[index].arrival == arrival:
+                group.append(ordered[index])
+                index += 1
+
+            delay = arrival - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            created_at = clock.now()
+            await orchestrator.submit_tasks([
+                Task(
+                    id=simulated.id,
+                    name=simulated.id,
+                    agent_type=simulated.agent_type,
+                    priority=simulated.priority,
+                    dependencies=[TaskDependency(task_id=dep) for dep in simulated.dependencies],
+                    estimated_duration=max(1, round(simulated.duration)),
+                    created_at=created_at
+                )
+                for simulated in group
+            ])
+
+    def _build_report(self, engine: SimulatedExecutionEngine, virtual_seconds: float,
+                      truncated: bool) -> Dict[str, Any]:
+        """Сформировать отчет по результатам прогона."""
+        arrivals = {task.id: task.arrival for task in self.scenario.tasks}
+        finished = engine.finished_at
+
+        waits: Dict[str, List[float]] = {}
+        all_waits = []
+        turnaround = []
+        for task_id, started in engine.started_at.items():
+            wait = started - arrivals[task_id]
+            all_waits.append(wait)
+            waits.setdefault(engine.priorities[task_id], []).append(wait)
+            if task_id in finished:
+                turnaround.append(finished[task_id] - arrivals[task_id])
+
+        busy: Dict[str, float] = {agent.id: 0.0 for agent in self.scenario.agents}
+        for task_id, started in engine.started_at.items():
+            agent_id = engine.assigned_agent[task_id]
+            busy[agent_id] = busy.get(agent_id, 0.0) + finished.get(task_id, virtual_seconds) - started
+
+        makespan = max(finished.values(), default=0.0)
+        utilization = {
+            agent_id: (seconds / makespan if makespan > 0 else 0.0)
+            for agent_id, seconds in busy.items()
+        }
+
+        # Дайджест расписания: одинаковый seed и сценарий дают одинаковое значение
+        schedule = sorted(
+            (task_id, engine.assigned_agent[task_id], round(started, 6),
+             round(finished.get(task_id, -1.0), 6))
+            for task_id, started in engine.started_at.items()
+        )
+        digest = hashlib.sha256(json.dumps(schedule).encode("utf-8")).hexdigest()
+
+        return {
+            "scenario": self.scenario.name,
+            "seed": self.seed,
+            "balancing_strategy": self.balancing_strategy.value,
+            "priority_weights": {factor.value: weight for factor, weight in self.priority_weights.items()},
+            "tasks": len(self.scenario.tasks),
+            "finished": len(finished),
+            "failed": len(engine.failed),
+            "unfinished": len(self.scenario.tasks) - len(finished),
+            "truncated": truncated,
+            "virtual_seconds": virtual_seconds,
+            "makespan_seconds": makespan,
+            "throughput_per_second": len(finished) / makespan if makespan > 0 else None,
+            "wait_seconds": {
+                "all": _summary(all_waits),
+                "by_priority": {priority: _summary(values) for priority, values in sorted(waits.items())}
+            },
+            "turnaround_seconds": _summary(turnaround),
+            "agent_utilization": utilization,
+            "mean_utilization": sum(utilization.values()) / len(utilization) if utilization else 0.0,
+            "digest": digest
+        }
+
+
+def _summary(values: List[float]) -> Dict[str, Optional[float]]:
+    """Свести выборку к count/mean/p50/p95/p99."""
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else None,
+        "p50": percentile(values, 0.50),
+        "p95": percentile(values, 0.95),
+        "p99": percentile(values, 0.99),
+    }
+
+
+def compare_strategies(scenario: SimulationScenario, strategies: List[BalancingStrategy],
+                       priority_weights: Optional[Dict[PriorityFactor, float]] = None,
+                       seed: int = 0, horizon: Optional[float] = None,
+                       config: Optional[OrchestrationConfig] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Проиграть сценарий с каждой стратегией балансировки.
+
+    Args:
+        scenario: Сценарий
+        strategies: Стратегии для сравнения
+        priority_weights: Веса правил приоритета
+        seed: Seed симуляции
+        horizon: Предел виртуального времени
+        config: Конфигурация оркестратора
+
+    Returns:
+        Отчеты по имени стратегии
+    """
+    return {
+        strategy.value: OrchestrationSimulator(
+            scenario, config, strategy, priority_weights, seed, horizon
+        ).run()
+        for strategy in strategies
+    }
+
+
+def _parse_weights(raw: Optional[str]) -> Dict[PriorityFactor, float]:
+    """Разобрать веса правил приоритета из JSON вида {"age": 0.5}."""
+    if not raw:
+        return {}
+    return {PriorityFactor(name): float(weight) for name, weight in json.loads(raw).items()}
+
+
+def main(argv: Optional[List[str]] = None):
+    """Точка входа командной строки."""
+    parser = argparse.ArgumentParser(description="Deterministic orchestrator simulation")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--workload", choices=sorted(WORKLOADS), default="bursty",
+                        help="Synthetic workload to simulate")
+    source.add_argument("--scenario", help="Scenario JSON or OTLP/JSON trace exported by Tracer")
+    parser.add_argument("--task-duration", type=float, default=30.0,
+                        help="Mean task duration in virtual seconds for synthetic workloads")
+    parser.add_argument("--burst-interval", type=float, default=60.0,
+                        help="Virtual seconds between bursts for synthetic workloads")
+    parser.add_argument("--strategies", nargs="+", default=[BalancingStrategy.ADAPTIVE.value],
+                        choices=[strategy.value for strategy in BalancingStrategy])
+    parser.add_argument("--weights", help='Priority rule weights as JSON, e.g. {"age": 0.5}')
+    parser.add_argument("--monitoring-interval", type=int, default=OrchestrationConfig.monitoring_interval,
+                        help="Dispatch loop interval in virtual seconds")
+    parser.add_argument("--max-concurrent-tasks", type=int,
+                        default=OrchestrationConfig.max_concurrent_tasks)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--horizon", type=float, default=None,
+                        help="Stop after this many virtual seconds")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.ERROR)
+
+    if args.scenario:
+        scenario = load_scenario(args.scenario)
+    else:
+        workload = WORKLOADS[args.workload](seed=args.seed)
+        workload.task_duration = args.task_duration
+        workload.burst_interval = args.burst_interval
+        scenario = scenario_from_workload(workload, seed=args.seed)
+
+    config = OrchestrationConfig(monitoring_interval=args.monitoring_interval,
+                                 max_concurrent_tasks=args.max_concurrent_tasks)
+    results = compare_strategies(
+        scenario,
+        [BalancingStrategy(name) for name in args.strategies],
+        _parse_weights(args.weights),
+        seed=args.seed,
+        horizon=args.horizon,
+        config=config
+    )
+
+    for name, report in results.items():
+        wait = report["wait_seconds"]["all"]
+        print(f"{name:>22}: {report['finished']}/{report['tasks']} tasks, "
+              f"makespan {report['makespan_seconds']:.0f}s, "
+              f"wait p50 {wait['p50'] or 0:.1f}s p95 {wait['p95'] or 0:.1f}s, "
+              f"utilization {report['mean_utilization']:.0%}, "
+              f"{report['speedup'] or 0:.0f}x real time, digest {report['digest'][:12]}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
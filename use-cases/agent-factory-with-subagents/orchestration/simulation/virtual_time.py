@@ -0,0 +1,123 @@
+"""
+Виртуальное время для дискретно-событийной симуляции.
+
+SimulationEventLoop - обычный asyncio-цикл, у которого time() возвращает
+виртуальное время. Когда готовых к запуску колбэков нет, селектор не ждет
+реального ввода-вывода, а сразу переводит виртуальные часы к ближайшему
+таймеру. Поэтому asyncio.sleep, wait_for и таймауты оркестратора работают
+без изменений, а сутки нагрузки проигрываются за секунды реального времени.
+"""
+
+import asyncio
+import selectors
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Optional
+
+from ..core.interfaces import IClock
+
+
+# Начало виртуального времени по умолчанию (фиксировано для воспроизводимости)
+DEFAULT_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+class SimulationDeadlockError(RuntimeError):
+    """В симуляции не осталось ни таймеров, ни готовых колбэков."""
+
+
+class _VirtualTimeSelector(selectors.DefaultSelector):
+    """Селектор, который вместо ожидания продвигает виртуальное время."""
+
+    def __init__(self):
+        super().__init__()
+        self.advance: Optional[Callable[[float], None]] = None
+
+    def select(self, timeout: Optional[float] = None):
+        # Реальный ввод-вывод (self-pipe цикла) опрашивается без ожидания
+        events = super().select(0)
+        if events or timeout == 0:
+            return events
+
+        if timeout is None:
+            raise SimulationDeadlockError(
+                "Simulation has no pending timers or callbacks: awaited coroutine can never finish"
+            )
+
+        self.advance(timeout)
+        return events
+
+
+class SimulationEventLoop(asyncio.SelectorEventLoop):
+    """
+    Событийный цикл на виртуальном времени.
+
+    Виртуальное время начинается с нуля и меняется только тогда, когда
+    цикл простаивает, поэтому порядок событий полностью определяется
+    программой и не зависит от нагрузки машины.
+    """
+
+    def __init__(self):
+        self._virtual_time = 0.0
+        selector = _VirtualTimeSelector()
+        selector.advance = self._advance
+        super().__init__(selector)
+
+    def time(self) -> float:
+        """Текущее виртуальное время в секундах."""
+        return self._virtual_time
+
+    def _advance(self, seconds: float):
+        """Продвинуть виртуальное время."""
+        if seconds > 0:
+            self._virtual_time += seconds
+
+
+class VirtualClock(IClock):
+    """Часы компонентов оркестратора, привязанные к виртуальному времени цикла."""
+
+    def __init__(self, loop: SimulationEventLoop, epoch: datetime = DEFAULT_EPOCH):
+        """
+        Инициализация виртуальных часов.
+
+        Args:
+            loop: Цикл симуляции
+            epoch: Календарное время, соответствующее нулю виртуального времени
+        """
+        self.loop = loop
+        self.epoch = epoch
+
+    def now(self) -> datetime:
+        """Текущее виртуальное время (UTC)."""
+        return self.epoch + timedelta(seconds=self.loop.time())
+
+    def monotonic(self) -> float:
+        """Виртуальное монотонное время в секундах."""
+        return self.loop.time()
+
+
+def run_simulation(main: Callable[[SimulationEventLoop, VirtualClock], Awaitable[Any]],
+                   epoch: datetime = DEFAULT_EPOCH) -> Any:
+    """
+    Выполнить корутину на виртуальном времени.
+
+    Args:
+        main: Фабрика корутины, получающая цикл и виртуальные часы
+        epoch: Календарное время начала симуляции
+
+    Returns:
+        Результат корутины
+    """
+    loop = SimulationEventLoop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(main(loop, VirtualClock(loop, epoch)))
+    finally:
+        try:
+            pending = asyncio.all_tasks(loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
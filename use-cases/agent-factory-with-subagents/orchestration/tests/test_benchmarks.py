@@ -0,0 +1,44 @@
+"""
+Дымовые тесты нагрузочного бенчмарка оркестратора.
+"""
+
+import pytest
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from orchestration.benchmarks.load_benchmark import run_workload, percentile
+from orchestration.benchmarks.workloads import deep_dag_workload, failure_workload
+
+
+class TestLoadBenchmark:
+    """Тесты нагрузочного бенчмарка."""
+
+    async def test_deep_dag_completes(self):
+        """Зависимые задачи разблокируются по мере завершения предков."""
+        workload = deep_dag_workload(chains=3, depth=4, agents_per_type=1, agent_types=2)
+
+        result = await run_workload(workload, monitoring_interval=0.001, timeout=10)
+
+        assert not result["timed_out"]
+        assert result["finished"] == result["tasks"] == 12
+        assert result["dispatch_latency_seconds"]["p50"] is not None
+
+    async def test_failures_block_descendants(self):
+        """Потомки упавших задач остаются заблокированными."""
+        workload = failure_workload(tasks=60, failure_rate=0.2, agents_per_type=2, seed=3)
+        expected = workload.expected_finished()
+        assert workload.failing_task_ids and expected < 60
+
+        result = await run_workload(workload, monitoring_interval=0.001, timeout=10)
+
+        assert not result["timed_out"]
+        assert result["finished"] == expected
+
+    def test_percentile(self):
+        """Перцентиль методом ближайшего ранга."""
+        values = list(range(1, 101))
+        assert percentile(values, 0.5) == 50
+        assert percentile(values, 0.99) == 99
+        assert percentile([], 0.5) is None
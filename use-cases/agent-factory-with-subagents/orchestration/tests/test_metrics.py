@@ -0,0 +1,97 @@
+"""
+Тесты для реестра метрик и экспорта в формате Prometheus.
+"""
+
+import asyncio
+import pytest
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from orchestration.core.orchestrator import AgentOrchestrator
+from orchestration.core.types import Task, OrchestrationConfig
+from orchestration.monitoring.metrics import Histogram, MetricsRegistry
+
+
+class TestHistogram:
+    """Тесты для логарифмической гистограммы."""
+
+    def test_bucket_boundaries(self):
+        """Значение попадает в наименьшую корзину с границей >= значения."""
+        histogram = Histogram(min_value=1.0, bucket_count=4)  # 1, 2, 4, 8, +Inf
+
+        for value in (0.5, 1.0, 1.5, 2.0, 3.0, 8.0, 100.0):
+            histogram.observe(value)
+
+        assert histogram.counts == [2, 2, 1, 1, 1]
+        assert histogram.count == 7
+        assert histogram.sum == pytest.approx(116.0)
+
+    def test_quantile_estimate(self):
+        """Оценка квантиля укладывается в границы корзины."""
+        histogram = Histogram(min_value=1e-3)
+        for i in range(1, 1001):
+            histogram.observe(i / 1000)
+
+        p50 = histogram.quantile(0.5)
+        p99 = histogram.quantile(0.99)
+
+        assert 0.25 <= p50 <= 1.0
+        assert 0.5 <= p99 <= 1.024
+        assert Histogram().quantile(0.5) is None
+
+
+class TestMetricsRegistry:
+    """Тесты для реестра метрик."""
+
+    def test_prometheus_text_format(self):
+        """Тест формата экспозиции Prometheus."""
+        registry = MetricsRegistry(namespace="test")
+        registry.counter("events_total", "Events", ["kind"]).labels(kind="a").inc(3)
+        registry.gauge("depth", "Depth").set(5)
+        registry.histogram("latency_seconds", "Latency", min_value=1.0, bucket_count=2).observe(1.5)
+
+        text = registry.render_prometheus()
+
+        assert "# TYPE test_events_total counter" in text
+        assert 'test_events_total{kind="a"} 3' in text
+        assert "test_depth 5" in text
+        assert 'test_latency_seconds_bucket{le="1"} 0' in text
+        assert 'test_latency_seconds_bucket{le="2"} 1' in text
+        assert 'test_latency_seconds_bucket{le="+Inf"} 1' in text
+        assert "test_latency_seconds_count 1" in text
+
+    def test_reregistration_returns_same_family(self):
+        """Повторная регистрация возвращает то же семейство."""
+        registry = MetricsRegistry()
+        first = registry.counter("requests_total", "Requests")
+        second = registry.counter("requests_total", "Requests")
+        assert first is second
+
+        with pytest.raises(ValueError):
+            registry.gauge("requests_total", "Requests")
+
+
+class TestOrchestratorMetrics:
+    """Тесты метрик оркестратора."""
+
+    async def test_metrics_endpoint(self):
+        """Endpoint отдает метрики поданных задач."""
+        orchestrator = AgentOrchestrator(OrchestrationConfig(metrics_port=0))
+        await orchestrator.start()
+
+        try:
+            await orchestrator.submit_task(Task(id="metrics-task", name="Task", agent_type="coder"))
+
+            port = orchestrator._metrics_server.port
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+            await writer.drain()
+            response = (await reader.read()).decode("utf-8")
+            writer.close()
+
+            assert response.startswith("HTTP/1.1 200 OK")
+            assert 'orchestrator_tasks_submitted_total{agent_type="coder"} 1' in response
+        finally:
+            await orchestrator.shutdown()
@@ -13,12 +13,12 @@ from typing import List, Dict, Any
 # Импортируем компоненты для тестирования
 import sys
 import os
-sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from core.orchestrator import AgentOrchestrator
-from core.types import (
+from orchestration.core.orchestrator import AgentOrchestrator
+from orchestration.core.types import (
     Task, Agent, TaskPriority, TaskStatus, AgentStatus,
-    OrchestrationConfig
+    OrchestrationConfig, TaskDependency
 )
 
 
@@ -139,6 +139,116 @@ class TestAgentOrchestrator:
             status = await orchestrator.get_task_status(task_id)
             assert status is not None
 
+    async def test_bulk_submission_with_dependencies(self, orchestrator):
+        """Тест пакетной отправки задач с зависимостями внутри пакета."""
+        tasks = [
+            Task(id="bulk-0", name="Root", agent_type="test-agent"),
+            Task(id="bulk-1", name="Child", agent_type="test-agent",
+                 dependencies=[TaskDependency(task_id="bulk-0")]),
+            Task(id="bulk-2", name="Grandchild", agent_type="test-agent",
+                 dependencies=[TaskDependency(task_id="bulk-1")])
+        ]
+
+        task_ids = await orchestrator.submit_tasks(tasks)
+        assert task_ids == ["bulk-0", "bulk-1", "bulk-2"]
+
+        dependency_manager = orchestrator.dependency_manager
+        assert await dependency_manager.get_dependencies("bulk-2") == ["bulk-1"]
+        assert await dependency_manager.is_ready_to_execute("bulk-0")
+        assert not await dependency_manager.is_ready_to_execute("bulk-1")
+
+        status = await orchestrator.get_system_status()
+        assert status["metrics"]["tasks_submitted"] == 3
+
+    async def test_bulk_submission_rejects_cycle(self, orchestrator):
+        """Тест отклонения пакета с циклической зависимостью."""
+        tasks = [
+            Task(id="cycle-a", name="A", agent_type="test-agent",
+                 dependencies=[TaskDependency(task_id="cycle-b")]),
+            Task(id="cycle-b", name="B", agent_type="test-agent",
+                 dependencies=[TaskDependency(task_id="cycle-a")])
+        ]
+
+        with pytest.raises(ValueError):
+            await orchestrator.submit_tasks(tasks)
+
+        # Пакет отклонен целиком - состояние не изменилось
+        assert await orchestrator.task_queue.size() == 0
+        assert await orchestrator.dependency_manager.get_dependencies("cycle-a") == []
+
+    async def test_bulk_submission_rejects_duplicates(self, orchestrator):
+        """Тест отклонения пакета с дублирующимися ID."""
+        tasks = [
+            Task(id="dup", name="First", agent_type="test-agent"),
+            Task(id="dup", name="Second", agent_type="test-agent")
+        ]
+
+        with pytest.raises(ValueError):
+            await orchestrator.submit_tasks(tasks)
+
+        assert await orchestrator.task_queue.size() == 0
+
+    async def test_bulk_submission_rejects_submitted_task(self, orchestrator):
+        """Тест отклонения пакета с уже поданной задачей."""
+        await orchestrator.submit_task(Task(id="first", name="First", agent_type="test-agent"))
+        tasks = [
+            Task(id="second", name="Second", agent_type="test-agent",
+                 dependencies=[TaskDependency(task_id="first")]),
+            Task(id="first", name="First again", agent_type="test-agent")
+        ]
+
+        with pytest.raises(ValueError):
+            await orchestrator.submit_tasks(tasks)
+
+        # Ни зависимость, ни планирование от отклоненного пакета не остались
+        assert await orchestrator.dependency_manager.get_dependencies("second") == []
+        assert await orchestrator.dependency_manager.get_dependents("first") == []
+        assert [task.id for task in await orchestrator.scheduler.get_scheduled_tasks()] == ["first"]
+        assert await orchestrator.task_queue.size() == 1
+
+    async def test_rollback_keeps_earlier_dependencies(self, orchestrator):
+        """Откат пакета удаляет только добавленные им зависимости."""
+        await orchestrator.submit_task(Task(id="base", name="Base", agent_type="test-agent"))
+        await orchestrator.dependency_manager.add_dependency("later", "base")
+
+        async def reject(tasks):
+            return False
+
+        orchestrator.task_queue.enqueue_many = reject
+        tasks = [
+            Task(id="other", name="Other", agent_type="test-agent"),
+            Task(id="later", name="Later", agent_type="test-agent",
+                 dependencies=[TaskDependency(task_id="base"), TaskDependency(task_id="other")])
+        ]
+
+        with pytest.raises(RuntimeError):
+            await orchestrator.submit_tasks(tasks)
+
+        dependency_manager = orchestrator.dependency_manager
+        assert await dependency_manager.get_dependencies("later") == ["base"]
+        assert await dependency_manager.get_dependents("base") == ["later"]
+        assert await dependency_manager.get_dependents("other") == []
+
+    async def test_bulk_submission_rolls_back_on_enqueue_failure(self, orchestrator):
+        """Тест отката пакета, который отклонила очередь."""
+        async def reject(tasks):
+            return False
+
+        orchestrator.task_queue.enqueue_many = reject
+        tasks = [
+            Task(id="root", name="Root", agent_type="test-agent"),
+            Task(id="child", name="Child", agent_type="test-agent",
+                 dependencies=[TaskDependency(task_id="root")])
+        ]
+
+        with pytest.raises(RuntimeError):
+            await orchestrator.submit_tasks(tasks)
+
+        assert await orchestrator.dependency_manager.get_dependencies("child") == []
+        assert await orchestrator.scheduler.get_scheduled_tasks() == []
+        assert await orchestrator.scheduler.get_ready_tasks() == []
+        assert orchestrator._submitted_at == {}
+
     async def test_task_cancellation(self, orchestrator, sample_task):
         """Тест отмены задач."""
         # Отправляем задачу
@@ -147,6 +257,19 @@ class TestAgentOrchestrator:
         # Отменяем задачу
         cancel_result = await orchestrator.cancel_task(task_id)
         assert cancel_result
+        assert task_id not in orchestrator._submitted_at
+
+    async def test_failed_cancellation_forgets_submission_time(self, orchestrator, sample_task):
+        """Время подачи не остается навсегда, даже если отмена завершилась ошибкой."""
+        task_id = await orchestrator.submit_task(sample_task)
+
+        async def broken_cancel(task_id):
+            raise RuntimeError("scheduler unavailable")
+
+        orchestrator.scheduler.cancel_task = broken_cancel
+
+        assert not await orchestrator.cancel_task(task_id)
+        assert task_id not in orchestrator._submitted_at
 
     async def test_system_status(self, orchestrator):
         """Тест получения статуса системы."""
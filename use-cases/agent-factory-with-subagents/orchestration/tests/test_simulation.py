@@ -0,0 +1,164 @@
+"""
+Тесты для режима симуляции на виртуальном времени.
+"""
+
+import asyncio
+import time
+from datetime import timedelta
+import pytest
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from orchestration.balancers.load_balancer import BalancingStrategy
+from orchestration.benchmarks.workloads import bursty_workload
+from orchestration.core.types import Agent, TaskPriority
+from orchestration.managers.priority_manager import PriorityFactor, SmartPriorityManager
+from orchestration.monitoring.tracing import Tracer
+from orchestration.simulation import (
+    OrchestrationSimulator, SimulatedTask, SimulationDeadlockError, SimulationScenario,
+    compare_strategies, run_simulation, scenario_from_otlp, scenario_from_workload
+)
+from orchestration.simulation.virtual_time import DEFAULT_EPOCH
+
+
+def _agent(agent_id: str, agent_type: str) -> Agent:
+    return Agent(id=agent_id, name=agent_id, type=agent_type, capabilities=[agent_type])
+
+
+class TestVirtualTime:
+    """Тесты событийного цикла на виртуальном времени."""
+
+    def test_sleep_advances_virtual_time(self):
+        """Сон на час проходит мгновенно и сдвигает виртуальные часы."""
+        async def main(loop, clock):
+            await asyncio.sleep(3600)
+            await asyncio.wait_for(asyncio.sleep(10), timeout=60)
+            return loop.time(), clock.now()
+
+        wall_start = time.perf_counter()
+        elapsed, now = run_simulation(main)
+
+        assert elapsed == pytest.approx(3610)
+        assert now == DEFAULT_EPOCH + timedelta(seconds=3610)
+        assert time.perf_counter() - wall_start < 1.0
+
+    def test_deadlock_detected(self):
+        """Ожидание события, которое никто не установит, завершается ошибкой."""
+        async def main(loop, clock):
+            await asyncio.Event().wait()
+
+        with pytest.raises(SimulationDeadlockError):
+            run_simulation(main)
+
+
+class TestOrchestrationSimulator:
+    """Тесты симулятора оркестратора."""
+
+    def _scenario(self) -> SimulationScenario:
+        workload = bursty_workload(tasks=200, burst_size=50, burst_interval=60,
+                                   agent_types=2, agents_per_type=2, seed=7)
+        workload.task_duration = 20
+        return scenario_from_workload(workload, seed=7)
+
+    def test_same_seed_is_reproducible(self):
+        """Одинаковый seed дает одинаковое расписание."""
+        scenario = self._scenario()
+
+        first = OrchestrationSimulator(scenario, seed=3).run()
+        second = OrchestrationSimulator(scenario, seed=3).run()
+
+        assert first["finished"] == 200
+        assert first["digest"] == second["digest"]
+        assert first["makespan_seconds"] == second["makespan_seconds"]
+        assert first["virtual_seconds"] > first["wall_seconds"]
+
+    def test_priority_ordered_dispatch(self):
+        """При одном агенте критичная задача выполняется раньше низкоприоритетных."""
+        tasks = [SimulatedTask(id=f"low-{i}", arrival=0.0, duration=100, agent_type="coder",
+                               priority=TaskPriority.LOW) for i in range(3)]
+        tasks.append(SimulatedTask(id="critical", arrival=0.0, duration=100, agent_type="coder",
+                                   priority=TaskPriority.CRITICAL))
+        scenario = SimulationScenario("priorities", tasks, [_agent("coder-1", "coder")])
+
+        report = OrchestrationSimulator(scenario).run()
+        waits = report["wait_seconds"]["by_priority"]
+
+        assert report["finished"] == 4
+        assert waits["CRITICAL"]["p50"] < waits["LOW"]["p50"]
+
+    def test_failed_task_blocks_dependents(self):
+        """Потомки упавшей задачи не выполняются, симуляция не зависает."""
+        tasks = [
+            SimulatedTask(id="root", arrival=0.0, duration=5, agent_type="coder", fails=True),
+            SimulatedTask(id="child", arrival=0.0, duration=5, agent_type="coder", dependencies=["root"]),
+            SimulatedTask(id="other", arrival=10.0, duration=5, agent_type="coder"),
+        ]
+        scenario = SimulationScenario("failures", tasks, [_agent("coder-1", "coder")])
+
+        report = OrchestrationSimulator(scenario).run()
+
+        assert report["finished"] == 2
+        assert report["failed"] == 1
+        assert report["unfinished"] == 1
+
+    def test_compare_strategies(self):
+        """Сравнение стратегий возвращает отчет по каждой стратегии."""
+        results = compare_strategies(
+            self._scenario(),
+            [BalancingStrategy.ROUND_ROBIN, BalancingStrategy.LEAST_LOADED],
+            priority_weights={PriorityFactor.AGE: 0.5}
+        )
+
+        assert set(results) == {"round_robin", "least_loaded"}
+        for report in results.values():
+            assert report["finished"] == 200
+            assert report["priority_weights"] == {"age": 0.5}
+
+
+class TestTraceReplay:
+    """Тесты восстановления сценария из трейса."""
+
+    def test_scenario_from_otlp(self):
+        """Сценарий восстанавливается из экспорта трассировщика и проигрывается."""
+        tracer = Tracer()
+        second = 1_000_000_000
+
+        for index, (task_id, dependencies) in enumerate([("first", ""), ("second", "first")]):
+            start = index * 30 * second
+            attributes = {"task.agent_type": "coder", "task.priority": "HIGH"}
+            if dependencies:
+                attributes["task.dependencies"] = dependencies
+            root = tracer.start_task_trace(task_id, start, attributes)
+            tracer.end_span(tracer.start_span("agent.call", task_id, parent=root, start_ns=start + second,
+                                              attributes={"agent.id": "coder-1", "agent.type": "coder"}),
+                            end_ns=start + 11 * second)
+            tracer.end_span(root, end_ns=start + 12 * second)
+
+        scenario = scenario_from_otlp(tracer.to_otlp())
+        tasks = {task.id: task for task in scenario.tasks}
+
+        assert tasks["second"].arrival == pytest.approx(30)
+        assert tasks["first"].duration == pytest.approx(10)
+        assert tasks["second"].dependencies == ["first"]
+        assert tasks["second"].priority == TaskPriority.HIGH
+        assert [agent.id for agent in scenario.agents] == ["coder-1"]
+
+        assert OrchestrationSimulator(scenario).run()["finished"] == 2
+
+
+class TestPriorityRuleWeights:
+    """Тесты настройки весов правил приоритета."""
+
+    async def test_update_rule_weights(self):
+        """Веса меняются только у указанных факторов."""
+        manager = SmartPriorityManager()
+        before = {rule.factor: rule.weight for rule in manager._priority_rules}
+
+        await manager.update_rule_weights({PriorityFactor.AGE: 0.9})
+
+        after = {rule.factor: rule.weight for rule in manager._priority_rules}
+        assert after[PriorityFactor.AGE] == 0.9
+        assert all(after[factor] == weight for factor, weight in before.items()
+                   if factor != PriorityFactor.AGE)
@@ -0,0 +1,106 @@
+"""
+Тесты для трассировки задач.
+"""
+
+import json
+import pytest
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from orchestration.core.orchestrator import AgentOrchestrator
+from orchestration.core.types import Task, TaskDependency, OrchestrationConfig
+from orchestration.monitoring.tracing import Tracer
+
+
+class TestTracer:
+    """Тесты для Tracer."""
+
+    def test_nested_spans_share_trace(self):
+        """Вложенные спаны становятся дочерними активного спана."""
+        tracer = Tracer()
+        root = tracer.start_task_trace("task-1")
+
+        with tracer.span("task.execution", "task-1") as execution:
+            with tracer.span("agent.call") as call:
+                pass
+
+        assert execution.parent_id == root.span_id
+        assert call.parent_id == execution.span_id
+        assert call.trace_id == root.trace_id
+        assert execution.start_ns <= call.start_ns <= call.end_ns <= execution.end_ns
+
+    def test_exception_marks_span_as_error(self):
+        """Исключение внутри спана помечает его ошибкой."""
+        tracer = Tracer()
+
+        with pytest.raises(RuntimeError):
+            with tracer.span("failing"):
+                raise RuntimeError("boom")
+
+        span = tracer.finished_spans()[0]
+        assert span.error == "RuntimeError: boom"
+
+    def test_disabled_tracer_records_nothing(self):
+        """Выключенный трассировщик не создает спанов."""
+        tracer = Tracer(enabled=False)
+
+        with tracer.span("ignored") as span:
+            assert span is None
+        tracer.start_task_trace("task-1")
+        tracer.finish_task_trace("task-1")
+
+        assert tracer.finished_spans() == []
+
+    def test_otlp_json_export(self, tmp_path):
+        """Экспорт в OTLP/JSON."""
+        tracer = Tracer(service_name="test-service")
+        tracer.start_task_trace("task-1", attributes={"task.priority": "HIGH"})
+        tracer.record_span("task.enqueue", "task-1", 1000, 2000, {"batch.size": 1})
+        tracer.finish_task_trace("task-1", error="failed")
+
+        path = tmp_path / "traces.json"
+        assert tracer.export_json(str(path)) == 2
+
+        payload = json.loads(path.read_text())
+        resource = payload["resourceSpans"][0]
+        assert resource["resource"]["attributes"][0]["value"]["stringValue"] == "test-service"
+
+        enqueue, root = resource["scopeSpans"][0]["spans"]
+        assert len(root["traceId"]) == 32 and len(root["spanId"]) == 16
+        assert enqueue["parentSpanId"] == root["spanId"]
+        assert int(enqueue["endTimeUnixNano"]) - int(enqueue["startTimeUnixNano"]) == 1000
+        assert {"key": "batch.size", "value": {"intValue": "1"}} in enqueue["attributes"]
+        assert root["status"] == {"code": 2, "message": "failed"}
+
+
+class TestOrchestratorTracing:
+    """Тесты трассировки в оркестраторе."""
+
+    async def test_submission_and_cancellation_traced(self):
+        """Подача и отмена задачи формируют завершенный трейс."""
+        orchestrator = AgentOrchestrator(OrchestrationConfig(enable_tracing=True))
+        await orchestrator.start()
+
+        try:
+            await orchestrator.submit_tasks([
+                Task(id="traced-0", name="Root", agent_type="coder"),
+                Task(id="traced-1", name="Child", agent_type="coder",
+                     dependencies=[TaskDependency(task_id="traced-0")])
+            ])
+
+            root = orchestrator.tracer.task_root("traced-1")
+            assert root is not None
+            assert orchestrator.tracer.get_mark("traced-0", "ready") is not None
+            assert orchestrator.tracer.get_mark("traced-1", "ready") is None
+
+            await orchestrator.cancel_task("traced-1")
+        finally:
+            await orchestrator.shutdown()
+
+        spans = [span for span in orchestrator.tracer.finished_spans()
+                 if span.trace_id == root.trace_id]
+        assert [span.name for span in spans] == ["task.enqueue", "task"]
+        assert spans[1].error == "cancelled"
+        assert spans[0].attributes["batch.size"] == 2
@@ -18,6 +18,8 @@ import logging
 from typing import Optional, Dict, Any, List
 from pydantic_ai import RunContext
 
+from ..common.knowledge_client import search_agent_knowledge_text
+
 logger = logging.getLogger(__name__)
 
 # ============================================================================
@@ -49,29 +51,18 @@ async def search_agent_knowledge(
         knowledge_tags = getattr(ctx.deps, 'knowledge_tags', [])
         knowledge_domain = getattr(ctx.deps, 'knowledge_domain', None)
 
-        # Формируем запрос с учетом тегов роли
-        search_query = f"{query} {' '.join(knowledge_tags)}"
-
-        logger.info(f"Ищу в базе знаний роли: {search_query}")
-
-        # ПРИМЕЧАНИЕ: Здесь должен быть вызов Archon RAG
-        # Для шаблона оставляем заглушку
-        # В реальном агенте: await mcp__archon__rag_search_knowledge_base(...)
-
-        result = f"""
-📚 **База знаний роли [{ctx.deps.agent_name}]:**
-
-🔍 Запрос: {query}
-📋 Теги: {', '.join(knowledge_tags)}
-🌐 Домен: {knowledge_domain or 'Не указан'}
-
-💡 **Найденная информация:**
-[Здесь будут результаты поиска из Archon RAG]
-
-ШАБЛОН: Замените на реальный вызов mcp__archon__rag_search_knowledge_base
-"""
-
-        return result
+        logger.info(f"Ищу в базе знаний роли: {query}, теги: {knowledge_tags}")
+
+        # Общий клиент Archon (common/knowledge_client.py): пул соединений,
+        # кэш результатов и объединение одинаковых запросов для всех агентов
+        return await search_agent_knowledge_text(
+            query=query,
+            tags=knowledge_tags,
+            domain=knowledge_domain,
+            match_count=match_count,
+            label=f"📚 База знаний роли [{ctx.deps.agent_name}]",
+            base_url=getattr(ctx.deps, 'archon_url', None)
+        )
 
     except Exception as e:
         logger.error(f"Ошибка поиска в базе знаний: {e}")